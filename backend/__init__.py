@@ -2,6 +2,7 @@
 # backend/__init__.py
 # Import necessary modules and packages
 import os
+import logging
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
 from .config import Config
@@ -10,11 +11,15 @@ from datetime import timedelta
 from .commands import register_commands
 from backend.utils.file_encryption import file_encryptor
 from backend.utils.rate_limiter import limiter
+from backend.utils.db_engine import engine_options, configure_engine
+from backend.utils import principal_cache, metrics
+from backend.utils.logging_config import configure_logging, init_request_ids
 
 # Import extensions from our extensions module
 from .extensions import db, migrate, login_manager, cors, ma, csrf
 
 mail = Mail()
+logger = logging.getLogger(__name__)
 
 # Correctly find project root and .env path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -33,7 +38,12 @@ def create_app(config_class=Config):
     app = Flask(__name__, instance_relative_config=False)
 
     app.config.from_object(config_class)
-    print(f"--- [INIT] Loaded config from object: {config_class.__name__} ---")
+    # One queue-backed logging setup, JSON lines with request ids (see utils/logging_config.py)
+    configure_logging(app.config)
+    init_request_ids(app)
+    # Per-endpoint latency, size and query histograms (see utils/metrics.py)
+    metrics.init_app(app)
+    logger.info("Loaded config from object: %s", config_class.__name__)
     
     # --- Initialize Flask Extensions ---
     # --- Bulletproof Session Cookie & CORS Config for Dev/Prod ---
@@ -81,7 +91,11 @@ def create_app(config_class=Config):
         return response
     
     mail.init_app(app)
+    # Pooling/pragmas for the configured database (SQLite WAL, Postgres pool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     ma.init_app(app)
@@ -117,12 +131,17 @@ def create_app(config_class=Config):
     login_manager.login_message_category = 'info'
 
     # --- User Loader for Flask-Login ---
+    # Served from a short-lived per-worker cache (see utils/principal_cache.py)
+    principal_cache.init_app(app)
+
     @login_manager.user_loader
     def load_user(user_id):
-        # Import User model here to avoid circular imports
-        from backend.models import User
-        return User.query.get(int(user_id))
+        return principal_cache.load_principal(user_id)
     
+    # Erases deleted documents' files in the background (see services/shred_service.py)
+    from backend.services.shred_service import ShredWorker
+    ShredWorker().init_app(app)
+
     register_commands(app)
 
     # --- Register Blueprints ---
@@ -136,10 +155,15 @@ def create_app(config_class=Config):
         # Exempt API routes from CSRF
         csrf.exempt(api_blueprint)
 
-        print("--- Blueprints Registered Successfully ---")
+        logger.info("Blueprints registered")
+
+        # Load the form interrogatory catalogs up front so requests are served from memory
+        from backend.app.discovery.catalog import interrogatory_catalog
+        loaded_languages = interrogatory_catalog.preload()
+        logger.info("Interrogatory catalogs preloaded: %s", loaded_languages)
 
     except ImportError as e:
-        print(f"--- Error importing or registering Blueprints: {e} ---")
+        logger.error("Error importing or registering Blueprints: %s", e)
 
     # --- Return App Instance ---
     return app
\ No newline at end of file
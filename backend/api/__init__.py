@@ -16,6 +16,8 @@ from . import generation # <-- ADD THIS LINE
 from . import discovery
 from . import auth
 from . import medical
+from . import admin
+from . import subpoenas
 from .medical import medical_bp
 
 bp.register_blueprint(medical_bp)
@@ -0,0 +1,129 @@
+# backend/api/admin.py
+from functools import wraps
+from flask import jsonify, current_app, request, Response, stream_with_context
+from flask_login import login_required, current_user
+from backend.extensions import db
+from backend.utils.db_engine import pool_stats
+from backend.utils.metrics import CONTENT_TYPE, render_metrics, scrape_token_valid
+from backend.services.transfer_service import (
+    export_ndjson, export_blob_archive, import_ndjson, TransferServiceError, DEFAULT_BATCH_SIZE
+)
+from . import bp
+from .auth import admin_required, security_logger
+
+
+@bp.route('/admin/db-pool', methods=['GET'])
+@login_required
+@admin_required
+def get_db_pool_stats():
+    """
+    Connection pool statistics for this worker process (admin only): checkouts,
+    waits and timeouts since the worker started, plus the pool's current size,
+    checked out connections and overflow. Each gunicorn worker has its own pool,
+    so repeated calls may be answered by different workers (see 'pid').
+    """
+    stats = pool_stats.snapshot(db.engine)
+    stats['config'] = {key: current_app.config.get(key) for key in (
+        'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE',
+        'DB_STATEMENT_TIMEOUT_MS', 'SQLITE_BUSY_TIMEOUT_MS')}
+    security_logger.info("Admin %s retrieved database pool statistics", current_user.username)
+    return jsonify(stats), 200
+
+
+def scrape_token_or_admin_required(f):
+    """Lets a request with the METRICS_TOKEN bearer token through; anything else needs an admin session."""
+    admin_view = login_required(admin_required(f))
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if scrape_token_valid():
+            return f(*args, **kwargs)
+        return admin_view(*args, **kwargs)
+    return decorated_function
+
+
+@bp.route('/admin/metrics', methods=['GET'])
+@scrape_token_or_admin_required
+def get_metrics():
+    """
+    Per-endpoint request latency, response size and database query
+    histograms in the Prometheus text format, summed over all workers
+    (see utils/metrics.py). For scrapers, send 'Authorization: Bearer
+    <METRICS_TOKEN>'; otherwise admin only. Not audit-logged: scrapers call
+    it constantly.
+    """
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+
+def _export_scope():
+    """The export's scope from the query string: user_id, username or firm."""
+    scope = {
+        'user_id': request.args.get('user_id', type=int),
+        'username': request.args.get('username') or None,
+        'firm': request.args.get('firm') or None,
+    }
+    if sum(value is not None for value in scope.values()) != 1:
+        return None
+    return scope
+
+
+@bp.route('/admin/export/cases.ndjson', methods=['GET'])
+@login_required
+@admin_required
+def export_cases():
+    """
+    Streams an NDJSON export of a user's (user_id or username) or a firm's
+    cases and documents. ?blobs=1 names each document's file in the blob
+    archive (GET /admin/export/blobs.tar with the same scope).
+    """
+    scope = _export_scope()
+    if scope is None:
+        return jsonify({'error': "Give exactly one of 'user_id', 'username' or 'firm'"}), 400
+    include_blobs = request.args.get('blobs', '').lower() in ('1', 'true', 'yes')
+    security_logger.info("Admin %s exported cases for %s", current_user.username, scope)
+    return Response(stream_with_context(export_ndjson(include_blobs=include_blobs, **scope)),
+                    mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=cases.ndjson'})
+
+
+@bp.route('/admin/export/blobs.tar', methods=['GET'])
+@login_required
+@admin_required
+def export_blobs():
+    """Streams a tar archive of the documents' stored (encrypted) files for the same scope."""
+    scope = _export_scope()
+    if scope is None:
+        return jsonify({'error': "Give exactly one of 'user_id', 'username' or 'firm'"}), 400
+    security_logger.info("Admin %s exported document files for %s", current_user.username, scope)
+    return Response(stream_with_context(export_blob_archive(**scope)),
+                    mimetype='application/x-tar',
+                    headers={'Content-Disposition': 'attachment; filename=blobs.tar'})
+
+
+@bp.route('/admin/import', methods=['POST'])
+@login_required
+@admin_required
+def import_cases():
+    """
+    Imports an export (multipart: 'ndjson' file, optional 'blobs' archive).
+    Form fields: 'key' names the checkpoint (defaults to the file name; post
+    again with the same key to resume), 'owner' gives every case to one user,
+    'batch_size' sets records per transaction.
+    """
+    ndjson_file = request.files.get('ndjson')
+    if ndjson_file is None or not ndjson_file.filename:
+        return jsonify({'error': "An 'ndjson' file is required"}), 400
+    blobs_file = request.files.get('blobs')
+    import_key = request.form.get('key') or ndjson_file.filename
+    batch_size = request.form.get('batch_size', DEFAULT_BATCH_SIZE, type=int)
+
+    try:
+        result = import_ndjson(ndjson_file.stream, import_key,
+                               owner_username=request.form.get('owner') or None,
+                               blob_file=blobs_file.stream if blobs_file and blobs_file.filename else None,
+                               batch_size=batch_size)
+    except TransferServiceError as e:
+        security_logger.warning("Admin %s import '%s' failed: %s", current_user.username, import_key, e)
+        return jsonify({'error': str(e)}), 400
+    security_logger.info("Admin %s imported '%s': %s", current_user.username, import_key, result['status'])
+    return jsonify(result), 200
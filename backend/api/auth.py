@@ -11,6 +11,7 @@ from functools import wraps
 from datetime import datetime, timedelta
 import logging
 from backend.utils.rate_limiter import limiter
+from backend.utils.principal_cache import SessionPrincipal, remember_principal, forget_session
 from . import bp
 from . import cases
 from . import documents
@@ -18,14 +19,10 @@ from . import generation
 from . import discovery
 from . import auth
 
-# Setup security logger
+logger = logging.getLogger(__name__)
+
+# Audit log: also written to LOG_FILE_DIR/security.log (see utils/logging_config.py)
 security_logger = logging.getLogger('security')
-if not security_logger.handlers:
-    handler = logging.FileHandler('security.log')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    security_logger.setLevel(logging.INFO)
-    security_logger.addHandler(handler)
 
 def admin_required(f):
     @wraps(f)
@@ -36,7 +33,7 @@ def admin_required(f):
         # Check if user is admin (you'll need to add an is_admin field later)
         # For now, we can consider the first user as admin
         if current_user.id != 1:  # Assuming user with ID 1 is admin
-            security_logger.warning(f"User {current_user.id} attempted to access admin route without privileges")
+            security_logger.warning("User %s attempted to access admin route without privileges", current_user.id)
             return jsonify({"error": "Admin privileges required"}), 403
             
         return f(*args, **kwargs)
@@ -54,10 +51,10 @@ def register():
         # Validate incoming data using the registration schema
         validated_data = registration_input_schema.load(json_data)
     except ValidationError as err:
-        print(f"Validation Error on Registration: {err.messages}")
+        logger.error("Validation Error on Registration: %s", err.messages)
         return jsonify({"error": "Validation failed", "messages": err.messages}), 400
     except Exception as val_err:
-         print(f"Error during validation call: {val_err}")
+         logger.error("Error during validation call: %s", val_err)
          return jsonify({'error': 'Data validation process failed'}), 500
 
     # Use validated data
@@ -68,10 +65,10 @@ def register():
 
     # Check if username or email already exists
     if User.query.filter_by(username=username).first():
-        security_logger.info(f"Registration attempt with existing username: {username}")
+        security_logger.info("Registration attempt with existing username: %s", username)
         return jsonify({"error": "Username already exists"}), 409
     if email and User.query.filter_by(email=email).first():
-        security_logger.info(f"Registration attempt with existing email: {email}")
+        security_logger.info("Registration attempt with existing email: %s", email)
         return jsonify({"error": "Email already exists"}), 409
 
     # Create new user with pending approval
@@ -92,7 +89,7 @@ def register():
         db.session.add(new_user)
         db.session.commit()
 
-        security_logger.info(f"User registered successfully (pending approval): {username} from IP {request.remote_addr}")
+        security_logger.info("User registered successfully (pending approval): %s from IP %s", username, request.remote_addr)
         
         # Send approval request to admin
         send_admin_approval_request(new_user)
@@ -107,11 +104,11 @@ def register():
 
     except IntegrityError as e:
         db.session.rollback()
-        security_logger.warning(f"IntegrityError during registration for {username}: {e}")
+        security_logger.warning("IntegrityError during registration for %s: %s", username, e)
         return jsonify({"error": "Username or email might already exist (Integrity error)"}), 409
     except Exception as e:
         db.session.rollback()
-        security_logger.error(f"Error during registration for {username}: {e}")
+        security_logger.error("Error during registration for %s: %s", username, e)
         return jsonify({"error": "An unexpected error occurred during registration"}), 500
 
 @bp.route('/auth/login', methods=['POST'])
@@ -148,69 +145,49 @@ def login():
 
     # If user not found, return generic error
     if user is None:
-        security_logger.info(f"Login attempt with non-existent username: {username} from IP {client_ip}")
+        security_logger.info("Login attempt with non-existent username: %s from IP %s", username, client_ip)
         return jsonify({"error": "Invalid username or password"}), 401
         
-    # Check if account is locked
-    if hasattr(user, 'locked_until') and user.locked_until:
-        if user.locked_until > datetime.utcnow():
-            lock_expiry = user.locked_until.strftime("%Y-%m-%d %H:%M:%S")
-            security_logger.warning(f"Login attempt to locked account: {username} from IP {client_ip}")
-            return jsonify({
-                "error": "Account locked",
-                "message": f"Your account is temporarily locked due to multiple failed login attempts. Please try again after {lock_expiry}."
-            }), 403
-        else:
-            # Lock expired, reset the lock
-            user.locked_until = None
-            db.session.commit()
+    # Check if account is locked (an expired lock is cleared by the next login)
+    if user.is_account_locked():
+        lock_expiry = user.locked_until.strftime("%Y-%m-%d %H:%M:%S")
+        security_logger.warning("Login attempt to locked account: %s from IP %s", username, client_ip)
+        return jsonify({
+            "error": "Account locked",
+            "message": f"Your account is temporarily locked due to multiple failed login attempts. Please try again after {lock_expiry}."
+        }), 403
         
     # Validate password is correct
     if not user.check_password(password):
-        # Increment failed attempts counter
-        if hasattr(user, 'failed_login_attempts'):
-            user.failed_login_attempts = user.failed_login_attempts + 1 if user.failed_login_attempts else 1
-            
-            # Lock account if too many failed attempts
-            if user.failed_login_attempts >= 10:
-                user.locked_until = datetime.utcnow() + timedelta(hours=24)
-                security_logger.warning(f"Account {username} locked for 24 hours after 10 failed attempts. IP: {client_ip}")
-            elif user.failed_login_attempts >= 5:
-                user.locked_until = datetime.utcnow() + timedelta(minutes=15)
-                security_logger.warning(f"Account {username} locked for 15 minutes after 5 failed attempts. IP: {client_ip}")
-                
-            db.session.commit()
+        # Count the attempt (and lock if too many) in one commit
+        user.increment_login_attempts()
+        db.session.commit()
+        if user.failed_login_attempts >= 10:
+            security_logger.warning("Account %s locked for 24 hours after 10 failed attempts. IP: %s", username, client_ip)
+        elif user.failed_login_attempts >= 5:
+            security_logger.warning("Account %s locked for 15 minutes after 5 failed attempts. IP: %s", username, client_ip)
             
-        security_logger.warning(f"Failed login attempt for user {username} from IP {client_ip}")
+        security_logger.warning("Failed login attempt for user %s from IP %s", username, client_ip)
         return jsonify({"error": "Invalid username or password"}), 401
 
     # Check if user account is approved
     if user.pending_approval:
-        security_logger.info(f"Login attempt to unapproved account: {username} from IP {client_ip}")
+        security_logger.info("Login attempt to unapproved account: %s from IP %s", username, client_ip)
         return jsonify({
             "error": "Account pending approval",
             "message": "Your account is waiting for approval. You'll receive an email when your account is approved."
         }), 403
 
-    # All checks passed - log the user in
+    # All checks passed - log the user in; security tracking is reset in the same commit
+    user.record_successful_login(client_ip)
     login_user(user, remember=remember)
-    
-    # Reset security tracking
-    if hasattr(user, 'failed_login_attempts'):
-        user.failed_login_attempts = 0
-    if hasattr(user, 'locked_until'):
-        user.locked_until = None
-    if hasattr(user, 'last_login_at'):
-        user.last_login_at = datetime.utcnow()
-    if hasattr(user, 'last_login_ip'):
-        user.last_login_ip = client_ip
-        
+    principal = SessionPrincipal(user)
+    user_data = user_schema.dump(user)
     db.session.commit()
+    remember_principal(principal)
 
-    security_logger.info(f"User {username} logged in successfully from IP {client_ip}")
+    security_logger.info("User %s logged in successfully from IP %s", username, client_ip)
 
-    # Serialize the logged-in user
-    user_data = user_schema.dump(user)
     return jsonify({
         "message": "Login successful",
         "user": user_data
@@ -223,7 +200,8 @@ def logout():
     username = current_user.username
     client_ip = request.remote_addr
     logout_user()
-    security_logger.info(f"User {username} logged out from IP {client_ip}")
+    forget_session()
+    security_logger.info("User %s logged out from IP %s", username, client_ip)
     return jsonify({"message": "Logout successful"}), 200
 
 @bp.route('/auth/change-password', methods=['POST'])
@@ -244,22 +222,25 @@ def change_password():
     current_password = validated_data.get('current_password')
     new_password = validated_data.get('new_password')
     
+    # The principal is a cached snapshot; check and update the user's row
+    user = db.session.get(User, current_user.id)
+
     # Verify current password
-    if not current_user.check_password(current_password):
-        security_logger.warning(f"Failed password change attempt (wrong current password) for user {current_user.username}")
+    if not user.check_password(current_password):
+        security_logger.warning("Failed password change attempt (wrong current password) for user %s", current_user.username)
         return jsonify({"error": "Current password is incorrect"}), 401
         
     # Check if new password is same as old
     if current_password == new_password:
         return jsonify({"error": "New password must be different from current password"}), 400
         
-    # Update password
-    current_user.set_password(new_password)
-    if hasattr(current_user, 'password_changed_at'):
-        current_user.password_changed_at = datetime.utcnow()
+    # Update password; other sessions of this user are logged out by the new stamp
+    user.set_password(new_password)
+    principal = SessionPrincipal(user)
     db.session.commit()
+    remember_principal(principal)
     
-    security_logger.info(f"Password changed successfully for user {current_user.username}")
+    security_logger.info("Password changed successfully for user %s", current_user.username)
     return jsonify({"message": "Password changed successfully"}), 200
 
 @bp.route('/auth/status')
@@ -278,7 +259,7 @@ def approve_user(token):
     user = User.query.filter_by(approval_token=token).first()
     
     if not user:
-        security_logger.warning(f"Invalid approval token attempt: {token}")
+        security_logger.warning("Invalid approval token attempt: %s", token)
         return jsonify({"error": "Invalid or expired approval token"}), 404
     
     if not user.pending_approval:
@@ -291,7 +272,7 @@ def approve_user(token):
     # Send approval notification to user
     send_user_approved_notification(user)
     
-    security_logger.info(f"User {user.username} approved via token")
+    security_logger.info("User %s approved via token", user.username)
     return jsonify({
         "message": f"User {user.username} approved successfully.",
         "user": user_schema.dump(user)
@@ -302,8 +283,8 @@ def approve_user(token):
 @admin_required
 def get_pending_users():
     """Get all pending users (admin only)"""
-    pending_users = User.query.filter_by(pending_approval=True).all()
-    security_logger.info(f"Admin {current_user.username} retrieved list of {len(pending_users)} pending users")
+    pending_users = User.query.filter_by(pending_approval=True).order_by(User.created_at).all()
+    security_logger.info("Admin %s retrieved list of %s pending users", current_user.username, len(pending_users))
     return jsonify({
         "pending_users": user_schema.dump(pending_users, many=True),
         "count": len(pending_users)
@@ -326,7 +307,7 @@ def admin_approve_user(user_id):
     # Send approval notification to user
     send_user_approved_notification(user)
     
-    security_logger.info(f"Admin {current_user.username} approved user {user.username}")
+    security_logger.info("Admin %s approved user %s", current_user.username, user.username)
     return jsonify({
         "message": f"User {user.username} approved successfully.",
         "user": user_schema.dump(user)
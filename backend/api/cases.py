@@ -5,19 +5,28 @@ import datetime # <<< ADD THIS IMPORT
 from flask import send_file, current_app # Import send_file and current_app (might need current_app for config later)
 from flask import request, jsonify
 from flask_login import login_required, current_user # <-- ADDED/ENSURE THIS
-from werkzeug.exceptions import Forbidden # <-- ADDED/ENSURE THIS
+from werkzeug.exceptions import Forbidden, NotFound # <-- ADDED/ENSURE THIS
 from docxtpl import DocxTemplate 
 from marshmallow import ValidationError # <<< Import ValidationError
 from backend.extensions import db # Import db from extensions
-from backend.models import Case, Document # Import necessary models
+from backend.models import Case, Document, CaseSuggestion # Import necessary models
 from . import bp # Import the blueprint instance from api/__init__.py
-from backend.schemas import case_schema, case_update_input_schema, case_update_input_schema, case_create_input_schema, cases_schema
+from backend.schemas import case_schema, case_update_input_schema, case_update_input_schema, case_create_input_schema, cases_schema, case_list_schema
 
 from backend.services.case_service import (
     create_case, get_case_by_id, update_case, delete_case, # Add update/delete
+    get_all_cases_for_user, find_cases_by_number, get_case_versions, PROFILE_DETAIL, PROFILE_TEMPLATE_CONTEXT,
     DuplicateCaseError, CaseServiceError, CaseNotFoundError
 )
+from backend.utils.http_cache import make_etag, not_modified, add_validators
+from backend.services.suggestion_service import (
+    list_suggestions, apply_suggestions, group_by_document, SuggestionServiceError
+)
 from flask_login import login_required, current_user
+import logging
+
+logger = logging.getLogger(__name__)
+
 # === REPLACE the entire TEMPLATE_CONTEXT_MAP dictionary near the top of cases.py with this ===
 TEMPLATE_CONTEXT_MAP = {
     # --- Configuration for jury_fees_template.docx ---
@@ -148,6 +157,12 @@ TEMPLATE_CONTEXT_MAP = {
 # === END REPLACEMENT ===
 # == Case Management Endpoints ==
 
+def _owner_version():
+    """The logged-in user's serialized fields (case reads nest the owner), already in memory."""
+    return (current_user.id, current_user.username, current_user.email, current_user.firm,
+            current_user.pending_approval, current_user.created_at, current_user.approved_at,
+            current_user.password_changed_at, current_user.last_login_at)
+
 # Consolidated route for /cases handling GET and POST (relative to /api prefix)
 @bp.route('/cases', methods=['GET', 'POST'])
 @login_required
@@ -155,18 +170,30 @@ def handle_cases():
     """Handles fetching all cases (GET) and creating a new case (POST)."""
     if request.method == 'GET':
         # --- GET Logic (Serialization using output schema) ---
-        print("--- Handling GET /api/cases (Blueprint) ---")
+        logger.debug("Handling GET /api/cases (Blueprint)")
+        case_number = request.args.get('case_number')
+        if case_number:
+            try:
+                return jsonify(case_list_schema.dump(find_cases_by_number(current_user.id, case_number.strip())))
+            except CaseServiceError as e:
+                return jsonify({'error': str(e)}), 500
         try:
-            cases = Case.query.filter_by(user_id=current_user.id).order_by(Case.display_name).all()
-            result = cases_schema.dump(cases)
-            return jsonify(result)
+            versions = get_case_versions(current_user.id)
+            etag = make_etag('cases', _owner_version(), versions['cases'], versions['documents'])
+            cached = not_modified(etag, versions['last_modified'])
+            if cached:
+                return cached
+
+            cases = get_all_cases_for_user(current_user.id)
+            result = case_list_schema.dump(cases)
+            return add_validators(jsonify(result), etag, versions['last_modified'])
         except Exception as e:
-            print(f"Error fetching cases: {e}")
+            logger.error("Error fetching cases: %s", e)
             return jsonify({'error': 'Failed to fetch cases'}), 500
 
     elif request.method == 'POST':
         # --- POST Logic (Validation using input schema, call service, Serialization using output schema) ---
-        print("--- Handling POST /api/cases (Blueprint - AUTH REQUIRED by user {current_user.id}) ---") # Added user logging
+        logger.debug("Handling POST /api/cases (Blueprint - AUTH REQUIRED by user %s)", current_user.id)
         request_data = request.get_json()
         if not request_data:
             return jsonify({'error': 'No data provided'}), 400
@@ -177,11 +204,11 @@ def handle_cases():
             # Use validate() which doesn't require session or instance
             errors = case_create_input_schema.validate(request_data) # Use create schema
             if errors:
-                print(f"Validation Error on Case Create: {errors}")
+                logger.error("Validation Error on Case Create: %s", errors)
                 return jsonify({'error': 'Validation failed', 'messages': errors}), 400
             # Data is structurally valid according to CaseCreateInputSchema
         except Exception as val_err:
-             print(f"Error during validation call: {val_err}")
+             logger.error("Error during validation call: %s", val_err)
              return jsonify({'error': 'Data validation process failed'}), 500
 
         # 2. Call the service function with the original (now validated) data
@@ -198,7 +225,7 @@ def handle_cases():
         except DuplicateCaseError as e: return jsonify({'error': str(e)}), 409
         except CaseServiceError as e: return jsonify({'error': str(e)}), 500
         except Exception as e:
-            print(f"Unexpected error handling POST /api/cases: {e}")
+            logger.error("Unexpected error handling POST /api/cases: %s", e)
             # Potentially rollback if service didn't already
             # db.session.rollback()
             return jsonify({'error': 'An unexpected error occurred'}), 500
@@ -211,24 +238,34 @@ def handle_cases():
 @login_required
 def get_case_details(case_id):
     """Fetches details for a specific case."""
-    print(f"--- Handling GET /api/cases/{case_id} (AUTH REQUIRED) ---")
+    logger.debug("Handling GET /api/cases/%s (AUTH REQUIRED)", case_id)
     try:
+        # Unknown or someone else's case: fall through to the normal 404/403 handling
+        versions = get_case_versions(current_user.id, case_id=case_id)
+        if versions is not None:
+            etag = make_etag('case', case_id, _owner_version(), versions['cases'], versions['documents'])
+            cached = not_modified(etag, versions['last_modified'])
+            if cached:
+                return cached
+
         # Use .first_or_404() for slightly cleaner handling
-        target_case = get_case_by_id(case_id, user_id=current_user.id)
+        target_case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_DETAIL)
         if target_case is None:
             return jsonify({'error': 'Case not found'}), 404
             
         # Add debug prints
-        print(f"DEBUG: Retrieved case {case_id} from database")
-        print(f"DEBUG: Case details: {target_case.case_details}")
+        logger.debug("Retrieved case %s from database", case_id)
+        logger.debug("Case details: %s", target_case.case_details)
         
         # Serialize the case object using the schema
         result = case_schema.dump(target_case)
-        print(f"DEBUG: Serialized case data: {result}")
-        return jsonify(result)
+        logger.debug("Serialized case data: %s", result)
+        if versions is None:
+            return jsonify(result)
+        return add_validators(jsonify(result), etag, versions['last_modified'])
     except Forbidden as e: return jsonify({'error': str(e) or 'Permission denied'}), 403
     except Exception as e:
-        print(f"Error fetching case {case_id}: {e}")
+        logger.error("Error fetching case %s: %s", case_id, e)
         return jsonify({'error': 'Failed to fetch case details'}), 500
 
 
@@ -237,7 +274,7 @@ def get_case_details(case_id):
 @login_required
 def update_case_details(case_id):
     """Updates details for a specific case using service."""
-    print(f"--- Handling PUT /api/cases/{case_id} (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling PUT /api/cases/%s (AUTH REQUIRED by user %s)", case_id, current_user.id)
     data = request.get_json()  # Use a consistent variable name
     if not data:
         return jsonify({'error': 'No update data provided'}), 400
@@ -273,43 +310,86 @@ def update_case_details(case_id):
     except Forbidden as e:
         return jsonify({'error': str(e) or 'Permission denied'}), 403
     except Exception as e:
-        print(f"Error updating case: {e}")
+        logger.error("Error updating case: %s", e)
         return jsonify({'error': str(e)}), 500
     
 
 
+@bp.route('/cases/<int:case_id>/suggestions', methods=['GET'])
+@login_required
+def get_case_suggestions(case_id):
+    """Lists a case's AI suggestions (pending by default; ?status=accepted|rejected|all)."""
+    logger.debug("Handling GET /api/cases/%s/suggestions (AUTH REQUIRED by user %s)", case_id, current_user.id)
+    status = request.args.get('status', CaseSuggestion.STATUS_PENDING)
+    try:
+        suggestions = list_suggestions(case_id, current_user.id, status=None if status == 'all' else status)
+        return jsonify({
+            'suggestions': [s.to_dict() for s in suggestions],
+            # Same layout as the old case_details['pending_suggestions']
+            'by_document': group_by_document(suggestions),
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except NotFound:
+        return jsonify({'error': 'Case not found'}), 404
+    except Forbidden as e:
+        return jsonify({'error': str(e) or 'Permission denied'}), 403
+    except Exception as e:
+        logger.error("Error listing suggestions for case %s: %s", case_id, e)
+        return jsonify({'error': 'Failed to fetch suggestions'}), 500
+
+
+@bp.route('/cases/<int:case_id>/suggestions/apply', methods=['POST'])
+@login_required
+def apply_case_suggestions(case_id):
+    """
+    Applies and/or rejects suggestions in bulk. Body:
+        {"accept": [id or {"id"|"document_id"+"field", "value"?, "lock"?}],
+         "reject": [...], "reject_remaining": false}
+    """
+    logger.debug("Handling POST /api/cases/%s/suggestions/apply (AUTH REQUIRED by user %s)", case_id, current_user.id)
+    data = request.get_json() or {}
+    accept = data.get('accept') or []
+    reject = data.get('reject') or []
+    if not isinstance(accept, list) or not isinstance(reject, list):
+        return jsonify({'error': "'accept' and 'reject' must be lists"}), 400
+
+    try:
+        result = apply_suggestions(case_id, current_user.id, accept=accept, reject=reject,
+                                   reject_remaining=bool(data.get('reject_remaining')))
+        target_case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_DETAIL)
+        result['case'] = case_schema.dump(target_case)
+        return jsonify(result)
+    except NotFound:
+        return jsonify({'error': 'Case not found'}), 404
+    except Forbidden as e:
+        return jsonify({'error': str(e) or 'Permission denied'}), 403
+    except SuggestionServiceError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        logger.error("Error applying suggestions for case %s: %s", case_id, e)
+        return jsonify({'error': 'Failed to apply suggestions'}), 500
+
+
 @bp.route('/cases/<int:case_id>', methods=['DELETE'])
 @login_required # <-- ADD THIS decorator
 def delete_case_and_documents(case_id):
     """Deletes a case (DB via service) and associated documents/files."""
-    print(f"--- Handling DELETE /api/cases/{case_id} (AUTH REQUIRED) ---")
+    logger.debug("Handling DELETE /api/cases/%s (AUTH REQUIRED)", case_id)
 
-    # We need file paths *before* deleting the case record
     try:
-        # --- MODIFIED: Fetch case AND verify ownership first ---
-        case_to_delete = get_case_by_id(case_id, user_id=current_user.id)
-        file_paths_to_delete = [doc.file_path for doc in case_to_delete.documents if doc.file_path]
-        print(f"Identified files for potential deletion: {file_paths_to_delete}")
-
-        # --- MODIFIED: Call delete service, passing user_id ---
-        delete_successful = delete_case(case_id, user_id=current_user.id)
-
-        if not delete_successful: raise CaseServiceError("Case service reported delete failure.")
-
-        # --- File deletion logic (keep your existing logic here) ---
-        # ... your loop to os.remove(file_path) ...
-        print(f"Attempting to delete files...") # Example log
-        # ...
-        message = f'Case {case_id} deleted successfully...' # Your success message logic
-
-        return jsonify({'message': message}), 200
+        # Ownership is checked by the service; the files are erased in the
+        # background once the delete commits
+        files_queued = delete_case(case_id, user_id=current_user.id)
+        message = f'Case {case_id} deleted successfully ({files_queued} file(s) queued for secure deletion)'
+        return jsonify({'message': message, 'files_queued': files_queued}), 200
 
     except CaseNotFoundError as e: return jsonify({'error': str(e)}), 404
     except Forbidden as e: return jsonify({'error': str(e) or 'Permission denied'}), 403 # <-- ADDED handling
     except CaseServiceError as e: return jsonify({'error': str(e)}), 500
     except Exception as e:
-         print(f"Error fetching case/doc paths for deletion {case_id}: {e}")
-         return jsonify({'error': 'Failed to retrieve case/document info for deletion'}), 500
+         logger.error("Error deleting case %s: %s", case_id, e)
+         return jsonify({'error': 'Failed to delete case'}), 500
 
     
 # === Add this new route for Word document generation ===
@@ -321,23 +401,23 @@ def download_word_document(case_id):
     Generates and sends a Word document based on a template name
     provided in the request body.
     """
-    print(f"--- Handling POST /api/cases/{case_id}/download_word_document (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling POST /api/cases/%s/download_word_document (AUTH REQUIRED by user %s)", case_id, current_user.id)
 
     # --- Get Template Name from Request ---
     request_data = request.get_json()
     if not request_data:
-        print("Error: No JSON data provided in request body")
+        logger.error("Error: No JSON data provided in request body")
         return jsonify({'error': 'No JSON data provided in request body'}), 400
 
     template_name = request_data.get('template_name')
     if not template_name:
-        print("Error: Missing 'template_name' in request body")
+        logger.error("Error: Missing 'template_name' in request body")
         return jsonify({'error': 'Missing "template_name" in request body'}), 400
 
     # Basic validation (optional but recommended): Check for potentially unsafe names
     # Prevent directory traversal and check extension
     if '..' in template_name or '/' in template_name or '\\' in template_name or not template_name.endswith('.docx'):
-         print(f"Error: Invalid template name format or characters: {template_name}")
+         logger.error("Error: Invalid template name format or characters: %s", template_name)
          return jsonify({'error': 'Invalid template name specified'}), 400
     # Optional: Limit to known/allowed templates
     # allowed_templates = ['jury_fees_template.docx', 'another_template.docx']
@@ -345,17 +425,17 @@ def download_word_document(case_id):
     #    print(f"Error: Template '{template_name}' is not allowed.")
     #    return jsonify({'error': f"Template '{template_name}' not allowed"}), 400
 
-    print(f"--- Requested template: {template_name} ---")
+    logger.debug("Requested template: %s", template_name)
 
     # --- 1. Fetch Case Data ---
     try:
         # Make sure get_case_by_id returns the ORM object
-        case_data = get_case_by_id(case_id=case_id, user_id=current_user.id)
+        case_data = get_case_by_id(case_id=case_id, user_id=current_user.id, profile=PROFILE_TEMPLATE_CONTEXT)
     except CaseNotFoundError:
-        print(f"Error: Case ID {case_id} not found.")
+        logger.error("Error: Case ID %s not found.", case_id)
         return jsonify({'error': 'Case not found'}), 404
     except Exception as e:
-        print(f"Error fetching data for case {case_id} (Word Gen): {e}")
+        logger.error("Error fetching data for case %s (Word Gen): %s", case_id, e)
         # db might not be needed if get_case_by_id handles rollback, but good practice
         if 'db' in locals() and db.session.is_active:
              db.session.rollback()
@@ -370,13 +450,13 @@ def download_word_document(case_id):
         template_dir = os.path.join(current_app.root_path, 'templates')
         template_path = os.path.join(template_dir, template_name) # Use the DYNAMIC template_name
 
-        print(f"Attempting to use template path: {template_path}")
+        logger.debug("Attempting to use template path: %s", template_path)
         if not os.path.exists(template_path):
              # Fallback check (might be needed depending on blueprint/app structure)
              # Path relative to blueprint folder if 'templates' is there
              try:
                   alt_template_path = os.path.join(bp.root_path, '..', 'templates', template_name)
-                  print(f"Attempting fallback template path: {alt_template_path}")
+                  logger.debug("Attempting fallback template path: %s", alt_template_path)
                   if os.path.exists(alt_template_path):
                        template_path = alt_template_path
                   else:
@@ -387,16 +467,16 @@ def download_word_document(case_id):
 
         # This check should now happen after trying both primary and fallback paths
         if not os.path.exists(template_path):
-             print(f"Error: Template file '{template_name}' not found at tested paths.")
+             logger.error("Error: Template file '%s' not found at tested paths.", template_name)
              return jsonify({'error': f'Template file "{template_name}" not found'}), 400
 
-        print(f"Using template file path: {template_path}")
+        logger.debug("Using template file path: %s", template_path)
 
     except FileNotFoundError: # Catch specific error if path checks fail
-         print(f"Error: Template file '{template_name}' not found after checks.")
+         logger.error("Error: Template file '%s' not found after checks.", template_name)
          return jsonify({'error': f'Template file "{template_name}" not found'}), 400
     except Exception as e:
-         print(f"Error constructing template path: {e}")
+         logger.error("Error constructing template path: %s", e)
          return jsonify({'error': 'Could not determine template path'}), 500
 
 
@@ -411,29 +491,29 @@ def download_word_document(case_id):
     try:
         context = build_dynamic_context(template_name, case_data)
         if not context and template_name in TEMPLATE_CONTEXT_MAP: # Check if context is empty but config existed
-             print(f"Warning: Built empty context for known template '{template_name}'. Check config and data source.")
+             logger.warning("Built empty context for known template '%s'. Check config and data source.", template_name)
              # Decide if empty context is an error or okay
              # return jsonify({'error': f"Failed to build context for template '{template_name}'"}), 500
-        print(f"Dynamic context created for '{template_name}': {context}")
+        logger.debug("Dynamic context created for '%s': %s", template_name, context)
     except Exception as e:
-         print(f"Error building dynamic context for {template_name}: {e}")
+         logger.error("Error building dynamic context for %s: %s", template_name, e)
          return jsonify({'error': 'Failed to build document context'}), 500
     # --- END OF REPLACEMENT ---
 
     # --- 4. Load, Render, and Save Template to Memory ---
     try:
         doc = DocxTemplate(template_path) # Uses dynamic path
-        print(f"Rendering docx template: {template_name}...")
+        logger.debug("Rendering docx template: %s...", template_name)
         doc.render(context)
-        print("Template rendered.")
+        logger.debug("Template rendered.")
 
         file_stream = io.BytesIO()
         doc.save(file_stream)
         file_stream.seek(0)
-        print("Document saved to memory stream.")
+        logger.debug("Document saved to memory stream.")
 
     except Exception as e: # Catch potential Jinja/DocxTemplate errors here
-        print(f"Error rendering/saving template {template_name}: {e}")
+        logger.error("Error rendering/saving template %s: %s", template_name, e)
         # Check specifically for docxtpl rendering errors (e.g., missing context key)
         # The exact error message might vary depending on Jinja/docxtpl version
         if 'is not defined' in str(e) or isinstance(e, NameError): # Check for common Jinja errors
@@ -443,7 +523,7 @@ def download_word_document(case_id):
              except IndexError:
                   missing_key = "(unknown)"
              error_msg = f"Template '{template_name}' rendering failed: Missing data for placeholder like '{{ {missing_key} }}'."
-             print(f"Context provided was: {context}") # Log context when error occurs
+             logger.debug("Context provided was: %s", context) # Log context when error occurs
              return jsonify({'error': error_msg}), 400 # Return specific error
         else:
              # Generic processing error
@@ -460,7 +540,7 @@ def download_word_document(case_id):
         safe_template_name = base_template_name.replace('/','_').replace('\\','_')
         output_filename = f"{safe_template_name}_{safe_case_identifier}.docx"
 
-        print(f"Sending file: {output_filename}")
+        logger.debug("Sending file: %s", output_filename)
         return send_file(
             file_stream,
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
@@ -468,7 +548,7 @@ def download_word_document(case_id):
             download_name=output_filename # Suggest filename to browser
         )
     except Exception as e:
-        print(f"Error sending file stream: {e}")
+        logger.error("Error sending file stream: %s", e)
         return jsonify({'error': 'Failed to send document for download'}), 500
 # === End of updated function ===
 
@@ -481,7 +561,7 @@ def build_dynamic_context(template_name, case_data):
     template_config = TEMPLATE_CONTEXT_MAP.get(template_name)
 
     if not template_config:
-        print(f"Warning: No context configuration found for template '{template_name}'. Returning empty context.")
+        logger.warning("No context configuration found for template '%s'. Returning empty context.", template_name)
         return {}
 
     # Ensure details_dict is a dictionary, even if case_details is None
@@ -507,14 +587,14 @@ def build_dynamic_context(template_name, case_data):
                              if current_level is None: break
                          else: value_found = None; break
                 else:
-                     print(f"Warning: Missing 'key' in config for {context_key} (source: case_details)")
+                     logger.warning("Missing 'key' in config for %s (source: case_details)", context_key)
 
             elif source == 'direct':
                 attribute = config.get('attribute')
                 if attribute:
                     value_found = getattr(case_data, attribute, None)
                 else:
-                     print(f"Warning: Missing 'attribute' in config for {context_key} (source: direct)")
+                     logger.warning("Missing 'attribute' in config for %s (source: direct)", context_key)
             # --- End Get value ---
 
 
@@ -527,10 +607,10 @@ def build_dynamic_context(template_name, case_data):
                 try:
                     # Format as "Month day, year"
                     value_to_use_in_context = value_found.strftime('%B %d, %Y')
-                    print(f"Formatted date for key '{context_key}': {value_to_use_in_context}") # Added log
+                    logger.debug("Formatted date for key '%s': %s", context_key, value_to_use_in_context) # Added log
                 except ValueError:
                      # Handle potential errors with date formatting if needed
-                     print(f"Warning: Could not format date {value_found} for key {context_key}. Using original or default.")
+                     logger.warning("Could not format date %s for key %s. Using original or default.", value_found, context_key)
                      value_to_use_in_context = value_found # Revert to original on format error
             # ---### END CHANGE ###---
 
@@ -547,7 +627,7 @@ def build_dynamic_context(template_name, case_data):
                      if 'case' in sig.parameters: params_to_pass['case'] = case_data
                      default_to_use = default_value_config(**params_to_pass)
                  except Exception as lambda_err:
-                     print(f"Error executing lambda default for {context_key}: {lambda_err}")
+                     logger.error("Error executing lambda default for %s: %s", context_key, lambda_err)
                      default_to_use = '' # Fallback default on lambda error
             else:
                 default_to_use = default_value_config # Use the static default value
@@ -558,7 +638,7 @@ def build_dynamic_context(template_name, case_data):
 
         except Exception as e:
              # ... (Keep your existing error handling for key processing) ...
-             print(f"Error processing context key '{context_key}' for template '{template_name}': {e}")
+             logger.error("Error processing context key '%s' for template '%s': %s", context_key, template_name, e)
              default_to_use_on_error = default_value_config if not callable(default_value_config) else ''
              context[context_key] = default_to_use_on_error
 
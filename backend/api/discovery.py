@@ -1,16 +1,14 @@
-from flask import request, jsonify, current_app, send_file, Blueprint, session, url_for
+from flask import request, jsonify, current_app, send_file, Blueprint, session, url_for, Response
 from flask_login import login_required, current_user
 import os
 import io
 import json
-import traceback
-import tempfile  # Add this import
 import fitz  # PyMuPDF
 import re  # Added for regex pattern matching
 from docx import Document
 from docxtpl import DocxTemplate, RichText
 from backend.services.case_service import get_case_by_id
-from backend.schemas import case_schema  # Add this import
+from backend.schemas import case_schema, case_fields_schema  # Add this import
 from backend.app.discovery import (
     parse_requests_for_production,
     parse_form_interrogatories,
@@ -25,7 +23,7 @@ from backend.app.discovery import (
 from backend.models import Case
 from backend.extensions import csrf
 from . import bp
-from backend.app.discovery.formatters import format_form_interrogatory_responses, format_medical_records
+from backend.app.discovery.formatters import format_form_interrogatory_responses
 import logging
 from datetime import datetime
 from typing import Dict, Any
@@ -35,12 +33,18 @@ from typing import Dict, Any
 from backend.services.case_service import get_case_by_id
 
 # To include CaseNotFoundError:
-from backend.services.case_service import get_case_by_id, CaseNotFoundError
+from backend.services.case_service import (
+    get_case_by_id, get_judge_doc, case_query, CaseNotFoundError,
+    PROFILE_DISCOVERY, PROFILE_TEMPLATE_CONTEXT
+)
 
 # Add this new import:
 from backend.app.discovery.registry import get_discovery_type_info
+from backend.app.discovery.catalog import interrogatory_catalog, CatalogNotFoundError
 from docx import Document as DocxDocument
 
+logger = logging.getLogger(__name__)
+
 # Helper functions for context building
 def _format_date_for_context(date_value):
     """Format date values for template context."""
@@ -53,13 +57,7 @@ def _format_date_for_context(date_value):
 
 def _get_judge_doc_from_analysis(case):
     """Get judge_doc from analysis results if available."""
-    if hasattr(case, 'documents') and case.documents:
-        # Look for the most recently analyzed document
-        for doc in case.documents:
-            if doc.analysis_json and isinstance(doc.analysis_json, dict):
-                if 'judge_doc' in doc.analysis_json and doc.analysis_json['judge_doc']:
-                    return doc.analysis_json['judge_doc']
-    return ''
+    return get_judge_doc(case.id)
 
 # Function to strip markdown formatting
 def strip_markdown(text):
@@ -78,7 +76,7 @@ def strip_markdown(text):
 @bp.route('/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint to verify the discovery blueprint is working."""
-    print("DEBUG: Test endpoint called successfully")
+    logger.debug("Test endpoint called successfully")
     return jsonify({"message": "Discovery API is working", "authenticated": current_user.is_authenticated}), 200
 
 def get_cached_objection_sheet(discovery_type: str):
@@ -99,7 +97,7 @@ def get_cached_objection_sheet(discovery_type: str):
             objection_text = '\n'.join([p.text for p in doc.paragraphs if p.text.strip()])
             setattr(current_app, cache_key, objection_text)
         except Exception as doc_error:
-            print(f"DEBUG: Error loading {discovery_type} objection sheet: {str(doc_error)}")
+            logger.error("Error loading %s objection sheet: %s", discovery_type, str(doc_error))
             setattr(current_app, cache_key, f"Error loading {discovery_type} objection sheet")
     
     return getattr(current_app, cache_key)
@@ -111,47 +109,44 @@ def parse_discovery_document(case_id):
     Accepts a file upload and discovery_type, parses the file, and returns just the questions.
     This is step 1 of the two-step process for discovery document generation.
     """
-    print(f"DEBUG: Discovery parse endpoint accessed by user {current_user.id} for case {case_id}")
-    print(f"DEBUG: Request form data: {request.form}")
-    print(f"DEBUG: Request files: {request.files.keys() if request.files else 'None'}")
+    logger.debug("Discovery parse endpoint accessed by user %s for case %s", current_user.id, case_id)
+    logger.debug("Request form data: %s", request.form)
+    logger.debug("Request files: %s", request.files.keys() if request.files else 'None')
     
     # Check for 'document' instead of 'file' to match Documents API pattern
     document = request.files.get('document')
     discovery_type = request.form.get('discovery_type')
     
-    print(f"DEBUG: Extracted discovery_type: {discovery_type}")
-    print(f"DEBUG: Extracted document: {document.filename if document else 'None'}")
+    logger.debug("Extracted discovery_type: %s", discovery_type)
+    logger.debug("Extracted document: %s", document.filename if document else 'None')
     
     if not document or not discovery_type:
-        print("DEBUG: Missing document or discovery_type, returning 400")
+        logger.debug("Missing document or discovery_type, returning 400")
         return jsonify({'error': 'Missing document or discovery_type'}), 400
 
-    # Create a temporary file with a secure name using tempfile module
-    temp_file = None
-    temp_path = None
+    # Open the upload straight from memory - nothing is written to disk, and the
+    # same document handle is shared by every parser that needs it
+    pdf_doc = None
     try:
-        # Create a named temporary file that closes when done
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_path = temp_file.name
-            print(f"DEBUG: Created temporary file at {temp_path}")
-            
-            # Save uploaded file content to the temporary file
-            document.save(temp_file)
-            temp_file.flush()  # Ensure all data is written
-            
-        print(f"DEBUG: File saved successfully, size: {os.path.getsize(temp_path) if os.path.exists(temp_path) else 'file not found'}")
+        pdf_bytes = document.read()
+        logger.debug("Read upload into memory, size: %s", len(pdf_bytes))
+        try:
+            pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as pdf_error:
+            logger.debug("Upload is not a readable PDF: %s", pdf_error)
+            return jsonify({'error': 'Uploaded file is not a readable PDF'}), 400
         
         # Load case details
-        print(f"DEBUG: Attempting to get case {case_id} for user {current_user.id}")
-        case = get_case_by_id(case_id, user_id=current_user.id)
-        print(f"DEBUG: Successfully retrieved case {case_id}")
+        logger.debug("Attempting to get case %s for user %s", case_id, current_user.id)
+        case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_DISCOVERY)
+        logger.debug("Successfully retrieved case %s", case_id)
         
         case_details = {}
         if hasattr(case, 'to_dict'):
-            print("DEBUG: Case has to_dict method, calling it")
+            logger.debug("Case has to_dict method, calling it")
             case_details = case.to_dict()
         else:
-            print("DEBUG: Case doesn't have to_dict method, creating basic dict")
+            logger.debug("Case doesn't have to_dict method, creating basic dict")
             # Create a basic dict with essential attributes
             case_details = {
                 'id': case.id,
@@ -161,30 +156,29 @@ def parse_discovery_document(case_id):
         
         # Load objection master sheet (as plain text)
         objection_master = get_cached_objection_sheet(discovery_type)
-        print(f"DEBUG: Successfully loaded {discovery_type} objection sheet, length: {len(objection_master)}")
+        logger.debug("Successfully loaded %s objection sheet, length: %s", discovery_type, len(objection_master))
         
         # Use the orchestrator service - just to parse, not for full response
-        print(f"DEBUG: About to initialize DiscoveryResponseService")
+        logger.debug("About to initialize DiscoveryResponseService")
         service = DiscoveryResponseService()
-        print(f"DEBUG: Service initialized successfully")
+        logger.debug("Service initialized successfully")
         
-        print(f"DEBUG: Calling service.respond with discovery_type={discovery_type}")
+        logger.debug("Calling service.respond with discovery_type=%s", discovery_type)
         
         # Add some pre-processing checks to validate the PDF
         try:
             # Quick text extraction test to verify PDF is readable
-            with fitz.open(temp_path) as doc:
-                if len(doc) > 0:
-                    sample_text = doc[0].get_text()[:200]
-                    print(f"DEBUG: Sample text from first page: {sample_text}")
-                else:
-                    print("DEBUG: PDF appears to have no pages")
+            if len(pdf_doc) > 0:
+                sample_text = pdf_doc[0].get_text()[:200]
+                logger.debug("Sample text from first page: %s", sample_text)
+            else:
+                logger.debug("PDF appears to have no pages")
         except Exception as pdf_check_error:
-            print(f"DEBUG: Error in PDF pre-check: {pdf_check_error}")
+            logger.error("Error in PDF pre-check: %s", pdf_check_error)
             
         # Get the AI response but only return questions
-        result = service.respond(discovery_type, temp_path, case_details, objection_master)
-        print(f"DEBUG: Service.respond completed successfully")
+        result = service.respond(discovery_type, pdf_doc, case_details, objection_master)
+        logger.debug("Service.respond completed successfully")
         
         # Extract just the questions and clean them for display
         questions = result.get('questions', [])
@@ -214,24 +208,16 @@ def parse_discovery_document(case_id):
             'questions': cleaned_questions,
             'discovery_type': discovery_type,
             'message': 'Document parsed successfully',
-            'session_key': session_key  # Include this for reference
+            'session_key': session_key,  # Include this for reference
+            'parse_path': result.get('parse_path')  # deterministic / hybrid / ai
         }), 200
         
     except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"DEBUG: Error in parse_discovery_document: {str(e)}")
-        print(f"DEBUG: Error traceback: {error_trace}")
-        current_app.logger.error(f"Error processing discovery for case {case_id}: {e}")
-        current_app.logger.error(f"Traceback: {error_trace}")
+        logger.exception("Error processing discovery for case %s: %s", case_id, e)
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     finally:
-        # Clean up the temporary file
-        if temp_file and temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                print(f"DEBUG: Temporary file {temp_path} removed")
-            except Exception as cleanup_error:
-                print(f"DEBUG: Error removing temporary file: {str(cleanup_error)}")
+        if pdf_doc is not None:
+            pdf_doc.close()
 
 
 @bp.route('/discovery/cases/<int:case_id>/generate-document', methods=['POST'])
@@ -241,7 +227,7 @@ def generate_discovery_document(case_id):
     Unified endpoint to generate discovery documents for all types.
     Uses registry pattern to determine workflow and template.
     """
-    print(f"DEBUG: Generate discovery document for case {case_id} by user {current_user.id}")
+    logger.debug("Generate discovery document for case %s by user %s", case_id, current_user.id)
     
     try:
         # Get request data
@@ -253,7 +239,7 @@ def generate_discovery_document(case_id):
         if not discovery_type:
             return jsonify({'error': 'discovery_type is required'}), 400
             
-        print(f"DEBUG: Discovery type: {discovery_type}")
+        logger.debug("Discovery type: %s", discovery_type)
         
         # Get configuration from registry
         try:
@@ -261,11 +247,11 @@ def generate_discovery_document(case_id):
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
             
-        print(f"DEBUG: Using template: {type_config['template_file']}")
-        print(f"DEBUG: Workflow type: {type_config['workflow_type']}")
+        logger.debug("Using template: %s", type_config['template_file'])
+        logger.debug("Workflow type: %s", type_config['workflow_type'])
         
         # Verify case ownership
-        case = get_case_by_id(case_id, user_id=current_user.id)
+        case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_TEMPLATE_CONTEXT)
         
         # Handle different workflows based on registry
         if type_config['workflow_type'] == 'format_responses':
@@ -282,13 +268,12 @@ def generate_discovery_document(case_id):
     except CaseNotFoundError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
-        print(f"DEBUG: Error generating discovery document: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error generating discovery document: %s", e)
         return jsonify({'error': f'Failed to generate document: {str(e)}'}), 500
 
 def _generate_form_interrogatory_document(case, type_config, data):
     """Handle form interrogatory document generation."""
-    print("DEBUG: Processing form interrogatory workflow")
+    logger.debug("Processing form interrogatory workflow")
     
     # Get session key from request
     session_key = data.get('session_key')
@@ -302,7 +287,7 @@ def _generate_form_interrogatory_document(case, type_config, data):
             'error': 'Session data not found or expired. Please re-upload the document.'
         }), 400
         
-    print(f"DEBUG: Found stored result with {len(stored_result.get('questions', []))} questions")
+    logger.debug("Found stored result with %s questions", len(stored_result.get('questions', [])))
     
     # Get questions and AI response
     questions = stored_result.get('questions', [])
@@ -321,7 +306,7 @@ def _generate_form_interrogatory_document(case, type_config, data):
     # Clean up session data
     if session_key in current_app.config:
         del current_app.config[session_key]
-        print(f"DEBUG: Cleaned up session key: {session_key}")
+        logger.debug("Cleaned up session key: %s", session_key)
     
     # Generate document
     return _render_and_send_document(
@@ -333,7 +318,7 @@ def _generate_form_interrogatory_document(case, type_config, data):
 
 def _generate_parse_and_select_document(case, type_config, data):
     """Handle RFPs & Special Interrogatories workflow (parse → select → generate)."""
-    print("DEBUG: Processing parse and select workflow")
+    logger.debug("Processing parse and select workflow")
     
     # Get session key and selections from request
     session_key = data.get('session_key')
@@ -350,7 +335,7 @@ def _generate_parse_and_select_document(case, type_config, data):
             'error': 'Session data not found or expired. Please re-upload the document.'
         }), 400
         
-    print(f"DEBUG: Found stored result with {len(stored_result.get('questions', []))} questions")
+    logger.debug("Found stored result with %s questions", len(stored_result.get('questions', [])))
     
     # Get questions and AI response
     questions = stored_result.get('questions', [])
@@ -380,7 +365,7 @@ def _generate_parse_and_select_document(case, type_config, data):
     # Clean up session data
     if session_key in current_app.config:
         del current_app.config[session_key]
-        print(f"DEBUG: Cleaned up session key: {session_key}")
+        logger.debug("Cleaned up session key: %s", session_key)
     
     # Generate document
     return _render_and_send_document(
@@ -404,14 +389,7 @@ def _build_case_context(case):
         return date_value
     
     # Get judge_doc from analysis results if available
-    judge_doc = ''
-    if hasattr(case, 'documents') and case.documents:
-        # Look for the most recently analyzed document
-        for doc in case.documents:
-            if doc.analysis_json and isinstance(doc.analysis_json, dict):
-                if 'judge_doc' in doc.analysis_json and doc.analysis_json['judge_doc']:
-                    judge_doc = doc.analysis_json['judge_doc']
-                    break
+    judge_doc = get_judge_doc(case.id)
     
     return {
         # Core case information
@@ -576,19 +554,19 @@ def _parse_ai_response_by_question(ai_response, type_config):
     if current_num is not None:
         responses_dict[current_num] = current_text.strip()
     
-    print(f"DEBUG: Parsed {len(responses_dict)} AI responses")
+    logger.debug("Parsed %s AI responses", len(responses_dict))
     return responses_dict
 
 def _render_and_send_document(template_name, context, case_id, discovery_type):
     """Render template and send document for download."""
-    print(f"DEBUG: Rendering template: {template_name}")
+    logger.debug("Rendering template: %s", template_name)
     
     # Build template path
     template_dir = os.path.join(current_app.root_path, 'templates')
     template_path = os.path.join(template_dir, template_name)
     
     if not os.path.exists(template_path):
-        print(f"ERROR: Template not found: {template_path}")
+        logger.error("Template not found: %s", template_path)
         return jsonify({'error': f'Template file "{template_name}" not found'}), 500
     
     try:
@@ -605,7 +583,7 @@ def _render_and_send_document(template_name, context, case_id, discovery_type):
         safe_case_identifier = str(context.get('case_number', case_id)).replace('/', '_').replace('\\', '_')
         output_filename = f"{discovery_type}_responses_{safe_case_identifier}.docx"
         
-        print(f"DEBUG: Sending file: {output_filename}")
+        logger.debug("Sending file: %s", output_filename)
         
         return send_file(
             output,
@@ -615,8 +593,7 @@ def _render_and_send_document(template_name, context, case_id, discovery_type):
         )
         
     except Exception as e:
-        print(f"ERROR: Template rendering failed: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Template rendering failed: %s", e)
         return jsonify({'error': f'Failed to render template: {str(e)}'}), 500
 
 @bp.route('/discovery/cases/<int:case_id>/respond', methods=['POST'])
@@ -626,47 +603,44 @@ def respond_to_discovery(case_id):
     Accepts a file upload and discovery_type, parses the file, processes with AI,
     and returns a Word document with formatted responses.
     """
-    print(f"DEBUG: Discovery respond endpoint accessed by user {current_user.id} for case {case_id}")
-    print(f"DEBUG: Request form data: {request.form}")
-    print(f"DEBUG: Request files: {request.files.keys() if request.files else 'None'}")
+    logger.debug("Discovery respond endpoint accessed by user %s for case %s", current_user.id, case_id)
+    logger.debug("Request form data: %s", request.form)
+    logger.debug("Request files: %s", request.files.keys() if request.files else 'None')
     
     # Check for 'document' instead of 'file' to match Documents API pattern
     document = request.files.get('document')
     discovery_type = request.form.get('discovery_type')
     
-    print(f"DEBUG: Extracted discovery_type: {discovery_type}")
-    print(f"DEBUG: Extracted document: {document.filename if document else 'None'}")
+    logger.debug("Extracted discovery_type: %s", discovery_type)
+    logger.debug("Extracted document: %s", document.filename if document else 'None')
     
     if not document or not discovery_type:
-        print("DEBUG: Missing document or discovery_type, returning 400")
+        logger.debug("Missing document or discovery_type, returning 400")
         return jsonify({'error': 'Missing document or discovery_type'}), 400
 
-    # Create a temporary file with a secure name using tempfile module
-    temp_file = None
-    temp_path = None
+    # Open the upload straight from memory - nothing is written to disk, and the
+    # same document handle is shared by every parser that needs it
+    pdf_doc = None
     try:
-        # Create a named temporary file that closes when done
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_path = temp_file.name
-            print(f"DEBUG: Created temporary file at {temp_path}")
-            
-            # Save uploaded file content to the temporary file
-            document.save(temp_file)
-            temp_file.flush()  # Ensure all data is written
-            
-        print(f"DEBUG: File saved successfully, size: {os.path.getsize(temp_path) if os.path.exists(temp_path) else 'file not found'}")
+        pdf_bytes = document.read()
+        logger.debug("Read upload into memory, size: %s", len(pdf_bytes))
+        try:
+            pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception as pdf_error:
+            logger.debug("Upload is not a readable PDF: %s", pdf_error)
+            return jsonify({'error': 'Uploaded file is not a readable PDF'}), 400
         
         # Load case details
-        print(f"DEBUG: Attempting to get case {case_id} for user {current_user.id}")
-        case = get_case_by_id(case_id, user_id=current_user.id)
-        print(f"DEBUG: Successfully retrieved case {case_id}")
+        logger.debug("Attempting to get case %s for user %s", case_id, current_user.id)
+        case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_TEMPLATE_CONTEXT)
+        logger.debug("Successfully retrieved case %s", case_id)
         
         case_details = {}
         if hasattr(case, 'to_dict'):
-            print("DEBUG: Case has to_dict method, calling it")
+            logger.debug("Case has to_dict method, calling it")
             case_details = case.to_dict()
         else:
-            print("DEBUG: Case doesn't have to_dict method, creating basic dict")
+            logger.debug("Case doesn't have to_dict method, creating basic dict")
             # Create a basic dict with essential attributes
             case_details = {
                 'id': case.id,
@@ -676,37 +650,36 @@ def respond_to_discovery(case_id):
         
         # Load objection master sheet (as plain text)
         objection_master = get_cached_objection_sheet(discovery_type)
-        print(f"DEBUG: Successfully loaded {discovery_type} objection sheet, length: {len(objection_master)}")
+        logger.debug("Successfully loaded %s objection sheet, length: %s", discovery_type, len(objection_master))
 
         # Use the orchestrator service
-        print(f"DEBUG: About to initialize DiscoveryResponseService")
+        logger.debug("About to initialize DiscoveryResponseService")
         service = DiscoveryResponseService()
-        print(f"DEBUG: Service initialized successfully")
+        logger.debug("Service initialized successfully")
         
-        print(f"DEBUG: Calling service.respond with discovery_type={discovery_type}")
+        logger.debug("Calling service.respond with discovery_type=%s", discovery_type)
         
         # Add some pre-processing checks to validate the PDF
         try:
             # Quick text extraction test to verify PDF is readable
-            with fitz.open(temp_path) as doc:
-                if len(doc) > 0:
-                    sample_text = doc[0].get_text()[:200]
-                    print(f"DEBUG: Sample text from first page: {sample_text}")
-                else:
-                    print("DEBUG: PDF appears to have no pages")
+            if len(pdf_doc) > 0:
+                sample_text = pdf_doc[0].get_text()[:200]
+                logger.debug("Sample text from first page: %s", sample_text)
+            else:
+                logger.debug("PDF appears to have no pages")
         except Exception as pdf_check_error:
-            print(f"DEBUG: Error in PDF pre-check: {pdf_check_error}")
+            logger.error("Error in PDF pre-check: %s", pdf_check_error)
             
         # Get the AI response
-        result = service.respond(discovery_type, temp_path, case_details, objection_master)
-        print(f"DEBUG: Service.respond completed successfully")
+        result = service.respond(discovery_type, pdf_doc, case_details, objection_master)
+        logger.debug("Service.respond completed successfully")
         
         # Define path to the template
         template_name = 'discovery_responses_template.docx'  # Make sure this exists in templates folder
         template_dir = os.path.join(current_app.root_path, 'templates')
         template_path = os.path.join(template_dir, template_name)
         
-        print(f"DEBUG: Looking for document template at: {template_path}")
+        logger.debug("Looking for document template at: %s", template_path)
         if not os.path.exists(template_path):
             return jsonify({'error': f'Template file "{template_name}" not found'}), 500
         
@@ -720,7 +693,7 @@ def respond_to_discovery(case_id):
         current_text = ""
         in_response = False
         
-        print(f"DEBUG: Parsing AI response text")
+        logger.debug("Parsing AI response text")
         
         # Parse AI response to match responses with question numbers
         for line in ai_response.split('\n'):
@@ -735,7 +708,7 @@ def respond_to_discovery(case_id):
                     current_text = ""
                 except IndexError:
                     current_num = None
-                    print(f"DEBUG: Failed to extract number from: {line}")
+                    logger.debug("Failed to extract number from: %s", line)
             elif "REQUEST FOR PRODUCTION NO." in line:
                 # If we hit a new request, save the current response
                 if current_num is not None:
@@ -749,7 +722,7 @@ def respond_to_discovery(case_id):
             responses_dict[current_num] = current_text.strip()
         
         # Create RichText object with formatted responses
-        print(f"DEBUG: Creating RichText for responses")
+        logger.debug("Creating RichText for responses")
         responses_rt = RichText()
         
         for question in questions:
@@ -811,12 +784,12 @@ def respond_to_discovery(case_id):
         }
         
         # Create and render the document
-        print(f"DEBUG: Creating document from template")
+        logger.debug("Creating document from template")
         doc = DocxTemplate(template_path)
         doc.render(context)
         
         # Save to BytesIO
-        print(f"DEBUG: Saving document to memory stream")
+        logger.debug("Saving document to memory stream")
         output = io.BytesIO()
         doc.save(output)
         output.seek(0)
@@ -830,7 +803,7 @@ def respond_to_discovery(case_id):
             del current_app.config[session_key]
         
         # Return the file
-        print(f"DEBUG: Sending file: {output_filename}")
+        logger.debug("Sending file: %s", output_filename)
         return send_file(
             output,
             as_attachment=True,
@@ -839,52 +812,46 @@ def respond_to_discovery(case_id):
         )
         
     except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"DEBUG: Error in respond_to_discovery: {str(e)}")
-        print(f"DEBUG: Error traceback: {error_trace}")
-        current_app.logger.error(f"Error processing discovery for case {case_id}: {e}")
-        current_app.logger.error(f"Traceback: {error_trace}")
+        logger.exception("Error processing discovery for case %s: %s", case_id, e)
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     finally:
-        # Clean up the temporary file
-        if temp_file and temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                print(f"DEBUG: Temporary file {temp_path} removed")
-            except Exception as cleanup_error:
-                print(f"DEBUG: Error removing temporary file: {str(cleanup_error)}")
+        if pdf_doc is not None:
+            pdf_doc.close()
 
 @bp.route('/discovery/interrogatory-questions', methods=['GET'])
 @login_required
 def get_interrogatory_questions():
     """
     Serves the list of interrogatory questions based on the requested language.
+    The body comes pre-serialized (and pre-gzipped) from the in-memory catalog,
+    and a matching If-None-Match gets a 304 without any body at all.
     """
     language = request.args.get('language', 'english')
     
     try:
-        # Get the project root directory (one level up from the backend directory)
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        
-        # Construct the path to the JSON file
-        file_path = os.path.join(project_root, 'backend', 'data', f'form_interrogatories_{language}.json')
-        
-        print(f"DEBUG: Looking for questions file at: {file_path}")
-        print(f"DEBUG: File exists? {os.path.exists(file_path)}")
-        
-        # Check if file exists
-        if not os.path.exists(file_path):
-            return jsonify({'error': f'No questions found for language: {language}'}), 404
-            
-        # Read and return the questions
-        with open(file_path, 'r', encoding='utf-8') as f:
-            questions = json.load(f)
-            return jsonify(questions)
-            
+        entry = interrogatory_catalog.get(language)
+    except CatalogNotFoundError:
+        return jsonify({'error': f'No questions found for language: {language}'}), 404
     except Exception as e:
-        current_app.logger.error(f"Error serving interrogatory questions: {str(e)}")
+        current_app.logger.error("Error serving interrogatory questions: %s", e)
         return jsonify({'error': 'Failed to load interrogatory questions'}), 500
 
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = entry.gzip_etag if use_gzip else entry.etag
+
+    if request.if_none_match.contains(entry.etag) or request.if_none_match.contains(entry.gzip_etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.gzip_body if use_gzip else entry.body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Private: the route requires a login. no-cache: always revalidate (cheap 304)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @bp.route('/discovery/generate-interrogatory-document', methods=['POST'])
 @login_required
 def generate_interrogatory_document():
@@ -905,22 +872,18 @@ def generate_interrogatory_document():
             return jsonify({'error': 'Missing required fields: case_id and selected_ids'}), 400
 
         # Get case details
-        case = get_case_by_id(case_id, user_id=current_user.id)
+        case = get_case_by_id(case_id, user_id=current_user.id, profile=PROFILE_DISCOVERY)
         if not case:
             return jsonify({'error': 'Case not found'}), 404
 
-        # Get the questions from the JSON file
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        questions_file = os.path.join(project_root, 'backend', 'data', f'form_interrogatories_{language}.json')
-        
-        if not os.path.exists(questions_file):
+        # Get the questions from the in-memory catalog
+        try:
+            entry = interrogatory_catalog.get(language)
+        except CatalogNotFoundError:
             return jsonify({'error': f'No questions found for language: {language}'}), 404
-
-        with open(questions_file, 'r', encoding='utf-8') as f:
-            all_questions = json.load(f)
             
-        # Filter questions based on selected IDs
-        selected_questions = [q for q in all_questions if q['id'] in selected_ids]
+        # Look up the selected questions by id (kept in catalog order)
+        selected_questions = entry.select(selected_ids)
 
         # Create a new Document
         doc = Document()
@@ -945,21 +908,14 @@ def generate_interrogatory_document():
                 for subpart in question['subparts']:
                     doc.add_paragraph(subpart, style='List Bullet')
 
-        # Save to a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-        doc.save(temp_file.name)
-        temp_file.close()
-
-        # Read the file and send it
-        with open(temp_file.name, 'rb') as f:
-            file_content = f.read()
-
-        # Clean up the temporary file
-        os.unlink(temp_file.name)
+        # Save to memory
+        output = io.BytesIO()
+        doc.save(output)
+        output.seek(0)
 
         # Create response with the file
         response = send_file(
-            io.BytesIO(file_content),
+            output,
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
             as_attachment=True,
             download_name=f'form_interrogatories_{language}_{case_id}.docx'
@@ -968,11 +924,7 @@ def generate_interrogatory_document():
         return response
 
     except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"DEBUG: Error generating interrogatory document: {str(e)}")
-        print(f"DEBUG: Error traceback: {error_trace}")
-        current_app.logger.error(f"Error generating interrogatory document: {e}")
-        current_app.logger.error(f"Traceback: {error_trace}")
+        logger.exception("Error generating interrogatory document: %s", e)
         return jsonify({'error': f'Failed to generate document: {str(e)}'}), 500
 
 @bp.route('/discovery/cases/<int:case_id>/format-responses', methods=['POST'])
@@ -997,21 +949,16 @@ def format_discovery_responses(case_id: int):
         medical_data = data.get('medical_data', {})
         
         # Get case details
-        case = Case.query.get_or_404(case_id)
+        case = case_query(PROFILE_TEMPLATE_CONTEXT).get_or_404(case_id)
         if case.user_id != current_user.id:
             return jsonify({'error': 'Unauthorized'}), 403
             
-        # Convert case to dict for formatting
-        case_dict = case_schema.dump(case)
-        
-        # Format responses using AI
-        formatted_data = format_form_interrogatory_responses(responses, case_dict)
+        # Convert case to dict for formatting (documents aren't needed)
+        case_dict = case_fields_schema.dump(case)
         
-        # Format medical records if provided
-        if medical_data:
-            medical_formatted = format_medical_records(medical_data, case_dict)
-            formatted_data['responses'].update(medical_formatted['responses'])
-            formatted_data['metadata']['medical_records'] = medical_formatted['metadata']
+        # Format responses using AI; sections (and medical records, if provided)
+        # are formatted concurrently
+        formatted_data = format_form_interrogatory_responses(responses, case_dict, medical_data=medical_data)
         
         # Store in session for document generation
         session_key = f'formatted_responses_{case_id}'
@@ -1024,8 +971,8 @@ def format_discovery_responses(case_id: int):
         return jsonify(formatted_data)
         
     except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
+        logger.error("Validation error: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error formatting responses: {str(e)}", exc_info=True)
+        logger.error("Error formatting responses: %s", e, exc_info=True)
         return jsonify({'error': 'Failed to format responses'}), 500
\ No newline at end of file
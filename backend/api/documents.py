@@ -2,9 +2,9 @@
 import os
 import uuid
 import io
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, send_file
 from werkzeug.utils import secure_filename
-from werkzeug.exceptions import Forbidden
+from werkzeug.exceptions import Forbidden, NotFound
 from marshmallow import ValidationError # <<< Import ValidationError
 from backend.utils.rate_limiter import limiter
 
@@ -19,18 +19,23 @@ from backend.schemas import document_schema, documents_schema # <<< Import schem
 # ---### END CHANGE ###---
 
 # Import necessary service functions and exceptions
-from backend.services.case_service import get_case_by_id, CaseNotFoundError, CaseServiceError
+from backend.services.case_service import get_case_by_id, get_case_versions, CaseNotFoundError, CaseServiceError
 from backend.services.document_service import (
     get_documents_for_case, delete_document_record, create_document_and_extract_text,
     DocumentNotFoundError, DocumentServiceError, AuthorizationError
 )
 from backend.services.analysis_service import trigger_analysis_and_update, AnalysisServiceError, NoTextToAnalyzeError
+from backend.services.search_service import search_documents, SearchServiceError, DEFAULT_PER_PAGE
+from backend.utils.http_cache import make_etag, not_modified, add_validators
 
 from backend.utils.file_security import (
     FileSecurityError,
     FileSizeExceededError,
     FileTypeNotAllowedError
 )
+import logging
+
+logger = logging.getLogger(__name__)
 
 # == Document Management Endpoints ==
 
@@ -38,8 +43,19 @@ from backend.utils.file_security import (
 @login_required
 def get_case_documents(case_id):
     """Fetches all documents associated with a specific case, ensuring ownership."""
-    print(f"--- Handling GET /api/cases/{case_id}/documents (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling GET /api/cases/%s/documents (AUTH REQUIRED by user %s)", case_id, current_user.id)
     try:
+        # Documents only; case edits don't change this listing. Unknown or
+        # someone else's case falls through to the normal 404/403 handling.
+        versions = get_case_versions(current_user.id, case_id=case_id)
+        if versions is not None:
+            etag = make_etag('case_documents', case_id, versions['documents'])
+            # Includes the case's updated_at, which document deletes touch
+            last_modified = versions['last_modified']
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+
         # Check case ownership first
         case = get_case_by_id(case_id, user_id=current_user.id)
 
@@ -50,7 +66,9 @@ def get_case_documents(case_id):
         # ---### START CHANGE: Use Marshmallow Schema for Serialization ###---
         # Serialize the list of document objects using the pre-instantiated schema
         result = documents_schema.dump(documents)
-        return jsonify(result)
+        if versions is None:
+            return jsonify(result)
+        return add_validators(jsonify(result), etag, last_modified)
         # ---### END CHANGE ###---
 
     except Forbidden as e:
@@ -62,7 +80,41 @@ def get_case_documents(case_id):
     except DocumentServiceError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
-        current_app.logger.error(f"Unexpected error handling GET /api/cases/{case_id}/documents: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling GET /api/cases/%s/documents: %s", case_id, e, exc_info=True)
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+
+@bp.route('/documents/search', methods=['GET'])
+@login_required
+@limiter.limit("60 per minute")
+def search_case_documents():
+    """
+    Full-text search over the extracted text of the user's documents.
+    Query params: q (required), case_id, page, per_page.
+    """
+    logger.debug("Handling GET /api/documents/search (AUTH REQUIRED by user %s)", current_user.id)
+    try:
+        case_id = request.args.get('case_id', type=int)
+        if case_id is not None:
+            get_case_by_id(case_id, user_id=current_user.id)  # 404/403 before searching
+        results = search_documents(
+            current_user.id,
+            request.args.get('q', ''),
+            case_id=case_id,
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', DEFAULT_PER_PAGE, type=int),
+        )
+        return jsonify(results)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except NotFound:
+        return jsonify({'error': 'Case not found'}), 404
+    except Forbidden as e:
+        return jsonify({'error': str(e) or 'Permission denied'}), 403
+    except SearchServiceError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        current_app.logger.error("Unexpected error handling GET /api/documents/search: %s", e, exc_info=True)
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
 
@@ -71,7 +123,7 @@ def get_case_documents(case_id):
 @limiter.limit("10 per minute, 100 per hour")  # Add this line
 def upload_file_to_case(case_id):
     """Handles file upload, ensuring user owns the case."""
-    print(f"--- Handling POST /api/cases/{case_id}/documents (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling POST /api/cases/%s/documents (AUTH REQUIRED by user %s)", case_id, current_user.id)
 
     try:
         # Check case ownership first
@@ -113,7 +165,7 @@ def upload_file_to_case(case_id):
     except DocumentServiceError as e: # Catch generic service errors
         return jsonify({'error': str(e)}), 500
     except Exception as e: # Catch unexpected errors
-        current_app.logger.error(f"Unexpected error handling POST /api/cases/{case_id}/documents: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling POST /api/cases/%s/documents: %s", case_id, e, exc_info=True)
         return jsonify({'error': 'An unexpected error occurred during file upload'}), 500
 
 
@@ -126,9 +178,8 @@ def delete_single_document(document_id):
     Deletes a specific document record (DB via service) and its file,
     checking ownership via the parent case.
     """
-    print(f"--- Handling DELETE /api/documents/{document_id} (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling DELETE /api/documents/%s (AUTH REQUIRED by user %s)", document_id, current_user.id)
 
-    file_path_to_remove = None
     doc_file_name = f"ID {document_id}" # Fallback name
     try:
         # 1. Fetch the document record first
@@ -144,42 +195,21 @@ def delete_single_document(document_id):
         # Use the case service to check ownership of the parent case
         get_case_by_id(case_id, user_id=current_user.id) # Raises Forbidden/NotFound if check fails
 
-        # 3. If ownership confirmed, get file path *before* DB delete
-        file_path_to_remove = doc_record.file_path
-
-        # 4. Call service to delete DB record
-        # Assuming delete_document_record just needs the ID now
+        # 3. Delete the DB record; the service queues the file for secure
+        # erasure in the same transaction (see services/shred_service.py)
         delete_document_record(document_id)
 
-        # --- File deletion logic ---
-        file_deleted = False
-        delete_error_msg = ""
-        if file_path_to_remove and os.path.exists(file_path_to_remove):
-            try:
-                os.remove(file_path_to_remove)
-                print(f"Deleted file: {file_path_to_remove}")
-                file_deleted = True
-            except OSError as e:
-                print(f"Error deleting file {file_path_to_remove}: {e}") # Log error, continue
-                delete_error_msg = " Error deleting associated file."
-        elif file_path_to_remove:
-            print(f"File path not found or missing for deleted document record {document_id}")
-            delete_error_msg = " Associated file not found on disk."
-        else:
-             print(f"No file path stored for document record {document_id}")
-             delete_error_msg = " No associated file path found."
-
-
-        return jsonify({'message': f'Document "{doc_file_name}" deleted successfully.' + delete_error_msg}), 200
+        return jsonify({'message': f'Document "{doc_file_name}" deleted successfully. '
+                                   'Its file is queued for secure deletion.'}), 200
 
     except DocumentNotFoundError as e: return jsonify({'error': str(e)}), 404
     except CaseNotFoundError as e:
-        print(f"Error deleting document {document_id}: Associated case {case_id if 'case_id' in locals() else 'unknown'} not found.")
+        logger.error("Error deleting document %s: Associated case %s not found.", document_id, case_id if 'case_id' in locals() else 'unknown')
         return jsonify({'error': f'Associated case not found for document {document_id}'}), 404
     except Forbidden as e: return jsonify({'error': str(e) or 'Permission denied to delete this document'}), 403
     except DocumentServiceError as e: return jsonify({'error': str(e)}), 500
     except Exception as e:
-        current_app.logger.error(f"Unexpected error handling DELETE /api/documents/{document_id}: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling DELETE /api/documents/%s: %s", document_id, e, exc_info=True)
         # db.session.rollback() # Consider rollback
         return jsonify({'error': 'An unexpected error occurred during deletion'}), 500
 
@@ -191,7 +221,7 @@ def delete_single_document(document_id):
 @login_required
 def trigger_document_analysis(document_id):
     """Triggers AI analysis for a specific document, checking ownership via parent case."""
-    print(f"--- Handling POST /api/documents/{document_id}/analyze (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling POST /api/documents/%s/analyze (AUTH REQUIRED by user %s)", document_id, current_user.id)
     doc = None # Initialize doc
     try:
         # Fetch doc and check case ownership
@@ -212,13 +242,13 @@ def trigger_document_analysis(document_id):
 
     except DocumentNotFoundError as e: return jsonify({'error': str(e)}), 404
     except CaseNotFoundError as e:
-        print(f"Error analyzing document {document_id}: Associated case {doc.case_id if doc else 'unknown'} not found.")
+        logger.error("Error analyzing document %s: Associated case %s not found.", document_id, doc.case_id if doc else 'unknown')
         return jsonify({'error': f'Associated case not found for document {document_id}'}), 404
     except Forbidden as e: return jsonify({'error': str(e) or 'Permission denied to analyze this document'}), 403
     except NoTextToAnalyzeError as e: return jsonify({'error': str(e)}), 400
     except AnalysisServiceError as e: return jsonify({'error': str(e)}), 500
     except Exception as e:
-        current_app.logger.error(f"Unexpected error handling POST /api/documents/{document_id}/analyze: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling POST /api/documents/%s/analyze: %s", document_id, e, exc_info=True)
         return jsonify({'error': 'An unexpected error occurred during analysis trigger'}), 500
 
 
@@ -228,7 +258,7 @@ def trigger_document_analysis(document_id):
 @login_required
 def trigger_document_creation(case_id):
     """Placeholder: Triggers AI document generation, checking case ownership."""
-    print(f"--- Handling POST /api/cases/{case_id}/create-document (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling POST /api/cases/%s/create-document (AUTH REQUIRED by user %s)", case_id, current_user.id)
     try:
         # Check case ownership first
         case = get_case_by_id(case_id, user_id=current_user.id)
@@ -248,14 +278,14 @@ def trigger_document_creation(case_id):
         if not doc_type: return jsonify({'error': 'Document type is required'}), 400
 
         # --- Add AI Call Logic Here (or call service) ---
-        print(f"Placeholder: Document creation would be triggered for case {case_id}, type: {doc_type}")
+        logger.info("Placeholder: Document creation would be triggered for case %s, type: %s", case_id, doc_type)
         # Example: generated_doc_path = generation_service.create(case, doc_type, details)
         return jsonify({'message': 'Document generation process initiated (placeholder)', 'case_id': case_id, 'type': doc_type})
 
     except CaseNotFoundError as e: return jsonify({'error': str(e)}), 404
     except Forbidden as e: return jsonify({'error': str(e) or 'Permission denied to generate document for this case'}), 403
     except Exception as e:
-        current_app.logger.error(f"Unexpected error handling POST /api/cases/{case_id}/create-document: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling POST /api/cases/%s/create-document: %s", case_id, e, exc_info=True)
         return jsonify({'error': 'An unexpected error occurred during document creation trigger'}), 500
 
 @bp.route('/documents/<int:document_id>/download', methods=['GET'])
@@ -265,7 +295,7 @@ def download_document(document_id):
     """
     Download a document file, with ownership verification and decryption.
     """
-    print(f"--- Handling GET /api/documents/{document_id}/download (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling GET /api/documents/%s/download (AUTH REQUIRED by user %s)", document_id, current_user.id)
     
     try:
         # Fetch document record and verify ownership
@@ -290,7 +320,7 @@ def download_document(document_id):
         
         try:
             # Decrypt to memory
-            decrypted_data = file_encryptor.decrypt_file(doc.file_path)
+            decrypted_data = file_encryptor.decrypt_file(doc.file_path, wrapped_key=doc.file_key)
             
             # Create in-memory file-like object
             file_stream = io.BytesIO(decrypted_data)
@@ -313,7 +343,7 @@ def download_document(document_id):
                 mime_type = 'application/octet-stream'
                 
             # Log access for audit purposes
-            print(f"User {current_user.id} downloading document {document_id}: {doc.file_name}")
+            logger.info("User %s downloading document %s: %s", current_user.id, document_id, doc.file_name)
             
             # Return the file
             return send_file(
@@ -324,7 +354,7 @@ def download_document(document_id):
             )
             
         except Exception as e:
-            print(f"Error decrypting file for download: {e}")
+            logger.error("Error decrypting file for download: %s", e)
             return jsonify({'error': 'Error decrypting document for download'}), 500
             
     except DocumentNotFoundError as e:
@@ -334,5 +364,5 @@ def download_document(document_id):
     except Forbidden as e:
         return jsonify({'error': str(e) or 'Permission denied to download this document'}), 403
     except Exception as e:
-        current_app.logger.error(f"Unexpected error handling GET /api/documents/{document_id}/download: {e}", exc_info=True)
+        current_app.logger.error("Unexpected error handling GET /api/documents/%s/download: %s", document_id, e, exc_info=True)
         return jsonify({'error': 'An unexpected error occurred during document download'}), 500
\ No newline at end of file
@@ -18,6 +18,10 @@ from flask_login import login_required, current_user
 from werkzeug.exceptions import Forbidden
 # Import the new Marshmallow schemas
 from backend.schemas import generate_document_input_schema, generated_document_schema
+import logging
+
+logger = logging.getLogger(__name__)
+
 # ---### END CHANGE ###---
 
 
@@ -27,12 +31,12 @@ def get_document_types():
     """Returns a list of available document types for generation."""
     # This route is simple, no Marshmallow schema strictly needed for output,
     # but could add one later for consistency if desired.
-    print("--- Handling GET /api/generation/document-types ---")
+    logger.debug("Handling GET /api/generation/document-types")
     try:
         types = list(DOCUMENT_PROMPTS.keys())
         return jsonify(types), 200
     except Exception as e:
-        print(f"Error fetching document types: {e}")
+        logger.error("Error fetching document types: %s", e)
         return jsonify({"error": "Failed to retrieve document types"}), 500
 
 # ---### START CHANGE: Refactor handle_generate_document ###---
@@ -45,7 +49,7 @@ def handle_generate_document(case_id):
     API endpoint to trigger document generation for a case.
     Validates input and serializes output using Marshmallow schemas.
     """
-    print(f"--- Handling POST /api/cases/{case_id}/generate_document (AUTH REQUIRED by user {current_user.id}) ---")
+    logger.debug("Handling POST /api/cases/%s/generate_document (AUTH REQUIRED by user %s)", case_id, current_user.id)
     request_data = request.get_json()
 
     if not request_data:
@@ -58,10 +62,10 @@ def handle_generate_document(case_id):
         validated_data = generate_document_input_schema.load(request_data)
         # If it passes, validated_data contains 'document_type' and optional 'custom_instructions'
     except ValidationError as err:
-        print(f"Validation Error on Generate Document: {err.messages}")
+        logger.error("Validation Error on Generate Document: %s", err.messages)
         return jsonify({"error": "Validation failed", "messages": err.messages}), 400
     except Exception as val_err:
-         print(f"Error during validation call: {val_err}")
+         logger.error("Error during validation call: %s", val_err)
          return jsonify({'error': 'Data validation process failed'}), 500
 
     # 2. Call Service Function
@@ -88,7 +92,7 @@ def handle_generate_document(case_id):
     except InvalidDocumentTypeError as e: return jsonify({"error": str(e)}), 400 # Bad request for invalid type
     except GenerationServiceError as e: return jsonify({"error": str(e)}), 500
     except Exception as e:
-        print(f"Unexpected error in generate_document route for case {case_id}: {e}")
+        logger.error("Unexpected error in generate_document route for case %s: %s", case_id, e)
         # Consider db.session.rollback() if service might leave transaction open
         return jsonify({"error": "An unexpected error occurred during document generation"}), 500
 # ---### END CHANGE ###---
@@ -1,14 +1,13 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, url_for
 from flask_login import login_required, current_user
 import os
 import io
 import traceback
-import tempfile
 import logging
-from backend.utils import document_parser
-from docx import Document
 from datetime import datetime
-from backend.services.analysis_service import call_gemini_with_prompt
+from backend.services import medical_summary_service, job_service
+from backend.services.medical_summary_service import MedicalSummaryServiceError, NoTextExtractedError
+from backend.models import BackgroundJob
 
 medical_bp = Blueprint('medical', __name__, url_prefix='/medical')
 
@@ -19,7 +18,9 @@ ALLOWED_EXTENSIONS = {'.pdf', '.docx'}
 def summarize_records():
     """
     Accepts an uploaded PDF or Word doc and returns a summarized Word document of medical records.
-    Uses AI to parse and format the summary from the raw extracted text.
+    The provider table is read locally in page-range chunks; AI only reads the rows that don't
+    validate, or the text of chunks without a provider table. Providers are merged across chunks.
+    With async=1 it returns 202 and a job to poll instead (see summary_job_status).
     """
     try:
         uploaded_file = request.files.get('file')
@@ -30,83 +31,38 @@ def summarize_records():
         filename = uploaded_file.filename
         ext = os.path.splitext(filename)[1].lower()
         if ext not in ALLOWED_EXTENSIONS:
-            current_app.logger.error(f"Unsupported file type: {ext}")
+            current_app.logger.error("Unsupported file type: %s", ext)
             return jsonify({'error': 'Only PDF and DOCX files are supported.'}), 400
 
-        # Save to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            temp_path = temp_file.name
-            uploaded_file.save(temp_file)
-            temp_file.flush()
-        current_app.logger.info(f"File uploaded and saved to {temp_path}")
+        # Read the upload into memory; nothing is written to disk
+        file_bytes = uploaded_file.read()
+        current_app.logger.info("File uploaded (%s bytes)", len(file_bytes))
 
-        # Extract text
-        text = None
-        if ext == '.pdf':
-            # Try both 'text' and 'blocks' extraction
-            import fitz
-            try:
-                with fitz.open(temp_path) as doc:
-                    text_lines = []
-                    for page in doc:
-                        # Try 'text' extraction
-                        t1 = page.get_text("text")
-                        # Try 'blocks' extraction
-                        t2 = "\n".join([b[4] for b in page.get_text("blocks") if b[4].strip()])
-                        # Use whichever is longer
-                        page_text = t1 if len(t1) > len(t2) else t2
-                        text_lines.append(page_text)
-                    text = "\n".join(text_lines)
-            except Exception as e:
-                current_app.logger.error(f"fitz extraction failed: {str(e)}")
-                text = document_parser.extract_text_from_pdf(temp_path)
-        elif ext == '.docx':
-            text = document_parser.extract_text_from_docx(temp_path)
-        else:
-            text = None
-        if not text or not text.strip():
-            current_app.logger.error("Failed to extract text from uploaded file (empty result). Try a different file or format.")
-            os.remove(temp_path)
-            return jsonify({'error': 'Failed to extract text from uploaded file. Try a different file or format.'}), 400
-
-        # Log the first 50 lines of extracted text for debugging
-        lines = text.splitlines()
-        current_app.logger.info("Extracted text sample:\n" + '\n'.join(lines[:50]))
-
-        # Build a much stricter AI prompt
-        prompt = (
-            "Below is a list of medical providers and their details, possibly in a messy or misaligned format. "
-            "For each provider, extract:\n"
-            "(a) Name (from the Provider column),\n"
-            "(b) Type of service (from the Provider Specialty column),\n"
-            "(c) Dates of service (from First Service Date and Last Service Date; if two dates, include both and a message 'may need to check for additional service dates'),\n"
-            "(d) Cost of service (from Total Billed column).\n"
-            "IMPORTANT: ONLY use the data provided between <BEGIN DATA> and <END DATA>. Do NOT invent or add any providers or information that is not present in the data. "
-            "If you cannot find a provider, do not include it. If any field is missing, write 'Missing Information'. Ignore time of day in dates.\n"
-            "Format each provider as:\n(a) ...\n(b) ...\n(c) ...\n(d) ...\n"
-            "Here is the raw data (do not ignore or summarize, just extract as instructed):\n"
-            "<BEGIN DATA>\n" + text + "\n<END DATA>"
+        config = current_app.config
+        options = dict(
+            api_key=config.get('AI_API_KEY'),
+            chunk_pages=config.get('MEDICAL_SUMMARY_CHUNK_PAGES', 20),
+            max_workers=config.get('MEDICAL_SUMMARY_MAX_WORKERS', 4),
         )
 
-        # Call AI
+        # Async mode: start a background job and let the client poll it
+        if request.args.get('async', request.form.get('async', '')).lower() in ('1', 'true', 'yes'):
+            job = medical_summary_service.start_summary_job(
+                current_user.id, file_bytes, ext, ttl=config.get('MEDICAL_SUMMARY_JOB_TTL', 3600), **options)
+            current_app.logger.info("Started summary job %s", job['id'])
+            return jsonify(dict(job, status_url=url_for('api.medical.summary_job_status', job_id=job['id']))), 202
+
+        # Provider rows are read locally in page-range chunks; the model only
+        # sees rows that fail validation, or chunks without a provider table
         try:
-            ai_response = call_gemini_with_prompt(prompt)
-            current_app.logger.info("AI response sample:\n" + '\n'.join(ai_response.splitlines()[:20]))
-        except Exception as e:
-            current_app.logger.error(f"AI call failed: {str(e)}")
-            os.remove(temp_path)
+            output, info = medical_summary_service.summarize_records(file_bytes, ext, **options)
+        except NoTextExtractedError as e:
+            current_app.logger.error(str(e))
+            return jsonify({'error': str(e)}), 400
+        except MedicalSummaryServiceError as e:
+            current_app.logger.error("AI call failed: %s", e)
             return jsonify({'error': f'AI call failed: {str(e)}'}), 500
-
-        # Write AI response to Word doc
-        doc = Document()
-        for line in ai_response.splitlines():
-            p = doc.add_paragraph(line)
-            p.style.font.name = 'Times New Roman'
-        output = io.BytesIO()
-        doc.save(output)
-        output.seek(0)
-        os.remove(temp_path)
-        current_app.logger.info(f"Temporary file {temp_path} removed.")
+        current_app.logger.info("Summary built: %s", info)
 
         return send_file(
             output,
@@ -116,6 +72,36 @@ def summarize_records():
         )
     except Exception as e:
         error_trace = traceback.format_exc()
-        current_app.logger.error(f"Error in summarize_records: {str(e)}")
-        current_app.logger.error(f"Traceback: {error_trace}")
-        return jsonify({'error': f'Failed to summarize records: {str(e)}'}), 500 
\ No newline at end of file
+        current_app.logger.error("Error in summarize_records: %s", e)
+        current_app.logger.error("Traceback: %s", error_trace)
+        return jsonify({'error': f'Failed to summarize records: {str(e)}'}), 500 
+
+
+@medical_bp.route('/summarize-records/jobs/<job_id>', methods=['GET'])
+@login_required
+def summary_job_status(job_id):
+    """Progress of an async summary: chunks done of total, providers found so far, errors."""
+    job = medical_summary_service.get_summary_job(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Summary job not found.'}), 404
+    status = job_service.job_status(job)
+    if job.status == BackgroundJob.STATUS_DONE:
+        status['download_url'] = url_for('api.medical.summary_job_document', job_id=job_id)
+    return jsonify(status), 200
+
+
+@medical_bp.route('/summarize-records/jobs/<job_id>/document', methods=['GET'])
+@login_required
+def summary_job_document(job_id):
+    """The Word document of a finished async summary."""
+    job = medical_summary_service.get_summary_job(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Summary job not found.'}), 404
+    if job.status != BackgroundJob.STATUS_DONE:
+        return jsonify({'error': f"Summary job is {job.status}."}), 409
+    return send_file(
+        io.BytesIO(job_service.job_document(job)),
+        as_attachment=True,
+        download_name='medical_record_summary.docx',
+        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    )
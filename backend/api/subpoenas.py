@@ -0,0 +1,67 @@
+# backend/api/subpoenas.py
+import logging
+from flask import jsonify, current_app, request, url_for
+from flask_login import login_required, current_user
+from backend.services import job_service
+from backend.services.subpoena_service import (
+    SubpoenaService, SubpoenaServiceError, collect_batch_files, start_batch_job, get_batch_job
+)
+from backend.utils.rate_limiter import limiter
+from . import bp
+
+logger = logging.getLogger(__name__)
+
+
+@bp.route('/subpoenas/batch', methods=['POST'])
+@login_required
+@limiter.limit("5 per minute, 30 per hour")
+def process_subpoena_batch():
+    """
+    Processes a batch of subpoena packets: a ZIP and/or several PDFs uploaded
+    as 'files'. Returns the provider index merged across the files (each entry
+    with its source files and pages), per-file status and the text summary.
+
+    Batches of more than SUBPOENA_BATCH_SYNC_MAX_FILES files, or any batch with
+    async=1, run as a background job instead: 202 with a status_url to poll
+    (see subpoena_batch_job_status), whose result is the same index.
+    """
+    uploads = [(upload.filename, upload.stream) for upload in request.files.getlist('files') if upload.filename]
+    if not uploads:
+        return jsonify({'error': 'No files uploaded.'}), 400
+
+    config = current_app.config
+    api_key = config.get('AI_API_KEY')
+    if not api_key:
+        logger.error("AI_API_KEY not found in config.")
+        return jsonify({'error': 'AI service is not configured.'}), 500
+
+    try:
+        files = collect_batch_files(uploads, max_files=config.get('SUBPOENA_BATCH_MAX_FILES', 50))
+    except SubpoenaServiceError as e:
+        return jsonify({'error': str(e)}), 400
+
+    max_workers = config.get('SUBPOENA_BATCH_MAX_WORKERS', 4)
+    run_async = request.args.get('async', request.form.get('async', '')).lower() in ('1', 'true', 'yes')
+    if run_async or len(files) > config.get('SUBPOENA_BATCH_SYNC_MAX_FILES', 3):
+        job = start_batch_job(current_user.id, files, api_key, max_workers=max_workers,
+                              ttl=config.get('SUBPOENA_BATCH_JOB_TTL', 3600))
+        logger.info("Started subpoena batch job %s (%s files) for user %s", job['id'], len(files), current_user.id)
+        return jsonify(dict(job, status_url=url_for('api.subpoena_batch_job_status', job_id=job['id']))), 202
+
+    logger.info("Processing subpoena batch of %s file(s) for user %s", len(files), current_user.id)
+    try:
+        result = SubpoenaService(api_key).process_batch(files, max_workers=max_workers)
+    except Exception as e:
+        logger.error("Error processing subpoena batch: %s", e)
+        return jsonify({'error': 'Failed to process subpoena batch'}), 500
+    return jsonify(result), 200
+
+
+@bp.route('/subpoenas/batch/jobs/<job_id>', methods=['GET'])
+@login_required
+def subpoena_batch_job_status(job_id):
+    """Progress of a background batch (files done of total); once done, 'result' holds the merged index."""
+    job = get_batch_job(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Subpoena batch job not found.'}), 404
+    return jsonify(job_service.job_status(job)), 200
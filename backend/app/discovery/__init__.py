@@ -16,9 +16,11 @@ from .prompt_builders import (
     build_requests_for_admission_prompt as build_rfa_prompt,  # Alias for backward compatibility
 )
 
-from .base import DiscoveryQuestion
+from .base import DiscoveryQuestion, ParseResult
 from .service import DiscoveryResponseService
 from .registry import DISCOVERY_TYPE_REGISTRY, get_discovery_type_info
+from .chain import run_parser_chain, get_parse_path_stats
+from .catalog import interrogatory_catalog, CatalogNotFoundError
 
 # Version of the discovery module
 __version__ = '1.0.0'
\ No newline at end of file
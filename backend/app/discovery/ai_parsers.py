@@ -4,52 +4,62 @@ Extracts definitions and the main requests section, then uses Gemini to parse re
 Not hooked up to the registry or API yet.
 """
 import re
-import fitz  # PyMuPDF
 from typing import List, Optional
 from .base import DiscoveryQuestion
+from backend.utils.document_parser import open_pdf, DocumentSource
 from backend.services.analysis_service import analyze_discovery_with_gemini
 import json
+import logging
 
-def ai_parse_requests_for_production(pdf_path: str, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None) -> List[DiscoveryQuestion]:
+logger = logging.getLogger(__name__)
+
+def ai_parse_requests_for_production(pdf_path: DocumentSource, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None,
+                                     spans_text: Optional[str] = None) -> List[DiscoveryQuestion]:
     """
     AI-driven parser for Requests for Production. Extracts definitions and the main numbered requests section,
     then sends the relevant text to Gemini for parsing and response generation.
     Returns a list of DiscoveryQuestion objects, each with a .response field containing the AI's answer.
+    If spans_text is given, only that text is sent (the spans a deterministic parser left unparsed).
     """
     try:
-        # --- Extract full text from PDF ---
-        with fitz.open(pdf_path) as doc:
-            full_text = ""
-            for page in doc:
-                full_text += page.get_text()
-
-        # --- Extract definitions section (optional, for AI context) ---
-        definitions = None
-        definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-        if definitions_match:
-            definitions = definitions_match.group(1).strip()
-        else:
-            # Try a fallback: look for 'DEFINITIONS' up to the first requests heading
-            fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-            if fallback:
-                definitions = fallback.group(1).strip()
-
-        # --- Find the main requests section (after the main heading) ---
-        requests_heading = re.search(r'(REQUESTS? FOR PRODUCTION[\s\S]{0,2000})', full_text, re.IGNORECASE)
-        if requests_heading:
-            start_idx = requests_heading.start()
+        if spans_text is not None:
+            # Hybrid mode: only the text the deterministic parser couldn't account for
+            definitions = None
+            main_text = spans_text
         else:
-            # Fallback: look for 'REQUESTS' as a heading
-            requests_heading = re.search(r'(REQUESTS?[\s\S]{0,2000})', full_text, re.IGNORECASE)
-            start_idx = requests_heading.start() if requests_heading else 0
+            # --- Extract full text from PDF ---
+            with open_pdf(pdf_path) as doc:
+                full_text = ""
+                for page in doc:
+                    full_text += page.get_text()
+
+            # --- Extract definitions section (optional, for AI context) ---
+            definitions = None
+            definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
+            if definitions_match:
+                definitions = definitions_match.group(1).strip()
+            else:
+                # Try a fallback: look for 'DEFINITIONS' up to the first requests heading
+                fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
+                if fallback:
+                    definitions = fallback.group(1).strip()
+
+            # --- Find the main requests section (after the main heading) ---
+            requests_heading = re.search(r'(REQUESTS? FOR PRODUCTION[\s\S]{0,2000})', full_text, re.IGNORECASE)
+            if requests_heading:
+                start_idx = requests_heading.start()
+            else:
+                # Fallback: look for 'REQUESTS' as a heading
+                requests_heading = re.search(r'(REQUESTS?[\s\S]{0,2000})', full_text, re.IGNORECASE)
+                start_idx = requests_heading.start() if requests_heading else 0
 
-        # Only use text after the main heading
-        main_text = full_text[start_idx:]
+            # Only use text after the main heading
+            main_text = full_text[start_idx:]
 
-        # Optionally, trim to the end of the requests section (before signature, etc.)
-        end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
-        if end_match:
-            main_text = main_text[:end_match.start()]
+            # Optionally, trim to the end of the requests section (before signature, etc.)
+            end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
+            if end_match:
+                main_text = main_text[:end_match.start()]
 
         # --- Build robust Gemini prompt ---
         prompt = """
@@ -84,13 +94,13 @@ RESPONSE TO REQUEST FOR PRODUCTION NO.X:
             prompt += f"\nCASE DATA (use this to answer requests if possible):\n{case_data}\n"
 
         # --- Call Gemini to extract and answer requests ---
-        print("[AI PARSER] Sending extracted text to Gemini for parsing and response generation...")
+        logger.info("Sending extracted text to Gemini for parsing and response generation...")
         ai_result = analyze_discovery_with_gemini(prompt)
 
         # --- ROBUST PARSING LOGIC TO HANDLE MULTIPLE RESPONSE FORMATS ---
         questions = []
         
-        print(f"--- [Discovery Gemini] Raw Response Text (first 500 chars): {str(ai_result)[:500]} ---")
+        logger.debug("[Discovery Gemini] Raw Response Text (first 500 chars): %s", str(ai_result)[:500])
         
         try:
             # Try to parse as JSON first
@@ -126,7 +136,7 @@ RESPONSE TO REQUEST FOR PRODUCTION NO.X:
                                     dq.response = response
                                     questions.append(dq)
                                 except Exception as e:
-                                    print(f"[AI PARSER] Error parsing request key '{req_key}': {e}")
+                                    logger.error("Error parsing request key '%s': %s", req_key, e)
                                     continue
         
         elif isinstance(ai_result, dict):
@@ -154,12 +164,12 @@ RESPONSE TO REQUEST FOR PRODUCTION NO.X:
                             dq.response = response
                             questions.append(dq)
                         except Exception as e:
-                            print(f"[AI PARSER] Error parsing request key '{req_key}': {e}")
+                            logger.error("Error parsing request key '%s': %s", req_key, e)
                             continue
         
         elif isinstance(ai_result, str):
             # Handle text response - try to parse manually
-            print("[AI PARSER] Received text response, attempting manual parsing...")
+            logger.info("Received text response, attempting manual parsing...")
             lines = ai_result.split('\n')
             current_request = None
             current_text = ""
@@ -201,55 +211,60 @@ RESPONSE TO REQUEST FOR PRODUCTION NO.X:
                 questions.append(dq)
         
         else:
-            print(f"[AI PARSER ERROR] Unrecognized response format: {type(ai_result)}")
+            logger.error("Unrecognized response format: %s", type(ai_result))
 
-        print(f"[AI PARSER] Gemini returned {len(questions)} requests with responses.")
+        logger.info("Gemini returned %s requests with responses.", len(questions))
         return questions
 
     except Exception as e:
-        print(f"[AI PARSER ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("AI parser error: %s", e)
         return []
 
-def ai_parse_special_interrogatories(pdf_path: str, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None) -> List[DiscoveryQuestion]:
+def ai_parse_special_interrogatories(pdf_path: DocumentSource, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None,
+                                      spans_text: Optional[str] = None) -> List[DiscoveryQuestion]:
     """
     AI-driven parser for Special Interrogatories. Extracts definitions and the main numbered interrogatories section,
     then sends the relevant text to Gemini for parsing and response generation.
     Returns a list of DiscoveryQuestion objects, each with a .response field containing the AI's answer.
+    If spans_text is given, only that text is sent (the spans a deterministic parser left unparsed).
     """
     try:
-        # --- Extract full text from PDF ---
-        with fitz.open(pdf_path) as doc:
-            full_text = ""
-            for page in doc:
-                full_text += page.get_text()
-
-        # --- Extract definitions section (optional, for AI context) ---
-        definitions = None
-        definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=SPECIAL INTERROGATORY|INTERROGATORIES|INTERROGATORY|$)', full_text, re.IGNORECASE)
-        if definitions_match:
-            definitions = definitions_match.group(1).strip()
-        else:
-            fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=SPECIAL INTERROGATORY|INTERROGATORIES|INTERROGATORY|$)', full_text, re.IGNORECASE)
-            if fallback:
-                definitions = fallback.group(1).strip()
-
-        # --- Find the main interrogatories section (after the main heading) ---
-        interrogatories_heading = re.search(r'(SPECIAL INTERROGATOR(Y|IES)[\s\S]{0,2000})', full_text, re.IGNORECASE)
-        if interrogatories_heading:
-            start_idx = interrogatories_heading.start()
+        if spans_text is not None:
+            # Hybrid mode: only the text the deterministic parser couldn't account for
+            definitions = None
+            main_text = spans_text
         else:
-            interrogatories_heading = re.search(r'(INTERROGATOR(Y|IES)[\s\S]{0,2000})', full_text, re.IGNORECASE)
-            start_idx = interrogatories_heading.start() if interrogatories_heading else 0
+            # --- Extract full text from PDF ---
+            with open_pdf(pdf_path) as doc:
+                full_text = ""
+                for page in doc:
+                    full_text += page.get_text()
+
+            # --- Extract definitions section (optional, for AI context) ---
+            definitions = None
+            definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=SPECIAL INTERROGATORY|INTERROGATORIES|INTERROGATORY|$)', full_text, re.IGNORECASE)
+            if definitions_match:
+                definitions = definitions_match.group(1).strip()
+            else:
+                fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=SPECIAL INTERROGATORY|INTERROGATORIES|INTERROGATORY|$)', full_text, re.IGNORECASE)
+                if fallback:
+                    definitions = fallback.group(1).strip()
+
+            # --- Find the main interrogatories section (after the main heading) ---
+            interrogatories_heading = re.search(r'(SPECIAL INTERROGATOR(Y|IES)[\s\S]{0,2000})', full_text, re.IGNORECASE)
+            if interrogatories_heading:
+                start_idx = interrogatories_heading.start()
+            else:
+                interrogatories_heading = re.search(r'(INTERROGATOR(Y|IES)[\s\S]{0,2000})', full_text, re.IGNORECASE)
+                start_idx = interrogatories_heading.start() if interrogatories_heading else 0
 
-        # Only use text after the main heading
-        main_text = full_text[start_idx:]
+            # Only use text after the main heading
+            main_text = full_text[start_idx:]
 
-        # Optionally, trim to the end of the interrogatories section (before signature, etc.)
-        end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
-        if end_match:
-            main_text = main_text[:end_match.start()]
+            # Optionally, trim to the end of the interrogatories section (before signature, etc.)
+            end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
+            if end_match:
+                main_text = main_text[:end_match.start()]
 
         # --- Build robust Gemini prompt ---
         prompt = """
@@ -283,13 +298,13 @@ RESPONSE TO SPECIAL INTERROGATORY NO.X:
             prompt += f"\nCASE DATA (use this to answer interrogatories if possible):\n{case_data}\n"
 
         # --- Call Gemini to extract and answer interrogatories ---
-        print("[AI PARSER] Sending extracted text to Gemini for parsing and response generation (Special Interrogatories)...")
+        logger.info("Sending extracted text to Gemini for parsing and response generation (Special Interrogatories)...")
         ai_result = analyze_discovery_with_gemini(prompt)
 
         # --- ROBUST PARSING LOGIC TO HANDLE MULTIPLE RESPONSE FORMATS ---
         questions = []
         
-        print(f"--- [Discovery Gemini] Raw Response Text (first 500 chars): {str(ai_result)[:500]} ---")
+        logger.debug("[Discovery Gemini] Raw Response Text (first 500 chars): %s", str(ai_result)[:500])
         
         try:
             # Try to parse as JSON first
@@ -334,7 +349,7 @@ RESPONSE TO SPECIAL INTERROGATORY NO.X:
                                     dq.response = response
                                     questions.append(dq)
                                 except Exception as e:
-                                    print(f"[AI PARSER] Error parsing interrogatory key '{req_key}': {e}")
+                                    logger.error("Error parsing interrogatory key '%s': %s", req_key, e)
                                     continue
         
         elif isinstance(ai_result, dict):
@@ -362,12 +377,12 @@ RESPONSE TO SPECIAL INTERROGATORY NO.X:
                             dq.response = response
                             questions.append(dq)
                         except Exception as e:
-                            print(f"[AI PARSER] Error parsing interrogatory key '{req_key}': {e}")
+                            logger.error("Error parsing interrogatory key '%s': %s", req_key, e)
                             continue
         
         elif isinstance(ai_result, str):
             # Handle text response - try to parse manually
-            print("[AI PARSER] Received text response, attempting manual parsing...")
+            logger.info("Received text response, attempting manual parsing...")
             lines = ai_result.split('\n')
             current_request = None
             current_text = ""
@@ -409,57 +424,62 @@ RESPONSE TO SPECIAL INTERROGATORY NO.X:
                 questions.append(dq)
         
         else:
-            print(f"[AI PARSER ERROR] Unrecognized response format for special interrogatories: {type(ai_result)}")
+            logger.error("Unrecognized response format for special interrogatories: %s", type(ai_result))
 
-        print(f"[AI PARSER] Gemini returned {len(questions)} special interrogatories with responses.")
+        logger.info("Gemini returned %s special interrogatories with responses.", len(questions))
         return questions
 
     except Exception as e:
-        print(f"[AI PARSER ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("AI parser error: %s", e)
         return []
 
-def ai_parse_requests_for_admission(pdf_path: str, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None) -> List[DiscoveryQuestion]:
+def ai_parse_requests_for_admission(pdf_path: DocumentSource, case_data: Optional[dict] = None, objections_list: Optional[List[str]] = None,
+                                    spans_text: Optional[str] = None) -> List[DiscoveryQuestion]:
     """
     AI-driven parser for Requests for Admission. Extracts definitions and the main numbered requests section,
     then sends the relevant text to Gemini for parsing and response generation.
     Returns a list of DiscoveryQuestion objects, each with a .response field containing the AI's answer.
+    If spans_text is given, only that text is sent (the spans a deterministic parser left unparsed).
     """
     try:
-        # --- Extract full text from PDF ---
-        with fitz.open(pdf_path) as doc:
-            full_text = ""
-            for page in doc:
-                full_text += page.get_text()
-
-        # --- Extract definitions section (optional, for AI context) ---
-        definitions = None
-        definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR ADMISSION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-        if definitions_match:
-            definitions = definitions_match.group(1).strip()
-        else:
-            # Try a fallback: look for 'DEFINITIONS' up to the first requests heading
-            fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR ADMISSION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-            if fallback:
-                definitions = fallback.group(1).strip()
-
-        # --- Find the main requests section (after the main heading) ---
-        requests_heading = re.search(r'(REQUESTS? FOR ADMISSION[\s\S]{0,2000})', full_text, re.IGNORECASE)
-        if requests_heading:
-            start_idx = requests_heading.start()
+        if spans_text is not None:
+            # Hybrid mode: only the text the deterministic parser couldn't account for
+            definitions = None
+            main_text = spans_text
         else:
-            # Fallback: look for 'REQUESTS' as a heading
-            requests_heading = re.search(r'(REQUESTS?[\s\S]{0,2000})', full_text, re.IGNORECASE)
-            start_idx = requests_heading.start() if requests_heading else 0
+            # --- Extract full text from PDF ---
+            with open_pdf(pdf_path) as doc:
+                full_text = ""
+                for page in doc:
+                    full_text += page.get_text()
+
+            # --- Extract definitions section (optional, for AI context) ---
+            definitions = None
+            definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR ADMISSION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
+            if definitions_match:
+                definitions = definitions_match.group(1).strip()
+            else:
+                # Try a fallback: look for 'DEFINITIONS' up to the first requests heading
+                fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR ADMISSION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
+                if fallback:
+                    definitions = fallback.group(1).strip()
+
+            # --- Find the main requests section (after the main heading) ---
+            requests_heading = re.search(r'(REQUESTS? FOR ADMISSION[\s\S]{0,2000})', full_text, re.IGNORECASE)
+            if requests_heading:
+                start_idx = requests_heading.start()
+            else:
+                # Fallback: look for 'REQUESTS' as a heading
+                requests_heading = re.search(r'(REQUESTS?[\s\S]{0,2000})', full_text, re.IGNORECASE)
+                start_idx = requests_heading.start() if requests_heading else 0
 
-        # Only use text after the main heading
-        main_text = full_text[start_idx:]
+            # Only use text after the main heading
+            main_text = full_text[start_idx:]
 
-        # Optionally, trim to the end of the requests section (before signature, etc.)
-        end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
-        if end_match:
-            main_text = main_text[:end_match.start()]
+            # Optionally, trim to the end of the requests section (before signature, etc.)
+            end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
+            if end_match:
+                main_text = main_text[:end_match.start()]
 
         # --- Build robust Gemini prompt ---
         prompt = """
@@ -494,13 +514,13 @@ RESPONSE TO REQUEST FOR ADMISSION NO.X:
             prompt += f"\nCASE DATA (use this to answer requests if possible):\n{case_data}\n"
 
         # --- Call Gemini to extract and answer requests ---
-        print("[AI PARSER] Sending extracted text to Gemini for parsing and response generation...")
+        logger.info("Sending extracted text to Gemini for parsing and response generation...")
         ai_result = analyze_discovery_with_gemini(prompt)
 
         # --- ROBUST PARSING LOGIC TO HANDLE MULTIPLE RESPONSE FORMATS ---
         questions = []
         
-        print(f"--- [Discovery Gemini] Raw Response Text (first 500 chars): {str(ai_result)[:500]} ---")
+        logger.debug("[Discovery Gemini] Raw Response Text (first 500 chars): %s", str(ai_result)[:500])
         
         try:
             # Try to parse as JSON first
@@ -536,7 +556,7 @@ RESPONSE TO REQUEST FOR ADMISSION NO.X:
                                     dq.response = response
                                     questions.append(dq)
                                 except Exception as e:
-                                    print(f"[AI PARSER] Error parsing request key '{req_key}': {e}")
+                                    logger.error("Error parsing request key '%s': %s", req_key, e)
                                     continue
         
         elif isinstance(ai_result, dict):
@@ -564,12 +584,12 @@ RESPONSE TO REQUEST FOR ADMISSION NO.X:
                             dq.response = response
                             questions.append(dq)
                         except Exception as e:
-                            print(f"[AI PARSER] Error parsing request key '{req_key}': {e}")
+                            logger.error("Error parsing request key '%s': %s", req_key, e)
                             continue
         
         elif isinstance(ai_result, str):
             # Handle text response - try to parse manually
-            print("[AI PARSER] Received text response, attempting manual parsing...")
+            logger.info("Received text response, attempting manual parsing...")
             lines = ai_result.split('\n')
             current_request = None
             current_text = ""
@@ -611,13 +631,11 @@ RESPONSE TO REQUEST FOR ADMISSION NO.X:
                 questions.append(dq)
         
         else:
-            print(f"[AI PARSER ERROR] Unrecognized response format: {type(ai_result)}")
+            logger.error("Unrecognized response format: %s", type(ai_result))
 
-        print(f"[AI PARSER] Gemini returned {len(questions)} requests with responses.")
+        logger.info("Gemini returned %s requests with responses.", len(questions))
         return questions
 
     except Exception as e:
-        print(f"[AI PARSER ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("AI parser error: %s", e)
         return []
\ No newline at end of file
@@ -9,7 +9,8 @@ class DiscoveryQuestion:
     Represents a single discovery question/request with optional subparts.
     """
     
-    def __init__(self, number: str, text: str, subparts: List[str] = None):
+    def __init__(self, number: str, text: str, subparts: List[str] = None,
+                 page: Optional[int] = None, line: Optional[int] = None):
         """
         Initialize a discovery question.
         
@@ -17,21 +18,32 @@ class DiscoveryQuestion:
             number: Question/request number (e.g., "1", "2.1")
             text: Text of the question/request
             subparts: Optional list of subpart texts
+            page: 1-based page the question starts on, if known
+            line: 1-based line within that page, if known
         """
         self.number = number
         self.text = text
         self.subparts = subparts or []
+        self.page = page
+        self.line = line
+        # (start, end) offsets in the parsed text; set by the deterministic parsers, not serialized
+        self.span = None
     
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert to dictionary for JSON serialization.
         """
-        return {
+        data = {
             'id': f"q_{self.number}",  # Add this line!
             'number': self.number,
             'text': self.text,
             'subparts': self.subparts
         }
+        # Source location is only known for the deterministic parsers
+        if self.page is not None:
+            data['page'] = self.page
+            data['line'] = self.line
+        return data
     
     def __str__(self) -> str:
         """String representation for debugging."""
@@ -39,6 +51,47 @@ class DiscoveryQuestion:
         return f"Question {self.number}{subparts_str}: {self.text[:50]}..."
 
 
+class ParseResult:
+    """
+    Questions produced by a parser chain together with how they were produced.
+    """
+
+    # Paths a parser chain can take
+    PATH_DETERMINISTIC = 'deterministic'  # Regex parser was confident enough
+    PATH_HYBRID = 'hybrid'                # Regex parser plus AI on the unparsed spans
+    PATH_AI = 'ai'                        # Full AI parse
+
+    def __init__(self, questions: List[DiscoveryQuestion], confidence: float = 1.0,
+                 path: str = PATH_DETERMINISTIC, parser: Optional[str] = None,
+                 signals: Optional[Dict[str, Any]] = None, unparsed_spans: Optional[List[str]] = None):
+        """
+        Args:
+            questions: Parsed questions
+            confidence: 0-1 score for the deterministic parse
+            path: Which of the PATH_* routes produced the questions
+            parser: Name of the parser(s) used
+            signals: The individual scores behind the confidence
+            unparsed_spans: Text inside the requests section no question accounted for
+        """
+        self.questions = questions
+        self.confidence = confidence
+        self.path = path
+        self.parser = parser
+        self.signals = signals or {}
+        self.unparsed_spans = unparsed_spans or []
+
+    def summary(self) -> Dict[str, Any]:
+        """Everything but the questions, for logging and API responses."""
+        return {
+            'path': self.path,
+            'parser': self.parser,
+            'confidence': self.confidence,
+            'signals': self.signals,
+            'unparsed_spans': len(self.unparsed_spans),
+            'question_count': len(self.questions),
+        }
+
+
 class BaseDiscoveryParser:
     """
     Base class for discovery document parsers.
@@ -0,0 +1,132 @@
+"""
+In-memory catalog of form interrogatory questions.
+
+The per-language JSON files in ``backend/data`` are loaded once, indexed by
+question id, and kept as pre-serialized (and pre-gzipped) bytes with a strong
+ETag so the questions endpoint never has to touch the disk or re-encode JSON.
+A file is reloaded only when its mtime changes.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+# Languages map straight onto file names, so only allow plain identifiers
+_LANGUAGE_PATTERN = re.compile(r'^[a-z_]+$')
+
+
+class CatalogNotFoundError(Exception):
+    """Raised when no interrogatory catalog exists for a language."""
+    pass
+
+
+class InterrogatoryCatalogEntry:
+    """
+    One loaded language catalog: the question list, an id index and the
+    ready-to-send response bodies.
+    """
+
+    def __init__(self, language: str, questions: List[Dict[str, Any]], mtime: float):
+        self.language = language
+        self.mtime = mtime
+        self.questions = questions
+        self.by_id = {self._normalize_id(q.get('id')): q for q in questions}
+        self.position = {self._normalize_id(q.get('id')): i for i, q in enumerate(questions)}
+        self.by_number = {str(q.get('number')): q for q in questions}
+
+        # Pre-serialize once; compact separators keep the payload small
+        self.body = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong ETags must differ per representation
+        self.etag = f"fi-{language}-{digest}"
+        self.gzip_etag = f"{self.etag}-gz"
+
+    @staticmethod
+    def _normalize_id(question_id):
+        """Ids are ints in the JSON files but may arrive as strings from the client."""
+        try:
+            return int(question_id)
+        except (TypeError, ValueError):
+            return question_id
+
+    def select(self, selected_ids: Iterable) -> List[Dict[str, Any]]:
+        """
+        Returns the questions for the given ids in catalog order.
+        Unknown ids are ignored.
+        """
+        positions = {
+            self.position[key]
+            for key in (self._normalize_id(sid) for sid in selected_ids)
+            if key in self.position
+        }
+        return [self.questions[i] for i in sorted(positions)]
+
+
+class InterrogatoryCatalog:
+    """Process-wide cache of form interrogatory catalogs, one entry per language."""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self._data_dir = data_dir
+        self._entries: Dict[str, InterrogatoryCatalogEntry] = {}
+        self._lock = threading.Lock()
+
+    def _path_for(self, language: str) -> str:
+        if not language or not _LANGUAGE_PATTERN.match(language):
+            raise CatalogNotFoundError(f'No questions found for language: {language}')
+        return os.path.join(self._data_dir, f'form_interrogatories_{language}.json')
+
+    def get(self, language: str) -> InterrogatoryCatalogEntry:
+        """
+        Returns the catalog entry for a language, (re)loading it if the file
+        is new or its mtime has changed since the last load.
+
+        Raises:
+            CatalogNotFoundError: If no catalog file exists for the language
+        """
+        path = self._path_for(language)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            raise CatalogNotFoundError(f'No questions found for language: {language}')
+
+        entry = self._entries.get(language)
+        if entry is not None and entry.mtime == mtime:
+            return entry
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            entry = self._entries.get(language)
+            if entry is not None and entry.mtime == mtime:
+                return entry
+            with open(path, 'r', encoding='utf-8') as f:
+                questions = json.load(f)
+            entry = InterrogatoryCatalogEntry(language, questions, mtime)
+            self._entries[language] = entry
+            return entry
+
+    def preload(self, languages: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Loads every catalog in the data directory (or the given languages)
+        so the first request doesn't pay for it. Returns the loaded languages.
+        """
+        if languages is None:
+            languages = [
+                name[len('form_interrogatories_'):-len('.json')]
+                for name in sorted(os.listdir(self._data_dir))
+                if name.startswith('form_interrogatories_') and name.endswith('.json')
+            ]
+        loaded = []
+        for language in languages:
+            self.get(language)
+            loaded.append(language)
+        return loaded
+
+
+# Create a singleton instance
+interrogatory_catalog = InterrogatoryCatalog()
@@ -0,0 +1,141 @@
+"""
+Confidence-gated parser chains for discovery documents.
+
+Each registry entry lists deterministic parsers in 'parser_chain' and an
+optional 'ai_parser'. The deterministic parsers run first and score their own
+output (see parsers.score_parse). Gemini is only called when the best score is
+below the entry's 'confidence_threshold':
+  - on just the unparsed spans, when the regex parse is otherwise usable
+  - on the whole document, when it isn't
+The path taken is recorded on the ParseResult and counted per discovery type
+so the deterministic hit rate can be tracked.
+"""
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import DiscoveryQuestion, ParseResult
+from backend.utils.document_parser import DocumentSource
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.9
+
+# Below this coverage the regex parse missed too much for a spans-only AI pass
+MIN_HYBRID_COVERAGE = 0.5
+
+_path_counts = Counter()
+_path_counts_lock = threading.Lock()
+
+
+def _record_path(discovery_type: str, path: str) -> None:
+    with _path_counts_lock:
+        _path_counts[(discovery_type, path)] += 1
+
+
+def get_parse_path_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns per discovery type counts of each path taken since the worker
+    started, plus the share handled without any AI call.
+    """
+    with _path_counts_lock:
+        counts = dict(_path_counts)
+
+    stats = {}
+    for (discovery_type, path), count in counts.items():
+        stats.setdefault(discovery_type, {})[path] = count
+    for paths in stats.values():
+        total = sum(paths.values())
+        paths['deterministic_hit_rate'] = round(paths.get(ParseResult.PATH_DETERMINISTIC, 0) / total, 3)
+    return stats
+
+
+def _sort_key(question: DiscoveryQuestion):
+    number = str(question.number)
+    return (0, int(number), '') if number.isdigit() else (1, 0, number)
+
+
+def _merge_questions(primary: List[DiscoveryQuestion], extra: List[DiscoveryQuestion]) -> List[DiscoveryQuestion]:
+    """Adds questions from ``extra`` whose numbers ``primary`` doesn't have, in number order."""
+    known = {str(q.number) for q in primary}
+    added = [q for q in extra if str(q.number) not in known]
+    if not added:
+        return primary
+    return sorted(primary + added, key=_sort_key)
+
+
+def run_parser_chain(discovery_type: str, type_info: Dict[str, Any], pdf_path: DocumentSource,
+                     ai_kwargs: Optional[Dict[str, Any]] = None) -> ParseResult:
+    """
+    Runs a registry entry's parser chain on a PDF.
+
+    Args:
+        discovery_type: Registry key, used for path statistics
+        type_info: Registry entry
+        pdf_path: The discovery PDF (path, bytes, stream or open fitz.Document)
+        ai_kwargs: Extra keyword arguments for the AI parser (case_data, objections_list)
+
+    Returns:
+        ParseResult describing the questions and the path taken
+    """
+    chain: List[Callable[[str], ParseResult]] = type_info.get('parser_chain') or []
+    ai_parser = type_info.get('ai_parser')
+    threshold = type_info.get('confidence_threshold', DEFAULT_CONFIDENCE_THRESHOLD)
+    ai_kwargs = ai_kwargs or {}
+
+    # --- Deterministic parsers: keep the best scoring one ---
+    best = None
+    for parser in chain:
+        try:
+            result = parser(pdf_path)
+        except Exception as e:
+            logger.warning("Deterministic parser %s failed: %s", parser.__name__, e)
+            continue
+        logger.info("[PARSE PATH] %s: %s confidence %s %s", discovery_type, parser.__name__, result.confidence, result.signals)
+        if best is None or result.confidence > best.confidence:
+            best = result
+        if result.confidence >= threshold:
+            break
+
+    if ai_parser is None:
+        return _finish(discovery_type, best or ParseResult([], confidence=0.0))
+    if best is not None and best.confidence >= threshold:
+        best.path = ParseResult.PATH_DETERMINISTIC
+        return _finish(discovery_type, best)
+
+    # --- AI on the unparsed spans only ---
+    if (best is not None and best.questions and best.unparsed_spans
+            and best.signals.get('coverage', 0) >= MIN_HYBRID_COVERAGE):
+        spans_text = "\n\n".join(best.unparsed_spans)
+        logger.info("[PARSE PATH] %s: sending %s unparsed spans (%s chars) to %s", discovery_type, len(best.unparsed_spans), len(spans_text), ai_parser.__name__)
+        ai_questions = ai_parser(pdf_path, spans_text=spans_text, **ai_kwargs)
+        best.questions = _merge_questions(best.questions, ai_questions)
+        best.path = ParseResult.PATH_HYBRID
+        best.parser = f"{best.parser}+{ai_parser.__name__}"
+        return _finish(discovery_type, best)
+
+    # --- Full AI parse ---
+    logger.info("[PARSE PATH] %s: confidence below %s, using %s", discovery_type, threshold, ai_parser.__name__)
+    ai_questions = ai_parser(pdf_path, **ai_kwargs)
+    if not ai_questions and best is not None and best.questions:
+        # AI failed; a low-confidence regex parse beats nothing
+        logger.info("[PARSE PATH] %s: AI parser returned nothing, keeping deterministic result", discovery_type)
+        best.path = ParseResult.PATH_DETERMINISTIC
+        best.signals['ai_failed'] = True
+        return _finish(discovery_type, best)
+
+    result = ParseResult(
+        ai_questions,
+        confidence=best.confidence if best else 0.0,
+        path=ParseResult.PATH_AI,
+        parser=ai_parser.__name__,
+        signals=best.signals if best else {},
+    )
+    return _finish(discovery_type, result)
+
+
+def _finish(discovery_type: str, result: ParseResult) -> ParseResult:
+    _record_path(discovery_type, result.path)
+    logger.info("[PARSE PATH] %s: %s via %s (%s questions, confidence %s)", discovery_type, result.path, result.parser, len(result.questions), result.confidence)
+    return result
@@ -1,15 +1,64 @@
 """
 Formatters for different types of discovery responses.
+
+Form interrogatory answers are formatted section by section (1.x identity,
+6.x medical, 8.x income, ...). Each section gets its own compact prompt and is
+sent to Gemini in JSON response mode concurrently with the others; a section
+whose response is malformed is retried on its own instead of failing the set.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-from backend.services.analysis_service import call_gemini_with_prompt, AnalysisServiceError
+from flask import current_app
+
+from backend.services.analysis_service import call_gemini_json, AnalysisServiceError
+from .catalog import interrogatory_catalog, CatalogNotFoundError
 
 logger = logging.getLogger(__name__)
 
+# (group, label, form interrogatory sections, formatting guidance, case fields sent with it)
+SECTION_GROUPS = [
+    ('identity', 'identity and background', ('1', '2', '3'),
+     "Identity and background answers: names, addresses and dates on their own lines.",
+     ()),
+    ('insurance', 'insurance', ('4',),
+     "Insurance answers: list each policy with carrier, policy number, limits and policy holder.",
+     ()),
+    ('medical', 'physical, mental or emotional injuries and medical history', ('6', '10'),
+     "Medical answers: format as a clear, structured list. Include all provider information. "
+     "List dates and amounts clearly.",
+     ('incident_date', 'incident_description')),
+    ('property', 'property damage', ('7',),
+     "Property damage answers: list each item with its damage, repair estimate and amounts as currency.",
+     ('incident_date', 'vehicle_details')),
+    ('income', 'loss of income and other damages', ('8', '9'),
+     "Income answers: format dates clearly, list amounts with proper currency formatting and "
+     "include clear calculations where provided.",
+     ('incident_date',)),
+    ('incident', 'the incident, investigation and surveillance', ('12', '13', '14', '20'),
+     "Incident answers: keep the chronology in order and identify each person, document or recording.",
+     ('incident_date', 'incident_location', 'incident_description', 'vehicle_details')),
+    ('contentions', 'other claims, defenses and contentions', ('11', '15', '16', '17', '50'),
+     "Contention answers: state each fact and identify supporting persons and documents separately.",
+     ('case_type',)),
+]
+OTHER_GROUP = ('other', 'other questions', (), "", ())
+
+SECTION_TO_GROUP = {section: group for group in SECTION_GROUPS for section in group[2]}
+
+# Sent with every section
+BASE_CASE_FIELDS = ('case_number', 'plaintiff', 'defendant', 'active_defendant')
+
+MEDICAL_RECORDS_GROUP = 'medical_records'
+
+# Per-section retry of malformed or incomplete AI responses
+MAX_SECTION_ATTEMPTS = 3
+SECTION_RETRY_DELAY = 1.0  # seconds, doubled on each retry
+
 def validate_responses(responses: Dict[str, str]) -> bool:
     """
     Validate the format of client responses.
@@ -26,161 +75,283 @@ def validate_responses(responses: Dict[str, str]) -> bool:
         
     for question_num, response in responses.items():
         if not isinstance(question_num, str) or not isinstance(response, str):
-            logger.error(f"Invalid response format for question {question_num}")
+            logger.error("Invalid response format for question %s", question_num)
             return False
             
         # Validate question number format (e.g., "1.5", "2.0")
         if not all(c.isdigit() or c == '.' for c in question_num):
-            logger.error(f"Invalid question number format: {question_num}")
+            logger.error("Invalid question number format: %s", question_num)
             return False
             
     return True
 
-def format_form_interrogatory_responses(client_answers: Dict[str, str], case_details: Dict[str, Any]) -> Dict[str, Any]:
+def group_answers_by_section(client_answers: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    Splits client answers into SECTION_GROUPS by the section part of the
+    question number ("6.4" -> medical). Unknown sections go to 'other'.
+    """
+    grouped: Dict[str, Dict[str, str]] = {}
+    for number, answer in client_answers.items():
+        group = SECTION_TO_GROUP.get(number.split('.')[0], OTHER_GROUP)
+        grouped.setdefault(group[0], {})[number] = answer
+    return grouped
+
+
+def _group_config(name: str) -> tuple:
+    for group in SECTION_GROUPS:
+        if group[0] == name:
+            return group
+    return OTHER_GROUP
+
+
+def _compact_case_info(case_details: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Only the case fields a section needs, without empty values."""
+    info = {}
+    for field in BASE_CASE_FIELDS + tuple(fields):
+        value = case_details.get(field)
+        if value not in (None, '', [], {}):
+            info[field] = value
+    return info
+
+
+def _question_texts(language: str = 'english') -> Dict[str, Dict[str, Any]]:
+    try:
+        return interrogatory_catalog.get(language).by_number
+    except CatalogNotFoundError:
+        return {}
+
+
+def _compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def build_section_prompt(group_name: str, answers: Dict[str, str], case_details: Dict[str, Any],
+                         questions_by_number: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
     """
-    Format client answers for form interrogatories using AI.
+    Builds the prompt for one section group: just its questions, the client's
+    answers and the case fields relevant to that section.
+    """
+    _, label, _, guidance, fields = _group_config(group_name)
+    questions_by_number = questions_by_number or {}
+    items = [
+        {'number': number, 'question': questions_by_number.get(number, {}).get('text', ''), 'answer': answer}
+        for number, answer in answers.items()
+    ]
+    return (
+        f"You are a legal assistant formatting client answers to California form interrogatories ({label}).\n"
+        f"CASE: {_compact_json(_compact_case_info(case_details, fields))}\n"
+        f"ANSWERS: {_compact_json(items)}\n"
+        "RULES:\n"
+        "- Format each answer according to its question's built-in format; keep subparts (a), (b), (c) as a list; "
+        "otherwise use normal sentences. Keep it clear and concise.\n"
+        "- Do NOT add objections or \"Subject to and without waiving\" clauses; the template already has them.\n"
+        + (f"- {guidance}\n" if guidance else "")
+        + "Return a JSON object whose keys are exactly the question numbers above and whose values are the "
+        "formatted responses as strings."
+    )
+
+
+def build_medical_records_prompt(medical_data: Dict[str, Any], case_details: Optional[Dict[str, Any]] = None) -> str:
+    """Builds the prompt that turns provider data into the 6.x medical answers."""
+    case_info = _compact_case_info(case_details or {}, ('incident_date',))
+    return (
+        "You are a legal assistant formatting medical records for California form interrogatories.\n"
+        f"CASE: {_compact_json(case_info)}\n"
+        f"MEDICAL RECORDS DATA: {_compact_json(medical_data)}\n"
+        "RULES:\n"
+        "- For each provider give a) provider information (name, address, phone number), "
+        "b) treatment dates in chronological order, c) amount as currency, d) any relevant notes.\n"
+        "- Use a clear, professional list format suitable for legal documents.\n"
+        "Return a JSON object whose keys are question numbers (e.g. \"6.4\", \"6.5\", \"6.6\") and whose "
+        "values are the formatted lists as strings."
+    )
+
+
+def _normalize_section_result(result: Any, expected: Optional[List[str]]) -> Dict[str, str]:
+    """
+    Checks one section's AI output. Returns the responses for the expected
+    question numbers, or raises ValueError if the output is unusable.
+    """
+    if not isinstance(result, dict):
+        raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+
+    responses = {}
+    for number, value in result.items():
+        number = str(number).strip()
+        if expected is not None and number not in expected:
+            continue
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        responses[number] = value
+
+    if not validate_responses(responses):
+        raise ValueError("invalid response format")
+    if expected is not None:
+        missing = [number for number in expected if number not in responses]
+        if missing:
+            raise ValueError(f"missing questions {', '.join(missing)}")
+    return responses
+
+
+def _format_section(name: str, prompt: str, expected: Optional[List[str]], api_key: str) -> Tuple[Dict[str, str], int]:
+    """Formats one section, retrying malformed responses. Returns (responses, attempts)."""
+    last_error = None
+    for attempt in range(1, MAX_SECTION_ATTEMPTS + 1):
+        try:
+            result = call_gemini_json(prompt, api_key=api_key)
+            return _normalize_section_result(result, expected), attempt
+        except (AnalysisServiceError, ValueError) as e:
+            last_error = e
+            logger.warning("Section '%s' attempt %s/%s failed: %s", name, attempt, MAX_SECTION_ATTEMPTS, e)
+            if attempt < MAX_SECTION_ATTEMPTS:
+                time.sleep(SECTION_RETRY_DELAY * 2 ** (attempt - 1))
+    raise AnalysisServiceError(f"Section '{name}' failed after {MAX_SECTION_ATTEMPTS} attempts: {last_error}")
+
+
+def run_section_tasks(tasks: Dict[str, Tuple[str, Optional[List[str]]]],
+                      max_workers: Optional[int] = None) -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, Any]]]:
+    """
+    Formats sections concurrently.
+
+    Args:
+        tasks: Section name -> (prompt, expected question numbers or None)
+        max_workers: Concurrent AI calls (defaults to AI_FORMAT_MAX_WORKERS)
+
+    Returns:
+        Tuple of (responses per section, status per section). Failed sections
+        have no responses and an 'error' in their status.
+    """
+    # Worker threads have no app context, so read the config here
+    api_key = current_app.config.get("AI_API_KEY")
+    if not api_key:
+        raise AnalysisServiceError("AI API Key is not configured.")
+    if max_workers is None:
+        max_workers = current_app.config.get('AI_FORMAT_MAX_WORKERS', 4)
+
+    results: Dict[str, Dict[str, str]] = {}
+    status: Dict[str, Dict[str, Any]] = {}
+    if not tasks:
+        return results, status
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+        futures = {
+            pool.submit(_format_section, name, prompt, expected, api_key): name
+            for name, (prompt, expected) in tasks.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name], attempts = future.result()
+                status[name] = {'question_count': len(results[name]), 'attempts': attempts}
+            except Exception as e:
+                logger.error("Failed to format section '%s': %s", name, e)
+                status[name] = {'error': str(e), 'attempts': MAX_SECTION_ATTEMPTS}
+    return results, status
+
+
+def format_form_interrogatory_responses(client_answers: Dict[str, str], case_details: Dict[str, Any],
+                                        medical_data: Optional[Dict[str, Any]] = None,
+                                        language: str = 'english') -> Dict[str, Any]:
+    """
+    Format client answers for form interrogatories using AI, one section group
+    at a time and concurrently.
     
     Args:
         client_answers: Dict where keys are question numbers (e.g., "1.5", "2.0")
                        and values are the client's raw answers
         case_details: Dictionary containing case information
+        medical_data: Optional medical provider data, formatted in the same fan-out
+        language: Catalog used to look up question texts
     
     Returns:
-        Dict with formatted responses and metadata
+        Dict with formatted responses and metadata. Answers in a section that
+        still failed after retries are returned as given and listed under
+        metadata['failed_sections'].
     """
-    logger.info(f"Formatting form interrogatory responses for case {case_details.get('case_id')}")
+    case_id = case_details.get('case_id', case_details.get('id'))
+    logger.info("Formatting form interrogatory responses for case %s", case_id)
     
     # Validate inputs
     if not validate_responses(client_answers):
         raise ValueError("Invalid response format")
-        
-    prompt = f"""
-    You are a legal assistant formatting responses to form interrogatories.
-    
-    CASE INFORMATION:
-    {json.dumps(case_details, indent=2)}
-    
-    CLIENT ANSWERS:
-    {json.dumps(client_answers, indent=2)}
-    
-    INSTRUCTIONS:
-    1. For each question number in the client answers:
-       - Format the response according to the question's built-in format
-       - If the question has subparts (a, b, c), maintain that list format
-       - If no specific format is requested, keep as normal sentences
-       - Keep the response clear and concise
-    
-    2. Do NOT add any objections or "Subject to and without waiving" clauses
-       - The template already includes these
-       - Just format the substantive response
-    
-    3. For medical records sections (typically questions 6.4, 6.5, 6.6):
-       - Format as a clear, structured list
-       - Include all provider information
-       - List dates and amounts clearly
-    
-    4. For income loss sections (typically questions 8.1-8.8):
-       - Format dates clearly
-       - List amounts with proper currency formatting
-       - Include clear calculations where provided
-    
-    Return the formatted responses as a JSON object where:
-    - Keys are the question numbers (e.g., "1.5", "2.0")
-    - Values are the professionally formatted responses
-    """
-    
-    try:
-        logger.debug("Calling Gemini AI for response formatting")
-        response = call_gemini_with_prompt(prompt)
-        
-        logger.debug("Parsing AI response as JSON")
-        formatted_responses = json.loads(response)
-        
-        # Validate formatted responses
-        if not validate_responses(formatted_responses):
-            raise ValueError("AI returned invalid response format")
-        
-        # Add metadata
-        result = {
-            'responses': formatted_responses,
-            'metadata': {
-                'formatted_at': datetime.utcnow().isoformat(),
-                'case_id': case_details.get('case_id'),
-                'version': '1.0',
-                'question_count': len(formatted_responses)
-            }
+
+    grouped = group_answers_by_section(client_answers)
+    questions_by_number = _question_texts(language)
+    tasks = {
+        name: (build_section_prompt(name, answers, case_details, questions_by_number), list(answers))
+        for name, answers in grouped.items()
+    }
+    if medical_data:
+        tasks[MEDICAL_RECORDS_GROUP] = (build_medical_records_prompt(medical_data, case_details), None)
+
+    logger.debug("Formatting %s sections: %s", len(tasks), ', '.join(tasks))
+    results, status = run_section_tasks(tasks)
+
+    if not results:
+        errors = "; ".join(f"{name}: {s.get('error')}" for name, s in status.items())
+        raise AnalysisServiceError(f"Failed to format form interrogatory responses: {errors}")
+
+    # Merge in question order; failed sections keep the client's own answers
+    formatted_responses = {}
+    failed_sections = {}
+    for name, answers in grouped.items():
+        if name in results:
+            formatted_responses.update(results[name])
+        else:
+            formatted_responses.update(answers)
+            failed_sections[name] = status[name]['error']
+
+    metadata = {
+        'formatted_at': datetime.utcnow().isoformat(),
+        'case_id': case_id,
+        'version': '1.1',
+        'question_count': len(formatted_responses),
+        'sections': {name: s for name, s in status.items() if name != MEDICAL_RECORDS_GROUP},
+        'failed_sections': failed_sections,
+    }
+
+    if medical_data:
+        medical_status = status[MEDICAL_RECORDS_GROUP]
+        if MEDICAL_RECORDS_GROUP in results:
+            formatted_responses.update(results[MEDICAL_RECORDS_GROUP])
+        metadata['medical_records'] = {
+            'provider_count': len(medical_data),
+            'question_count': len(results.get(MEDICAL_RECORDS_GROUP, {})),
+            **medical_status,
         }
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"Failed to format form interrogatory responses: {str(e)}", exc_info=True)
-        raise AnalysisServiceError(f"Failed to format form interrogatory responses: {str(e)}")
 
-def format_medical_records(medical_data: Dict[str, List[Dict]]) -> Dict[str, Any]:
+    return {'responses': formatted_responses, 'metadata': metadata}
+
+
+def format_medical_records(medical_data: Dict[str, List[Dict]], case_details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Format medical records into structured lists for form interrogatories.
+    Runs through the same section fan-out as format_form_interrogatory_responses.
     
     Args:
         medical_data: Dict containing medical provider information
+        case_details: Optional case information (only the incident date is used)
     
     Returns:
         Dict with formatted medical records and metadata
     """
     logger.info("Formatting medical records for form interrogatories")
-    
-    prompt = f"""
-    You are a legal assistant formatting medical records for form interrogatories.
-    
-    MEDICAL RECORDS DATA:
-    {json.dumps(medical_data, indent=2)}
-    
-    INSTRUCTIONS:
-    1. Format each medical provider's information as a structured list:
-       a) Provider Information:
-          - Name
-          - Address
-          - Phone Number
-       b) Treatment Dates:
-          - List all dates in chronological order
-       c) Amount:
-          - Format as currency
-       d) Additional Notes:
-          - Include any relevant notes
-    
-    2. For each provider, create a clear, professional list format suitable for legal documents.
-    
-    3. Ensure all information is properly formatted and easy to read.
-    
-    4. Return the formatted responses as a JSON object where:
-       - Keys are the question numbers (e.g., "6.4", "6.5", "6.6")
-       - Values are the professionally formatted lists
-    """
-    
-    try:
-        logger.debug("Calling Gemini AI for medical records formatting")
-        response = call_gemini_with_prompt(prompt)
-        
-        logger.debug("Parsing AI response as JSON")
-        formatted_medical = json.loads(response)
-        
-        # Validate formatted responses
-        if not validate_responses(formatted_medical):
-            raise ValueError("AI returned invalid medical records format")
-        
-        # Add metadata
-        result = {
-            'responses': formatted_medical,
-            'metadata': {
-                'formatted_at': datetime.utcnow().isoformat(),
-                'version': '1.0',
-                'provider_count': len(medical_data),
-                'question_count': len(formatted_medical)
-            }
+
+    tasks = {MEDICAL_RECORDS_GROUP: (build_medical_records_prompt(medical_data, case_details), None)}
+    results, status = run_section_tasks(tasks, max_workers=1)
+    if MEDICAL_RECORDS_GROUP not in results:
+        error = status[MEDICAL_RECORDS_GROUP]['error']
+        logger.error("Failed to format medical records: %s", error)
+        raise AnalysisServiceError(f"Failed to format medical records: {error}")
+
+    formatted_medical = results[MEDICAL_RECORDS_GROUP]
+    return {
+        'responses': formatted_medical,
+        'metadata': {
+            'formatted_at': datetime.utcnow().isoformat(),
+            'version': '1.1',
+            'provider_count': len(medical_data),
+            'question_count': len(formatted_medical),
+            'attempts': status[MEDICAL_RECORDS_GROUP]['attempts'],
         }
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"Failed to format medical records: {str(e)}", exc_info=True)
-        raise AnalysisServiceError(f"Failed to format medical records: {str(e)}") 
\ No newline at end of file
+    }
@@ -1,85 +1,221 @@
 """
 Parsers for different types of discovery documents.
 Enhanced to handle various document formats including simple numbered items.
+
+All parsers share one single-pass pipeline: a tokenizer classifies every line
+with one combined alternation regex, and a small state machine assembles the
+requests from those tokens while tracking the page and line each one starts on.
 """
 import re
-import fitz  # PyMuPDF
-from typing import List, Pattern, Dict, Any, Optional
-from .base import DiscoveryQuestion, BaseDiscoveryParser
+from bisect import bisect_right
+from backend.utils.document_parser import open_pdf, DocumentSource
+from typing import List, Pattern, Dict, Any, Optional, Iterator, NamedTuple, Tuple
+from .base import DiscoveryQuestion, BaseDiscoveryParser, ParseResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Token kinds produced by DiscoveryTokenizer
+TOKEN_BLANK = 'blank'
+TOKEN_STRUCTURED = 'structured'    # e.g. "REQUEST FOR PRODUCTION NO. 3: ..."
+TOKEN_NUMBERED = 'numbered'        # e.g. "3. All documents ..."
+TOKEN_DOT_NUMBER = 'dot_number'    # starts with "3." but isn't a numbered item (e.g. "3.5 ...")
+TOKEN_BARE_NUMBER = 'bare_number'  # a line holding only a number
+TOKEN_TEXT = 'text'
+
+# How many lines after a request heading are folded into its text
+MAX_CONTINUATION_LINES = 9
+
+# Gaps smaller than this (page footers, line numbers, "///") don't count as unparsed text
+MIN_UNPARSED_CHARS = 40
+
+# Any "... NO. X" request heading, used to sanity check how many requests were found
+REQUEST_HEADING_PATTERN = re.compile(r"^[ \t]*(?!RESPONSE\b)(?:[A-Za-z']+[ \t]+){1,5}NO\.[ \t]*(\d+(?:\.\d+)?)",
+                                     re.IGNORECASE | re.MULTILINE)
+# Where the requests section ends (signature block)
+SECTION_END_PATTERN = re.compile(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', re.IGNORECASE)
+
+SUBPART_PATTERN = re.compile(r"\([a-zA-Z]\)\s+([^\(\)]+)")
+BLOCK_NUMBER_PATTERN = re.compile(r'.*?(\d+)[\.\s]+(.*)')
+
+
+class DiscoveryToken(NamedTuple):
+    """One classified line of document text."""
+    kind: str
+    number: Optional[str]
+    text: str   # Request text following the heading/number
+    raw: str    # The whole stripped line
+    page: int
+    line: int
+    start: int  # Offset of the line in the source text
+    end: int    # Offset just past the line (before its newline)
+
+
+class DiscoveryTokenizer:
+    """
+    Classifies document lines using one combined alternation regex built from
+    a parser's structured patterns and its numbered pattern, so each line is
+    matched exactly once.
+    """
+
+    def __init__(self, structured_patterns: List[Pattern], numbered_pattern: Optional[Pattern] = None):
+        alternatives = []
+        flags = 0
+        # name -> (token kind, index of the first inner group, number of inner groups)
+        self._groups: Dict[str, Tuple[str, int, int]] = {}
+
+        named = [(f"s{i}", TOKEN_STRUCTURED, p) for i, p in enumerate(structured_patterns)]
+        if numbered_pattern is not None:
+            named.append(("num", TOKEN_NUMBERED, numbered_pattern))
+        for name, kind, pattern in named:
+            alternatives.append(f"(?P<{name}>{self._strip_anchor(pattern.pattern)})")
+            flags |= pattern.flags
+
+        alternatives.append(r"(?P<dot>\d+\.)")
+        alternatives.append(r"(?P<bare>\d+)$")
+        self.regex = re.compile("|".join(alternatives), flags)
+
+        for name, kind, pattern in named:
+            self._groups[name] = (kind, self.regex.groupindex[name] + 1, pattern.groups)
+
+    @staticmethod
+    def _strip_anchor(pattern: str) -> str:
+        return pattern[1:] if pattern.startswith('^') else pattern
+
+    def classify(self, line: str) -> Tuple[str, Optional[str], str]:
+        """Returns (kind, number, text) for one stripped line."""
+        if not line:
+            return TOKEN_BLANK, None, ''
+        match = self.regex.match(line)
+        if match is None:
+            return TOKEN_TEXT, None, line
+        name = match.lastgroup
+        if name == 'dot':
+            return TOKEN_DOT_NUMBER, None, line
+        if name == 'bare':
+            return TOKEN_BARE_NUMBER, line, line
+        kind, first, count = self._groups[name]
+        number = match.group(first)
+        text = (match.group(first + 1) or '') if count > 1 else ''
+        return kind, number, text
+
+    def tokenize(self, text: str, page_starts: Optional[List[int]] = None,
+                 start: int = 0, end: Optional[int] = None) -> Iterator[DiscoveryToken]:
+        """
+        Yields one token per line of ``text[start:end]``.
+
+        Args:
+            text: Full document text
+            page_starts: Offsets in ``text`` where each page begins (page 1 first)
+            start: Offset to start tokenizing from
+            end: Offset to stop at (defaults to the end of the text)
+        """
+        page_starts = page_starts or [0]
+        end = len(text) if end is None else end
+
+        page_index = max(bisect_right(page_starts, start) - 1, 0)
+        next_page = page_index + 1
+        line_no = 1 + text.count('\n', page_starts[page_index], start)
+
+        pos = start
+        while pos < end:
+            newline = text.find('\n', pos, end)
+            if newline == -1:
+                newline = end
+
+            # Move to the page this line starts on (empty pages share an offset)
+            if next_page < len(page_starts) and pos >= page_starts[next_page]:
+                while next_page < len(page_starts) and pos >= page_starts[next_page]:
+                    next_page += 1
+                page_index = next_page - 1
+                line_no = 1 + text.count('\n', page_starts[page_index], pos)
+
+            raw = text[pos:newline].strip()
+            kind, number, line_text = self.classify(raw)
+            yield DiscoveryToken(kind, number, line_text, raw, page_index + 1, line_no, pos, newline)
+
+            line_no += 1
+            pos = newline + 1
 
 
 class GeneralDiscoveryParser:
     """Base implementation with shared parsing logic for discovery documents."""
+
+    @staticmethod
+    def extract_pages(pdf_path: DocumentSource) -> List[str]:
+        """Returns the text of every page of the PDF (path, bytes, stream or open document)."""
+        with open_pdf(pdf_path) as doc:
+            return [page.get_text("text") for page in doc]
+
+    @staticmethod
+    def join_pages(pages: List[str], separator: str = "") -> Tuple[str, List[int]]:
+        """
+        Joins page texts into one string.
+
+        Returns:
+            Tuple of (full text, offset where each page starts)
+        """
+        parts = []
+        page_starts = []
+        length = 0
+        for page_text in pages:
+            page_starts.append(length)
+            if separator and not (page_text and page_text.strip()):
+                continue  # Skip empty pages but keep their page number
+            chunk = page_text + separator
+            parts.append(chunk)
+            length += len(chunk)
+        return "".join(parts).replace("\r", "\n"), page_starts
     
     @classmethod
-    def parse(cls, pdf_path: str, primary_patterns: List[Pattern], numbered_pattern: Pattern = None) -> List[DiscoveryQuestion]:
+    def parse(cls, pdf_path: DocumentSource, primary_patterns: List[Pattern], numbered_pattern: Pattern = None,
+              tokenizer: Optional[DiscoveryTokenizer] = None) -> List[DiscoveryQuestion]:
         """
         Generic PDF parser for discovery documents using multiple regex patterns.
         
         Args:
-            pdf_path: Path to the PDF file
+            pdf_path: Path to the PDF file, or its bytes / stream / open fitz.Document
             primary_patterns: List of regex patterns to try for formal request formats
             numbered_pattern: Pattern to match simple numbered items
+            tokenizer: Prebuilt tokenizer for these patterns (built on the fly if omitted)
             
         Returns:
             List of parsed DiscoveryQuestion objects
         """
-        questions = []
-        doc_text = ""
-        
         try:
-            # Open the PDF with PyMuPDF
-            doc = fitz.open(pdf_path)
-            print(f"[DEBUG] PDF has {len(doc)} pages")
-            
-            # First, extract all text from the document
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text("text")
-                if text and text.strip():
-                    print(f"[DEBUG] Extracted text from page {page_num+1} ({len(text)} chars)")
-                    doc_text += text + "\n\n"  # Add extra line breaks between pages
-                else:
-                    print(f"[DEBUG] No text found on page {page_num+1}")
-            
-            # Normalize line endings and whitespace
-            doc_text = doc_text.replace("\r", "\n")
-            
-            # Check if document has expected pattern in it
-            document_type = cls._determine_document_type(doc_text)
-            print(f"[DEBUG] Detected document type: {document_type}")
-            
-            # Process the text line by line
-            lines = doc_text.split('\n')
-            i = 0
-            
-            # First try to find structured requests (REQUEST FOR PRODUCTION NO. X)
-            structured_questions = cls._parse_structured_requests(lines, primary_patterns)
-            if structured_questions:
-                print(f"[DEBUG] Found {len(structured_questions)} structured requests")
-                questions.extend(structured_questions)
-            
-            # If no structured requests or too few found, try numbered format
-            if not questions and numbered_pattern:
-                numbered_questions = cls._parse_numbered_requests(lines, numbered_pattern)
-                print(f"[DEBUG] Found {len(numbered_questions)} numbered requests")
-                questions.extend(numbered_questions)
-            
-            # Close the document
-            doc.close()
-            
-            # Print detailed information about what was found
-            print(f"[DEBUG] Successfully extracted {len(questions)} questions total")
-            for i, q in enumerate(questions[:5]):  # Print first 5 for debugging
-                print(f"[DEBUG] Question {i+1}: #{q.number} - {q.text[:50]}...")
-            
-            return questions
-            
+            return cls.parse_scored(pdf_path, primary_patterns, numbered_pattern, tokenizer).questions
         except Exception as e:
-            print(f"[ERROR] Failed to process PDF: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to process PDF: %s", e)
             return []
+
+    @classmethod
+    def parse_scored(cls, pdf_path: DocumentSource, primary_patterns: List[Pattern], numbered_pattern: Pattern = None,
+                     tokenizer: Optional[DiscoveryTokenizer] = None, parser_name: Optional[str] = None) -> ParseResult:
+        """
+        Same as parse(), but returns a ParseResult carrying a confidence score
+        and the unparsed spans. Exceptions are left to the caller.
+        """
+        pages = cls.extract_pages(pdf_path)
+        # Extra line breaks between pages
+        doc_text, page_starts = cls.join_pages(pages, separator="\n\n")
+        logger.debug("PDF has %s pages (%s chars of text)", len(pages), len(doc_text))
+        
+        # Check if document has expected pattern in it
+        document_type = cls._determine_document_type(doc_text)
+        logger.debug("Detected document type: %s", document_type)
+
+        if tokenizer is None:
+            tokenizer = DiscoveryTokenizer(primary_patterns, numbered_pattern)
+        questions = cls.parse_tokens(tokenizer.tokenize(doc_text, page_starts),
+                                     use_numbered=numbered_pattern is not None)
+        
+        # Print detailed information about what was found
+        logger.debug("Successfully extracted %s questions total", len(questions))
+        for i, q in enumerate(questions[:5]):  # Print first 5 for debugging
+            logger.debug("Question %s: #%s (page %s) - %s...", i + 1, q.number, q.page, q.text[:50])
+        
+        return score_parse(questions, doc_text, parser=parser_name)
     
     @staticmethod
     def _determine_document_type(text: str) -> str:
@@ -96,193 +232,299 @@ class GeneralDiscoveryParser:
             return "requests_for_admission"
         else:
             return "unknown"
-    
+
     @staticmethod
-    def _parse_structured_requests(lines: List[str], patterns: List[Pattern]) -> List[DiscoveryQuestion]:
-        """Parse structured requests using multiple patterns"""
-        questions = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Try all patterns
-            for pattern in patterns:
-                match = pattern.match(line)
-                if match:
-                    number = match.group(1)
-                    q_text = match.group(2) if len(match.groups()) > 1 else ""
-                    
-                    # Look ahead for continued text
-                    next_idx = i + 1
-                    while next_idx < len(lines) and next_idx < i + 10:
-                        next_line = lines[next_idx].strip()
-                        if not next_line or re.match(r'^\d+\.', next_line) or any(p.match(next_line) for p in patterns):
-                            break
-                        q_text += " " + next_line
-                        next_idx += 1
-                    
-                    # Process subparts if any
-                    subparts = re.findall(r"\([a-zA-Z]\)\s+([^\(\)]+)", q_text)
-                    if subparts:
-                        main_text = q_text.split("(")[0].strip()
-                        clean_subparts = [subpart.strip() for subpart in subparts]
-                        questions.append(
-                            DiscoveryQuestion(number=number, text=main_text, subparts=clean_subparts)
-                        )
-                    else:
-                        questions.append(
-                            DiscoveryQuestion(number=number, text=q_text.strip())
-                        )
-                    break  # Found a match with one pattern, move to next line
-                    
-        return questions
-    
+    def _build_structured_question(number: str, parts: List[str], page: int, line: int,
+                                   span: Tuple[int, int]) -> DiscoveryQuestion:
+        """Joins a structured request's lines and splits off any (a), (b) subparts."""
+        q_text = " ".join(parts)
+        subparts = SUBPART_PATTERN.findall(q_text)
+        if subparts:
+            main_text = q_text.split("(")[0].strip()
+            clean_subparts = [subpart.strip() for subpart in subparts]
+            question = DiscoveryQuestion(number=number, text=main_text, subparts=clean_subparts, page=page, line=line)
+        else:
+            question = DiscoveryQuestion(number=number, text=q_text.strip(), page=page, line=line)
+        question.span = span
+        return question
+
     @staticmethod
-    def _parse_numbered_requests(lines: List[str], pattern: Pattern) -> List[DiscoveryQuestion]:
+    def _build_numbered_question(number: str, parts: List[str], page: int, line: int,
+                                 span: Tuple[int, int]) -> DiscoveryQuestion:
+        question = DiscoveryQuestion(number=number, text=" ".join(parts).strip(), page=page, line=line)
+        question.span = span
+        return question
+
+    @classmethod
+    def parse_tokens(cls, tokens: Iterator[DiscoveryToken], use_numbered: bool = True) -> List[DiscoveryQuestion]:
         """
-        Parse simple numbered requests with enhanced handling for various formats and layouts.
-        Now handles line breaks between number and text, and different whitespace patterns.
+        Single-pass state machine over the token stream.
+
+        Three candidate readings are built side by side and the first non-empty
+        one wins, in order:
+          1. structured requests ("REQUEST FOR PRODUCTION NO. X")
+          2. numbered items ("1. ...", or a bare "1" followed by its text)
+          3. blank-line separated blocks containing a number (last resort)
+        A request absorbs up to MAX_CONTINUATION_LINES following lines, stopping
+        at a blank line or at anything that looks like the next request.
+        Each question's ``span`` records the text offsets it was built from.
         """
-        questions = []
-        current_number = None
-        current_text = ""
-        
-        # First, we'll try a standard approach looking for numbered lines
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
+        structured = []
+        s_current = None  # [number, parts, page, line, (start, end)]
+        s_budget = 0
+
+        numbered = []
+        n_current = None
+        n_budget = 0
+        pending_bare = None  # (number, page, line, start) waiting for its text line
+
+        blocks = []
+        block = None  # [parts, page, line, (start, end)]
+
+        for kind, number, text, raw, page, line, start, end in tokens:
+            # --- 1. Structured requests ---
+            if kind == TOKEN_STRUCTURED:
+                if s_current is not None:
+                    structured.append(cls._build_structured_question(*s_current))
+                s_current = [number, [text], page, line, (start, end)]
+                s_budget = MAX_CONTINUATION_LINES
+            elif kind in (TOKEN_TEXT, TOKEN_BARE_NUMBER):
+                if s_budget > 0:
+                    s_current[1].append(raw)
+                    s_current[4] = (s_current[4][0], end)
+                    s_budget -= 1
+            else:
+                s_budget = 0
+
+            if not use_numbered:
                 continue
-            
-            # Try the standard pattern first
-            match = pattern.match(line)
-            if match:
-                # If we were already building a question, save it
-                if current_number is not None:
-                    questions.append(DiscoveryQuestion(number=current_number, text=current_text.strip()))
-                
-                # Start a new question
-                current_number = match.group(1)
-                current_text = match.group(2) if len(match.groups()) > 1 else ""
-                
-                # Look ahead for continued text (stop at next number)
-                next_idx = i + 1
-                while next_idx < len(lines) and next_idx < i + 10:
-                    next_line = lines[next_idx].strip()
-                    if not next_line or re.match(r'^\d+\.', next_line):
-                        break
-                    current_text += " " + next_line
-                    next_idx += 1
-            # Alternative approach for numbers that stand alone on a line
-            elif re.match(r'^\d+$', line) and i + 1 < len(lines):
-                # This might be a number with text on the next line
-                next_line = lines[i+1].strip()
-                if next_line and not re.match(r'^\d+\.', next_line) and not re.match(r'^\d+$', next_line):
-                    # If we were already building a question, save it
-                    if current_number is not None:
-                        questions.append(DiscoveryQuestion(number=current_number, text=current_text.strip()))
-                    
-                    # Start a new question
-                    current_number = line
-                    current_text = next_line
-                    
-                    # Look ahead for continued text (skip the next line since we already included it)
-                    next_idx = i + 2
-                    while next_idx < len(lines) and next_idx < i + 10:
-                        next_line = lines[next_idx].strip()
-                        if not next_line or re.match(r'^\d+$', next_line) or re.match(r'^\d+\.', next_line):
-                            break
-                        current_text += " " + next_line
-                        next_idx += 1
-        
-        # Don't forget to add the last question if we were building one
-        if current_number is not None:
-            questions.append(DiscoveryQuestion(number=current_number, text=current_text.strip()))
-        
-        # If the above approach didn't find any questions, try a more aggressive approach
-        if not questions:
-            print("[DEBUG] No questions found with standard approach, trying alternative approach...")
-            
-            # Combine lines into text blocks to handle multi-line questions
-            text_blocks = []
-            current_block = ""
-            
-            for line in lines:
-                stripped = line.strip()
-                if not stripped:
-                    if current_block:
-                        text_blocks.append(current_block)
-                        current_block = ""
+
+            # --- 2. Numbered items ---
+            if pending_bare is not None:
+                bare = pending_bare
+                pending_bare = None
+                if kind in (TOKEN_TEXT, TOKEN_STRUCTURED):
+                    if n_current is not None:
+                        numbered.append(cls._build_numbered_question(*n_current))
+                    n_current = [bare[0], [raw], bare[1], bare[2], (bare[3], end)]
+                    # The text line itself used one slot of the window
+                    n_budget = MAX_CONTINUATION_LINES - 1
+                    kind = None  # consumed
+
+            if kind == TOKEN_NUMBERED:
+                if n_current is not None:
+                    numbered.append(cls._build_numbered_question(*n_current))
+                n_current = [number, [text], page, line, (start, end)]
+                n_budget = MAX_CONTINUATION_LINES
+            elif kind == TOKEN_BARE_NUMBER:
+                pending_bare = (number, page, line, start)
+                n_budget = 0
+            elif kind in (TOKEN_TEXT, TOKEN_STRUCTURED):
+                if n_budget > 0:
+                    n_current[1].append(raw)
+                    n_current[4] = (n_current[4][0], end)
+                    n_budget -= 1
+            elif kind is not None:
+                n_budget = 0
+
+            # --- 3. Text blocks (fallback) ---
+            if raw:
+                if block is None:
+                    block = [[raw], page, line, (start, end)]
                 else:
-                    if current_block:
-                        current_block += " " + stripped
-                    else:
-                        current_block = stripped
-            
-            if current_block:
-                text_blocks.append(current_block)
-            
-            # Now look for number patterns in the text blocks
-            current_request = None
-            
-            for block in text_blocks:
-                # Look for numeric pattern starts like "1." or "1 " or just a number
-                num_match = re.match(r'.*?(\d+)[\.\s]+(.*)', block)
-                if num_match:
-                    num = num_match.group(1)
-                    text = num_match.group(2)
-                    questions.append(DiscoveryQuestion(number=num, text=text.strip()))
-        
-        print(f"[DEBUG] Found {len(questions)} questions using enhanced numbered request parsing")
-        return questions
+                    block[0].append(raw)
+                    block[3] = (block[3][0], end)
+            elif block is not None:
+                blocks.append(block)
+                block = None
+
+        if s_current is not None:
+            structured.append(cls._build_structured_question(*s_current))
+        if structured:
+            logger.debug("Found %s structured requests", len(structured))
+            return structured
+        if not use_numbered:
+            return []
+
+        if n_current is not None:
+            numbered.append(cls._build_numbered_question(*n_current))
+        if numbered:
+            logger.debug("Found %s numbered requests", len(numbered))
+            return numbered
+
+        if block is not None:
+            blocks.append(block)
+        logger.debug("No questions found with standard approach, trying text blocks...")
+        for parts, page, line, span in blocks:
+            num_match = BLOCK_NUMBER_PATTERN.match(" ".join(parts))
+            if num_match:
+                numbered.append(cls._build_numbered_question(num_match.group(1), [num_match.group(2)], page, line, span))
+        return numbered
+
+
+def _visible_length(text: str) -> int:
+    """Number of non-whitespace characters."""
+    return len("".join(text.split()))
+
+
+def score_parse(questions: List[DiscoveryQuestion], text: str, start: int = 0,
+                end: Optional[int] = None, parser: Optional[str] = None) -> ParseResult:
+    """
+    Scores a deterministic parse of ``text[start:end]``.
+
+    The confidence is the product of three 0-1 signals:
+      - continuity: how many request numbers follow on from the previous one (starting at 1)
+      - count: parsed count versus the "... NO. X" headings found in the text
+      - coverage: share of the requests section (first request up to the
+        signature block) that ended up inside some request
+    Gaps of at least MIN_UNPARSED_CHARS visible characters are returned as
+    unparsed spans so the AI parser can be run on just those.
+    """
+    end = len(text) if end is None else end
+    if not questions:
+        return ParseResult([], confidence=0.0, parser=parser,
+                           signals={'continuity': 0.0, 'count': 0.0, 'coverage': 0.0})
+
+    # --- Numbering continuity ---
+    numbers = [int(q.number) for q in questions if str(q.number).isdigit()]
+    if numbers:
+        in_sequence = (numbers[0] == 1) + sum(1 for a, b in zip(numbers, numbers[1:]) if b == a + 1)
+        continuity = in_sequence / len(numbers)
+    else:
+        continuity = 1.0  # e.g. form interrogatory numbers like "2.1"
+
+    # --- Count versus headings ---
+    headings = {m.group(1) for m in REQUEST_HEADING_PATTERN.finditer(text, start, end)}
+    if headings:
+        count = min(len(questions), len(headings)) / max(len(questions), len(headings))
+    else:
+        count = 1.0  # Plain numbered list, nothing to compare against
+
+    # --- Leftover text inside the requests section ---
+    spans = sorted(q.span for q in questions if q.span)
+    unparsed_spans = []
+    coverage = 1.0
+    if spans:
+        section_start = spans[0][0]
+        end_match = SECTION_END_PATTERN.search(text, spans[-1][1], end)
+        section_end = end_match.start() if end_match else end
+
+        gaps = [(a_end, b_start) for (_, a_end), (b_start, _) in zip(spans, spans[1:])]
+        gaps.append((spans[-1][1], section_end))
+        leftover = 0
+        for gap_start, gap_end in gaps:
+            gap_text = text[gap_start:gap_end].strip()
+            visible = _visible_length(gap_text)
+            if visible >= MIN_UNPARSED_CHARS:
+                unparsed_spans.append(gap_text)
+                leftover += visible
+
+        total = _visible_length(text[section_start:section_end])
+        if total:
+            coverage = max(0.0, 1.0 - leftover / total)
+
+    signals = {
+        'continuity': round(continuity, 3),
+        'count': round(count, 3),
+        'coverage': round(coverage, 3),
+        'headings': len(headings),
+    }
+    confidence = round(continuity * count * coverage, 3)
+    return ParseResult(questions, confidence=confidence, parser=parser,
+                       signals=signals, unparsed_spans=unparsed_spans)
+
+
+# Shared "1. text" numbered pattern
+NUMBERED_PATTERN = re.compile(r"^(\d+)\.\s+(.*)", re.IGNORECASE)
+
+# Patterns for structured form interrogatories
+FORM_INTERROGATORY_PATTERNS = [
+    re.compile(r"^(?:FORM|Form)\s+INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
+    re.compile(r"^INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE)
+]
+
+# Patterns for structured special interrogatories
+SPECIAL_INTERROGATORY_PATTERNS = [
+    re.compile(r"^(?:SPECIAL|Special)\s+INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
+    re.compile(r"^INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE)
+]
+
+# Multiple patterns for structured requests for production
+PRODUCTION_REQUEST_PATTERNS = [
+    re.compile(r"^(?:REQUEST|Request)\s+FOR\s+PRODUCTION\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE),
+    re.compile(r"^(?:DEMAND|Demand)\s+FOR\s+PRODUCTION\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE),
+    re.compile(r"^(?:PRODUCTION\s+REQUEST|Production\s+Request)\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE)
+]
+
+# Patterns for structured requests for admission
+ADMISSION_REQUEST_PATTERNS = [
+    re.compile(r"^(?:REQUEST|Request)\s+FOR\s+ADMISSION\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
+    re.compile(r"^(?:ADMISSION\s+REQUEST|Admission\s+Request)\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE)
+]
 
+RFP_DEFINITIONS_PATTERN = re.compile(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', re.IGNORECASE)
+RFP_DEFINITIONS_FALLBACK_PATTERN = re.compile(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', re.IGNORECASE)
+RFP_HEADING_PATTERN = re.compile(r'REQUESTS? FOR PRODUCTION', re.IGNORECASE)
+RFP_HEADING_FALLBACK_PATTERN = re.compile(r'REQUESTS?', re.IGNORECASE)
 
-def parse_form_interrogatories(pdf_path: str) -> List[DiscoveryQuestion]:
+# Tokenizers are built once per document type
+FORM_INTERROGATORY_TOKENIZER = DiscoveryTokenizer(FORM_INTERROGATORY_PATTERNS, NUMBERED_PATTERN)
+SPECIAL_INTERROGATORY_TOKENIZER = DiscoveryTokenizer(SPECIAL_INTERROGATORY_PATTERNS, NUMBERED_PATTERN)
+PRODUCTION_REQUEST_TOKENIZER = DiscoveryTokenizer(PRODUCTION_REQUEST_PATTERNS, NUMBERED_PATTERN)
+ADMISSION_REQUEST_TOKENIZER = DiscoveryTokenizer(ADMISSION_REQUEST_PATTERNS, NUMBERED_PATTERN)
+
+
+def parse_form_interrogatories(pdf_path: DocumentSource) -> List[DiscoveryQuestion]:
     """
     Parses a Form Interrogatories PDF into a list of DiscoveryQuestion objects.
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_path: Path to the PDF file, or its bytes / stream / open fitz.Document
         
     Returns:
         List of parsed DiscoveryQuestion objects
     """
-    # Patterns for structured form interrogatories
-    structured_patterns = [
-        re.compile(r"^(?:FORM|Form)\s+INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
-        re.compile(r"^INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE)
-    ]
-    
-    # Pattern for numbered format
-    numbered_pattern = re.compile(r"^(\d+)\.\s+(.*)", re.IGNORECASE)
-    
-    return GeneralDiscoveryParser.parse(pdf_path, structured_patterns, numbered_pattern)
+    return GeneralDiscoveryParser.parse(pdf_path, FORM_INTERROGATORY_PATTERNS, NUMBERED_PATTERN,
+                                        tokenizer=FORM_INTERROGATORY_TOKENIZER)
 
 
-def parse_special_interrogatories(pdf_path: str) -> List[DiscoveryQuestion]:
+def parse_special_interrogatories(pdf_path: DocumentSource) -> List[DiscoveryQuestion]:
     """
     Parses a Special Interrogatories PDF into a list of DiscoveryQuestion objects.
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_path: Path to the PDF file, or its bytes / stream / open fitz.Document
         
     Returns:
         List of parsed DiscoveryQuestion objects
     """
-    # Patterns for structured special interrogatories
-    structured_patterns = [
-        re.compile(r"^(?:SPECIAL|Special)\s+INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
-        re.compile(r"^INTERROGATORY\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE)
-    ]
-    
-    # Pattern for numbered format
-    numbered_pattern = re.compile(r"^(\d+)\.\s+(.*)", re.IGNORECASE)
-    
-    return GeneralDiscoveryParser.parse(pdf_path, structured_patterns, numbered_pattern)
+    return GeneralDiscoveryParser.parse(pdf_path, SPECIAL_INTERROGATORY_PATTERNS, NUMBERED_PATTERN,
+                                        tokenizer=SPECIAL_INTERROGATORY_TOKENIZER)
+
+
+def _longest_consecutive_run(questions: List[DiscoveryQuestion]) -> List[DiscoveryQuestion]:
+    """Groups questions by consecutive numbering and returns the longest group."""
+    grouped = []
+    current = []
+    last_num = None
+    for q in questions:
+        try:
+            num = int(q.number)
+        except Exception:
+            num = None
+        if last_num is not None and num is not None and num == last_num + 1:
+            current.append(q)
+        else:
+            if current:
+                grouped.append(current)
+            current = [q]
+        last_num = num
+    if current:
+        grouped.append(current)
+    return max(grouped, key=len)
 
 
-def parse_requests_for_production(pdf_path: str) -> List[DiscoveryQuestion]:
+def parse_requests_for_production(pdf_path: DocumentSource) -> List[DiscoveryQuestion]:
     """
     Improved parser for Requests for Production:
     - Ignores definitions/instructions/preamble (but can extract for AI context)
@@ -291,111 +533,82 @@ def parse_requests_for_production(pdf_path: str) -> List[DiscoveryQuestion]:
     - Only uses the first/longest/main numbered list after the heading
     - Subparts remain part of the main request
     """
-    import fitz
-    import re
-    questions = []
     try:
-        # --- Extract full text from PDF ---
-        with fitz.open(pdf_path) as doc:
-            full_text = ""
-            for page in doc:
-                full_text += page.get_text()
-
-        # --- Optionally extract definitions for AI context (not used for questions) ---
-        definitions = None
-        definitions_match = re.search(r'(EXHIBIT\s*"?A"?.*?DEFINITIONS AND INSTRUCTIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-        if definitions_match:
-            definitions = definitions_match.group(1).strip()
-        else:
-            fallback = re.search(r'(DEFINITIONS[\s\S]{0,5000}?)(?=REQUESTS? FOR PRODUCTION|REQUESTS?\s*$)', full_text, re.IGNORECASE)
-            if fallback:
-                definitions = fallback.group(1).strip()
-
-        # --- Find the main requests section (after the main heading) ---
-        requests_heading = re.search(r'(REQUESTS? FOR PRODUCTION[\s\S]{0,2000})', full_text, re.IGNORECASE)
-        if requests_heading:
-            start_idx = requests_heading.start()
-        else:
-            requests_heading = re.search(r'(REQUESTS?[\s\S]{0,2000})', full_text, re.IGNORECASE)
-            start_idx = requests_heading.start() if requests_heading else 0
-
-        # Only use text after the main heading
-        main_text = full_text[start_idx:]
-
-        # Optionally, trim to the end of the requests section (before signature, etc.)
-        end_match = re.search(r'(DATED:|RESPECTFULLY SUBMITTED|BY:|SIGNATURE)', main_text, re.IGNORECASE)
-        if end_match:
-            main_text = main_text[:end_match.start()]
-
-        # --- Now parse only the main_text for requests ---
-        # Multiple patterns for structured requests for production
-        structured_patterns = [
-            re.compile(r"^(?:REQUEST|Request)\s+FOR\s+PRODUCTION\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE),
-            re.compile(r"^(?:DEMAND|Demand)\s+FOR\s+PRODUCTION\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE),
-            re.compile(r"^(?:PRODUCTION\s+REQUEST|Production\s+Request)\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE)
-        ]
-        numbered_pattern = re.compile(r"^(\d+)\.\s+(.*)", re.IGNORECASE)
-
-        # Parse lines from main_text only
-        lines = main_text.split('\n')
-        # Try structured first
-        structured_questions = GeneralDiscoveryParser._parse_structured_requests(lines, structured_patterns)
-        if structured_questions:
-            questions.extend(structured_questions)
-        # If not enough, try numbered
-        if not questions:
-            numbered_questions = GeneralDiscoveryParser._parse_numbered_requests(lines, numbered_pattern)
-            questions.extend(numbered_questions)
-
-        # If there are multiple numbered lists, pick the longest one (to avoid definitions)
-        if questions:
-            # Group by consecutive numbering
-            grouped = []
-            current = []
-            last_num = None
-            for q in questions:
-                try:
-                    num = int(q.number)
-                except Exception:
-                    num = None
-                if last_num is not None and num is not None and num == last_num + 1:
-                    current.append(q)
-                else:
-                    if current:
-                        grouped.append(current)
-                    current = [q]
-                last_num = num
-            if current:
-                grouped.append(current)
-            # Pick the longest group
-            questions = max(grouped, key=len)
-
-        print(f"[DEBUG] Improved parser extracted {len(questions)} requests after main heading.")
-        return questions
+        return parse_requests_for_production_scored(pdf_path).questions
     except Exception as e:
-        print(f"[ERROR] Exception in improved parse_requests_for_production: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception in improved parse_requests_for_production: %s", e)
         return []
 
 
-def parse_requests_for_admission(pdf_path: str) -> List[DiscoveryQuestion]:
+def parse_requests_for_production_scored(pdf_path: DocumentSource) -> ParseResult:
+    """
+    Requests for Production parser returning a scored ParseResult.
+    See parse_requests_for_production() for the parsing rules.
+    """
+    # --- Extract full text from PDF ---
+    pages = GeneralDiscoveryParser.extract_pages(pdf_path)
+    full_text, page_starts = GeneralDiscoveryParser.join_pages(pages)
+
+    # --- Optionally extract definitions for AI context (not used for questions) ---
+    definitions = None
+    definitions_match = RFP_DEFINITIONS_PATTERN.search(full_text)
+    if definitions_match:
+        definitions = definitions_match.group(1).strip()
+    else:
+        fallback = RFP_DEFINITIONS_FALLBACK_PATTERN.search(full_text)
+        if fallback:
+            definitions = fallback.group(1).strip()
+
+    # --- Find the main requests section (after the main heading) ---
+    requests_heading = RFP_HEADING_PATTERN.search(full_text) or RFP_HEADING_FALLBACK_PATTERN.search(full_text)
+    start_idx = requests_heading.start() if requests_heading else 0
+
+    # Optionally, trim to the end of the requests section (before signature, etc.)
+    end_match = SECTION_END_PATTERN.search(full_text, start_idx)
+    end_idx = end_match.start() if end_match else len(full_text)
+
+    # --- Tokenize only the main requests section; structured first, then numbered ---
+    tokens = PRODUCTION_REQUEST_TOKENIZER.tokenize(full_text, page_starts, start_idx, end_idx)
+    questions = GeneralDiscoveryParser.parse_tokens(tokens)
+
+    # If there are multiple numbered lists, pick the longest one (to avoid definitions)
+    if questions:
+        questions = _longest_consecutive_run(questions)
+
+    logger.debug("Improved parser extracted %s requests after main heading.", len(questions))
+    return score_parse(questions, full_text, start_idx, end_idx, parser='parse_requests_for_production')
+
+
+def parse_requests_for_admission(pdf_path: DocumentSource) -> List[DiscoveryQuestion]:
     """
     Parses a Requests for Admission PDF into a list of DiscoveryQuestion objects.
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_path: Path to the PDF file, or its bytes / stream / open fitz.Document
         
     Returns:
         List of parsed DiscoveryQuestion objects
     """
-    # Patterns for structured requests for admission
-    structured_patterns = [
-        re.compile(r"^(?:REQUEST|Request)\s+FOR\s+ADMISSION\s+NO\.\s*([\d\.]+)[\.:]?\s*(.*)", re.IGNORECASE),
-        re.compile(r"^(?:ADMISSION\s+REQUEST|Admission\s+Request)\s+NO\.\s*(\d+)[\.:]?\s*(.*)", re.IGNORECASE)
-    ]
-    
-    # Pattern for numbered format
-    numbered_pattern = re.compile(r"^(\d+)\.\s+(.*)", re.IGNORECASE)
-    
-    return GeneralDiscoveryParser.parse(pdf_path, structured_patterns, numbered_pattern)
\ No newline at end of file
+    return GeneralDiscoveryParser.parse(pdf_path, ADMISSION_REQUEST_PATTERNS, NUMBERED_PATTERN,
+                                        tokenizer=ADMISSION_REQUEST_TOKENIZER)
+
+
+def parse_form_interrogatories_scored(pdf_path: DocumentSource) -> ParseResult:
+    """Form Interrogatories parser returning a scored ParseResult."""
+    return GeneralDiscoveryParser.parse_scored(pdf_path, FORM_INTERROGATORY_PATTERNS, NUMBERED_PATTERN,
+                                               tokenizer=FORM_INTERROGATORY_TOKENIZER,
+                                               parser_name='parse_form_interrogatories')
+
+
+def parse_special_interrogatories_scored(pdf_path: DocumentSource) -> ParseResult:
+    """Special Interrogatories parser returning a scored ParseResult."""
+    return GeneralDiscoveryParser.parse_scored(pdf_path, SPECIAL_INTERROGATORY_PATTERNS, NUMBERED_PATTERN,
+                                               tokenizer=SPECIAL_INTERROGATORY_TOKENIZER,
+                                               parser_name='parse_special_interrogatories')
+
+
+def parse_requests_for_admission_scored(pdf_path: DocumentSource) -> ParseResult:
+    """Requests for Admission parser returning a scored ParseResult."""
+    return GeneralDiscoveryParser.parse_scored(pdf_path, ADMISSION_REQUEST_PATTERNS, NUMBERED_PATTERN,
+                                               tokenizer=ADMISSION_REQUEST_TOKENIZER,
+                                               parser_name='parse_requests_for_admission')
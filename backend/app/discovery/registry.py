@@ -6,7 +6,12 @@ Enhanced to include template mapping and data source configuration.
 from .parsers import (
     parse_form_interrogatories,
     parse_special_interrogatories,
+    parse_requests_for_production,
     parse_requests_for_admission,
+    parse_form_interrogatories_scored,
+    parse_special_interrogatories_scored,
+    parse_requests_for_production_scored,
+    parse_requests_for_admission_scored,
 )
 from .ai_parsers import (
     ai_parse_requests_for_production,
@@ -20,10 +25,15 @@ from .prompt_builders import (
     build_requests_for_admission_prompt,
 )
 
-# Registry for discovery types
+# Registry for discovery types.
+# 'parser_chain' lists scored deterministic parsers tried first; 'ai_parser' is only
+# called when none reaches 'confidence_threshold' (see chain.run_parser_chain).
+# 'parser' is the plain parser kept for callers that just want a question list.
 DISCOVERY_TYPE_REGISTRY = {
     'form_interrogatories': {
         'parser': parse_form_interrogatories,
+        'parser_chain': [parse_form_interrogatories_scored],
+        'ai_parser': None,
         'prompt_builder': build_form_interrogatories_prompt,
         'display_name': 'Form Interrogatories',
         'request_type': 'Form Interrogatory No.',
@@ -33,7 +43,10 @@ DISCOVERY_TYPE_REGISTRY = {
         'workflow_type': 'format_responses',  # Uses format-responses endpoint
     },
     'special_interrogatories': {
-        'parser': ai_parse_special_interrogatories,
+        'parser': parse_special_interrogatories,
+        'parser_chain': [parse_special_interrogatories_scored],
+        'ai_parser': ai_parse_special_interrogatories,
+        'confidence_threshold': 0.9,
         'prompt_builder': build_special_interrogatories_prompt,
         'display_name': 'Special Interrogatories',
         'request_type': 'Special Interrogatory No.',
@@ -43,7 +56,10 @@ DISCOVERY_TYPE_REGISTRY = {
         'workflow_type': 'parse_and_select',  # Uses parse → select → generate
     },
     'requests_for_production': {
-        'parser': ai_parse_requests_for_production,
+        'parser': parse_requests_for_production,
+        'parser_chain': [parse_requests_for_production_scored],
+        'ai_parser': ai_parse_requests_for_production,
+        'confidence_threshold': 0.9,
         'prompt_builder': build_requests_for_production_prompt,
         'display_name': 'Requests for Production',
         'request_type': 'Request for Production No.',
@@ -53,7 +69,10 @@ DISCOVERY_TYPE_REGISTRY = {
         'workflow_type': 'parse_and_select',  # Uses parse → select → generate
     },
     'requests_for_admission': {
-        'parser': ai_parse_requests_for_admission,
+        'parser': parse_requests_for_admission,
+        'parser_chain': [parse_requests_for_admission_scored],
+        'ai_parser': ai_parse_requests_for_admission,
+        'confidence_threshold': 0.9,
         'prompt_builder': build_requests_for_admission_prompt,
         'display_name': 'Requests for Admission',
         'request_type': 'Request for Admission No.',
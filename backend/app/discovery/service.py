@@ -9,8 +9,13 @@ import json
 
 from .base import DiscoveryQuestion
 from .registry import get_discovery_type_info
+from .chain import run_parser_chain
+from backend.utils.document_parser import open_pdf, DocumentSource
 from backend.services.analysis_service import call_gemini_with_prompt, AnalysisServiceError
 from backend.schemas import case_schema
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class DiscoveryResponseService:
@@ -18,19 +23,20 @@ class DiscoveryResponseService:
     Orchestrates parsing, prompt building, and AI call for discovery responses.
     """
     
-    def respond(self, discovery_type: str, pdf_path: str, case_details: Dict, objection_sheet: str) -> Dict:
+    def respond(self, discovery_type: str, pdf_path: DocumentSource, case_details: Dict, objection_sheet: str) -> Dict:
         """
         Parses the uploaded discovery PDF, builds the AI prompt, and returns parsed questions and prompt.
         Enhanced with improved error handling and debugging.
         
         Args:
             discovery_type: Type of discovery (e.g., 'form_interrogatories')
-            pdf_path: Path to the uploaded PDF
+            pdf_path: Path to the uploaded PDF, or its bytes / stream / open fitz.Document
             case_details: Dictionary containing case information
             objection_sheet: Text content of objection master sheet
             
         Returns:
-            Dictionary containing 'questions', 'prompt', 'ai_response', and 'ai_error'
+            Dictionary containing 'questions', 'prompt', 'ai_response', 'ai_error'
+            and 'parse_path' (which parser path produced the questions)
             
         Raises:
             ValueError: If discovery_type is not supported
@@ -38,36 +44,35 @@ class DiscoveryResponseService:
         # Get parser and prompt builder from registry
         try:
             type_info = get_discovery_type_info(discovery_type)
-            parser = type_info['parser']
             prompt_builder = type_info['prompt_builder']
             
-            print(f"[DEBUG] Using parser for {discovery_type}: {parser.__name__}")
-            
-            # Parse questions - handle both RFPs and Special Interrogatories consistently
+            # The AI fallback gets case data and objections - handle both RFPs and Special Interrogatories consistently
+            ai_kwargs = {}
             if discovery_type in ['requests_for_production', 'special_interrogatories']:
                 # Serialize the full case object
                 serialized_case = case_schema.dump(case_details) if case_details else {}
                 # Pass the full objection sheet as a list of lines (or as a string)
                 objections_list = [line.strip() for line in objection_sheet.split('\n') if line.strip()] if objection_sheet else []
-                questions = parser(pdf_path, case_data=serialized_case, objections_list=objections_list)
-            else:
-                questions = parser(pdf_path)
+                ai_kwargs = {'case_data': serialized_case, 'objections_list': objections_list}
+            
+            # Deterministic parsers first, AI only when they aren't confident
+            parse_result = run_parser_chain(discovery_type, type_info, pdf_path, ai_kwargs)
+            questions = parse_result.questions
             
             # Verify we got questions
             if not questions:
-                print(f"[ERROR] Parser returned no questions for {pdf_path}")
+                logger.warning("Parser returned no questions for %s document", discovery_type)
                 # Try to extract some text to help diagnose the issue
                 try:
-                    import fitz
-                    with fitz.open(pdf_path) as doc:
+                    with open_pdf(pdf_path) as doc:
                         sample_text = ""
                         for page in doc:
                             sample_text += page.get_text()[:500]
                             if len(sample_text) >= 500:
                                 break
-                        print(f"[DEBUG] Sample text from PDF: {sample_text[:500]}")
+                        logger.debug("Sample text from PDF: %s", sample_text[:500])
                 except Exception as e:
-                    print(f"[ERROR] Failed to extract sample text: {e}")
+                    logger.error("Failed to extract sample text: %s", e)
                 
                 # Convert questions to list of dicts for JSON serialization with type-specific error message
                 return {
@@ -76,21 +81,22 @@ class DiscoveryResponseService:
                     'ai_response': None,
                     'ai_error': f"Failed to parse any {type_info['display_name'].lower()} from the PDF. Check if document format is supported.",
                     'discovery_type': discovery_type,
-                    'display_name': type_info['display_name']
+                    'display_name': type_info['display_name'],
+                    'parse_path': parse_result.summary()
                 }
             
             # Debug questions found
-            print(f"[DEBUG] Parsed {len(questions)} questions")
+            logger.debug("Parsed %s questions", len(questions))
             for i, q in enumerate(questions[:5]):  # Log first 5 for debugging
-                print(f"[DEBUG] Question {i+1}: #{q.number} - {q.text[:100]}")
+                logger.debug("Question %s: #%s - %s", i + 1, q.number, q.text[:100])
             
             # Convert questions to list of dicts for JSON serialization
             questions_list = [q.to_dict() for q in questions]
-            print(f"[DEBUG] Converted questions to dict format, count: {len(questions_list)}")
+            logger.debug("Converted questions to dict format, count: %s", len(questions_list))
             
             # Build prompt
             prompt = prompt_builder(questions, case_details, objection_sheet)
-            print(f"[DEBUG] Prompt built, length: {len(prompt)}")
+            logger.debug("Prompt built, length: %s", len(prompt))
             
             # Call Gemini AI with the prompt
             ai_response = None
@@ -98,17 +104,17 @@ class DiscoveryResponseService:
             
             try:
                 if prompt:
-                    print(f"[DEBUG] Calling Gemini AI with prompt")
+                    logger.debug("Calling Gemini AI with prompt")
                     ai_response = call_gemini_with_prompt(prompt)
-                    print(f"[DEBUG] AI response received, length: {len(ai_response) if ai_response else 0}")
+                    logger.debug("AI response received, length: %s", len(ai_response) if ai_response else 0)
                 else:
                     ai_error = f"Failed to generate prompt for {type_info['display_name'].lower()}"
             except AnalysisServiceError as e:
                 ai_error = str(e)
-                print(f"[ERROR] Analysis service error: {ai_error}")
+                logger.error("Analysis service error: %s", ai_error)
             except Exception as e:
                 ai_error = f"Unexpected error processing {type_info['display_name'].lower()}: {e}"
-                print(f"[ERROR] Unexpected error: {ai_error}")
+                logger.error("Unexpected error: %s", ai_error)
             
             return {
                 'questions': questions_list,
@@ -116,15 +122,13 @@ class DiscoveryResponseService:
                 'ai_response': ai_response,
                 'ai_error': ai_error,
                 'discovery_type': discovery_type,
-                'display_name': type_info['display_name']
+                'display_name': type_info['display_name'],
+                'parse_path': parse_result.summary()
             }
         
         except Exception as e:
-            import traceback
             error_message = f"Error processing {type_info['display_name'].lower()}: {str(e)}"
-            error_trace = traceback.format_exc()
-            print(f"[ERROR] {error_message}")
-            print(f"[ERROR] {error_trace}")
+            logger.exception(error_message)
             
             return {
                 'questions': [],
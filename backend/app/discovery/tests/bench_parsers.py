@@ -0,0 +1,83 @@
+"""
+Throughput benchmark for the discovery parsers.
+
+Builds large synthetic RFP, special interrogatory and RFA PDFs and reports
+pages/sec for each parser. Not part of the unit test run:
+
+    python -m backend.app.discovery.tests.bench_parsers [--pages 300] [--repeat 3]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from ..parsers import (
+    parse_requests_for_production,
+    parse_special_interrogatories,
+    parse_requests_for_admission
+)
+
+LINES_PER_PAGE = 40
+
+FILLER = (
+    "any and all DOCUMENTS, including but not limited to writings and",
+    "COMMUNICATIONS, that refer or relate to the INCIDENT, including",
+    "(a) the date of each such DOCUMENT; (b) the author of each such",
+    "DOCUMENT; and (c) the present custodian of each such DOCUMENT.",
+)
+
+SAMPLES = {
+    'rfp': ("REQUESTS FOR PRODUCTION, SET ONE", "REQUEST FOR PRODUCTION NO. {n}:", parse_requests_for_production),
+    'srog': ("SPECIAL INTERROGATORIES, SET ONE", "SPECIAL INTERROGATORY NO. {n}:", parse_special_interrogatories),
+    'rfa': ("REQUESTS FOR ADMISSION, SET ONE", "REQUEST FOR ADMISSION NO. {n}:", parse_requests_for_admission),
+}
+
+
+def build_pdf(path: str, title: str, heading: str, pages: int) -> int:
+    """Writes a synthetic discovery PDF and returns the number of requests in it."""
+    doc = fitz.open()
+    number = 0
+    lines = [title, ""]
+    for page_num in range(pages):
+        while len(lines) < LINES_PER_PAGE - len(FILLER) - 1:
+            number += 1
+            lines.append(f"{heading.format(n=number)} Produce {FILLER[0]}")
+            lines.extend(FILLER[1:])
+            lines.append("")
+        page = doc.new_page()
+        page.insert_text((36, 36), "\n".join(lines), fontsize=8)
+        lines = []
+    doc.save(path)
+    doc.close()
+    return number
+
+
+def run(pages: int, repeat: int) -> None:
+    work_dir = tempfile.mkdtemp()
+    try:
+        for name, (title, heading, parser) in SAMPLES.items():
+            path = os.path.join(work_dir, f"{name}.pdf")
+            expected = build_pdf(path, title, heading, pages)
+
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                questions = parser(path)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            print(f"{name:5} {pages} pages, {len(questions)}/{expected} requests: "
+                  f"{best:.3f}s best of {repeat} ({pages / best:.0f} pages/sec)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Benchmark discovery parsers on synthetic PDFs")
+    arg_parser.add_argument('--pages', type=int, default=300)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+    run(args.pages, args.repeat)
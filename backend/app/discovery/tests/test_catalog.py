@@ -0,0 +1,69 @@
+"""
+Tests for the in-memory form interrogatory catalog.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..catalog import InterrogatoryCatalog, CatalogNotFoundError
+
+
+class TestInterrogatoryCatalog(unittest.TestCase):
+    """Test loading, indexing and mtime-driven reloads."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.data_dir, 'form_interrogatories_english.json')
+        self.write_questions([
+            {'id': 1, 'number': '1.1', 'text': 'First'},
+            {'id': 2, 'number': '2.1', 'text': 'Second'},
+            {'id': 3, 'number': '2.2', 'text': 'Third'},
+        ])
+        self.catalog = InterrogatoryCatalog(self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_questions(self, questions, mtime=None):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(questions, f)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_select_by_id_keeps_catalog_order(self):
+        """Selected ids come back in catalog order, string ids included."""
+        entry = self.catalog.get('english')
+        selected = entry.select(['3', 1, 99])
+        self.assertEqual([q['number'] for q in selected], ['1.1', '2.2'])
+
+    def test_bodies_and_etag(self):
+        """The gzip body decompresses to the plain body and ETags differ per encoding."""
+        entry = self.catalog.get('english')
+        self.assertEqual(gzip.decompress(entry.gzip_body), entry.body)
+        self.assertEqual(len(json.loads(entry.body)), 3)
+        self.assertNotEqual(entry.etag, entry.gzip_etag)
+
+    def test_cached_until_mtime_changes(self):
+        """The same entry is reused until the file's mtime changes."""
+        first = self.catalog.get('english')
+        self.assertIs(self.catalog.get('english'), first)
+
+        self.write_questions([{'id': 1, 'number': '1.1', 'text': 'Changed'}], mtime=first.mtime + 10)
+        reloaded = self.catalog.get('english')
+        self.assertIsNot(reloaded, first)
+        self.assertNotEqual(reloaded.etag, first.etag)
+        self.assertEqual(reloaded.by_id[1]['text'], 'Changed')
+
+    def test_unknown_or_unsafe_language(self):
+        """Missing catalogs and path-like languages are rejected."""
+        with self.assertRaises(CatalogNotFoundError):
+            self.catalog.get('klingon')
+        with self.assertRaises(CatalogNotFoundError):
+            self.catalog.get('../english')
+
+
+if __name__ == '__main__':
+    unittest.main()
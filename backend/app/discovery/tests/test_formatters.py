@@ -0,0 +1,41 @@
+"""
+Tests for section grouping and validation in the form interrogatory formatter.
+"""
+import unittest
+
+from ..formatters import group_answers_by_section, build_section_prompt, _normalize_section_result
+
+
+class TestSectionFormatting(unittest.TestCase):
+    """Test how answers are split into sections and how section output is checked."""
+
+    def test_group_answers_by_section(self):
+        """Answers are grouped by section number; unknown sections fall into 'other'."""
+        grouped = group_answers_by_section({'1.1': 'a', '6.4': 'b', '10.1': 'c', '8.2': 'd', '99.1': 'e'})
+        self.assertEqual(grouped['identity'], {'1.1': 'a'})
+        self.assertEqual(grouped['medical'], {'6.4': 'b', '10.1': 'c'})
+        self.assertEqual(grouped['income'], {'8.2': 'd'})
+        self.assertEqual(grouped['other'], {'99.1': 'e'})
+
+    def test_prompt_only_has_section_fields(self):
+        """Section prompts carry the base case fields plus that section's own, without empties."""
+        case = {'case_number': '123', 'plaintiff': 'Doe', 'vehicle_details': 'Sedan', 'incident_date': None,
+                'documents': [{'id': 1}]}
+        prompt = build_section_prompt('income', {'8.2': 'answer'}, case)
+        self.assertIn('"case_number":"123"', prompt)
+        self.assertNotIn('vehicle_details', prompt)
+        self.assertNotIn('incident_date', prompt)
+        self.assertNotIn('documents', prompt)
+
+    def test_normalize_section_result(self):
+        """Extra keys are dropped, lists joined, and missing or malformed output rejected."""
+        result = _normalize_section_result({'6.4': ['x', 'y'], '6.5': 'z', '1.1': 'stray'}, ['6.4', '6.5'])
+        self.assertEqual(result, {'6.4': 'x\ny', '6.5': 'z'})
+        with self.assertRaises(ValueError):
+            _normalize_section_result({'6.4': 'x'}, ['6.4', '6.5'])
+        with self.assertRaises(ValueError):
+            _normalize_section_result(['not', 'a', 'dict'], ['6.4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,13 @@ from ..parsers import (
     parse_requests_for_production,
     parse_form_interrogatories,
     parse_special_interrogatories,
-    parse_requests_for_admission
+    parse_requests_for_admission,
+    GeneralDiscoveryParser,
+    ADMISSION_REQUEST_TOKENIZER,
+    score_parse
 )
+from ..base import DiscoveryQuestion, ParseResult
+from ..chain import run_parser_chain
 
 # Create a base class for parser tests
 class BaseParserTest(unittest.TestCase):
@@ -111,6 +116,107 @@ class TestRequestsForProduction(BaseParserTest):
         finally:
             self.cleanup_test_pdf(pdf_path)
 
+    def test_in_memory_sources(self):
+        """Bytes, streams and open documents parse the same as a path."""
+        import io
+        import fitz  # PyMuPDF
+
+        content = """
+        REQUEST FOR PRODUCTION NO. 1: All documents relating to the incident.
+        
+        REQUEST FOR PRODUCTION NO. 2: All photographs of the scene.
+        """
+        pdf_path = self.create_test_pdf(content, "rfp_memory.pdf")
+        try:
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+            expected = [q.to_dict() for q in parse_requests_for_production(pdf_path)]
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                sources = [data, io.BytesIO(data), doc]
+                for source in sources:
+                    self.assertEqual([q.to_dict() for q in parse_requests_for_production(source)], expected)
+                self.assertFalse(doc.is_closed)  # Caller's document is left open
+        finally:
+            self.cleanup_test_pdf(pdf_path)
+
+
+class TestTokenizer(unittest.TestCase):
+    """Test the single-pass tokenizer and its page/line tracking."""
+
+    def test_page_and_line_offsets(self):
+        """Questions report the page and line they start on, empty pages included."""
+        pages = [
+            "REQUESTS FOR ADMISSION\nREQUEST FOR ADMISSION NO. 1: Admit the light was red.\n",
+            "",
+            "Preamble\n\nREQUEST FOR ADMISSION NO. 2: Admit you were\nspeeding.\n",
+        ]
+        text, page_starts = GeneralDiscoveryParser.join_pages(pages, separator="\n\n")
+        questions = GeneralDiscoveryParser.parse_tokens(ADMISSION_REQUEST_TOKENIZER.tokenize(text, page_starts))
+
+        self.assertEqual([(q.number, q.page, q.line) for q in questions], [("1", 1, 2), ("2", 3, 3)])
+        self.assertEqual(questions[1].text, "Admit you were speeding.")
+        self.assertEqual(questions[1].to_dict()['page'], 3)
+
+    def test_bare_number_followed_by_text(self):
+        """A number alone on a line takes the next line as its text."""
+        text = "1\nAdmit the contract was signed.\n\n2\nAdmit it was breached.\n"
+        questions = GeneralDiscoveryParser.parse_tokens(ADMISSION_REQUEST_TOKENIZER.tokenize(text))
+
+        self.assertEqual([q.number for q in questions], ["1", "2"])
+        self.assertEqual(questions[1].text, "Admit it was breached.")
+        self.assertEqual(questions[1].line, 4)
+
+
+class TestConfidenceGating(unittest.TestCase):
+    """Test deterministic parse scoring and the AI fallback decision."""
+
+    def parse(self, text):
+        questions = GeneralDiscoveryParser.parse_tokens(ADMISSION_REQUEST_TOKENIZER.tokenize(text))
+        return score_parse(questions, text, parser='test')
+
+    def test_clean_parse_is_confident(self):
+        text = ("REQUEST FOR ADMISSION NO. 1: Admit the light was red.\n\n"
+                "REQUEST FOR ADMISSION NO. 2: Admit you were speeding.\n\nDATED: today\n")
+        result = self.parse(text)
+        self.assertEqual(result.confidence, 1.0)
+        self.assertEqual(result.unparsed_spans, [])
+
+    def test_unrecognized_request_is_left_over(self):
+        """A request in an unknown layout lowers the score and comes back as an unparsed span."""
+        text = ("REQUEST FOR ADMISSION NO. 1: Admit the light was red.\n\n"
+                "ADMIT NO. 2 that you were driving at least twenty miles over the limit.\n\n"
+                "REQUEST FOR ADMISSION NO. 3: Admit you were speeding.\n")
+        result = self.parse(text)
+        self.assertLess(result.confidence, 0.9)
+        self.assertEqual(len(result.unparsed_spans), 1)
+        self.assertIn("twenty miles", result.unparsed_spans[0])
+
+    def test_chain_paths(self):
+        """The AI parser is skipped when confident, gets only the spans when usable, else the whole file."""
+        ai_calls = []
+
+        def ai_parser(pdf_path, spans_text=None, **kwargs):
+            ai_calls.append(spans_text)
+            return [DiscoveryQuestion(number="2", text="From AI")]
+
+        def make_chain(result):
+            return {'parser_chain': [lambda pdf_path: result], 'ai_parser': ai_parser, 'confidence_threshold': 0.9}
+
+        confident = ParseResult([DiscoveryQuestion("1", "a")], confidence=0.95)
+        self.assertEqual(run_parser_chain('test', make_chain(confident), 'x.pdf').path, ParseResult.PATH_DETERMINISTIC)
+        self.assertEqual(ai_calls, [])
+
+        gaps = ParseResult([DiscoveryQuestion("1", "a"), DiscoveryQuestion("3", "c")], confidence=0.6,
+                           signals={'coverage': 0.8}, unparsed_spans=["ADMIT NO. 2 ..."])
+        result = run_parser_chain('test', make_chain(gaps), 'x.pdf')
+        self.assertEqual(result.path, ParseResult.PATH_HYBRID)
+        self.assertEqual([q.number for q in result.questions], ["1", "2", "3"])
+        self.assertEqual(ai_calls, ["ADMIT NO. 2 ..."])
+
+        empty = ParseResult([], confidence=0.0)
+        self.assertEqual(run_parser_chain('test', make_chain(empty), 'x.pdf').path, ParseResult.PATH_AI)
+        self.assertEqual(ai_calls[-1], None)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
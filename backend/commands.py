@@ -3,15 +3,114 @@ from flask.cli import with_appcontext
 from backend.utils.encryption import field_encryptor  # FIXED: Use correct import path
 
 @click.command('rotate-keys')
+@click.option('--status', 'show_status', is_flag=True, help='Report rows still on old keys and exit')
+@click.option('--batch-size', default=500, show_default=True, help='Rows per transaction')
+@click.option('--workers', default=4, show_default=True, help='Threads decrypting and re-encrypting')
 @with_appcontext
-def rotate_keys_command():
-    """Rotate encryption keys and re-encrypt all data."""
-    click.echo('Starting key rotation...')
-    success = field_encryptor.rotate_keys()
+def rotate_keys_command(show_status, batch_size, workers):
+    """Rotate encryption keys and re-encrypt all data (resumes an unfinished rotation)."""
+    from backend.services.key_rotation_service import rotation_status
+    if show_status:
+        status = rotation_status()
+        rotation = status['rotation'] or {}
+        click.echo(f"Active key: {status['active_key_id']}")
+        if rotation:
+            click.echo(f"Last rotation: {rotation.get('from_key_id')} -> {rotation.get('to_key_id')} "
+                       f"({rotation.get('status')}, started {rotation.get('started_at')})")
+        for table, counts in status['tables'].items():
+            click.echo(f"  {table}: {counts['stale_rows']} of {counts['rows']} rows on old keys")
+        click.echo(f"Rows still on old keys: {status['stale_rows']}")
+        return
+
+    rotation = field_encryptor.rotation
+    if rotation and rotation.get('status') == 'running':
+        click.echo(f"Resuming key rotation to {rotation['to_key_id']}...")
+    else:
+        click.echo('Starting key rotation...')
+    success = field_encryptor.rotate_keys(batch_size=batch_size, workers=workers)
     if success:
         click.echo('Key rotation completed successfully.')
     else:
-        click.echo('Key rotation failed. Check logs for details.')
+        click.echo('Key rotation failed. Check logs for details; run it again to resume.')
+
+@click.command('rotate-file-keys')
+@click.option('--status', 'show_status', is_flag=True, help='Report data keys still on old key-encryption keys and exit')
+@click.option('--rewrap-only', is_flag=True, help='Rewrap onto the current key without creating a new one (resume)')
+@click.option('--batch-size', default=1000, show_default=True, help='Documents per transaction')
+@with_appcontext
+def rotate_file_keys_command(show_status, rewrap_only, batch_size):
+    """Rotate the file key-encryption key and rewrap every document's data key."""
+    from backend.utils.file_encryption import file_encryptor
+    from backend.services.key_rotation_service import rewrap_file_keys, file_key_status, KeyRotationError
+    if not show_status:
+        if not rewrap_only:
+            click.echo(f'New key-encryption key: {file_encryptor.rotate_kek()}')
+        try:
+            click.echo(f'Rewrapped {rewrap_file_keys(batch_size=batch_size)} data keys.')
+        except KeyRotationError as e:
+            raise click.ClickException(f'{e} (run again with --rewrap-only to resume)')
+    status = file_key_status()
+    click.echo(f"Active key-encryption key: {status['active_kek_id']}")
+    click.echo(f"Documents: {status['documents']}, data keys on old keys: {status['stale_keys']}, "
+               f"legacy single-key files: {status['legacy_files']}")
+
+@click.command('shred-files')
+@click.option('--status', 'show_status', is_flag=True, help='Report the shred queue and exit')
+@with_appcontext
+def shred_files_command(show_status):
+    """Erase the files of deleted documents still waiting in the shred queue."""
+    from backend.services.shred_service import drain_queue, queue_status
+    if not show_status:
+        counts = drain_queue()
+        click.echo(f"Shredded {counts['done']} file(s); {counts['retried']} to retry, {counts['failed']} failed.")
+    status = queue_status()
+    click.echo('Jobs: ' + ', '.join(f'{name} {count}' for name, count in status['jobs'].items()))
+    if status['oldest_waiting']:
+        click.echo(f"Oldest waiting since: {status['oldest_waiting']}")
+
+@click.command('process-subpoenas')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--workers', default=None, type=int, help='Files processed at once (default: SUBPOENA_BATCH_MAX_WORKERS)')
+@click.option('--out', 'output', type=click.Path(dir_okay=False), help='Write the JSON result here')
+@click.option('--summary', 'summary_path', type=click.Path(dir_okay=False), help='Write the text summary here')
+@with_appcontext
+def process_subpoenas_command(paths, workers, output, summary_path):
+    """Process subpoena PDFs and ZIPs (or folders of them) into one provider index."""
+    import json
+    import os
+    from flask import current_app
+    from backend.services.subpoena_service import SubpoenaService, SubpoenaServiceError, collect_batch_files
+    api_key = current_app.config.get('AI_API_KEY')
+    if not api_key:
+        raise click.ClickException('AI_API_KEY is not configured.')
+    names = []
+    for path in paths:
+        if os.path.isdir(path):
+            names.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(('.pdf', '.zip')))
+        else:
+            names.append(path)
+    uploads = []
+    for name in names:
+        with open(name, 'rb') as f:
+            uploads.append((name, f.read()))
+    try:
+        files = collect_batch_files(uploads, max_files=current_app.config.get('SUBPOENA_BATCH_MAX_FILES', 50))
+    except SubpoenaServiceError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Processing {len(files)} file(s)...')
+    result = SubpoenaService(api_key).process_batch(
+        files, max_workers=workers or current_app.config.get('SUBPOENA_BATCH_MAX_WORKERS', 4))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        click.echo(f'Wrote JSON result: {output}')
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(result['summary'])
+        click.echo(f'Wrote summary: {summary_path}')
+    else:
+        click.echo(result['summary'])
 
 @click.command('backup-keys')
 @click.option('--directory', '-d', help='Backup directory (optional)')
@@ -22,7 +121,77 @@ def backup_keys_command(directory):
     backup_path = field_encryptor.backup_all_keys(directory)
     click.echo(f'Keys backed up to: {backup_path}')
 
+@click.command('benchmark-encryption')
+@click.option('--keys', default='1,2,4,8,16', show_default=True, help='Comma-separated key counts')
+@click.option('--values', default=2000, show_default=True, help='Values decrypted per run')
+def benchmark_encryption_command(keys, values):
+    """Compare field decrypt throughput for tagged and untagged values as keys accumulate."""
+    from backend.utils.encryption import benchmark_decrypt
+    counts = [int(count) for count in keys.split(',') if count.strip()]
+    click.echo(f"{'keys':>5} {'untagged/s':>12} {'tagged/s':>12} {'batch/s':>12}")
+    for row in benchmark_decrypt(counts, values=values):
+        click.echo(f"{row['keys']:>5} {row['untagged']:>12} {row['tagged']:>12} {row['tagged_batch']:>12}")
+
+@click.command('reindex-documents')
+@click.option('--batch-size', default=100, show_default=True, help='Documents per transaction')
+@with_appcontext
+def reindex_documents_command(batch_size):
+    """Rebuild the full-text search index from documents' extracted text."""
+    from backend.services.search_service import reindex_all_documents
+    click.echo('Reindexing documents for search...')
+    count = reindex_all_documents(batch_size=batch_size)
+    click.echo(f'Indexed {count} documents.')
+
+@click.command('export-cases')
+@click.option('--user', 'username', help='Export this user\'s cases')
+@click.option('--firm', help='Export the cases of every user in this firm')
+@click.option('--out', 'directory', required=True, type=click.Path(file_okay=False), help='Output directory')
+@click.option('--blobs/--no-blobs', default=False, show_default=True, help='Also write the documents\' files (blobs.tar)')
+@with_appcontext
+def export_cases_command(username, firm, directory, blobs):
+    """Export cases and documents as NDJSON (and a blob archive)."""
+    from backend.services.transfer_service import write_export
+    if bool(username) == bool(firm):
+        raise click.UsageError('Give exactly one of --user or --firm.')
+    paths = write_export(directory, username=username, firm=firm, include_blobs=blobs)
+    for kind, path in paths.items():
+        click.echo(f'Wrote {kind}: {path}')
+
+@click.command('import-cases')
+@click.argument('ndjson_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--blobs', 'blobs_file', type=click.Path(exists=True, dir_okay=False), help='Blob archive from export-cases')
+@click.option('--owner', help='Give every imported case to this user')
+@click.option('--key', 'import_key', help='Checkpoint key; defaults to the file name. Re-run with it to resume.')
+@click.option('--batch-size', default=200, show_default=True, help='Records per transaction')
+@with_appcontext
+def import_cases_command(ndjson_file, blobs_file, owner, import_key, batch_size):
+    """Import an export-cases NDJSON file, resuming from its checkpoint."""
+    import os
+    from backend.services.transfer_service import import_ndjson, TransferServiceError
+    import_key = import_key or os.path.basename(ndjson_file)
+    try:
+        with open(ndjson_file, 'r', encoding='utf-8') as lines:
+            blob_file = open(blobs_file, 'rb') if blobs_file else None
+            try:
+                result = import_ndjson(lines, import_key, owner_username=owner, blob_file=blob_file,
+                                       batch_size=batch_size)
+            finally:
+                if blob_file:
+                    blob_file.close()
+    except TransferServiceError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Import '{import_key}' {result['status']}: {result['cases']} cases, "
+               f"{result['documents']} documents, {result['blobs']} files imported; "
+               f"{result['skipped_cases']} cases and {result['skipped_documents']} documents skipped.")
+
 def register_commands(app):
     """Register custom Flask CLI commands."""
     app.cli.add_command(rotate_keys_command)
-    app.cli.add_command(backup_keys_command)
\ No newline at end of file
+    app.cli.add_command(rotate_file_keys_command)
+    app.cli.add_command(shred_files_command)
+    app.cli.add_command(process_subpoenas_command)
+    app.cli.add_command(backup_keys_command)
+    app.cli.add_command(reindex_documents_command)
+    app.cli.add_command(benchmark_encryption_command)
+    app.cli.add_command(export_cases_command)
+    app.cli.add_command(import_cases_command)
@@ -21,19 +21,75 @@ class Config:
     """Base configuration settings."""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'a-very-secret-dev-key-please-change')
 
+    # Logging (see utils/logging_config.py): root level, per-logger levels as
+    # "logger=LEVEL,...", json or text lines, and where the audit logs go
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_FILE_DIR = os.environ.get('LOG_FILE_DIR', os.path.join(instance_path, 'logs'))
+
+    # Request metrics (GET /api/admin/metrics, see utils/metrics.py): each
+    # worker writes its histograms to METRICS_DIR so a scrape covers them all
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(instance_path, 'metrics'))
+    METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    # Scrapers authenticate with 'Authorization: Bearer <METRICS_TOKEN>' (unset: admin session only)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
     # Database Configuration
     default_db_path = os.path.join(instance_path, 'default.db')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{default_db_path}')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine profile settings (see utils/db_engine.py); each applies to one backend
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+    # Seconds a worker serves the logged-in user from memory (see utils/principal_cache.py)
+    SESSION_PRINCIPAL_TTL = int(os.environ.get('SESSION_PRINCIPAL_TTL', 30))
+    SESSION_PRINCIPAL_CACHE_SIZE = int(os.environ.get('SESSION_PRINCIPAL_CACHE_SIZE', 1000))
+
+    # How often (seconds) a worker checks whether another process (rotate-keys,
+    # rotate-file-keys) changed the key directories' metadata, and reloads them
+    KEY_RELOAD_CHECK_SECONDS = float(os.environ.get('KEY_RELOAD_CHECK_SECONDS', 1))
+
+    # Encrypt case numbers at rest (existing rows: run rotate-keys after switching on)
+    ENCRYPT_CASE_FIELDS = os.environ.get('ENCRYPT_CASE_FIELDS', 'false').lower() in ['true', 'on', '1']
 
     # Upload Folder Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(instance_path, 'uploads'))
     os.makedirs(UPLOAD_FOLDER, exist_ok=True) # Ensure upload folder exists
 
+    # Background erasure of deleted files (see services/shred_service.py)
+    SHRED_WORKER_ENABLED = os.environ.get('SHRED_WORKER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    SHRED_POLL_SECONDS = int(os.environ.get('SHRED_POLL_SECONDS', 30))
+    SHRED_BATCH_SIZE = int(os.environ.get('SHRED_BATCH_SIZE', 20))
+    SHRED_PASSES = int(os.environ.get('SHRED_PASSES', 3))
+    SHRED_MAX_ATTEMPTS = int(os.environ.get('SHRED_MAX_ATTEMPTS', 5))
+    SHRED_RETRY_BASE_SECONDS = int(os.environ.get('SHRED_RETRY_BASE_SECONDS', 30))
+    SHRED_STALE_SECONDS = int(os.environ.get('SHRED_STALE_SECONDS', 3600))
+
     # Frontend URL for CORS
     FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:5173")
 
     AI_API_KEY = os.environ.get("AI_API_KEY")
+    # How many form interrogatory sections are formatted by the AI at once
+    AI_FORMAT_MAX_WORKERS = int(os.environ.get('AI_FORMAT_MAX_WORKERS', 4))
+    # Subpoena batches (POST /api/subpoenas/batch, flask process-subpoenas).
+    # Batches over SUBPOENA_BATCH_SYNC_MAX_FILES files run as background jobs,
+    # whose results are kept SUBPOENA_BATCH_JOB_TTL seconds
+    SUBPOENA_BATCH_MAX_FILES = int(os.environ.get('SUBPOENA_BATCH_MAX_FILES', 50))
+    SUBPOENA_BATCH_MAX_WORKERS = int(os.environ.get('SUBPOENA_BATCH_MAX_WORKERS', 4))
+    SUBPOENA_BATCH_SYNC_MAX_FILES = int(os.environ.get('SUBPOENA_BATCH_SYNC_MAX_FILES', 3))
+    SUBPOENA_BATCH_JOB_TTL = int(os.environ.get('SUBPOENA_BATCH_JOB_TTL', 3600))
+    # Medical record summaries: pages per chunk, chunks read at once, and how
+    # long a finished async job's document is kept (seconds)
+    MEDICAL_SUMMARY_CHUNK_PAGES = int(os.environ.get('MEDICAL_SUMMARY_CHUNK_PAGES', 20))
+    MEDICAL_SUMMARY_MAX_WORKERS = int(os.environ.get('MEDICAL_SUMMARY_MAX_WORKERS', 4))
+    MEDICAL_SUMMARY_JOB_TTL = int(os.environ.get('MEDICAL_SUMMARY_JOB_TTL', 3600))
     
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -4,19 +4,35 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from backend.extensions import db 
 import secrets
+from backend.utils.db_types import PortableJSONB, EncryptedString, EncryptedJSON, EncryptedText, blind_index_column
 
 class Case(db.Model):
+    __table_args__ = (
+        # Display names are unique per user; also serves the user's case list,
+        # ordered by display name, and the duplicate-name check
+        db.Index('ix_case_user_id_display_name', 'user_id', 'display_name', unique=True),
+        # Lets Postgres find cases by case_details keys/containment; not created on SQLite
+        db.Index('ix_case_case_details_gin', 'case_details', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True) # Auto-incrementing primary key
-    display_name = db.Column(db.String(200), unique=True, nullable=False)
+    display_name = db.Column(db.String(200), nullable=False)
     official_case_name = db.Column(db.String(200), unique=True, nullable=True)
-    case_number = db.Column(db.String(100), unique=True, nullable=True)
+    # Encrypted when ENCRYPT_CASE_FIELDS is on; looked up and kept unique through
+    # its blind index (see utils/db_types.py), ciphertext being randomized
+    case_number = db.Column(EncryptedString(512, blind_index='case_number_bidx', switch='ENCRYPT_CASE_FIELDS'),
+                            nullable=True)
+    case_number_bidx = blind_index_column('case_number', unique=True, index=True, nullable=True)
     judge = db.Column(db.String(150), nullable=True)
     plaintiff = db.Column(db.String(1000), nullable=True)
     defendant = db.Column(db.String(1000), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    case_details = db.Column(db.JSON, nullable=True) # For flexible/additional fields
+    # Bumped by every UPDATE, ORM or bulk; feeds the case ETags (see get_case_versions)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    case_details = db.Column(PortableJSONB, nullable=True) # For flexible/additional fields (JSONB on Postgres)
     jurisdiction = db.Column(db.String(200), nullable=True)
     county = db.Column(db.String(200), nullable=True)
     filing_date = db.Column(db.Date, nullable=True)
@@ -41,15 +57,25 @@ class Case(db.Model):
 
     # Relationship: A case can have many documents
     documents = db.relationship('Document', backref='case', lazy=True, cascade="all, delete-orphan")
+    # AI suggestions from document analysis, one row per field (see CaseSuggestion)
+    suggestions = db.relationship('CaseSuggestion', backref='case', lazy='dynamic', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<Case {self.display_name}>'
 
 class Document(db.Model):
+    __table_args__ = (
+        # Document listing filters by case and orders by upload date
+        db.Index('ix_document_case_id_upload_date', 'case_id', 'upload_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.Integer, db.ForeignKey('case.id'), nullable=False) # Foreign key linking to Case table
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(1024), nullable=False) # Path where the file is stored on the server
+    # The file's data key, wrapped by a file key-encryption key (see utils/file_encryption.py);
+    # NULL for files encrypted with the legacy single key. Deleting it erases the file.
+    file_key = db.Column(db.Text, nullable=True)
     # Store extracted text directly (consider implications for large files/DB size)
     extracted_text = db.Column(db.Text, nullable=True)
      # Store analysis results (e.g., as JSON)
@@ -57,12 +83,210 @@ class Document(db.Model):
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     # --- CONSIDER ADDING ---
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+
+    suggestions = db.relationship('CaseSuggestion', backref='document', lazy='dynamic', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<Document {self.file_name} (Case ID: {self.case_id})>'
 
+class CaseSuggestion(db.Model):
+    """A value for one case field suggested by the analysis of one document."""
+    __tablename__ = 'case_suggestion'
+    __table_args__ = (
+        db.UniqueConstraint('case_id', 'document_id', 'field', name='uq_case_suggestion_case_document_field'),
+        # Suggestion listing: a case's suggestions by status
+        db.Index('ix_case_suggestion_case_id_status', 'case_id', 'status'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_ACCEPTED = 'accepted'
+    STATUS_REJECTED = 'rejected'
+    STATUSES = (STATUS_PENDING, STATUS_ACCEPTED, STATUS_REJECTED)
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('case.id'), nullable=False)
+    # Null for suggestions whose document no longer exists (migrated data)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=True)
+    field = db.Column(db.String(100), nullable=False)
+    value = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "case_id": self.case_id,
+            "document_id": self.document_id,
+            "field": self.field,
+            "value": self.value,
+            "status": self.status,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<CaseSuggestion {self.field} (Case ID: {self.case_id}, {self.status})>'
+
+class DocumentSearchPage(db.Model):
+    """
+    One page of a document's extracted text, as indexed for full-text search
+    (see services/search_service.py). Word documents and text without page
+    breaks are a single row with page_number None.
+
+    Postgres searches a GIN index on to_tsvector(content); SQLite searches the
+    document_search_fts FTS5 table, kept in sync with this one by triggers.
+    """
+    __tablename__ = 'document_search_page'
+    __table_args__ = (
+        db.Index('ix_document_search_page_tsv', db.text("to_tsvector('english', content)"),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Copied from the document so searches scope by case/owner without joining document
+    case_id = db.Column(db.Integer, db.ForeignKey('case.id', ondelete='CASCADE'), nullable=False, index=True)
+    page_number = db.Column(db.Integer, nullable=True)
+    content = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<DocumentSearchPage doc {self.document_id} page {self.page_number}>'
+
+# External-content FTS5 index over document_search_page (SQLite only): the text
+# lives once, in document_search_page, and the triggers update the index row by row
+DOCUMENT_SEARCH_FTS_DDL = (
+    "CREATE VIRTUAL TABLE document_search_fts USING fts5("
+    "content, content='document_search_page', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER document_search_page_ai AFTER INSERT ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER document_search_page_ad AFTER DELETE ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER document_search_page_au AFTER UPDATE ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO document_search_fts(rowid, content) VALUES (new.id, new.content); END",
+)
+
+for _statement in DOCUMENT_SEARCH_FTS_DDL:
+    db.event.listen(DocumentSearchPage.__table__, 'after_create', db.DDL(_statement).execute_if(dialect='sqlite'))
+db.event.listen(DocumentSearchPage.__table__, 'before_drop',
+                db.DDL("DROP TABLE IF EXISTS document_search_fts").execute_if(dialect='sqlite'))
+
+class ImportCheckpoint(db.Model):
+    """
+    Progress of an NDJSON case import (see services/transfer_service.py),
+    committed with each batch so an interrupted import resumes where it stopped.
+    """
+    __tablename__ = 'import_checkpoint'
+
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETE = 'complete'
+
+    id = db.Column(db.Integer, primary_key=True)
+    import_key = db.Column(db.String(200), unique=True, nullable=False)
+    line_number = db.Column(db.Integer, nullable=False, default=0)  # Last line imported
+    case_id_map = db.Column(db.JSON, nullable=False, default=dict)  # Exported case id -> new id (None if skipped)
+    stats = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_RUNNING)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ImportCheckpoint {self.import_key} line {self.line_number} ({self.status})>'
+
+class ShredJob(db.Model):
+    """
+    A deleted document's file waiting to be erased from disk, queued in the
+    transaction that deleted the row and processed by the background shred
+    worker (see services/shred_service.py). Kept afterwards as the audit record.
+    """
+    __tablename__ = 'shred_job'
+    __table_args__ = (
+        # The worker's claim query: due jobs by status
+        db.Index('ix_shred_job_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'  # Out of retries; needs a look
+
+    MODE_OVERWRITE = 'overwrite'  # Legacy files: overwrite passes, then unlink
+    MODE_UNLINK = 'unlink'        # Envelope-encrypted files: the data key is already gone
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_path = db.Column(db.String(1000), nullable=False)
+    mode = db.Column(db.String(20), nullable=False, default=MODE_OVERWRITE)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    # No foreign keys: the document is gone, and the user may be by the time of an audit
+    document_id = db.Column(db.Integer, nullable=True)
+    requested_by = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "file_path": self.file_path,
+            "mode": self.mode,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "document_id": self.document_id,
+            "requested_by": self.requested_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ShredJob {self.id} {self.file_path} ({self.status})>'
+
+class BackgroundJob(db.Model):
+    """
+    An upload too slow for one request (medical summary, subpoena batch), run
+    by a thread of the worker that received it. Status, progress and result
+    live here so any worker can answer the polls (see services/job_service.py).
+    Results hold client records, so they are encrypted at rest.
+    """
+    __tablename__ = 'background_job'
+    __table_args__ = (
+        # Pruning deletes expired rows
+        db.Index('ix_background_job_expires_at', 'expires_at'),
+    )
+
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, not guessable
+    kind = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_RUNNING)
+    progress = db.Column(db.JSON, nullable=False, default=dict)
+    error = db.Column(db.Text, nullable=True)
+    result = db.Column(EncryptedJSON(), nullable=True)
+    document = db.Column(EncryptedText(), nullable=True)  # Base64 of a generated file
+    ttl_seconds = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)  # Set when the job finishes
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.kind} ({self.status})>'
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Partial index: the admin listing only ever asks for pending users
+        db.Index('ix_users_pending_created_at', 'created_at',
+                 sqlite_where=db.text('pending_approval = 1'),
+                 postgresql_where=db.text('pending_approval')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True, nullable=False)
@@ -114,8 +338,11 @@ class User(UserMixin, db.Model):
         return False
     
     def increment_login_attempts(self):
-        """Track failed login attempts and lock account if threshold exceeded"""
-        self.failed_login_attempts += 1
+        """
+        Track failed login attempts and lock account if threshold exceeded.
+        The caller commits, so the attempt and the lock are one transaction.
+        """
+        self.failed_login_attempts = (self.failed_login_attempts or 0) + 1
         
         # Lock account for progressively longer times based on failed attempts
         if self.failed_login_attempts >= 10:
@@ -125,19 +352,20 @@ class User(UserMixin, db.Model):
             # Lock for 15 minutes after 5 attempts
             self.locked_until = datetime.utcnow() + timedelta(minutes=15)
         
-        db.session.commit()
-        
     def reset_login_attempts(self):
-        """Reset counter after successful login"""
+        """Reset counter after successful login (the caller commits)"""
         self.failed_login_attempts = 0
         self.locked_until = None
         self.last_login_at = datetime.utcnow()
-        db.session.commit()
         
     def record_login_ip(self, ip_address):
-        """Record the IP address of a successful login"""
+        """Record the IP address of a successful login (the caller commits)"""
         self.last_login_ip = ip_address
-        db.session.commit()
+
+    def record_successful_login(self, ip_address):
+        """All of a successful login's bookkeeping, committed by the caller in one go"""
+        self.reset_login_attempts()
+        self.record_login_ip(ip_address)
         
     def to_dict(self):
         return {
@@ -1,6 +1,8 @@
 # backend/schemas.py
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field
 from marshmallow import fields, Schema, validate, ValidationError, validates, EXCLUDE
+from flask import has_request_context
+from flask_login import current_user
 from .models import Case, Document, User
 from .extensions import ma
 from backend.models import User
@@ -55,6 +57,7 @@ class DocumentSchema(SQLAlchemyAutoSchema):
         model = Document
         load_instance = True
         include_fk = True
+        exclude = ("version", "file_key")  # Internal; clients get the version through the ETag
 
 class CaseSchema(SQLAlchemyAutoSchema):
     """Schema for Case model OUTPUT (Serialization)"""
@@ -67,7 +70,7 @@ class CaseSchema(SQLAlchemyAutoSchema):
         allow_none=True
     )   
     documents = fields.Nested(DocumentSchema, many=True, dump_only=True)
-    owner = fields.Nested(UserSchema, dump_only=True)
+    owner = fields.Method('dump_owner', dump_only=True)
     # New fields for multiple defendants
     defendants = fields.Dict(
         keys=fields.Str(),
@@ -76,11 +79,22 @@ class CaseSchema(SQLAlchemyAutoSchema):
         allow_none=True
     )
     active_defendant = fields.Str(required=False, allow_none=True)
+
+    def dump_owner(self, case):
+        # The owner is normally the logged-in user: dump the cached principal
+        # rather than loading the users row again
+        if has_request_context() and current_user.is_authenticated and current_user.id == case.user_id:
+            return user_schema.dump(current_user)
+        return user_schema.dump(case.owner) if case.owner else None
+
     class Meta:
         model = Case
         load_instance = True
         include_relationships = True
         include_fk = True
+        # Suggestions are listed by /cases/<id>/suggestions; version goes into the ETag;
+        # the blind index is an internal lookup token
+        exclude = ("suggestions", "version", "case_number_bidx")
 
 class DiscoveryResponseSchema(Schema):
     """Schema for the response of the interrogatory generation endpoint."""
@@ -176,6 +190,8 @@ class PasswordChangeSchema(Schema):
 # Schemas for Serialization (Output)
 user_schema = UserSchema() # Used for single user output
 case_schema = CaseSchema()
+# Case columns only, for prompts and templates that never look at documents or owner
+case_fields_schema = CaseSchema(exclude=("documents", "owner"))
 document_schema = DocumentSchema()
 discovery_response_schema = DiscoveryResponseSchema()
 generated_document_schema = GeneratedDocumentSchema()
@@ -183,6 +199,8 @@ generated_document_schema = GeneratedDocumentSchema()
 # Collection schemas (for lists)
 users_schema = UserSchema(many=True)
 cases_schema = CaseSchema(many=True)
+# Case list: documents without their extracted text or analysis (see PROFILE_LIST)
+case_list_schema = CaseSchema(many=True, exclude=("documents.extracted_text", "documents.analysis_json"))
 documents_schema = DocumentSchema(many=True)
 
 # Schemas for Validation (Input)
@@ -6,12 +6,18 @@ from flask_login import current_user
 
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig # For JSON mode
-import traceback
 
 # Import necessary services and exceptions
 from backend.services.document_service import get_document_by_id, update_document_analysis, DocumentNotFoundError, DocumentServiceError
-from backend.services.case_service import get_case_by_id, update_case, CaseNotFoundError, CaseServiceError
+from backend.services.case_service import (
+    get_case_by_id, update_case, update_case_details,
+    CaseNotFoundError, CaseServiceError, PROFILE_DISCOVERY
+)
+from backend.services.suggestion_service import store_document_suggestions, SuggestionServiceError
 from .case_service import get_case_by_id # Or wherever get_case_by_id is defined
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- Define Exceptions ---
 class AnalysisServiceError(Exception):
@@ -30,7 +36,7 @@ def analyze_text_with_gemini(text_content):
     """
     api_key = current_app.config.get("AI_API_KEY")
     if not api_key:
-        print("ERROR: AI_API_KEY not found in config.")
+        logger.error("AI_API_KEY not found in config.")
         raise AnalysisServiceError("AI API Key is not configured.")
 
     try:
@@ -104,8 +110,8 @@ def analyze_text_with_gemini(text_content):
         json_output_config = GenerationConfig(response_mime_type="application/json")
 
                 # --- ADD DEBUG PRINTS ---
-        print(f"--- Text Content Type: {type(text_content)} ---")
-        print(f"--- Prompt Start (first 500 chars): {prompt[:500]}...")
+        logger.debug("Text Content Type: %s", type(text_content))
+        logger.debug("Prompt Start (first 500 chars): %s...", prompt[:500])
 
         json_output_config = GenerationConfig(
             response_mime_type="application/json",
@@ -113,7 +119,7 @@ def analyze_text_with_gemini(text_content):
             temperature=0.1  # Lower temperature for more precise/deterministic responses
         )
         # --- Make the API Call ---
-        print(f"--- Calling Gemini API (Model: {model.model_name}) ---")
+        logger.info("Calling Gemini API (Model: %s)", model.model_name)
         start_time = time.time()
         response = model.generate_content(
             prompt,
@@ -121,12 +127,12 @@ def analyze_text_with_gemini(text_content):
             # You might add safety_settings here if needed later
         )
         end_time = time.time()
-        print(f"--- Gemini API Call took {end_time - start_time:.2f} seconds ---")
+        logger.info("Gemini API Call took %.2f seconds", end_time - start_time)
 
         # --- Parse the Response ---
         # Because we requested JSON, response.text should be a JSON string
         response_text = response.text
-        print(f"--- Gemini Raw Response Text: {response_text[:500]}... ---") # Log beginning of response
+        logger.debug("Gemini Raw Response Text: %s...", response_text[:500]) # Log beginning of response
 
         parsed_json = json.loads(response_text) # Parse the JSON string into a Python dict
 
@@ -140,19 +146,12 @@ def analyze_text_with_gemini(text_content):
         return parsed_json # Return the Python dictionary
 
     except json.JSONDecodeError as e:
-         print(f"ERROR: Failed to parse JSON response from Gemini: {e}")
-         print(f"Gemini Raw Text was: {response_text}")
+         logger.error("Failed to parse JSON response from Gemini: %s", e)
+         logger.debug("Gemini Raw Text was: %s", response_text)
          raise AnalysisServiceError("Failed to parse analysis result from AI.") from e
     except Exception as e:
-        # --- MODIFY THIS BLOCK ---
-        print(f"ERROR: AI API call failed unexpectedly.")
-        print(f"Caught Exception Type: {type(e)}") # Print the type of exception
-        print(f"Caught Exception Args: {e.args}") # Print the arguments of the exception
-        print("--- Full Traceback ---")
-        traceback.print_exc() # Print the full stack trace
-        print("--- End Traceback ---")
+        logger.exception("AI API call failed unexpectedly (%s)", type(e).__name__)
         raise AnalysisServiceError("Analysis failed due to an API error.") from e
-        # -------------------------
 
 def call_gemini_with_prompt(prompt):
     """
@@ -174,12 +173,39 @@ def call_gemini_with_prompt(prompt):
     except Exception as e:
         raise AnalysisServiceError(f"AI call failed: {e}")
 
+def call_gemini_json(prompt, api_key=None, temperature=0.2):
+    """
+    Calls Gemini in JSON response mode and returns the parsed JSON.
+    Pass api_key when calling from a worker thread that has no app context.
+    """
+    if api_key is None:
+        api_key = current_app.config.get("AI_API_KEY")
+    if not api_key:
+        raise AnalysisServiceError("AI API Key is not configured.")
+
+    try:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17')
+        generation_config = GenerationConfig(
+            response_mime_type="application/json",
+            temperature=temperature
+        )
+        response = model.generate_content(prompt, generation_config=generation_config)
+        response_text = response.text
+    except Exception as e:
+        raise AnalysisServiceError(f"AI call failed: {e}")
+
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise AnalysisServiceError(f"AI returned invalid JSON: {e}") from e
+
 def trigger_analysis_and_update(document_id):
     """
     Orchestrates fetching doc, calling Gemini for analysis, updating
     document record, and storing suggestions in the Case record.
     """
-    print(f"Analysis requested for document ID: {document_id}")
+    logger.info("Analysis requested for document ID: %s", document_id)
     try:
         # 1. Get Document and Text (Remains the same)
         doc = get_document_by_id(document_id)
@@ -193,72 +219,41 @@ def trigger_analysis_and_update(document_id):
         update_document_analysis(document_id, analysis_result_json)
 
         # --- START REPLACEMENT for Step #4 ---
-        # 4. Store Extracted Fields as Pending Suggestions in Case Record
+        # 4. Store Extracted Fields as Pending Suggestions, one CaseSuggestion row
+        # per field; locked fields are filtered out when suggestions are listed
         try:
             case_id = doc.case_id
-            current_case = get_case_by_id(case_id, current_user.id)
-            current_details = dict(current_case.case_details or {}) # Get existing details
-
-            updated_case_details = False # Flag
+            get_case_by_id(case_id, current_user.id, profile=PROFILE_DISCOVERY) # Ownership check
 
             # Check if analysis_result_json is a dictionary
             if isinstance(analysis_result_json, dict):
-                # Get locked fields from case details
-                locked_fields = current_details.get('locked_fields', [])
-                print(f"Found locked fields: {locked_fields}")
-
                 # Prepare the suggestion data: create a copy and remove our metadata
                 suggestion_data = analysis_result_json.copy()
                 suggestion_data.pop('analysis_metadata', None) # Remove metadata key if it exists
 
-                # Filter out locked fields from suggestions
-                for field in locked_fields:
-                    if field in suggestion_data:
-                        print(f"Removing locked field {field} from suggestions")
-                        del suggestion_data[field]
-
-                # Ensure 'pending_suggestions' key exists
-                if 'pending_suggestions' not in current_details:
-                    current_details['pending_suggestions'] = {}
-
-                # Store the suggestion data under a key for this document
-                suggestion_key = f'doc_{document_id}'
-                current_details['pending_suggestions'][suggestion_key] = suggestion_data # Store dict without metadata
-                print(f"Stored suggestions for {suggestion_key} in case {case_id}")
-                updated_case_details = True
+                store_document_suggestions(case_id, document_id, suggestion_data, commit=False)
 
+                detail_updates = {'last_analyzed_doc_id': document_id} # Always update this tracker
                 # Add/Update metadata directly in case_details
                 if 'analysis_metadata' in analysis_result_json:
-                    current_details['last_analysis_metadata'] = analysis_result_json['analysis_metadata']
-                    updated_case_details = True # Ensure update happens even if only metadata changed
-
-                current_details['last_analyzed_doc_id'] = document_id
-                updated_case_details = True # Always update this tracker
-
-            # Only call update_case if changes were made
-            if updated_case_details:
-                case_update_data = {'case_details': current_details}
-                # (Keep the debug prints around update_case if you want)
-                print("--- DEBUG: Preparing to update case_details with:")
-                print(json.dumps(current_details, indent=2))
-                update_case(case_id, case_update_data, current_user.id)
-                print(f"--- DEBUG: update_case call completed for case {case_id} ---")
-                print(f"Case {case_id} details updated with pending suggestions/metadata for doc {document_id}")
+                    detail_updates['last_analysis_metadata'] = analysis_result_json['analysis_metadata']
+
+                update_case_details(case_id, detail_updates) # Commits the suggestions too
+                logger.info("Case %s updated with pending suggestions/metadata for doc %s", case_id, document_id)
             else:
-                print(f"Analysis for doc {document_id} did not yield a dictionary result to store as suggestions in case {case_id}.")
+                logger.info("Analysis for doc %s did not yield a dictionary result to store as suggestions in case %s.", document_id, case_id)
 
-        except (CaseNotFoundError, CaseServiceError) as e:
-             print(f"Warning: Could not update case {doc.case_id} with suggestions after analysis: {e}")
+        except (CaseNotFoundError, CaseServiceError, SuggestionServiceError) as e:
+             logger.warning("Could not update case %s with suggestions after analysis: %s", doc.case_id, e)
         except Exception as e:
-             print(f"Unexpected error storing suggestions in case {doc.case_id} after analysis: {e}")
-             traceback.print_exc() # Keep traceback for this unexpected block
+             logger.exception("Unexpected error storing suggestions in case %s after analysis: %s", doc.case_id, e)
         # --- END REPLACEMENT for Step #4 ---
         return analysis_result_json # Return the raw analysis result
 
     except (DocumentNotFoundError, NoTextToAnalyzeError) as e:
         raise e
     except Exception as e:
-        print(f"Error during analysis orchestration for doc {document_id}: {e}")
+        logger.error("Error during analysis orchestration for doc %s: %s", document_id, e)
         raise AnalysisServiceError(f"Analysis failed for document {document_id}") from e
 
 def analyze_discovery_with_gemini(prompt):
@@ -273,17 +268,16 @@ def analyze_discovery_with_gemini(prompt):
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17')
         json_output_config = GenerationConfig(response_mime_type="application/json", temperature=0.1)
-        print(f"--- [Discovery Gemini] Prompt Start (first 500 chars): {prompt[:500]}...")
+        logger.debug("[Discovery Gemini] Prompt Start (first 500 chars): %s...", prompt[:500])
         response = model.generate_content(prompt, generation_config=json_output_config)
         response_text = response.text
-        print(f"--- [Discovery Gemini] Raw Response Text (first 500 chars): {response_text[:500]}... ---")
+        logger.debug("[Discovery Gemini] Raw Response Text (first 500 chars): %s...", response_text[:500])
         parsed_json = json.loads(response_text)
         return parsed_json
     except json.JSONDecodeError as e:
-        print(f"ERROR: Failed to parse JSON response from Gemini: {e}")
-        print(f"Gemini Raw Text was: {response_text}")
+        logger.error("Failed to parse JSON response from Gemini: %s", e)
+        logger.debug("Gemini Raw Text was: %s", response_text)
         raise AnalysisServiceError("Failed to parse analysis result from AI.") from e
     except Exception as e:
-        print(f"ERROR: Discovery AI API call failed unexpectedly.")
-        traceback.print_exc()
+        logger.exception("Discovery AI API call failed unexpectedly.")
         raise AnalysisServiceError("Discovery analysis failed due to an API error.") from e
\ No newline at end of file
@@ -3,10 +3,21 @@ import os
 from backend.models import Case, Document, User # Import relevant models
 from backend.extensions import db # Import the db instance
 from flask_login import current_user # Import current_user to check ownership (though functions receive user_id explicitly)
-from werkzeug.exceptions import Forbidden # Import Forbidden for authorization errors
+from werkzeug.exceptions import Forbidden, HTTPException # Import Forbidden for authorization errors
 from sqlalchemy.exc import IntegrityError # To catch potential unique constraint errors
 from sqlalchemy import inspect # <<< Import inspect to read model columns
 from sqlalchemy.orm.attributes import flag_modified # <<< Import to mark JSON as modified
+from sqlalchemy.orm import selectinload, load_only, lazyload
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import update, func, case as sql_case, literal, cast, Text
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, array
+import json
+from datetime import datetime
+from backend.services.search_service import remove_case_from_index
+from backend.services.shred_service import enqueue_document_files, wake_worker
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # --- Custom Exceptions ---
@@ -22,6 +33,46 @@ class DuplicateCaseError(CaseServiceError):
     """Raised when trying to create a case with a duplicate display name (potentially per user)."""
     pass
 
+# --- Loading Profiles ---
+# Each endpoint loads a case through one of these, so it issues a fixed number of
+# queries however many documents the case has (see backend/tests/query_budget.py).
+PROFILE_LIST = 'list'                          # GET /cases
+PROFILE_DETAIL = 'detail'                      # GET /cases/<id>, full documents
+PROFILE_TEMPLATE_CONTEXT = 'template_context'  # Word/discovery templates, case columns only
+PROFILE_DISCOVERY = 'discovery'                # Parse/select endpoints, just identifying columns
+
+# Document columns the case list shows; extracted text and analysis stay in the database
+LIST_DOCUMENT_COLUMNS = (Document.id, Document.case_id, Document.file_name, Document.file_path,
+                         Document.upload_date, Document.updated_at)
+
+DISCOVERY_CASE_COLUMNS = (Case.id, Case.user_id, Case.display_name, Case.case_number)
+
+
+def _profile_options(profile):
+    """
+    Returns the loader options for a loading profile (None keeps the model defaults).
+    Case.owner is left lazy everywhere: it's the logged-in user, which
+    CaseSchema serializes from the cached principal without loading it.
+    """
+    if profile is None:
+        return []
+    if profile == PROFILE_LIST:
+        return [selectinload(Case.documents).load_only(*LIST_DOCUMENT_COLUMNS)]
+    if profile == PROFILE_DETAIL:
+        return [selectinload(Case.documents)]
+    if profile == PROFILE_TEMPLATE_CONTEXT:
+        # Templates only read case columns; judge_doc comes from get_judge_doc()
+        return [lazyload(Case.documents)]
+    if profile == PROFILE_DISCOVERY:
+        return [load_only(*DISCOVERY_CASE_COLUMNS), lazyload(Case.documents)]
+    raise ValueError(f"Unknown loading profile: {profile}")
+
+
+def case_query(profile=None):
+    """Case query with the given loading profile applied."""
+    return Case.query.options(*_profile_options(profile))
+
+
 # --- Service Functions ---
 
 def create_case(data, user_id):
@@ -53,7 +104,7 @@ def create_case(data, user_id):
     # --- Refactored: Get allowed fields from model ---
     mapper = inspect(Case)
     # Fields that are auto-managed or set explicitly elsewhere
-    protected_keys = {'id', 'user_id', 'created_at', 'updated_at', 'display_name'}
+    protected_keys = {'id', 'user_id', 'created_at', 'updated_at', 'display_name', 'case_number_bidx'}
     allowed_keys = {col.key for col in mapper.columns if col.key not in protected_keys}
     # Note: 'display_name' is handled separately above, but keep it in allowed_keys
     # if you want to allow setting it via the generic loop (though explicit handling is safer)
@@ -90,72 +141,297 @@ def create_case(data, user_id):
     try:
         db.session.add(new_case)
         db.session.commit()
-        print(f"Case '{display_name}' created successfully for user {user_id}.")
+        logger.info("Case '%s' created successfully for user %s.", display_name, user_id)
         return new_case
     except IntegrityError as e: # Catch potential DB integrity errors
         db.session.rollback()
-        print(f"IntegrityError creating case for user {user_id}: {e}")
+        logger.warning("IntegrityError creating case for user %s: %s", user_id, e)
         # Check if it's a unique constraint violation (could be display_name, case_number etc.)
         # Providing a generic message might be safer unless you parse the specific constraint name
         raise DuplicateCaseError(f"Database integrity error creating case. A unique field (like display name or case number) might already exist.") from e
     except Exception as e:
         db.session.rollback()
-        print(f"Error creating case for user {user_id}: {e}")
+        logger.error("Error creating case for user %s: %s", user_id, e)
         raise CaseServiceError("Failed to create case in database") from e
 
-def get_all_cases_for_user(user_id):
+def get_all_cases_for_user(user_id, profile=PROFILE_LIST):
     """Fetches all cases for a specific user, ordered by display name."""
     try:
         # Ensure user exists (optional, depends on how user_id is obtained)
         # user = db.session.get(User, user_id)
         # if not user:
         #     raise ValueError(f"User with ID {user_id} not found.")
-        return Case.query.filter_by(user_id=user_id).order_by(Case.display_name).all()
+        return case_query(profile).filter_by(user_id=user_id).order_by(Case.display_name).all()
     except Exception as e:
-        print(f"Error fetching cases for user {user_id} via service: {e}")
+        logger.error("Error fetching cases for user %s via service: %s", user_id, e)
         raise CaseServiceError(f"Failed to fetch cases for user {user_id} from database") from e
 
+def find_cases_by_number(user_id, case_number, profile=PROFILE_LIST):
+    """
+    Fetches a user's case with the given case number (a list of zero or one).
+    Compares blind indexes, so it stays an index lookup with case numbers encrypted.
+    """
+    try:
+        return case_query(profile).filter(Case.case_number == case_number, Case.user_id == user_id).all()
+    except Exception as e:
+        logger.error("Error searching cases by number for user %s: %s", user_id, e)
+        raise CaseServiceError("Failed to search cases by case number") from e
+
 # MODIFIED: Added ownership check (Keep this logic)
-def get_case_by_id(case_id, user_id):
-    print(f"DEBUG: Attempting to get case {case_id} for user {user_id}")
-    case = Case.query.get_or_404(case_id)
-    print(f"DEBUG: Found case {case_id}, owned by user {case.user_id}")
-    
-    # Check if this user owns the case
-    if case.user_id != user_id:
-        print(f"DEBUG: Permission denied - user {user_id} does not own case {case_id} (owned by {case.user_id})")
-        raise Forbidden("You don't have permission to access this case.")
+def get_case_by_id(case_id, user_id, profile=None):
     """
     Fetches a single case by its ID, ensuring ownership.
     Args:
         case_id (int): The ID of the case to fetch.
         user_id (int): The ID of the user requesting the case.
+        profile (str): Optional loading profile (PROFILE_*) for the case and its relationships.
     Returns:
         Case: The found Case object.
     Raises:
-        CaseNotFoundError: If no case with the given ID is found.
+        NotFound: If no case with the given ID is found (404).
         Forbidden: If the user does not own the case.
         CaseServiceError: For other database errors.
     """
+    logger.debug("Attempting to get case %s for user %s (profile: %s)", case_id, user_id, profile)
     try:
-        # Use session.get for primary key lookup (often slightly faster)
-        case = db.session.get(Case, case_id)
-        if case is None:
-            raise CaseNotFoundError(f"Case with ID {case_id} not found.")
-
-        # --- Ownership Check ---
-        if case.user_id != user_id:
-            # Log the attempt for security auditing
-            print(f"SECURITY ALERT: User {user_id} attempted to access case {case_id} owned by user {case.user_id}.")
-            raise Forbidden(f"Access denied: You do not own case {case_id}.")
-        # --- END Ownership Check ---
-
-        return case
-    except (CaseNotFoundError, Forbidden) as e: # Re-raise specific errors
-        raise e
+        case = case_query(profile).get_or_404(case_id)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error fetching case {case_id} for user {user_id} via service: {e}")
+        logger.error("Error fetching case %s for user %s via service: %s", case_id, user_id, e)
         raise CaseServiceError(f"Failed to fetch case {case_id} from database") from e
+    logger.debug("Found case %s, owned by user %s", case_id, case.user_id)
+
+    # --- Ownership Check ---
+    if case.user_id != user_id:
+        # Log the attempt for security auditing
+        logger.warning("SECURITY ALERT: User %s attempted to access case %s owned by user %s.", user_id, case_id, case.user_id)
+        raise Forbidden(f"Access denied: You do not own case {case_id}.")
+    # --- END Ownership Check ---
+
+    return case
+
+def get_judge_doc(case_id):
+    """
+    Returns the first judge_doc found in the case's document analyses, or ''.
+    Reads just that key in SQL instead of loading and decoding every analysis_json.
+    """
+    judge_doc = Document.analysis_json['judge_doc'].as_string()
+    row = (db.session.query(judge_doc)
+           .filter(Document.case_id == case_id, judge_doc.isnot(None), judge_doc != '')
+           .order_by(Document.id)
+           .first())
+    return row[0] if row else ''
+
+# --- Partial case_details writes ---
+# case_details holds suggestions and analysis metadata and can get large. These
+# helpers read or write single keys in SQL (jsonb_set/|| on Postgres, json_set
+# on SQLite) instead of reading the whole dict and writing it back.
+
+def get_case_versions(user_id, case_id=None):
+    """
+    Summarises the user's cases (or one case) and their documents in a single
+    aggregate query over the user/case indexes, without loading any rows.
+    Anything that changes what a case read returns changes the summary:
+    updates bump updated_at and version, inserts and deletes change the
+    counts and id sums.
+
+    Returns:
+        dict: {'cases': tuple, 'documents': tuple, 'last_modified': datetime or None},
+        or None when case_id is given and the user has no such case.
+    """
+    query = (db.session.query(
+                func.count(func.distinct(Case.id)), func.max(Case.updated_at),
+                func.coalesce(func.sum(Case.version), 0), func.coalesce(func.sum(Case.id), 0),
+                func.count(Document.id), func.max(Document.updated_at),
+                func.coalesce(func.sum(Document.version), 0), func.coalesce(func.sum(Document.id), 0))
+             .select_from(Case)
+             .outerjoin(Document, Document.case_id == Case.id)
+             .filter(Case.user_id == user_id))
+    if case_id is not None:
+        query = query.filter(Case.id == case_id)
+    row = query.one()
+
+    if case_id is not None and not row[0]:
+        return None
+    cases, documents = tuple(row[:4]), tuple(row[4:])
+    timestamps = [ts for ts in (cases[1], documents[1]) if ts is not None]
+    return {
+        'cases': cases,
+        'documents': documents,
+        'last_modified': max(timestamps) if timestamps else None,
+    }
+
+
+def touch_case(case_id):
+    """Marks a case as changed (updated_at, version) without loading it; no commit."""
+    db.session.execute(
+        update(Case).where(Case.id == case_id).values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _details_path(path):
+    """Normalizes a key or (key, subkey) tuple; deeper paths aren't supported."""
+    path = tuple(str(key) for key in (path if isinstance(path, (tuple, list)) else (path,)))
+    if not 1 <= len(path) <= 2:
+        raise ValueError(f"case_details paths must be one or two keys deep, got {path}")
+    for key in path:
+        if '"' in key or '\\' in key:
+            raise ValueError(f"Unsupported case_details key: {key!r}")
+    return path
+
+
+def _sqlite_path(*keys):
+    return '$' + ''.join(f'."{key}"' for key in keys)
+
+
+def _sqlite_details_expression(values, remove):
+    column = Case.__table__.c.case_details
+    base = sql_case((func.json_type(column) == 'object', column), else_=literal('{}'))
+
+    args = []
+    for key, value in values.items():
+        if isinstance(key, tuple):
+            # Rebuild just this sub-object with its new keys
+            parent = sql_case((func.json_type(column, _sqlite_path(key[0])) == 'object',
+                               func.json_extract(column, _sqlite_path(key[0]))), else_=literal('{}'))
+            sub_args = []
+            for sub_key, sub_value in value.items():
+                sub_args += [_sqlite_path(sub_key), func.json(literal(json.dumps(sub_value)))]
+            args += [_sqlite_path(key[0]), func.json(func.json_set(parent, *sub_args))]
+        else:
+            args += [_sqlite_path(key), func.json(literal(json.dumps(value)))]
+
+    expression = func.json_set(base, *args) if args else base
+    if remove:
+        expression = func.json_remove(expression, *[_sqlite_path(*path) for path in remove])
+    return expression
+
+
+def _postgres_details_expression(values, remove):
+    column = Case.__table__.c.case_details
+    empty = literal({}, JSONB)
+    expression = sql_case((func.jsonb_typeof(column) == 'object', column), else_=empty)
+
+    top_level = {key: value for key, value in values.items() if not isinstance(key, tuple)}
+    if top_level:
+        expression = expression.op('||', return_type=JSONB)(literal(top_level, JSONB))
+    for key, sub_values in values.items():
+        if isinstance(key, tuple):
+            current = column.op('->', return_type=JSONB)(literal(key[0], Text))
+            parent = sql_case((func.jsonb_typeof(current) == 'object', current), else_=empty)
+            new_parent = parent.op('||', return_type=JSONB)(literal(sub_values, JSONB))
+            expression = func.jsonb_set(expression, cast(array([key[0]]), ARRAY(Text)), new_parent, True,
+                                        type_=JSONB)
+    for path in remove:
+        expression = expression.op('#-', return_type=JSONB)(cast(array(list(path)), ARRAY(Text)))
+    return expression
+
+
+def case_details_update_expression(dialect_name, values=None, remove=()):
+    """
+    Builds the SQL expression for case_details with ``values`` set and ``remove`` deleted.
+
+    Args:
+        dialect_name: 'postgresql' or 'sqlite'
+        values: {key or (key, subkey): value}
+        remove: Keys or (key, subkey) paths to delete
+
+    Returns:
+        SQL expression, or None when the dialect has no JSON functions to do it in place
+    """
+    grouped = {}
+    for path, value in (values or {}).items():
+        path = _details_path(path)
+        if len(path) == 1:
+            grouped[path[0]] = value
+        else:
+            grouped.setdefault((path[0],), {})[path[1]] = value
+    remove = [_details_path(path) for path in remove]
+
+    if dialect_name == 'postgresql':
+        return _postgres_details_expression(grouped, remove)
+    if dialect_name == 'sqlite':
+        return _sqlite_details_expression(grouped, remove)
+    return None
+
+
+def update_case_details(case_id, values=None, remove=(), commit=True):
+    """
+    Sets and removes individual case_details keys in one UPDATE, without
+    loading the rest of case_details. Ownership must be checked by the caller.
+
+    Args:
+        case_id (int): The case to update.
+        values (dict): {key or (key, subkey): value}, e.g.
+            {('last_analysis_metadata', 'model'): '...', 'last_analyzed_doc_id': 5}
+        remove (iterable): Keys or (key, subkey) paths to delete.
+        commit (bool): Commit the change (False when part of a larger update).
+    Raises:
+        ValueError: For unsupported keys.
+        CaseServiceError: For database errors.
+    """
+    if not values and not remove:
+        return
+    dialect_name = db.session.get_bind().dialect.name
+    expression = case_details_update_expression(dialect_name, values, remove)
+
+    try:
+        if expression is None:
+            # No in-place JSON functions on this database: merge in Python
+            target_case = db.session.get(Case, case_id)
+            details = dict(target_case.case_details or {})
+            for path, value in (values or {}).items():
+                path = _details_path(path)
+                if len(path) == 1:
+                    details[path[0]] = value
+                else:
+                    details.setdefault(path[0], {})[path[1]] = value
+            for path in remove:
+                path = _details_path(path)
+                parent = details.get(path[0]) if len(path) == 2 else details
+                if isinstance(parent, dict):
+                    parent.pop(path[-1], None)
+            target_case.case_details = details
+            flag_modified(target_case, 'case_details')
+        else:
+            db.session.execute(
+                update(Case).where(Case.id == case_id).values(case_details=expression)
+                .execution_options(synchronize_session=False)
+            )
+            # A loaded copy of the case would otherwise keep the old details
+            loaded_case = db.session.identity_map.get(identity_key(Case, case_id))
+            if loaded_case is not None:
+                db.session.expire(loaded_case, ['case_details'])
+        if commit:
+            db.session.commit()
+        logger.debug("Updated case_details keys for case %s: set %s, removed %s", case_id, list((values or {}).keys()), list(remove))
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error updating case_details for case %s: %s", case_id, e)
+        raise CaseServiceError(f"Failed to update case details for case {case_id}") from e
+
+
+def get_case_detail(case_id, key, default=None):
+    """Reads a single case_details key in SQL, without loading the rest."""
+    value = db.session.query(Case.case_details[key]).filter(Case.id == case_id).scalar()
+    return default if value is None else value
+
+
+def case_details_has_key(key):
+    """Filter for cases whose case_details has ``key`` (served by the GIN index on Postgres)."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return Case.case_details.op('?')(literal(key, Text))
+    return func.json_type(Case.case_details, _sqlite_path(*_details_path(key))).isnot(None)
+
+
+def get_cases_with_detail_key(user_id, key, profile=PROFILE_LIST):
+    """Fetches a user's cases whose case_details contain ``key``."""
+    return (case_query(profile)
+            .filter(Case.user_id == user_id, case_details_has_key(key))
+            .order_by(Case.display_name)
+            .all())
 
 def _parse_defendants(defendant_str):
     """
@@ -206,12 +482,12 @@ def update_case(case_id, update_data, user_id):
     """
     # Fetch the case using the ownership-checking function
     target_case = get_case_by_id(case_id, user_id)
-    print(f"DEBUG: Retrieved case {case_id} for update")
-    print(f"DEBUG: Current case_details: {target_case.case_details}")
+    logger.debug("Retrieved case %s for update", case_id)
+    logger.debug("Current case_details: %s", target_case.case_details)
 
     # Get allowed fields from model
     mapper = inspect(Case)
-    protected_fields = {'id', 'user_id', 'created_at'}
+    protected_fields = {'id', 'user_id', 'created_at', 'version', 'case_number_bidx'}
     allowed_fields = {col.key for col in mapper.columns if col.key not in protected_fields}
 
     # Get locked fields from case_details
@@ -220,38 +496,34 @@ def update_case(case_id, update_data, user_id):
         locked_fields = update_data['case_details'].get('locked_fields', [])
     elif hasattr(target_case, 'case_details') and isinstance(target_case.case_details, dict):
         locked_fields = target_case.case_details.get('locked_fields', [])
-    print(f"DEBUG: Locked fields: {locked_fields}")
+    logger.debug("Locked fields: %s", locked_fields)
 
     try:
         updated = False
         json_modified = False
 
-        # First handle case_details separately to preserve its structure
+        # First handle case_details separately: only the keys that actually
+        # change are written, in place (see update_case_details)
         if 'case_details' in update_data:
             current_details = target_case.case_details or {}
             new_details = update_data['case_details']
-            print(f"DEBUG: New case_details to merge: {new_details}")
+            logger.debug("New case_details to merge: %s", new_details)
             
             # Ensure new_details is a dict
             if not isinstance(new_details, dict):
-                print(f"Warning: Non-dict value provided for case_details. Setting to empty dict.")
+                logger.warning("Non-dict value provided for case_details. Setting to empty dict.")
                 new_details = {}
+            # Suggestions live in CaseSuggestion now (see suggestion_service)
+            new_details = {key: value for key, value in new_details.items() if key != 'pending_suggestions'}
             
-            # Merge the new details with existing ones
-            merged_details = {**current_details, **new_details}
-            print(f"DEBUG: Merged case_details: {merged_details}")
-            
-            # Always preserve locked_fields if they exist in new_details
-            if 'locked_fields' in new_details:
-                merged_details['locked_fields'] = new_details['locked_fields']
+            changed_details = {key: value for key, value in new_details.items()
+                               if key not in current_details or current_details[key] != value}
             
-            # Update case_details if there are changes
-            if current_details != merged_details:
-                target_case.case_details = merged_details
+            if changed_details:
+                update_case_details(case_id, changed_details, commit=False)
                 json_modified = True
                 updated = True
-                print(f"DEBUG: Updated case_details for case {case_id}")
-                print(f"DEBUG: New case_details value: {target_case.case_details}")
+                logger.debug("Updated case_details keys %s for case %s", list(changed_details), case_id)
 
         # Then handle dedicated fields
         for key, value in update_data.items():
@@ -267,61 +539,61 @@ def update_case(case_id, update_data, user_id):
                     if not stripped_value and is_nullable:
                         new_value = None
                     elif not stripped_value and not is_nullable:
-                        print(f"Warning: Attempted to set non-nullable field '{key}' to empty string. Skipping update.")
+                        logger.warning("Attempted to set non-nullable field '%s' to empty string. Skipping update.", key)
                         continue
                     else:
                         new_value = stripped_value
 
                 # Update if value changed
                 if current_value != new_value:
-                    # Only skip if field is locked AND this is not part of a suggestion application
-                    if key in locked_fields and 'pending_suggestions' not in update_data.get('case_details', {}):
-                        print(f"Field '{key}' is locked. Skipping update.")
+                    if key in locked_fields:
+                        logger.info("Field '%s' is locked. Skipping update.", key)
                         continue
                         
                     setattr(target_case, key, new_value)
                     updated = True
-                    print(f"Updated field {key} for case {case_id}")
+                    logger.info("Updated field %s for case %s", key, case_id)
                     
                     # If defendant field was updated, also update defendants JSON field
                     if key == 'defendant':
                         defendants = _parse_defendants(new_value)
                         target_case.defendants = defendants
-                        print(f"Updated defendants JSON field with {len(defendants)} defendants")
+                        logger.info("Updated defendants JSON field with %s defendants", len(defendants))
 
         # Save changes if any were made
         if updated:
             try:
                 db.session.commit()
-                print(f"Successfully committed updates to case {case_id}")
+                logger.info("Successfully committed updates to case %s", case_id)
             except IntegrityError as e:
                 db.session.rollback()
-                print(f"Integrity error updating case {case_id}: {str(e)}")
+                logger.error("Integrity error updating case %s: %s", case_id, str(e))
                 raise DuplicateCaseError(f"Update would create duplicate case: {str(e)}")
             except Exception as e:
                 db.session.rollback()
-                print(f"Error committing updates to case {case_id}: {str(e)}")
+                logger.error("Error committing updates to case %s: %s", case_id, str(e))
                 raise CaseServiceError(f"Failed to update case: {str(e)}")
         else:
-            print(f"No changes to commit for case {case_id}")
+            logger.info("No changes to commit for case %s", case_id)
 
         return target_case
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error in update_case: {str(e)}")
+        logger.error("Error in update_case: %s", str(e))
         raise CaseServiceError(f"Failed to update case: {str(e)}")
 
 # MODIFIED: Added ownership check (Keep this logic)
 def delete_case(case_id, user_id):
     """
-    Deletes a case from the database, ensuring ownership.
-    Note: This only handles DB deletion. File deletion should be handled separately.
+    Deletes a case from the database, ensuring ownership. Its documents'
+    files are queued for secure erasure in the same transaction and erased
+    by the background shred worker (see services/shred_service.py).
     Args:
         case_id (int): The ID of the case to delete.
         user_id (int): The ID of the user attempting deletion.
     Returns:
-        bool: True if deletion was successful.
+        int: The number of files queued for erasure.
     Raises:
         CaseNotFoundError: If the case is not found.
         Forbidden: If the user does not own the case.
@@ -332,12 +604,15 @@ def delete_case(case_id, user_id):
 
     try:
         # Cascade delete should handle associated Document records if configured in model
+        remove_case_from_index(case_id)
+        queued = enqueue_document_files(target_case.documents, user_id=user_id)
         db.session.delete(target_case)
         db.session.commit()
-        print(f"Case {case_id} deleted successfully from DB via service by user {user_id}.")
-        return True
+        logger.info("Case %s deleted successfully from DB via service by user %s.", case_id, user_id)
+        wake_worker()
+        return queued
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting case {case_id} by user {user_id} via service: {e}")
+        logger.error("Error deleting case %s by user %s via service: %s", case_id, user_id, e)
         raise CaseServiceError(f"Failed to delete case {case_id} from database") from e
 
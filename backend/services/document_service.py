@@ -7,7 +7,9 @@ from werkzeug.utils import secure_filename
 from flask import current_app
 from backend.utils.document_parser import extract_text_from_pdf, extract_text_from_docx
 from flask_login import current_user
-from backend.services.case_service import CaseNotFoundError
+from backend.services.case_service import CaseNotFoundError, touch_case
+from backend.services.search_service import index_document, remove_document_from_index
+from backend.services.shred_service import enqueue_document_files, wake_worker
 # Import our new security module
 from backend.utils.file_security import (
     process_and_validate_file, 
@@ -16,6 +18,9 @@ from backend.utils.file_security import (
     FileTypeNotAllowedError,
     file_security_logger
 )
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- Define Exceptions ---
 class DocumentServiceError(Exception):
@@ -46,7 +51,7 @@ def get_documents_for_case(case_id):
     case = Case.query.filter_by(id=case_id, user_id=current_user.id).first()
     if case is None:
          # Case not found or doesn't belong to the user
-         file_security_logger.warning(f"AUTH ERROR: User {current_user.id} tried to access documents for case {case_id} they don't own.")
+         file_security_logger.warning("AUTH ERROR: User %s tried to access documents for case %s they don't own.", current_user.id, case_id)
          raise AuthorizationError(f"Case with ID {case_id} not found or access denied.")
     # --- END Authorization Check ---
 
@@ -55,16 +60,17 @@ def get_documents_for_case(case_id):
         documents = Document.query.filter_by(case_id=case_id).order_by(Document.upload_date.desc()).all()
         return documents
     except Exception as e:
-        print(f"Error fetching documents for case {case_id} (owned by user {current_user.id}): {e}")
+        logger.error("Error fetching documents for case %s (owned by user %s): %s", case_id, current_user.id, e)
         raise DocumentServiceError(f"Failed to fetch documents for case {case_id}") from e
 
 def delete_document_record(document_id):
     """
-    Deletes a document record from the database and securely deletes the file.
+    Deletes a document record from the database and queues its file for
+    secure erasure by the background shred worker.
     Args:
         document_id (int): The ID of the document record to delete.
     Returns:
-        bool: True if deletion successful.
+        bool: True once the deletion is committed.
     Raises:
         DocumentNotFoundError: If the document record is not found.
         DocumentServiceError: For database errors.
@@ -74,34 +80,21 @@ def delete_document_record(document_id):
         raise DocumentNotFoundError(f"Document record with ID {document_id} not found.")
 
     try:
-        # --- Store file path BEFORE deleting record ---
-        file_path_to_delete = doc_to_delete.file_path
-        # --- END Store ---
-
+        remove_document_from_index(document_id)
+        touch_case(doc_to_delete.case_id)  # Moves the case's Last-Modified past the delete
+        # The file is erased in the background, queued in this transaction:
+        # envelope-encrypted files lose their data key with the row and are
+        # just unlinked, legacy ones get overwrite passes (see shred_service)
+        enqueue_document_files([doc_to_delete], user_id=current_user.id)
         db.session.delete(doc_to_delete)
         db.session.commit()
-        file_security_logger.info(f"Document record deleted from DB via service by User {current_user.id}: {document_id}")
-
-        # --- SECURE File Deletion AFTER DB commit ---
-        if file_path_to_delete and os.path.exists(file_path_to_delete):
-             try:
-                  # Use secure deletion instead of standard os.remove
-                  from backend.utils.secure_deletion import secure_delete_file
-                  secure_delete_result = secure_delete_file(file_path_to_delete)
-                  
-                  if secure_delete_result:
-                      file_security_logger.info(f"Associated file SECURELY deleted from disk: {file_path_to_delete}")
-                  else:
-                      file_security_logger.error(f"Secure deletion failed for file {file_path_to_delete}")
-             except Exception as e:
-                  # Log error but don't fail the operation just because file deletion failed
-                  file_security_logger.error(f"Error during secure deletion of file {file_path_to_delete}: {e}")
-        # --- END Secure File Deletion ---
+        file_security_logger.info("Document record deleted from DB via service by User %s: %s", current_user.id, document_id)
+        wake_worker()
 
         return True
     except Exception as e:
         db.session.rollback()
-        file_security_logger.error(f"Error deleting document record {document_id} via service by User {current_user.id}: {e}")
+        file_security_logger.error("Error deleting document record %s via service by User %s: %s", document_id, current_user.id, e)
         raise DocumentServiceError(f"Failed to delete document record {document_id}") from e
 
 def create_document_and_extract_text(case_id, file_storage):
@@ -117,7 +110,7 @@ def create_document_and_extract_text(case_id, file_storage):
     case = Case.query.filter_by(id=case_id, user_id=current_user.id).first()
     if case is None:
          # Case not found or doesn't belong to the user
-         file_security_logger.warning(f"AUTH ERROR: User {current_user.id} tried to upload document to case {case_id} they don't own.")
+         file_security_logger.warning("AUTH ERROR: User %s tried to upload document to case %s they don't own.", current_user.id, case_id)
          raise AuthorizationError(f"Case with ID {case_id} not found or access denied.")
     # --- END Authorization Check ---
 
@@ -128,9 +121,9 @@ def create_document_and_extract_text(case_id, file_storage):
         # Save the file
         try:
             file_storage.save(file_path)
-            file_security_logger.info(f"File saved securely via service by User {current_user.id} to: {file_path}")
+            file_security_logger.info("File saved securely via service by User %s to: %s", current_user.id, file_path)
         except Exception as e:
-            file_security_logger.error(f"Error saving file {clean_filename} via service by User {current_user.id}: {e}")
+            file_security_logger.error("Error saving file %s via service by User %s: %s", clean_filename, current_user.id, e)
             raise DocumentServiceError(f"Failed to save file {clean_filename} on server") from e
     
         # Create initial DB record
@@ -145,10 +138,10 @@ def create_document_and_extract_text(case_id, file_storage):
             db.session.add(new_doc)
             db.session.commit()
             doc_id = new_doc.id # Get the ID after commit
-            file_security_logger.info(f"Document record created via service with ID: {doc_id}")
+            file_security_logger.info("Document record created via service with ID: %s", doc_id)
         except Exception as e:
             db.session.rollback()
-            file_security_logger.error(f"Error saving document record to DB via service: {e}")
+            file_security_logger.error("Error saving document record to DB via service: %s", e)
             # Clean up the file we just saved if DB record fails
             if os.path.exists(file_path):
                  try: os.remove(file_path)
@@ -158,7 +151,7 @@ def create_document_and_extract_text(case_id, file_storage):
         # Extract text (Best effort) - BEFORE encryption
         extracted_text = None
         try:
-            file_security_logger.info(f"Attempting to parse file via service: {clean_filename}")
+            file_security_logger.info("Attempting to parse file via service: %s", clean_filename)
             if mime_type == 'application/pdf':
                 extracted_text = extract_text_from_pdf(file_path)
             elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or mime_type == 'application/msword':
@@ -166,7 +159,7 @@ def create_document_and_extract_text(case_id, file_storage):
             # Add other parsers if needed
         except Exception as e:
              # Log error but don't necessarily fail the whole operation
-             file_security_logger.error(f"Error extracting text from {clean_filename} (ID: {doc_id}) via service: {e}")
+             file_security_logger.error("Error extracting text from %s (ID: %s) via service: %s", clean_filename, doc_id, e)
              # Optionally raise DocumentServiceError here if extraction is critical
         
         # NOW ENCRYPT THE FILE - after text extraction
@@ -177,18 +170,20 @@ def create_document_and_extract_text(case_id, file_storage):
             import shutil
             shutil.copy2(file_path, temp_backup)
             
-            # Encrypt in place
-            file_encryptor.encrypt_file(file_path)
+            # Encrypt in place with a new data key; the wrapped key goes on the record
+            new_doc.file_key = file_encryptor.encrypt_file(file_path)
+            db.session.commit()
             
             # Remove backup if successful
             os.remove(temp_backup)
-            file_security_logger.info(f"File encrypted successfully: {file_path}")
+            file_security_logger.info("File encrypted successfully: %s", file_path)
         except Exception as e:
             # Restore from backup if encryption fails
+            db.session.rollback()
             if os.path.exists(temp_backup):
                 shutil.copy2(temp_backup, file_path)
                 os.remove(temp_backup)
-            file_security_logger.error(f"Error encrypting file {file_path}: {e}")
+            file_security_logger.error("Error encrypting file %s: %s", file_path, e)
             # Continue without encryption rather than failing the upload
     
         # Update DB record with extracted text (if successful)
@@ -198,21 +193,22 @@ def create_document_and_extract_text(case_id, file_storage):
             if doc_to_update:
                 try:
                     doc_to_update.extracted_text = extracted_text
+                    index_document(doc_id, doc_to_update.case_id, extracted_text, commit=False)
                     db.session.commit()
-                    file_security_logger.info(f"Extracted text saved to DB via service for document ID: {doc_id}")
+                    file_security_logger.info("Extracted text saved to DB via service for document ID: %s", doc_id)
                     # Return the updated object
                     return doc_to_update
                 except Exception as e:
                     db.session.rollback()
                     # Log error but maybe return the object without text? Or raise?
-                    file_security_logger.error(f"Error saving extracted text to DB for doc ID {doc_id} via service: {e}")
+                    file_security_logger.error("Error saving extracted text to DB for doc ID %s via service: %s", doc_id, e)
                     raise DocumentServiceError("Failed to save extracted text to database record") from e
             else:
                  # This shouldn't happen if initial commit succeeded
-                 file_security_logger.error(f"Consistency Error: Could not refetch doc ID {doc_id} to save text.")
+                 file_security_logger.error("Consistency Error: Could not refetch doc ID %s to save text.", doc_id)
                  raise DocumentServiceError("Failed to find document record after creation to save text.")
         else:
-            file_security_logger.info(f"No text extracted or file type not supported for document ID via service: {doc_id}")
+            file_security_logger.info("No text extracted or file type not supported for document ID via service: %s", doc_id)
             # Return the object without the extracted text updated
             return new_doc
     except (FileSizeExceededError, FileTypeNotAllowedError, FileSecurityError) as e:
@@ -220,7 +216,7 @@ def create_document_and_extract_text(case_id, file_storage):
         raise
     except Exception as e:
         # Generic error handling
-        file_security_logger.error(f"Unexpected error in document creation: {e}")
+        file_security_logger.error("Unexpected error in document creation: %s", e)
         raise DocumentServiceError(f"Unexpected error: {str(e)}") from e
         
 
@@ -232,7 +228,7 @@ def get_document_by_id(document_id):
 
     if doc is None:
         # Document not found OR it belongs to a case the user doesn't own
-        file_security_logger.warning(f"AUTH ERROR/NOT FOUND: User {current_user.id} failed to get document ID {document_id}.")
+        file_security_logger.warning("AUTH ERROR/NOT FOUND: User %s failed to get document ID %s.", current_user.id, document_id)
         raise DocumentNotFoundError(f"Document record with ID {document_id} not found or access denied.")
     return doc
 
@@ -255,9 +251,9 @@ def update_document_analysis(document_id, analysis_result):
         doc.analysis_json = analysis_result
         # Optionally update status fields etc.
         db.session.commit()
-        file_security_logger.info(f"Analysis results saved to DB via service by User {current_user.id} for document ID: {document_id}")
+        file_security_logger.info("Analysis results saved to DB via service by User %s for document ID: %s", current_user.id, document_id)
         return doc
     except Exception as e:
         db.session.rollback()
-        file_security_logger.error(f"Error saving analysis results for doc ID {document_id} via service by User {current_user.id}: {e}")
+        file_security_logger.error("Error saving analysis results for doc ID %s via service by User %s: %s", document_id, current_user.id, e)
         raise DocumentServiceError("Failed to save analysis results to database") from e
\ No newline at end of file
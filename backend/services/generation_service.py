@@ -8,6 +8,9 @@ from flask_login import current_user # <--- ADD THIS IMPORT
 
 from backend.services.case_service import get_case_by_id, CaseNotFoundError, CaseServiceError
 from backend.schemas import CaseSchema # <<< Import CaseSchema
+import logging
+
+logger = logging.getLogger(__name__)
 
 class GenerationServiceError(Exception): pass
 class InvalidDocumentTypeError(GenerationServiceError): pass # New specific error
@@ -39,8 +42,8 @@ def answer_interrogatory(case_id, interrogatory_text):
         CaseNotFoundError: If the case_id is not found.
         AnsweringServiceError: For errors during the process.
     """
-    print(f"--- Received request to answer interrogatory for Case ID: {case_id} ---")
-    print(f"Interrogatory Text: {interrogatory_text}")
+    logger.info("Received request to answer interrogatory for Case ID: %s", case_id)
+    logger.info("Interrogatory Text: %s", interrogatory_text)
 
    # --- Step 1: Fetch Case Data ---
     try:
@@ -54,26 +57,26 @@ def answer_interrogatory(case_id, interrogatory_text):
 
         # Convert the combined data to a JSON string for the prompt
         case_details_str = json.dumps(case_data_for_prompt, indent=2)
-        print(f"Successfully fetched case data for Case ID: {case_id}")
+        logger.info("Successfully fetched case data for Case ID: %s", case_id)
 
     except CaseNotFoundError:
-        print(f"ERROR: Case not found for Case ID: {case_id}")
+        logger.error("Case not found for Case ID: %s", case_id)
         # Re-raise the specific error so the calling route can handle it (e.g., return 404)
         raise AnsweringServiceError(f"Cannot access case {case_id} to answer interrogatory.") from e
     except Exception as e:
         # Catch other potential errors during data fetching/processing
-        print(f"ERROR: Failed to fetch or process case data for Case ID: {case_id} - {e}")
+        logger.error("Failed to fetch or process case data for Case ID: %s - %s", case_id, e)
         raise AnsweringServiceError(f"Failed to retrieve data for case {case_id}") from e
 
     # --- Step 2: Construct Prompt (We'll implement this next) ---
     # Placeholder for now
     prompt = f"Placeholder: Construct prompt using interrogatory, objections list, and case data: {interrogatory_text}"
-    print("Placeholder: Prompt constructed.")
+    logger.info("Placeholder: Prompt constructed.")
 
     # --- Step 3: Call AI Model (We'll implement this next) ---
     # Placeholder for now
     ai_response_text = "Placeholder: AI response with objections and answer will go here."
-    print("Placeholder: AI response generated.")
+    logger.info("Placeholder: AI response generated.")
 
     # --- Step 4: Return combined result ---
     return ai_response_text
@@ -132,10 +135,10 @@ DOCUMENT_PROMPTS = {
 
 # --- Modify the service function ---
 def generate_document_for_case(case_id, generation_data):
-    print(f"--- Real Generation Request Received ---")
-    print(f"Case ID: {case_id}, User ID: {current_user.id}") # Log user_id too
-    print(f"Case ID: {case_id}")
-    print(f"Generation Data: {generation_data}")
+    logger.info("Real Generation Request Received")
+    logger.info("Case ID: %s, User ID: %s", case_id, current_user.id) # Log user_id too
+    logger.info("Case ID: %s", case_id)
+    logger.info("Generation Data: %s", generation_data)
 
     doc_type = generation_data.get('document_type')
     custom_instructions = generation_data.get('custom_instructions', 'None') # Default to 'None' string
@@ -163,8 +166,8 @@ def generate_document_for_case(case_id, generation_data):
             case_details_str=case_details_str,
             custom_instructions=custom_instructions
         )
-        print(f"--- Using prompt template: {doc_type} ---")
-        print(f"--- Prompt for Generation (first 500 chars): {prompt[:500]}...")
+        logger.info("Using prompt template: %s", doc_type)
+        logger.debug("Prompt for Generation (first 500 chars): %s...", prompt[:500])
 
 
         # 3. Configure and Call Gemini API (remains the same)
@@ -175,7 +178,7 @@ def generate_document_for_case(case_id, generation_data):
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-1.5-pro-latest') # Using Pro for potentially better drafting
 
-        print(f"--- Calling Gemini API for Generation (Model: {model.model_name}) ---")
+        logger.info("Calling Gemini API for Generation (Model: %s)", model.model_name)
         start_time = time.time()
         # Consider adjusting generation config for creativity/length if needed
         # generation_config = genai.types.GenerationConfig(temperature=0.7)
@@ -184,11 +187,11 @@ def generate_document_for_case(case_id, generation_data):
              # generation_config=generation_config
         )
         end_time = time.time()
-        print(f"--- Gemini Generation Call took {end_time - start_time:.2f} seconds ---")
+        logger.info("Gemini Generation Call took %.2f seconds", end_time - start_time)
 
         # 4. Process Response (remains the same)
         generated_text = response.text
-        print(f"--- Gemini Generated Text (first 500 chars): {generated_text[:500]}...")
+        logger.info("Gemini Generated Text (first 500 chars): %s...", generated_text[:500])
 
         return generated_text
 
@@ -196,5 +199,5 @@ def generate_document_for_case(case_id, generation_data):
     except (CaseNotFoundError, InvalidDocumentTypeError, ValueError):
         raise
     except Exception as e:
-        print(f"ERROR: Gemini API call failed during generation for case {case_id}, type {doc_type}: {e}")
+        logger.error("Gemini API call failed during generation for case %s, type %s: %s", case_id, doc_type, e)
         raise GenerationServiceError(f"Failed to generate document using AI for case {case_id}") from e
\ No newline at end of file
@@ -0,0 +1,106 @@
+# --- backend/services/job_service.py ---
+"""
+Background jobs for uploads too slow for one request (medical record
+summaries, subpoena batches).
+
+start_job() records a BackgroundJob row and runs the work in a thread of the
+worker that received the upload. Status, progress and the result are kept in
+the row, so the status and download endpoints work whichever gunicorn worker
+the poll reaches. Results are encrypted at rest (EncryptedJSON/EncryptedText).
+
+A finished job expires ttl seconds later; expired rows are deleted whenever a
+job is started or read. A running job whose row hasn't changed for ttl
+seconds (its worker was restarted mid-job) is reported as failed.
+"""
+import base64
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from backend.extensions import db
+from backend.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+STOPPED_ERROR = "The job stopped before finishing (the server was restarted); please start it again."
+
+
+def prune_jobs(now=None):
+    """Deletes expired jobs; returns how many."""
+    now = now or datetime.utcnow()
+    deleted = (BackgroundJob.query.filter(BackgroundJob.expires_at < now)
+               .delete(synchronize_session=False))
+    db.session.commit()
+    return deleted
+
+
+def _update_job(job_id, **values):
+    values['updated_at'] = datetime.utcnow()
+    BackgroundJob.query.filter_by(id=job_id).update(values, synchronize_session=False)
+    db.session.commit()
+
+
+def job_status(job):
+    """The JSON view of a job: id, kind, status, error, its progress fields, and its result once done."""
+    status = {'id': job.id, 'kind': job.kind, 'status': job.status, 'error': job.error}
+    status.update(job.progress or {})
+    status['result'] = job.result if job.status == BackgroundJob.STATUS_DONE else None
+    return status
+
+
+def start_job(kind, user_id, work, ttl=3600, progress=None):
+    """
+    Runs ``work(report)`` in a background thread, inside an app context.
+    ``report(**fields)`` replaces the job's progress fields; ``work`` returns
+    (result, document): a JSON-safe result and optional file bytes.
+
+    Returns:
+        dict: The job's status (see job_status); poll get_job with its id.
+    """
+    app = current_app._get_current_object()
+    prune_jobs()
+    job = BackgroundJob(id=uuid.uuid4().hex, kind=kind, user_id=user_id, status=BackgroundJob.STATUS_RUNNING,
+                        progress=dict(progress or {}), ttl_seconds=ttl)
+    db.session.add(job)
+    db.session.commit()
+    job_id, status = job.id, job_status(job)
+
+    def run():
+        with app.app_context():
+            try:
+                result, document = work(lambda **fields: _update_job(job_id, progress=fields))
+                _update_job(job_id, status=BackgroundJob.STATUS_DONE, result=result,
+                            document=base64.b64encode(document).decode('ascii') if document is not None else None,
+                            expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+            except Exception as e:
+                logger.warning("%s job %s failed: %s", kind, job_id, e)
+                db.session.rollback()
+                _update_job(job_id, status=BackgroundJob.STATUS_FAILED, error=str(e),
+                            expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name=f"{kind}-{job_id[:8]}", daemon=True).start()
+    return status
+
+
+def get_job(job_id, user_id, kind):
+    """The job, or None if there's no such job of this kind for this user (or it expired)."""
+    now = datetime.utcnow()
+    prune_jobs(now)
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or job.user_id != user_id or job.kind != kind:
+        return None
+    if job.status == BackgroundJob.STATUS_RUNNING and job.updated_at < now - timedelta(seconds=job.ttl_seconds):
+        _update_job(job.id, status=BackgroundJob.STATUS_FAILED, error=STOPPED_ERROR,
+                    expires_at=now + timedelta(seconds=job.ttl_seconds))
+        db.session.refresh(job)
+    return job
+
+
+def job_document(job):
+    """The file bytes a finished job produced (None if it produced none)."""
+    return base64.b64decode(job.document) if job.document is not None else None
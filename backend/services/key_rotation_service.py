@@ -0,0 +1,286 @@
+# --- backend/services/key_rotation_service.py ---
+"""
+Re-encryption of field-level encrypted columns after a key rotation.
+
+Every column typed EncryptedString/EncryptedText/EncryptedJSON is rotated
+table by table, in primary-key order:
+  - a batch of rows is read as raw ciphertext (no per-value decryption by the
+    column type), skipping rows past the table's checkpoint;
+  - values not yet on the active key are decrypted and re-encrypted by a
+    thread pool, without decoding the plaintext;
+  - the changed rows are written with one executemany UPDATE and committed,
+    then the checkpoint (last primary key per table) is saved in the key
+    metadata. The UPDATE only matches rows whose values are still the ones
+    read, so a user's edit in between is never overwritten: those rows are
+    read again and re-encrypted from their new values.
+
+Columns with an encryption switch (see BlindIndexed in utils/db_types.py)
+may hold plaintext: it is encrypted while the switch is on and left alone
+while it is off. Blind indexes hash the plaintext, so they never change.
+
+A crash loses at most the batch in flight: the next run resumes after the
+checkpoint, and values already on the active key are left alone, so
+re-running a batch is harmless.
+
+Uploaded files use envelope encryption (utils/file_encryption.py): rotating
+their key-encryption key only rewraps each document's small data key
+(rewrap_file_keys), never the file bytes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, update, bindparam, func, or_, and_, Text, type_coerce
+
+from backend.extensions import db
+from backend.models import Document
+from backend.utils.encryption import field_encryptor, KEY_TAG
+from backend.utils.file_encryption import file_encryptor
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# --- Custom Exceptions ---
+class KeyRotationError(Exception):
+    """Raised when re-encrypting a batch fails; the rotation can be resumed."""
+    pass
+
+
+def encrypted_columns(tables=None):
+    """
+    Maps each table with encrypted columns to those columns.
+    Defaults to every table of the models' metadata.
+    """
+    from backend.utils.db_types import ENCRYPTED_TYPES
+    tables = tables if tables is not None else db.metadata.sorted_tables
+    found = {}
+    for table in tables:
+        columns = [column for column in table.columns if isinstance(column.type, ENCRYPTED_TYPES)]
+        if not columns:
+            continue
+        if len(table.primary_key.columns) != 1:
+            raise KeyRotationError(f"Table {table.name} needs a single-column primary key to be rotated")
+        found[table] = columns
+    return found
+
+
+def _raw(column):
+    return type_coerce(column, Text)
+
+
+def _tag_prefix(key_id):
+    return (KEY_TAG + key_id.encode('ascii') + KEY_TAG).decode('ascii')
+
+
+def _active_prefix():
+    return _tag_prefix(field_encryptor.active_key_id)
+
+
+def _switched_off(column):
+    switch = getattr(column.type, 'switch', None)
+    return switch is not None and not field_encryptor.enabled(switch)
+
+
+def _stale(column, key_id=None):
+    """SQL condition: the column holds a value not encrypted with the active (or given) key."""
+    prefix = _tag_prefix(key_id) if key_id else _active_prefix()
+    condition = and_(column.isnot(None), ~_raw(column).startswith(prefix, autoescape=True))
+    if _switched_off(column):
+        # Plaintext is expected there; only ciphertext from older keys is stale
+        condition = and_(condition, _raw(column).startswith(KEY_TAG.decode('ascii'), autoescape=True))
+    return condition
+
+
+def _reencryptor(column):
+    """The function bringing one stored value of ``column`` onto the active key."""
+    if getattr(column.type, 'switch', None) is None:
+        return field_encryptor.reencrypt
+    encrypt_plaintext = not _switched_off(column)
+
+    def reencrypt(value):
+        if value is None or field_encryptor.is_encrypted(value):
+            return field_encryptor.reencrypt(value)
+        return field_encryptor.encrypt(value).decode('utf-8') if encrypt_plaintext else value
+    return reencrypt
+
+
+def _reencrypt_rows(rows, reencryptors, pool, chunk_size=50):
+    """
+    Re-encrypts the rows' values (list of dicts) in the pool, with one
+    function per column key (see _reencryptor); returns the rows that changed.
+    """
+    column_keys = list(reencryptors)
+
+    def work(chunk):
+        changed = []
+        for row in chunk:
+            new_values = {key: reencryptors[key](row[key]) for key in column_keys}
+            if any(new_values[key] != row[key] for key in column_keys):
+                changed.append({**row, **new_values})
+        return changed
+
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    return [row for changed in pool.map(work, chunks) for row in changed]
+
+
+# Times a batch's rows edited while being re-encrypted are read again before giving up
+CONFLICT_RETRIES = 3
+
+
+def _update_unchanged(statement, params):
+    """
+    Runs an UPDATE whose WHERE also matches each row's old values; returns
+    how many rows it wrote (rows changed since they were read are skipped).
+    """
+    statement = statement.execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+        return db.session.execute(statement, params).rowcount
+    return sum(db.session.execute(statement, row).rowcount for row in params)
+
+
+def _rotate_table(table, columns, pool, batch_size):
+    pk = table.primary_key.columns.values()[0]
+    column_keys = [column.key for column in columns]
+    reencryptors = {column.key: _reencryptor(column) for column in columns}
+    progress = field_encryptor.rotation['tables'].get(table.name, {})
+    last_id = progress.get('last_id')  # None: from the start (keys may be integers or strings)
+    query = select(pk.label('_pk'), *[_raw(column).label(column.key) for column in columns])
+    statement = update(table).where(
+        pk == bindparam('_pk'),
+        # Unchanged since read: a concurrent edit is kept, not overwritten
+        *[_raw(column).isnot_distinct_from(bindparam(f'_old_{column.key}', type_=Text)) for column in columns],
+    ).values({key: bindparam(f'_new_{key}', type_=Text) for key in column_keys})
+    total = 0
+    while True:
+        batch_query = query.where(pk > last_id) if last_id is not None else query
+        batch = db.session.execute(batch_query.order_by(pk).limit(batch_size)).mappings().all()
+        if not batch:
+            break
+        rows = [dict(row) for row in batch]
+        written = 0
+        try:
+            pending = rows
+            for _ in range(CONFLICT_RETRIES + 1):
+                changed = _reencrypt_rows(pending, reencryptors, pool)
+                if not changed:
+                    break
+                read = {row['_pk']: row for row in pending}
+                params = [{'_pk': row['_pk'],
+                           **{f'_old_{key}': read[row['_pk']][key] for key in column_keys},
+                           **{f'_new_{key}': row[key] for key in column_keys}}
+                          for row in changed]
+                count = _update_unchanged(statement, params)
+                written += count
+                if count == len(changed):
+                    break
+                # Edited since read: re-encrypt the current values (rows already written are now current)
+                pending = [dict(row) for row in db.session.execute(
+                    query.where(pk.in_([row['_pk'] for row in changed])).order_by(pk)).mappings()]
+            else:
+                raise KeyRotationError("rows kept changing while being re-encrypted")
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise KeyRotationError(f"Re-encrypting {table.name} after id {last_id} failed: {e}") from e
+        last_id = rows[-1]['_pk']
+        field_encryptor.save_rotation_checkpoint(table.name, last_id, written)
+        total += written
+        logger.debug("Key rotation: %s up to id %s (%s rows re-encrypted)", table.name, last_id, written)
+    return total
+
+
+def rotate_encrypted_columns(batch_size=500, workers=4, tables=None):
+    """
+    Re-encrypts every encrypted column with the active key, resuming from the
+    rotation checkpoint in the key metadata. Returns rows re-encrypted per table.
+
+    Raises:
+        KeyRotationError: If a batch fails; it was rolled back and the
+            checkpoint still points before it.
+    """
+    if not field_encryptor.rotation:
+        raise KeyRotationError("No key rotation in progress")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(int(workers), 1)) as pool:
+        for table, columns in encrypted_columns(tables).items():
+            results[table.name] = _rotate_table(table, columns, pool, max(int(batch_size), 1))
+    return results
+
+
+def rotation_status(tables=None):
+    """
+    Rows still holding values from an older key (or untagged values), per
+    table, with the rotation checkpoint from the key metadata.
+    """
+    tables_status = {}
+    for table, columns in encrypted_columns(tables).items():
+        counts = db.session.execute(select(
+            func.count().label('rows'),
+            func.count().filter(or_(*[_stale(column) for column in columns])).label('stale'),
+        ).select_from(table)).one()
+        tables_status[table.name] = {'rows': counts.rows, 'stale_rows': counts.stale}
+    return {
+        'active_key_id': field_encryptor.active_key_id,
+        'rotation': field_encryptor.rotation,
+        'tables': tables_status,
+        'stale_rows': sum(status['stale_rows'] for status in tables_status.values()),
+    }
+
+
+# --- File data keys ---
+
+def rewrap_file_keys(batch_size=1000):
+    """
+    Rewraps every document's data key with the active file key-encryption
+    key, in batches of documents still on an older key, each committed.
+    Naturally resumable: a rerun only finds the documents not yet rewrapped.
+    Document versions and updated_at are kept, as the documents don't change.
+    A data key erased or replaced meanwhile (the document was deleted or
+    re-uploaded) is left as it is, so a deleted file is never made readable.
+    Returns the number of data keys rewrapped.
+    """
+    stale = _stale(Document.file_key, file_encryptor.active_kek_id)
+    statement = update(Document.__table__).where(
+        Document.id == bindparam('_id'), Document.file_key == bindparam('_old_file_key'),
+    ).values(
+        file_key=bindparam('_file_key'),
+        version=Document.__table__.c.version,
+        updated_at=Document.__table__.c.updated_at,
+    )
+    total, last_id = 0, 0
+    while True:
+        batch = db.session.execute(
+            select(Document.id, Document.file_key)
+            .where(stale, Document.id > last_id)
+            .order_by(Document.id)
+            .limit(max(int(batch_size), 1))
+        ).all()
+        if not batch:
+            break
+        try:
+            params = [{'_id': document_id, '_old_file_key': file_key,
+                       '_file_key': file_encryptor.rewrap_key(file_key)}
+                      for document_id, file_key in batch]
+            rewrapped = _update_unchanged(statement, params)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise KeyRotationError(f"Rewrapping file keys after document {last_id} failed: {e}") from e
+        last_id = batch[-1][0]
+        total += rewrapped
+        logger.debug("Rewrapped file keys up to document %s (%s so far)", last_id, total)
+    return total
+
+
+def file_key_status():
+    """Documents whose data key is on an older key-encryption key, and legacy (unwrapped) files."""
+    counts = db.session.execute(select(
+        func.count().label('documents'),
+        func.count().filter(_stale(Document.file_key, file_encryptor.active_kek_id)).label('stale'),
+        func.count().filter(Document.file_key.is_(None)).label('legacy'),
+    ).select_from(Document)).one()
+    return {
+        'active_kek_id': file_encryptor.active_kek_id,
+        'documents': counts.documents,
+        'stale_keys': counts.stale,
+        'legacy_files': counts.legacy,
+    }
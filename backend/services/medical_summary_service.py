@@ -0,0 +1,681 @@
+# --- backend/services/medical_summary_service.py ---
+"""
+Medical record summaries from provider billing tables.
+
+Record productions come with a ledger of providers: Provider, Provider
+Specialty, First/Last Service Date and Total Billed columns. Those are read
+locally into rows:
+  - tables drawn with ruling lines go through PyMuPDF table detection
+    (document_parser.extract_page_tables);
+  - text-only ledgers are read from word positions: the header line gives
+    the columns (a header may wrap onto a second line), every word goes to
+    the column it starts in, and lines without a date or amount are
+    continuations of the row above (wrapped provider names, with the
+    figures on the row's first line);
+  - Word documents' tables are read cell by cell.
+Each row is validated (provider, parseable dates, amount); the model only
+sees the rows that fail.
+
+Large productions are split into page-range chunks read concurrently (the
+map step; chunks without a ledger have their text read by the model), and
+the rows reduced into one entry per provider: overall service date range,
+summed billed amounts. summarize_records() does both and writes the Word
+document; start_summary_job() runs it as a background job with progress.
+"""
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from statistics import median
+
+import docx
+
+from backend.utils import document_parser
+from backend.services import job_service
+from backend.services.analysis_service import call_gemini_json, AnalysisServiceError
+from backend.services.subpoena_service import normalize_provider_name
+
+logger = logging.getLogger(__name__)
+
+MISSING = 'Missing Information'
+MULTIPLE_DATES_NOTE = 'may need to check for additional service dates'
+
+FIELDS = ('provider', 'specialty', 'first_date', 'last_date', 'total_billed')
+FIELD_LABELS = {
+    'provider': 'Provider',
+    'specialty': 'Provider Specialty',
+    'first_date': 'First Service Date',
+    'last_date': 'Last Service Date',
+    'total_billed': 'Total Billed',
+}
+# Checked in this order, so "Provider Specialty" is taken by specialty before
+# provider gets a look at it
+COLUMN_PATTERNS = (
+    ('specialty', re.compile(r'special|type\s+of\s+service', re.IGNORECASE)),
+    ('first_date', re.compile(r'first|start|from\b', re.IGNORECASE)),
+    ('last_date', re.compile(r'last|end|through|thru', re.IGNORECASE)),
+    ('total_billed', re.compile(r'billed|charges|amount', re.IGNORECASE)),
+    ('provider', re.compile(r'provider|facility', re.IGNORECASE)),
+)
+
+DATE_PATTERN = re.compile(r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{4}|\d{2})\b|\b(\d{4})-(\d{2})-(\d{2})\b')
+AMOUNT_PATTERN = re.compile(r'^\(?-?\$?\s*-?(\d{1,3}(,\d{3})+|\d+)(\.\d{1,2})?\)?$')
+TOTAL_ROW_PATTERN = re.compile(r'^(grand\s+)?totals?\b', re.IGNORECASE)
+
+
+class MedicalSummaryServiceError(Exception):
+    """Base exception for medical summary errors."""
+    pass
+
+class NoTextExtractedError(MedicalSummaryServiceError):
+    """Raised when nothing could be read from the uploaded file."""
+    pass
+
+
+# --- Columns ---
+def match_columns(header):
+    """
+    Maps table fields to header positions.
+
+    Args:
+        header (list[str]): Column names, left to right.
+
+    Returns:
+        dict: field -> column index, or None when the header isn't a provider
+        ledger (it needs a provider column and a date or billed column).
+    """
+    columns = {}
+    for index, name in enumerate(header):
+        for field, pattern in COLUMN_PATTERNS:
+            if field not in columns and pattern.search(name or ''):
+                columns[field] = index
+                break
+    if 'provider' not in columns or not ({'first_date', 'total_billed'} & columns.keys()):
+        return None
+    return columns
+
+
+def _row_from_cells(cells, columns, page=None, source='table'):
+    row = {field: ' '.join((cells[index] or '').split()) if index < len(cells) else ''
+           for field, index in columns.items()}
+    for field in FIELDS:
+        row.setdefault(field, '')
+    row.update({'page': page, 'source': source, 'columns': sorted(columns),
+                'raw': ' | '.join(f"{FIELD_LABELS[field]}: {row[field]}" for field in FIELDS if row[field])})
+    return row
+
+
+def _is_total_row(row):
+    """Grand total lines: labelled "Total", or an amount with no provider and no dates."""
+    if TOTAL_ROW_PATTERN.match(row['provider']):
+        return True
+    return not row['provider'] and not row['first_date'] and not row['last_date'] and bool(row['total_billed'])
+
+
+# --- Word positions ---
+def _group_lines(words):
+    """Groups page.get_text("words") tuples into lines, top to bottom, each sorted left to right."""
+    lines = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if lines and abs(center - lines[-1]['center']) <= (word[3] - word[1]) / 2:
+            lines[-1]['words'].append(word)
+        else:
+            lines.append({'center': center, 'words': [word]})
+    for line in lines:
+        line['words'].sort(key=lambda w: w[0])
+        line['y0'] = min(w[1] for w in line['words'])
+        line['y1'] = max(w[3] for w in line['words'])
+        line['text'] = ' '.join(w[4] for w in line['words'])
+    return lines
+
+
+def _header_cells(words, gap):
+    """Clusters header words into cells: words overlapping or closer than ``gap`` horizontally."""
+    cells = []
+    for word in sorted(words, key=lambda w: w[0]):
+        if cells and word[0] - cells[-1]['x1'] <= gap:
+            cells[-1]['words'].append(word)
+            cells[-1]['x1'] = max(cells[-1]['x1'], word[2])
+        else:
+            cells.append({'x0': word[0], 'x1': word[2], 'words': [word]})
+    for cell in cells:
+        cell['name'] = ' '.join(w[4] for w in sorted(cell['words'], key=lambda w: (round(w[1]), w[0])))
+    return cells
+
+
+def find_layout_header(lines):
+    """
+    Finds a provider ledger header among the lines of a page.
+
+    Returns:
+        (index of the first line after the header, column boundaries, columns)
+        or None. Boundaries are the x positions where each column starts:
+        a line height left of its header cell, or the end of the one before.
+    """
+    for i, line in enumerate(lines):
+        if not dict(COLUMN_PATTERNS)['provider'].search(line['text']):
+            continue
+        band = [line]
+        height = line['y1'] - line['y0']
+        following = lines[i + 1] if i + 1 < len(lines) else None
+        # "First Service" / "Date": a wrapped header line has no figures in it
+        if following and following['y0'] - line['y1'] < height and not re.search(r'\d', following['text']):
+            band.append(following)
+        words = [word for part in band for word in part['words']]
+        cells = _header_cells(words, gap=height * 0.6)
+        columns = match_columns([cell['name'] for cell in cells])
+        if columns is None or len(columns) < 3:
+            continue
+        # Text runs on to the right of its header (long names), figures may
+        # start a little left of theirs (right-aligned amounts)
+        bounds = [float('-inf')] + [max(cells[k - 1]['x1'], cells[k]['x0'] - height) for k in range(1, len(cells))]
+        return i + len(band), bounds, columns
+    return None
+
+
+def _split_line(line, bounds):
+    cells = [[] for _ in bounds]
+    for word in line['words']:
+        column = max(k for k, bound in enumerate(bounds) if bound <= word[0])
+        cells[column].append(word[4])
+    return [' '.join(cell) for cell in cells]
+
+
+def layout_rows(lines, bounds, columns, page=None):
+    """
+    Reads ledger rows from lines below a header. A line with a date or an
+    amount in its columns starts a row; a line without either, close below
+    a row, continues it (wrapped names). Anything else is skipped.
+    """
+    key_columns = [columns[field] for field in ('first_date', 'last_date', 'total_billed') if field in columns]
+    heights = [line['y1'] - line['y0'] for line in lines] or [0]
+    max_gap = median(heights) * 0.8
+    rows, current, previous = [], None, None
+    for line in lines:
+        cells = _split_line(line, bounds)
+        if any(re.search(r'\d', cells[index]) for index in key_columns):
+            current = {'cells': cells, 'lines': [line['text']]}
+            rows.append(current)
+        elif current is not None and line['y0'] - previous['y1'] <= max_gap:
+            current['cells'] = [f"{a} {b}".strip() for a, b in zip(current['cells'], cells)]
+            current['lines'].append(line['text'])
+        else:
+            current = None
+        previous = line
+
+    result = []
+    for item in rows:
+        row = _row_from_cells(item['cells'], columns, page=page, source='layout')
+        row['raw'] += f" [line text: {' / '.join(item['lines'])}]"
+        result.append(row)
+    return result
+
+
+# --- Documents ---
+def _drawn_rows(page, number):
+    rows = []
+    for table in document_parser.extract_page_tables(page):
+        columns = match_columns(table['header'])
+        if columns:
+            rows.extend(_row_from_cells([cells.get(name, '') for name in table['header']], columns, page=number)
+                        for cells in table['rows'])
+    return rows
+
+
+def _read_page(doc, index, headers):
+    """
+    A page's ruled ledger rows and text lines, noting in ``headers`` what
+    the page has for later pages: 'drawn', a text ledger header
+    (start line, bounds, columns) or None.
+    """
+    page = doc[index]
+    drawn = _drawn_rows(page, index + 1)
+    if drawn:
+        headers[index] = 'drawn'
+        return drawn, None
+    lines = _group_lines(page.get_text("words"))
+    headers[index] = find_layout_header(lines)
+    return [], lines
+
+
+def layout_before(doc, start, headers):
+    """
+    The text ledger columns in effect at page index ``start``: those of the
+    last header before it, or None (no ledger, or a ruled table after it).
+    Pages already read are looked up in ``headers``, so chunks reading
+    backwards don't read any page twice.
+    """
+    for index in range(start - 1, -1, -1):
+        if index not in headers:
+            _read_page(doc, index, headers)
+        header = headers[index]
+        if header == 'drawn':
+            return None
+        if header is not None:
+            return header[1:]
+    return None
+
+
+def extract_pdf_rows(doc, pages=None, layout=None, headers=None):
+    """
+    Provider rows from the pages of a PDF; a ledger running on to pages
+    without a header keeps the last columns found.
+
+    Args:
+        doc (fitz.Document): The PDF.
+        pages (range): Page indexes to read (default: all).
+        layout: Text ledger columns carried in from earlier pages (see layout_before).
+        headers (dict): Filled in with what each page read has (see _read_page).
+
+    Returns:
+        list[dict]: rows (FIELDS as text, plus page, source and raw text), or
+        an empty list when no page has a provider ledger.
+    """
+    rows, headers = [], {} if headers is None else headers
+    for index in pages if pages is not None else range(len(doc)):
+        drawn, lines = _read_page(doc, index, headers)
+        if drawn:
+            rows.extend(drawn)
+            layout = None
+            continue
+        if headers[index] is not None:
+            start, bounds, columns = headers[index]
+            layout = (bounds, columns)
+            lines = lines[start:]
+        if layout is not None:
+            rows.extend(layout_rows(lines, *layout, page=index + 1))
+    return [row for row in rows if not _is_total_row(row)]
+
+
+def extract_docx_rows(docx_source):
+    """Provider rows from the tables of a Word document (first row: header)."""
+    rows = []
+    for table in document_parser.open_docx(docx_source).tables:
+        cells = [[cell.text for cell in row.cells] for row in table.rows]
+        columns = match_columns(cells[0]) if cells else None
+        if columns:
+            rows.extend(_row_from_cells(row, columns) for row in cells[1:] if any(text.strip() for text in row))
+    return [row for row in rows if not _is_total_row(row)]
+
+
+# --- Validation ---
+def parse_date(value):
+    """The first date in ``value`` (time of day ignored), or None."""
+    match = DATE_PATTERN.search(value or '')
+    if not match:
+        return None
+    try:
+        if match.group(4):
+            return datetime(int(match.group(4)), int(match.group(5)), int(match.group(6))).date()
+        year = int(match.group(3))
+        if year < 100:
+            year += 2000 if year < 70 else 1900
+        return datetime(year, int(match.group(1)), int(match.group(2))).date()
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    """'$1,234.50' -> Decimal('1234.50'); '(25.00)' is negative. None if it isn't an amount."""
+    value = (value or '').strip()
+    if not AMOUNT_PATTERN.match(value):
+        return None
+    try:
+        amount = Decimal(re.sub(r'[^\d.]', '', value))
+    except InvalidOperation:
+        return None
+    return -amount if value.startswith('(') or '-' in value else amount
+
+
+def validate_row(row):
+    """
+    Parses a row's dates and amount.
+
+    Returns:
+        (parsed row, problems): provider, specialty, first_date/last_date
+        (date or None), total_billed (Decimal or None); problems lists the
+        fields that are missing or unreadable.
+    """
+    parsed = {
+        'provider': row.get('provider', '').strip(),
+        'specialty': row.get('specialty', '').strip(),
+        'first_date': parse_date(row.get('first_date')),
+        'last_date': parse_date(row.get('last_date')),
+        'total_billed': parse_amount(row.get('total_billed')),
+        'page': row.get('page'),
+        'source': row.get('source'),
+    }
+    # Only the columns the table has are required
+    columns = row.get('columns', FIELDS)
+    problems = [field for field in ('provider', 'first_date', 'total_billed')
+                if field in columns and parsed[field] in (None, '')]
+    if (row.get('last_date') or '').strip() and parsed['last_date'] is None:
+        problems.append('last_date')
+    return parsed, problems
+
+
+ROW_FIELDS_PROMPT = (
+    "For each row return provider (name), specialty (type of service), first_service_date and last_service_date "
+    "(MM/DD/YYYY, ignore time of day) and total_billed (a number, no currency sign). "
+    "Only use the text given; use null for anything that isn't there. "
+)
+REPAIR_PROMPT = (
+    "Each line below is one row of a medical provider billing table whose columns could not be read reliably. "
+    + ROW_FIELDS_PROMPT +
+    'Return JSON: {"rows": [{"index": 0, "provider": "...", "specialty": "...", '
+    '"first_service_date": "...", "last_service_date": "...", "total_billed": "..."}]}\n\n'
+)
+TEXT_ROWS_PROMPT = (
+    "Below are pages of a medical record production, possibly in a messy or misaligned format. "
+    "List every medical provider with its billing details, one row per provider. "
+    + ROW_FIELDS_PROMPT +
+    "Do NOT invent or add any providers that are not in the text. "
+    'Return JSON: {"rows": [{"provider": "...", "specialty": "...", '
+    '"first_service_date": "...", "last_service_date": "...", "total_billed": "..."}]}\n\n'
+)
+
+
+def _row_from_model(item, row=None):
+    """A row (as read from a table) from one of the model's JSON rows."""
+    return dict(row or {'page': None, 'raw': ''}, source='ai', **{
+        'provider': str(item.get('provider') or ''),
+        'specialty': str(item.get('specialty') or ''),
+        'first_date': str(item.get('first_service_date') or ''),
+        'last_date': str(item.get('last_service_date') or ''),
+        'total_billed': str(item.get('total_billed') or ''),
+    })
+
+
+def repair_rows(rows, api_key=None):
+    """
+    Asks the model to read rows that failed validation, in one call.
+
+    Returns:
+        list[dict]: The rows (same order) as the model read them; a row it
+        didn't return comes back unchanged.
+    """
+    listing = '\n'.join(f"{index}: {row['raw']}" for index, row in enumerate(rows))
+    response = call_gemini_json(REPAIR_PROMPT + listing, api_key=api_key)
+    by_index = {item.get('index'): item for item in (response or {}).get('rows', []) if isinstance(item, dict)}
+    repaired = []
+    for index, row in enumerate(rows):
+        item = by_index.get(index)
+        if item is None:
+            repaired.append(row)
+            continue
+        repaired.append(_row_from_model(item, row))
+    return repaired
+
+
+def resolve_rows(rows, api_key=None):
+    """
+    Validates rows, sending only the failing ones to the model.
+
+    Returns:
+        (parsed rows in document order, stats: rows, repaired, unresolved)
+    """
+    checked = [validate_row(row) for row in rows]
+    failing = [index for index, (_, problems) in enumerate(checked) if problems]
+    stats = {'rows': len(rows), 'repaired': 0, 'unresolved': 0}
+    if failing and not api_key:
+        logger.debug("%s of %s provider rows failed validation, no AI key to repair them", len(failing), len(rows))
+        stats['unresolved'] = len(failing)
+    elif failing:
+        logger.debug("%s of %s provider rows failed validation, asking the model", len(failing), len(rows))
+        try:
+            repaired = repair_rows([rows[index] for index in failing], api_key=api_key)
+        except AnalysisServiceError as e:
+            logger.debug("Row repair failed, keeping the rows as read: %s", e)
+            repaired = [rows[index] for index in failing]
+        for index, row in zip(failing, repaired):
+            parsed, problems = validate_row(row)
+            checked[index] = (parsed, problems)
+            stats['unresolved' if problems else 'repaired'] += 1
+    return [parsed for parsed, _ in checked], stats
+
+
+# --- Output ---
+def _format_date(value):
+    return value.strftime('%m/%d/%Y') if value else None
+
+
+def format_provider(row):
+    """The (a)-(d) lines for one provider."""
+    first, last = _format_date(row['first_date']), _format_date(row['last_date'])
+    if first and last and first != last:
+        dates = f"{first} - {last} ({MULTIPLE_DATES_NOTE})"
+    else:
+        dates = first or last or MISSING
+    cost = f"${row['total_billed']:,.2f}" if row['total_billed'] is not None else MISSING
+    return [
+        f"(a) {row['provider'] or MISSING}",
+        f"(b) {row['specialty'] or MISSING}",
+        f"(c) {dates}",
+        f"(d) {cost}",
+    ]
+
+
+def format_summary(rows):
+    """Summary lines for all providers, a blank line between providers."""
+    lines = []
+    for row in rows:
+        if lines:
+            lines.append('')
+        lines.extend(format_provider(row))
+    return lines
+
+
+def write_summary_document(providers, failed_chunks=()):
+    """The summary as a Word document (BytesIO), one provider at a time."""
+    document = docx.Document()
+    for index, provider in enumerate(providers):
+        if index:
+            document.add_paragraph('')
+        for line in format_provider(provider):
+            document.add_paragraph(line).style.font.name = 'Times New Roman'
+    for chunk in failed_chunks:
+        document.add_paragraph('')
+        document.add_paragraph(f"Pages {chunk['pages']} could not be summarized: {chunk['error']}")
+    output = io.BytesIO()
+    document.save(output)
+    output.seek(0)
+    return output
+
+
+# --- Map: page-range chunks ---
+def plan_chunks(page_count, chunk_pages):
+    """Page index ranges of at most chunk_pages pages covering the document."""
+    chunk_pages = max(1, int(chunk_pages))
+    return [range(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+def _page_text(page):
+    """The longer of plain text and text blocks: messy ledgers come out better one way or the other."""
+    plain = page.get_text("text")
+    blocks = "\n".join(b[4] for b in page.get_text("blocks") if b[4].strip())
+    return plain if len(plain) > len(blocks) else blocks
+
+
+def rows_from_text(text, api_key=None):
+    """Provider rows the model reads from text with no recognizable table."""
+    if not api_key:
+        raise AnalysisServiceError("AI API Key is not configured.")
+    response = call_gemini_json(TEXT_ROWS_PROMPT + text, api_key=api_key)
+    return [_row_from_model(item) for item in (response or {}).get('rows', []) if isinstance(item, dict)]
+
+
+def summarize_chunk(doc, pages, api_key=None, headers=None):
+    """
+    The map step for one page range: its ledger rows, validated (and the
+    failing ones repaired by the model), or rows the model reads from the
+    text when there's no ledger. Only the PDF reading holds the PDF lock.
+    ``headers`` is shared by the chunks of a document (see layout_before).
+
+    Returns:
+        (parsed rows, stats)
+    """
+    headers = {} if headers is None else headers
+    with document_parser.pdf_lock:
+        rows = extract_pdf_rows(doc, pages, layout=layout_before(doc, pages.start, headers), headers=headers)
+        text = None if rows else "\n".join(_page_text(doc[index]) for index in pages)
+    if rows:
+        return resolve_rows(rows, api_key=api_key)
+    if not text.strip():
+        return [], {'rows': 0, 'repaired': 0, 'unresolved': 0}
+    # The model read these already: they aren't sent back for repair
+    checked = [validate_row(row) for row in rows_from_text(text, api_key=api_key)]
+    unresolved = sum(1 for _, problems in checked if problems)
+    return [parsed for parsed, _ in checked], {'rows': len(checked), 'repaired': 0, 'unresolved': unresolved}
+
+
+# --- Reduce: one entry per provider ---
+def provider_key(row):
+    return normalize_provider_name(row['provider'])
+
+
+class ProviderReducer:
+    """
+    Merges parsed rows by provider (normalized name): service dates become
+    the overall range, billed amounts are summed and specialties combined.
+    Providers keep the order in which they first appear in the document,
+    whatever order the chunks finish in.
+    """
+
+    def __init__(self):
+        self._providers = {}
+
+    def __len__(self):
+        return len(self._providers)
+
+    def add(self, chunk_index, rows):
+        for position, row in enumerate(rows):
+            key = provider_key(row) or f"unnamed-{chunk_index}-{position}"
+            entry = self._providers.get(key)
+            if entry is None:
+                self._providers[key] = entry = {
+                    'provider': row['provider'], 'specialties': [], 'dates': [], 'amounts': [],
+                    'rows': 0, 'order': (chunk_index, position),
+                }
+            entry['order'] = min(entry['order'], (chunk_index, position))
+            entry['rows'] += 1
+            if row['specialty'] and row['specialty'] not in entry['specialties']:
+                entry['specialties'].append(row['specialty'])
+            entry['dates'].extend(date for date in (row['first_date'], row['last_date']) if date)
+            if row['total_billed'] is not None:
+                entry['amounts'].append(row['total_billed'])
+
+    def providers(self):
+        """Merged providers in document order, in the shape format_provider takes."""
+        return [{
+            'provider': entry['provider'],
+            'specialty': '; '.join(entry['specialties']),
+            'first_date': min(entry['dates']) if entry['dates'] else None,
+            'last_date': max(entry['dates']) if entry['dates'] else None,
+            'total_billed': sum(entry['amounts'], Decimal(0)) if entry['amounts'] else None,
+            'rows': entry['rows'],
+        } for entry in sorted(self._providers.values(), key=lambda entry: entry['order'])]
+
+
+def summarize_records(file_bytes, ext, api_key=None, chunk_pages=20, max_workers=4, progress=None):
+    """
+    Summarizes an uploaded record production (PDF or DOCX bytes): PDFs are
+    split into page-range chunks summarized concurrently (summarize_chunk),
+    and the chunks' rows reduced by provider as they finish.
+
+    Args:
+        api_key: For the model calls, which run in worker threads.
+        progress: Called as progress(chunks_done, chunks_total, providers)
+            after each chunk is reduced.
+
+    Returns:
+        (Word document as BytesIO, info: mode, chunks, failed_chunks,
+        providers and row stats)
+
+    Raises:
+        NoTextExtractedError: Nothing could be read from the file.
+    """
+    reducer = ProviderReducer()
+    stats = {'rows': 0, 'repaired': 0, 'unresolved': 0}
+    failed_chunks = []
+
+    def reduce(chunk_index, parsed, chunk_stats):
+        reducer.add(chunk_index, parsed)
+        for key in stats:
+            stats[key] += chunk_stats[key]
+
+    if ext == '.pdf':
+        with document_parser.open_pdf(file_bytes) as doc:
+            chunks = plan_chunks(len(doc), chunk_pages)
+            if not chunks:
+                raise NoTextExtractedError('Failed to extract text from uploaded file. Try a different file or format.')
+            if progress:
+                progress(0, len(chunks), 0)
+            headers = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(chunks)))) as pool:
+                futures = {pool.submit(summarize_chunk, doc, pages, api_key, headers): index
+                           for index, pages in enumerate(chunks)}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    index = futures[future]
+                    pages = chunks[index]
+                    try:
+                        reduce(index, *future.result())
+                    except Exception as e:
+                        logger.debug("Chunk of pages %s-%s failed: %s", pages.start + 1, pages.stop, e)
+                        failed_chunks.append({'pages': f"{pages.start + 1}-{pages.stop}", 'error': str(e)})
+                    if progress:
+                        progress(done, len(chunks), len(reducer))
+    else:
+        # Word documents have no pages: one chunk
+        chunks = [None]
+        rows = extract_docx_rows(file_bytes)
+        if not rows:
+            text = document_parser.extract_text_from_docx(file_bytes)
+            if not text or not text.strip():
+                raise NoTextExtractedError('Failed to extract text from uploaded file. Try a different file or format.')
+            try:
+                rows = rows_from_text(text, api_key=api_key)
+            except AnalysisServiceError as e:
+                raise MedicalSummaryServiceError(str(e)) from e
+        reduce(0, *resolve_rows(rows, api_key=api_key))
+        if progress:
+            progress(1, 1, len(reducer))
+
+    if failed_chunks and len(failed_chunks) == len(chunks):
+        raise MedicalSummaryServiceError(failed_chunks[0]['error'])
+    providers = reducer.providers()
+    failed_chunks.sort(key=lambda chunk: int(chunk['pages'].split('-')[0]))
+    info = dict(stats, chunks=len(chunks), failed_chunks=failed_chunks, providers=len(providers))
+    logger.debug("Medical summary: %s", info)
+    return write_summary_document(providers, failed_chunks), info
+
+
+# --- Background jobs ---
+# Run through job_service, so every worker can report a job's progress and
+# serve its document. Finished jobs expire after MEDICAL_SUMMARY_JOB_TTL.
+JOB_KIND = 'medical_summary'
+
+
+def start_summary_job(user_id, file_bytes, ext, api_key=None, chunk_pages=20, max_workers=4, ttl=3600):
+    """
+    Runs summarize_records in a background job, reporting chunks_done,
+    chunks_total and providers as it goes; the result is the summary's info.
+
+    Returns:
+        dict: The job's status (see job_service.job_status); poll get_summary_job with its id.
+    """
+    def work(report):
+        document, info = summarize_records(
+            file_bytes, ext, api_key=api_key, chunk_pages=chunk_pages, max_workers=max_workers,
+            progress=lambda done, total, providers: report(chunks_done=done, chunks_total=total, providers=providers))
+        return info, document.getvalue()
+
+    return job_service.start_job(JOB_KIND, user_id, work, ttl=ttl,
+                                 progress={'chunks_done': 0, 'chunks_total': None, 'providers': 0})
+
+
+def get_summary_job(job_id, user_id):
+    """The BackgroundJob, or None if there's no such summary for this user (or it expired)."""
+    return job_service.get_job(job_id, user_id, JOB_KIND)
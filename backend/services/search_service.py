@@ -0,0 +1,223 @@
+# --- backend/services/search_service.py ---
+"""
+Full-text search over documents' extracted text, scoped to the user's cases.
+
+Documents are indexed page by page in DocumentSearchPage when their text is
+extracted and removed with them, so the index never needs a full rebuild
+(reindex_all_documents() is there for backfills). Searching, ranking and
+snippets all happen in the database; a results page only carries the
+snippets, never whole documents.
+  - SQLite: FTS5 (document_search_fts), ranked by bm25, snippet()
+  - Postgres: to_tsvector/websearch_to_tsquery on a GIN index, ranked by
+    ts_rank_cd, ts_headline()
+"""
+import re
+
+from sqlalchemy import text
+
+from backend.extensions import db
+from backend.models import Document, DocumentSearchPage
+from backend.utils.document_parser import split_pages
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+
+# A quoted phrase or a single word
+_QUERY_TERM_RE = re.compile(r'"([^"]+)"|(\w+)', re.UNICODE)
+
+
+# --- Custom Exceptions ---
+class SearchServiceError(Exception):
+    """Base exception for errors in the Search service."""
+    pass
+
+
+# --- Indexing ---
+
+def index_document(document_id, case_id, extracted_text, commit=True):
+    """
+    (Re)indexes one document's text, a row per page. Call whenever a
+    document's extracted_text is set.
+    """
+    try:
+        DocumentSearchPage.query.filter_by(document_id=document_id).delete(synchronize_session=False)
+        pages = split_pages(extracted_text)
+        db.session.add_all([
+            DocumentSearchPage(document_id=document_id, case_id=case_id, page_number=number, content=content)
+            for number, content in pages
+        ])
+        if commit:
+            db.session.commit()
+        logger.debug("Indexed document %s for search (%s pages)", document_id, len(pages))
+        return len(pages)
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error indexing document %s for search: %s", document_id, e)
+        raise SearchServiceError(f"Failed to index document {document_id}") from e
+
+
+def remove_document_from_index(document_id):
+    """Drops a document's pages; part of the caller's transaction (no commit)."""
+    DocumentSearchPage.query.filter_by(document_id=document_id).delete(synchronize_session=False)
+
+
+def remove_case_from_index(case_id):
+    """Drops the pages of every document in a case; part of the caller's transaction."""
+    DocumentSearchPage.query.filter_by(case_id=case_id).delete(synchronize_session=False)
+
+
+def reindex_all_documents(batch_size=100):
+    """
+    Rebuilds the index for every document with extracted text, a batch of
+    documents at a time. Returns the number of documents indexed.
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = (db.session.query(Document.id, Document.case_id, Document.extracted_text)
+                 .filter(Document.id > last_id, Document.extracted_text.isnot(None))
+                 .order_by(Document.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for document_id, case_id, extracted_text in batch:
+            index_document(document_id, case_id, extracted_text, commit=False)
+        db.session.commit()
+        db.session.expunge_all()
+        indexed += len(batch)
+        last_id = batch[-1][0]
+    return indexed
+
+
+# --- Searching ---
+
+def _fts5_query(query):
+    """
+    Turns user input into an FTS5 query: every word or "quoted phrase" must
+    appear. Quoting each term keeps FTS5 syntax characters (-, :, *, etc.)
+    from reaching the parser.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM_RE.findall(query):
+        term = phrase or word
+        words = re.findall(r'\w+', term, re.UNICODE)
+        if words:
+            terms.append('"' + ' '.join(words) + '"')
+    return ' '.join(terms)
+
+
+_SQLITE_SEARCH = """
+    SELECT p.document_id, p.case_id, p.page_number, d.file_name, c.display_name AS case_name,
+           snippet(document_search_fts, 0, :start, :stop, '…', 24) AS snippet,
+           bm25(document_search_fts) AS score
+    FROM document_search_fts
+    JOIN document_search_page p ON p.id = document_search_fts.rowid
+    JOIN document d ON d.id = p.document_id
+    JOIN "case" c ON c.id = p.case_id
+    WHERE document_search_fts MATCH :query AND c.user_id = :user_id {case_filter}
+    ORDER BY score, p.document_id, p.page_number
+    LIMIT :limit OFFSET :offset
+"""
+
+_SQLITE_COUNT = """
+    SELECT count(*)
+    FROM document_search_fts
+    JOIN document_search_page p ON p.id = document_search_fts.rowid
+    JOIN "case" c ON c.id = p.case_id
+    WHERE document_search_fts MATCH :query AND c.user_id = :user_id {case_filter}
+"""
+
+# Ranks and pages in the subquery, so ts_headline only runs for the rows returned
+_POSTGRES_SEARCH = """
+    SELECT ranked.document_id, ranked.case_id, ranked.page_number, d.file_name, c.display_name AS case_name,
+           ts_headline('english', p.content, websearch_to_tsquery('english', :query),
+                       'StartSel=' || :start || ', StopSel=' || :stop || ', MaxFragments=2, MaxWords=30, MinWords=10')
+               AS snippet,
+           ranked.score
+    FROM (
+        SELECT p.id, p.document_id, p.case_id, p.page_number,
+               ts_rank_cd(to_tsvector('english', p.content), websearch_to_tsquery('english', :query)) AS score
+        FROM document_search_page p
+        JOIN "case" c ON c.id = p.case_id
+        WHERE to_tsvector('english', p.content) @@ websearch_to_tsquery('english', :query)
+          AND c.user_id = :user_id {case_filter}
+        ORDER BY score DESC, p.document_id, p.page_number
+        LIMIT :limit OFFSET :offset
+    ) ranked
+    JOIN document_search_page p ON p.id = ranked.id
+    JOIN document d ON d.id = ranked.document_id
+    JOIN "case" c ON c.id = ranked.case_id
+    ORDER BY ranked.score DESC, ranked.document_id, ranked.page_number
+"""
+
+_POSTGRES_COUNT = """
+    SELECT count(*)
+    FROM document_search_page p
+    JOIN "case" c ON c.id = p.case_id
+    WHERE to_tsvector('english', p.content) @@ websearch_to_tsquery('english', :query)
+      AND c.user_id = :user_id {case_filter}
+"""
+
+
+def search_documents(user_id, query, case_id=None, page=1, per_page=DEFAULT_PER_PAGE):
+    """
+    Searches the extracted text of the user's documents.
+
+    Args:
+        user_id (int): Only this user's cases are searched.
+        query (str): Words and "quoted phrases"; all must match.
+        case_id (int): Restrict to one case (optional).
+        page (int): 1-based results page.
+        per_page (int): Results per page (capped at MAX_PER_PAGE).
+    Returns:
+        dict: {'results': [{document_id, case_id, case_name, file_name,
+               page_number, snippet, score}], 'total', 'page', 'per_page'}
+        Snippets mark matches with <mark></mark>; page_number is None where
+        the document has no page information. Higher scores rank higher.
+    Raises:
+        ValueError: For an empty query.
+        SearchServiceError: For unsupported databases and query errors.
+    """
+    query = (query or '').strip()
+    if not query:
+        raise ValueError("Search query is required")
+    page = max(int(page or 1), 1)
+    per_page = min(max(int(per_page or DEFAULT_PER_PAGE), 1), MAX_PER_PAGE)
+
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == 'sqlite':
+        search_sql, count_sql = _SQLITE_SEARCH, _SQLITE_COUNT
+        query = _fts5_query(query)
+        if not query:
+            return {'results': [], 'total': 0, 'page': page, 'per_page': per_page}
+    elif dialect_name == 'postgresql':
+        search_sql, count_sql = _POSTGRES_SEARCH, _POSTGRES_COUNT
+    else:
+        raise SearchServiceError(f"Full-text search is not supported on {dialect_name}")
+
+    case_filter = 'AND p.case_id = :case_id' if case_id is not None else ''
+    params = {'query': query, 'user_id': user_id, 'case_id': case_id,
+              'start': SNIPPET_START, 'stop': SNIPPET_END,
+              'limit': per_page, 'offset': (page - 1) * per_page}
+
+    try:
+        total = db.session.execute(text(count_sql.format(case_filter=case_filter)), params).scalar()
+        rows = db.session.execute(text(search_sql.format(case_filter=case_filter)), params).mappings().all()
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error searching documents for user %s: %s", user_id, e)
+        raise SearchServiceError("Search failed") from e
+
+    results = []
+    for row in rows:
+        result = dict(row)
+        # bm25 is lower-is-better; flip it so both databases rank high to low
+        result['score'] = round(-row['score'] if dialect_name == 'sqlite' else row['score'], 4)
+        results.append(result)
+    return {'results': results, 'total': total, 'page': page, 'per_page': per_page}
@@ -0,0 +1,237 @@
+# --- backend/services/shred_service.py ---
+"""
+Background erasure of deleted documents' files.
+
+Deleting a document or case only queues a ShredJob per file, in the same
+transaction as the delete, so the API returns once the commit succeeds and a
+crash can't lose a pending erasure. A worker thread per app process drains
+the queue in batches:
+  - due jobs are claimed one conditional UPDATE each (pending -> running), so
+    several processes can share the queue;
+  - legacy files get overwrite passes through one Shredder (reused buffers,
+    one sync round per pass for the whole batch); envelope-encrypted files,
+    whose data key went with the row, are just unlinked;
+  - failures are retried with exponential backoff up to SHRED_MAX_ATTEMPTS,
+    then left as 'failed'. Every job row stays as the audit record.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, func, or_, and_
+
+from backend.extensions import db
+from backend.models import ShredJob
+from backend.utils.secure_deletion import Shredder, secure_deletion_logger
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_file_deletion(file_path, crypto_erased=False, document_id=None, user_id=None):
+    """
+    Queues a file for erasure; the caller commits it with the delete it belongs to.
+    Returns the ShredJob (pending).
+    """
+    job = ShredJob(
+        file_path=file_path,
+        mode=ShredJob.MODE_UNLINK if crypto_erased else ShredJob.MODE_OVERWRITE,
+        status=ShredJob.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        document_id=document_id,
+        requested_by=user_id,
+    )
+    db.session.add(job)
+    return job
+
+
+def enqueue_document_files(documents, user_id=None):
+    """Queues the files of documents being deleted. Returns the number of jobs queued."""
+    queued = 0
+    for document in documents:
+        if document.file_path:
+            enqueue_file_deletion(document.file_path, crypto_erased=document.file_key is not None,
+                                  document_id=document.id, user_id=user_id)
+            queued += 1
+    return queued
+
+
+def _retry_delay(attempts):
+    base = current_app.config.get('SHRED_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _claim_due_jobs(limit, now):
+    """Claims up to ``limit`` due jobs for this worker; returns them (running)."""
+    stale_before = now - timedelta(seconds=current_app.config.get('SHRED_STALE_SECONDS', 3600))
+    due = or_(
+        and_(ShredJob.status == ShredJob.STATUS_PENDING, ShredJob.next_attempt_at <= now),
+        # A worker died mid-job: the files may be half overwritten, so start over
+        and_(ShredJob.status == ShredJob.STATUS_RUNNING, ShredJob.started_at < stale_before),
+    )
+    candidates = db.session.execute(
+        select(ShredJob.id, ShredJob.status).where(due).order_by(ShredJob.next_attempt_at).limit(limit)
+    ).all()
+    claimed = []
+    for job_id, status in candidates:
+        result = db.session.execute(
+            update(ShredJob)
+            .where(ShredJob.id == job_id, ShredJob.status == status)
+            .values(status=ShredJob.STATUS_RUNNING, started_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return db.session.execute(select(ShredJob).where(ShredJob.id.in_(claimed))).scalars().all()
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+        return None
+    except OSError as e:
+        return e
+
+
+def process_due_jobs(limit=None, shredder=None, now=None):
+    """
+    Claims and processes one batch of due jobs.
+
+    Returns:
+        dict: Jobs done, retried and failed in this batch.
+    """
+    config = current_app.config
+    limit = limit or config.get('SHRED_BATCH_SIZE', 20)
+    now = now or datetime.utcnow()
+    jobs = _claim_due_jobs(limit, now)
+    counts = {'done': 0, 'retried': 0, 'failed': 0}
+    if not jobs:
+        return counts
+
+    overwrite = [job.file_path for job in jobs if job.mode == ShredJob.MODE_OVERWRITE]
+    results = (shredder or Shredder()).shred(overwrite, passes=config.get('SHRED_PASSES', 3)) if overwrite else {}
+    for job in jobs:
+        if job.mode != ShredJob.MODE_OVERWRITE:
+            results[job.file_path] = _unlink(job.file_path)
+
+    max_attempts = config.get('SHRED_MAX_ATTEMPTS', 5)
+    finished_at = datetime.utcnow()
+    for job in jobs:
+        error = results.get(job.file_path)
+        job.attempts += 1
+        if error is None or isinstance(error, FileNotFoundError):
+            job.status = ShredJob.STATUS_DONE
+            job.finished_at = finished_at
+            job.last_error = 'File was already gone' if error else None
+            counts['done'] += 1
+            secure_deletion_logger.info("Shred job %s done (%s): %s", job.id, job.mode, job.file_path)
+        elif job.attempts >= max_attempts:
+            job.status = ShredJob.STATUS_FAILED
+            job.finished_at = finished_at
+            job.last_error = str(error)
+            counts['failed'] += 1
+            secure_deletion_logger.error("Shred job %s failed after %s attempts: %s", job.id, job.attempts, error)
+        else:
+            job.status = ShredJob.STATUS_PENDING
+            job.next_attempt_at = finished_at + _retry_delay(job.attempts)
+            job.last_error = str(error)
+            counts['retried'] += 1
+            secure_deletion_logger.warning(
+                "Shred job %s attempt %s failed, retrying at %s: %s", job.id, job.attempts, job.next_attempt_at, error)
+    db.session.commit()
+    logger.debug("Shred batch: %s", counts)
+    return counts
+
+
+def drain_queue(limit=None):
+    """Processes batches until no job is due. Returns the summed counts."""
+    totals = {'done': 0, 'retried': 0, 'failed': 0}
+    shredder = Shredder()
+    while True:
+        counts = process_due_jobs(limit=limit, shredder=shredder)
+        if not any(counts.values()):
+            return totals
+        for key, value in counts.items():
+            totals[key] += value
+
+
+def queue_status():
+    """Job counts by status, and the oldest job still waiting."""
+    rows = db.session.execute(
+        select(ShredJob.status, func.count(), func.min(ShredJob.created_at)).group_by(ShredJob.status)
+    ).all()
+    counts = {status: count for status, count, _ in rows}
+    waiting = [oldest for status, _, oldest in rows
+               if status in (ShredJob.STATUS_PENDING, ShredJob.STATUS_RUNNING) and oldest]
+    return {
+        'jobs': {status: counts.get(status, 0) for status in
+                 (ShredJob.STATUS_PENDING, ShredJob.STATUS_RUNNING, ShredJob.STATUS_DONE, ShredJob.STATUS_FAILED)},
+        'oldest_waiting': min(waiting).isoformat() if waiting else None,
+    }
+
+
+class ShredWorker:
+    """
+    The per-process thread draining the queue. Sleeps SHRED_POLL_SECONDS
+    between rounds (which also picks up retries and other processes' jobs);
+    wake() starts a round at once after a delete commits. Started by the
+    first request, so CLI commands (migrations included) don't run it.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        app.extensions['shred_worker'] = self
+        if app.config.get('SHRED_WORKER_ENABLED', True):
+            app.before_request(self.start)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='shred-worker', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        poll_seconds = self._app.config.get('SHRED_POLL_SECONDS', 30)
+        while not self._stop.is_set():
+            with self._app.app_context():
+                try:
+                    drain_queue()
+                except Exception as e:
+                    db.session.rollback()
+                    secure_deletion_logger.error("Shred worker round failed: %s", e)
+                finally:
+                    db.session.remove()
+            self._wake.wait(poll_seconds)
+            self._wake.clear()
+
+
+def wake_worker():
+    """Nudges this process's shred worker after queueing jobs (no-op when it isn't running)."""
+    worker = current_app.extensions.get('shred_worker')
+    if worker is not None:
+        worker.wake()
@@ -1,53 +1,313 @@
 # subpoena_service.py
 
 import os
+import io
+import re
 import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import fitz  # PyMuPDF
-from typing import Dict, List, Any, Optional
+from backend.utils.document_parser import open_pdf, extract_page_tables, pdf_lock, DocumentSource
+from backend.services import job_service
+from typing import Dict, List, Any, Optional, Tuple
 import google.generativeai as genai
 import logging
 from datetime import datetime
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# --- Local pre-pass ---
+# Subpoena packets run to 100 pages, but the data sits in a few places: the
+# "Notification of Subpoenaed Records" tables (one row per location and record
+# type), each "ATTACHMENT 3" (scope and body part limitations) and the caption
+# of the deposition subpoena (case information). The pre-pass finds those by
+# heading, reads the tables as rows, and the model gets only that.
+SECTION_HEADINGS = {
+    'notification': re.compile(r'notification\s+of\s+subpoenaed\s+records', re.IGNORECASE),
+    'attachment_3': re.compile(r'attachment\s*3\b', re.IGNORECASE),
+    'caption': re.compile(r'deposition\s+subpoena\s+for\s+production\s+of\s+business\s+records', re.IGNORECASE),
+}
+DATE_RANGE_PATTERN = re.compile(r'records\s+requested\s+from\s+.{1,80}?\s+through\s+(?:present|[a-z]+\s+\d{1,2},\s*\d{4})',
+                                re.IGNORECASE | re.DOTALL)
+MAX_SPAN_CHARS = 3000  # Per section span; attachments and captions are short
+
+
+def _compact(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _heading_pages(page_texts: List[str]) -> Dict[str, List[int]]:
+    return {section: [i for i, text in enumerate(page_texts) if pattern.search(text)]
+            for section, pattern in SECTION_HEADINGS.items()}
+
+
+def _table_pages(doc: fitz.Document, page_texts: List[str], start_pages: List[int]) -> List[int]:
+    """Notification pages plus the pages their tables continue on (tables, no new heading)."""
+    pages = []
+    for start in start_pages:
+        page_num = start
+        while page_num < len(doc) and page_num not in pages:
+            if page_num != start and (any(p.search(page_texts[page_num]) for p in SECTION_HEADINGS.values())
+                                      or not doc[page_num].find_tables().tables):
+                break
+            pages.append(page_num)
+            page_num += 1
+    return pages
+
+
+def subpoena_prepass(doc: fitz.Document) -> Optional[Dict[str, Any]]:
+    """
+    Finds the subpoena sections by heading and extracts them locally.
+
+    Returns:
+        dict with tables (page, header, rows), spans (page, section, text: the
+        text of matched sections outside any table) and page bookkeeping, or
+        None when no notification table or attachment heading was found (the
+        caller then falls back to the full text).
+    """
+    page_texts = [page.get_text() for page in doc]
+    headings = _heading_pages(page_texts)
+    if not headings['notification'] and not headings['attachment_3']:
+        return None
+
+    tables, spans = [], []
+    for page_num in _table_pages(doc, page_texts, headings['notification']):
+        page = doc[page_num]
+        page_tables = extract_page_tables(page)
+        tables.extend({"page": page_num + 1, "header": t["header"], "rows": t["rows"]} for t in page_tables)
+        # Text around the tables (dates, notes) is an unmatched span
+        boxes = [fitz.Rect(t["bbox"]) for t in page_tables]
+        loose = [block[4] for block in page.get_text("blocks")
+                 if not any(fitz.Rect(block[:4]).intersects(box) for box in boxes)]
+        if loose:
+            spans.append({"page": page_num + 1, "section": "notification",
+                          "text": _compact(" ".join(loose))[:MAX_SPAN_CHARS]})
+
+    for page_num in headings['attachment_3']:
+        text = page_texts[page_num]
+        start = SECTION_HEADINGS['attachment_3'].search(text).start()
+        spans.append({"page": page_num + 1, "section": "attachment_3",
+                      "text": _compact(text[start:])[:MAX_SPAN_CHARS]})
+
+    # Case information: the first subpoena's caption is enough, it repeats
+    for page_num in headings['caption'][:1]:
+        spans.append({"page": page_num + 1, "section": "caption",
+                      "text": _compact(page_texts[page_num])[:MAX_SPAN_CHARS]})
+
+    # Date ranges stated on pages no section covers
+    covered = {span["page"] for span in spans} | {table["page"] for table in tables}
+    for page_num, text in enumerate(page_texts):
+        if page_num + 1 not in covered:
+            for match in DATE_RANGE_PATTERN.finditer(text):
+                spans.append({"page": page_num + 1, "section": "date_range", "text": _compact(match.group(0))})
+
+    return {
+        "tables": tables,
+        "spans": spans,
+        "page_count": len(page_texts),
+        "pages_used": sorted({span["page"] for span in spans} | {table["page"] for table in tables}),
+        "full_text_chars": sum(len(text) for text in page_texts),
+    }
+
+
+def format_structured_input(prepass: Dict[str, Any]) -> str:
+    """Compact model input: tables as JSON (header once, rows as lists), then section text."""
+    parts = ["NOTIFICATION OF SUBPOENAED RECORDS TABLES (JSON, one table per line):"]
+    for table in prepass["tables"]:
+        parts.append(json.dumps({"page": table["page"], "columns": table["header"],
+                                 "rows": [[row.get(name, "") for name in table["header"]] for row in table["rows"]]},
+                                separators=(",", ":")))
+    parts.append("\nSECTION TEXT:")
+    for span in prepass["spans"]:
+        parts.append(f"[page {span['page']}, {span['section']}] {span['text']}")
+    return "\n".join(parts)
+
+# --- Batches ---
+# Clerks get packets in batches: a ZIP or several PDFs are processed
+# concurrently and the per-file record_types merged into one index, one entry
+# per provider (normalized name and address) and record type.
+MAX_BATCH_FILES = 50
+MAX_BATCH_BYTES = 500 * 1024 * 1024  # Uncompressed, whole batch
+
+
+class SubpoenaServiceError(Exception):
+    """Raised for batches that can't be processed (bad ZIP, too many or too large files)."""
+    pass
+
+
+_NAME_STOPWORDS = {'the', 'inc', 'llc', 'llp', 'pc', 'apc', 'corp', 'corporation', 'co', 'ltd'}
+_ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'boulevard': 'blvd', 'road': 'rd', 'drive': 'dr',
+    'suite': 'ste', 'floor': 'fl', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'parkway': 'pkwy', 'highway': 'hwy', 'lane': 'ln', 'place': 'pl', 'court': 'ct',
+}
+
+
+def _words(value: str) -> List[str]:
+    value = (value or '').lower().replace('&', ' and ').replace('#', ' ')
+    return re.sub(r'[^a-z0-9 ]+', ' ', value).split()
+
+
+def normalize_provider_name(name: str) -> str:
+    """'The Cedars-Sinai Medical Center, Inc.' -> 'cedars sinai medical center'"""
+    return ' '.join(word for word in _words(name) if word not in _NAME_STOPWORDS)
+
+
+def normalize_address(address: str) -> str:
+    """Lowercase, no punctuation, common street words abbreviated, ZIP+4 cut to 5 digits."""
+    address = re.sub(r'\b(\d{5})-\d{4}\b', r'\1', address or '')
+    return ' '.join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in _words(address))
+
+
+def _table_pages_by_location(prepass: Optional[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Normalized location name -> pages of the notification table rows naming it."""
+    pages = {}
+    for table in (prepass or {}).get("tables", []):
+        for row in table["rows"]:
+            for value in row.values():
+                key = normalize_provider_name(value)
+                if key:
+                    pages.setdefault(key, set()).add(table["page"])
+    return {key: sorted(value) for key, value in pages.items()}
+
+
+def merge_record_types(file_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges per-file results into one record_types index, deduplicated by
+    record type, normalized provider name and normalized address. Each
+    entry lists its sources (file and pages); body parts and reference
+    numbers are combined.
+
+    Args:
+        file_results: dicts with "file" and "result" (a process_subpoena result).
+    """
+    merged, index = {}, {}
+    for file_result in file_results:
+        result = file_result.get("result") or {}
+        for record_type, locations in (result.get("record_types") or {}).items():
+            for location in locations or []:
+                key = (record_type.strip().lower(), normalize_provider_name(location.get("location")),
+                       normalize_address(location.get("address")))
+                source = {"file": file_result["file"], "pages": sorted(location.get("pages") or [])}
+                entry = index.get(key)
+                if entry is None:
+                    entry = {k: v for k, v in location.items() if k not in ("pages", "reference_number")}
+                    entry.update({"body_parts": [], "reference_numbers": [], "sources": []})
+                    index[key] = entry
+                    merged.setdefault(record_type, []).append(entry)
+                for part in location.get("body_parts") or []:
+                    if part not in entry["body_parts"]:
+                        entry["body_parts"].append(part)
+                reference = location.get("reference_number")
+                if reference and reference not in entry["reference_numbers"]:
+                    entry["reference_numbers"].append(reference)
+                if source not in entry["sources"]:
+                    entry["sources"].append(source)
+    return {"record_types": merged}
+
+
+def _pdf_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    return [info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.pdf')
+            and not os.path.basename(info.filename).startswith(('.', '__'))
+            and '__MACOSX/' not in info.filename]
+
+
+def collect_batch_files(uploads: List[Tuple[str, Any]], max_files: int = MAX_BATCH_FILES,
+                        max_bytes: int = MAX_BATCH_BYTES) -> List[Tuple[str, bytes]]:
+    """
+    Expands uploads (name, bytes or stream) into (name, PDF bytes): PDFs as
+    they are, ZIPs into their PDF members.
+
+    Raises:
+        SubpoenaServiceError: Unreadable ZIP, unsupported file, or the batch
+            is over max_files / max_bytes (checked before decompressing).
+    """
+    files, total = [], 0
+
+    def add(name, data):
+        nonlocal total
+        total += len(data)
+        if len(files) >= max_files or total > max_bytes:
+            raise SubpoenaServiceError(f"Batch is limited to {max_files} files and {max_bytes // (1024 * 1024)} MB")
+        files.append((name, data))
+
+    for name, source in uploads:
+        data = source.read() if hasattr(source, 'read') else bytes(source)
+        lower = (name or '').lower()
+        if lower.endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile as e:
+                raise SubpoenaServiceError(f"{name} is not a valid ZIP file") from e
+            with archive:
+                members = _pdf_members(archive)
+                if len(files) + len(members) > max_files or total + sum(m.file_size for m in members) > max_bytes:
+                    raise SubpoenaServiceError(f"Batch is limited to {max_files} files and {max_bytes // (1024 * 1024)} MB")
+                for member in members:
+                    add(f"{name}/{member.filename}", archive.read(member))
+        elif lower.endswith('.pdf'):
+            add(name, data)
+        else:
+            raise SubpoenaServiceError(f"{name}: only PDF and ZIP files are supported")
+    if not files:
+        raise SubpoenaServiceError("No PDF files found in the upload")
+    return files
+
+
 class SubpoenaService:
     def __init__(self, api_key: str):
         self.api_key = api_key
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-1.5-pro')
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from a PDF file with page markers."""
+    def extract_text_from_pdf(self, pdf_path: DocumentSource) -> str:
+        """Extract text from a PDF (path, bytes, stream or open document) with page markers."""
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            
-            # Extract first few pages as potential summary
-            summary_pages = min(3, len(doc))
-            summary_text = "POTENTIAL SUMMARY SECTION:\n\n"
-            
-            for page_num in range(summary_pages):
-                page = doc.load_page(page_num)
-                summary_text += page.get_text()
-                summary_text += f"\n[END OF PAGE {page_num + 1}]\n"
-            
-            text += summary_text + "\n\n"
-            
-            # Extract full document text
-            text += "COMPLETE DOCUMENT TEXT:\n\n"
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-                text += f"\n[END OF PAGE {page_num + 1}]\n"
-                
-            return text
+            with open_pdf(pdf_path) as doc:
+                return self._full_text(doc)
         except Exception as e:
-            logger.error(f"Error extracting text from PDF: {e}")
+            logger.error("Error extracting text from PDF: %s", e)
             raise e
 
-    def format_prompt(self, pdf_text: str) -> str:
-        """Create a prompt for the generative model to extract subpoena information."""
+    @staticmethod
+    def _full_text(doc: fitz.Document) -> str:
+        # Each page once; summary lists in the first pages are read in place
+        text = "COMPLETE DOCUMENT TEXT:\n\n"
+        for page_num in range(len(doc)):
+            text += doc.load_page(page_num).get_text()
+            text += f"\n[END OF PAGE {page_num + 1}]\n"
+        return text
+
+    def prepare_input(self, pdf_path: DocumentSource) -> Tuple[str, Dict[str, Any]]:
+        """
+        The document text for the model: the structured pre-pass output when
+        the subpoena sections were found, else the full text.
+
+        Returns:
+            (text, extraction info: mode, page counts and characters sent)
+        """
+        with pdf_lock, open_pdf(pdf_path) as doc:
+            prepass = subpoena_prepass(doc)
+            if prepass is None:
+                text = self._full_text(doc)
+                info = {"mode": "full_text", "page_count": len(doc), "pages_used": list(range(1, len(doc) + 1))}
+            else:
+                text = format_structured_input(prepass)
+                info = {"mode": "structured", "page_count": prepass["page_count"],
+                        "pages_used": prepass["pages_used"], "tables": len(prepass["tables"]),
+                        "full_text_chars": prepass["full_text_chars"],
+                        "location_pages": _table_pages_by_location(prepass)}
+        info["input_chars"] = len(text)
+        logger.info("Subpoena input: %s, %s chars from %s/%s pages",
+                    info['mode'], info['input_chars'], len(info['pages_used']), info['page_count'])
+        return text, info
+
+    def format_prompt(self, pdf_text: str, structured: bool = False) -> str:
+        """
+        Create a prompt for the generative model to extract subpoena information.
+        With structured=True pdf_text is the pre-pass output (format_structured_input).
+        """
         
         prompt = """
 You are a specialized legal assistant tasked with extracting structured information from medical record subpoenas. 
@@ -63,6 +323,7 @@ For each subpoena found in the document, extract the following information:
 4. Any body part limitations specified (typically found in the attachment sections)
 5. Case information (case name, case number, etc.)
 6. Reference or identification numbers (e.g., 66302-XX)
+7. The page numbers where the location appears (from the [page N] tags or [END OF PAGE N] markers)
 
 Group the subpoenas primarily by record type (Medical, Billing, Radiology Films, etc.), 
 and secondarily by location when the same location has multiple record types.
@@ -81,7 +342,8 @@ Return the results as a structured JSON object with the following format:
           "case_number": "Number",
           "claim_number": "Claim number if present" 
         },
-        "reference_number": "66302-XX or similar"
+        "reference_number": "66302-XX or similar",
+        "pages": [2, 3]
       }
     ],
     "Billing": [...],
@@ -97,6 +359,15 @@ Look for the following patterns in the document:
 5. Details about body part limitations often labeled as "SCOPE/ BODY PART LIMITATIONS"
 6. Date ranges often formatted as "Records requested from [date] through Present"
 
+"""
+        if structured:
+            prompt += """
+The document has been pre-processed: the "Notification of Subpoenaed Records" tables are given as JSON
+rows (with their page numbers), followed by the text of the ATTACHMENT 3 sections, the subpoena caption
+and any other relevant spans, each tagged with its page. Treat the table rows as the list of locations
+and record types, and take body part limitations, date ranges and case information from the text.
+"""
+        prompt += """
 Document Text:
 """
         prompt += pdf_text
@@ -109,22 +380,22 @@ Use both summary information (if available) and detailed sections to ensure comp
 """
         return prompt
 
-    def extract_subpoena_info(self, pdf_path: str) -> Dict[str, Any]:
+    def extract_subpoena_info(self, pdf_path: DocumentSource) -> Dict[str, Any]:
         """
         Extract subpoena information from a PDF file.
         
         Args:
-            pdf_path: Path to the PDF file
+            pdf_path: Path to the PDF file, or its bytes / stream / open fitz.Document
             
         Returns:
             Dictionary containing structured subpoena information
         """
         try:
-            # Extract text from PDF
-            pdf_text = self.extract_text_from_pdf(pdf_path)
+            # Local pre-pass: only the subpoena sections, tables as rows
+            pdf_text, extraction = self.prepare_input(pdf_path)
             
             # Create prompt for the generative model
-            prompt = self.format_prompt(pdf_text)
+            prompt = self.format_prompt(pdf_text, structured=extraction["mode"] == "structured")
             
             # Generate response
             response = self.model.generate_content(prompt)
@@ -144,28 +415,79 @@ Use both summary information (if available) and detailed sections to ensure comp
             
             try:
                 result = json.loads(json_str)
+                # Page references the model left out, from the table rows naming the location
+                location_pages = extraction.pop("location_pages", {})
+                for locations in (result.get("record_types") or {}).values():
+                    for location in locations or []:
+                        if not location.get("pages"):
+                            location["pages"] = location_pages.get(normalize_provider_name(location.get("location")), [])
+                result["extraction"] = extraction
                 return result
             except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON: {e}")
+                logger.error("Error parsing JSON: %s", e)
                 return {"error": f"Error parsing extracted data: {e}"}
                 
         except Exception as e:
-            logger.error(f"Error in subpoena extraction: {e}")
+            logger.error("Error in subpoena extraction: %s", e)
             return {"error": f"Error in subpoena extraction: {e}"}
 
-    def process_subpoena(self, pdf_path: str) -> Dict[str, Any]:
+    def process_subpoena(self, pdf_path: DocumentSource) -> Dict[str, Any]:
         """
         Process a subpoena PDF file and return structured information.
         This is the main method to call from external code.
         
         Args:
-            pdf_path: Path to the subpoena PDF file
+            pdf_path: Path to the subpoena PDF file, or its bytes / stream / open fitz.Document
             
         Returns:
             Dictionary containing structured subpoena information
         """
         return self.extract_subpoena_info(pdf_path)
 
+    def process_batch(self, files: List[Tuple[str, bytes]], max_workers: int = 4,
+                      progress=None) -> Dict[str, Any]:
+        """
+        Processes several subpoena PDFs concurrently (at most max_workers
+        model calls at a time) and merges them into one index.
+
+        Args:
+            files: (name, PDF bytes) pairs, e.g. from collect_batch_files.
+            progress: Optional callable(files_done, files_total), called as files finish.
+
+        Returns:
+            dict: record_types (merged, each entry with its sources), files
+            (per-file status and extraction info) and summary (the
+            format_result_summary text of the merged index).
+        """
+        def work(item):
+            name, data = item
+            try:
+                return {"file": name, "result": self.process_subpoena(data)}
+            except Exception as e:
+                logger.error("Error processing subpoena %s: %s", name, e)
+                return {"file": name, "result": {"error": str(e)}}
+
+        file_results = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(files)))) as pool:
+            futures = {pool.submit(work, item): index for index, item in enumerate(files)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                file_results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(files))
+
+        merged = merge_record_types(file_results)
+        merged["files"] = [
+            {"file": item["file"], "status": "error" if "error" in item["result"] else "ok",
+             "error": item["result"].get("error"), "extraction": item["result"].get("extraction")}
+            for item in file_results
+        ]
+        summary = self.format_result_summary(merged)
+        failed = [item for item in merged["files"] if item["status"] == "error"]
+        if failed:
+            summary += "Files not processed:\n" + "".join(f"- {item['file']}: {item['error']}\n" for item in failed)
+        merged["summary"] = summary
+        return merged
+
     def format_result_summary(self, result: Dict[str, Any]) -> str:
         """Format the extraction result as a readable summary."""
         if "error" in result:
@@ -190,7 +512,48 @@ Use both summary information (if available) and detailed sections to ensure comp
                 
                 if "reference_number" in location_info:
                     summary += f"  Reference: {location_info['reference_number']}\n"
+
+                if location_info.get("reference_numbers"):
+                    summary += f"  References: {', '.join(location_info['reference_numbers'])}\n"
+
+                if location_info.get("sources"):
+                    sources = []
+                    for source in location_info["sources"]:
+                        pages = source.get("pages") or []
+                        label = f" (p. {pages[0]})" if len(pages) == 1 else f" (pp. {', '.join(map(str, pages))})" if pages else ""
+                        sources.append(f"{source['file']}{label}")
+                    summary += f"  Sources: {'; '.join(sources)}\n"
                 
                 summary += "\n"
         
-        return summary
\ No newline at end of file
+        return summary
+
+
+# --- Background batches ---
+# Large batches take minutes of model calls, longer than a worker's request
+# timeout, so they run as jobs (see job_service) that any worker can report on.
+JOB_KIND = 'subpoena_batch'
+
+
+def start_batch_job(user_id: int, files: List[Tuple[str, bytes]], api_key: str, max_workers: int = 4,
+                    ttl: int = 3600) -> Dict[str, Any]:
+    """
+    Runs process_batch in a background job, reporting files_done and
+    files_total; the result is process_batch's merged index.
+
+    Returns:
+        dict: The job's status (see job_service.job_status); poll get_batch_job with its id.
+    """
+    def work(report):
+        result = SubpoenaService(api_key).process_batch(
+            files, max_workers=max_workers,
+            progress=lambda done, total: report(files_done=done, files_total=total))
+        return result, None
+
+    return job_service.start_job(JOB_KIND, user_id, work, ttl=ttl,
+                                 progress={'files_done': 0, 'files_total': len(files)})
+
+
+def get_batch_job(job_id: str, user_id: int):
+    """The BackgroundJob, or None if there's no such batch for this user (or it expired)."""
+    return job_service.get_job(job_id, user_id, JOB_KIND)
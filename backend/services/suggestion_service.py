@@ -0,0 +1,265 @@
+# --- backend/services/suggestion_service.py ---
+"""
+AI suggestions for case fields, one CaseSuggestion row per (case, document, field).
+
+Document analysis stores its extracted fields here (store_document_suggestions);
+the case page lists the pending ones and applies or rejects them in bulk.
+Suggestions for fields listed in case_details['locked_fields'] are filtered
+out in SQL, so they never leave the database.
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, select, exists, literal, func, Text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from backend.extensions import db
+from backend.models import Case, CaseSuggestion
+from backend.services.case_service import (
+    get_case_by_id, update_case, update_case_details, get_case_detail,
+    CaseServiceError, PROFILE_DISCOVERY
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# --- Custom Exceptions ---
+class SuggestionServiceError(Exception):
+    """Base exception for errors in the Suggestion service."""
+    pass
+
+
+# Case columns a suggestion may write; everything else goes into case_details
+PROTECTED_CASE_FIELDS = {'id', 'user_id', 'created_at', 'updated_at', 'version', 'case_details'}
+
+
+def _is_empty(value):
+    """Analysis results use None/''/[]/{} for fields it found nothing for."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _not_locked():
+    """
+    Filter for suggestions whose field isn't in the case's locked_fields.
+    Needs the query to join Case.
+    """
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == 'postgresql':
+        locked = func.coalesce(
+            Case.case_details.op('->', return_type=JSONB)(literal('locked_fields', Text)),
+            literal('[]').cast(JSONB),
+        )
+        return ~locked.op('?')(CaseSuggestion.field)
+    if dialect_name == 'sqlite':
+        locked = func.json_each(Case.case_details, '$.locked_fields').table_valued('value')
+        return ~exists(select(literal(1)).select_from(locked).where(locked.c.value == CaseSuggestion.field))
+    return None
+
+
+def suggestion_query(case_id, status=CaseSuggestion.STATUS_PENDING, include_locked=False):
+    """A case's suggestions with the given status, oldest document first."""
+    query = (CaseSuggestion.query
+             .join(Case, Case.id == CaseSuggestion.case_id)
+             .filter(CaseSuggestion.case_id == case_id))
+    if status is not None:
+        query = query.filter(CaseSuggestion.status == status)
+    if not include_locked:
+        locked_filter = _not_locked()
+        if locked_filter is not None:
+            query = query.filter(locked_filter)
+    return query.order_by(CaseSuggestion.document_id, CaseSuggestion.id)
+
+
+def _drop_locked(case_id, suggestions):
+    """Python fallback for databases without JSON functions."""
+    if _not_locked() is not None:
+        return suggestions
+    locked_fields = set(get_case_detail(case_id, 'locked_fields', default=[]) or [])
+    return [s for s in suggestions if s.field not in locked_fields]
+
+
+def list_suggestions(case_id, user_id, status=CaseSuggestion.STATUS_PENDING):
+    """
+    Lists a case's suggestions, ensuring ownership.
+    Args:
+        case_id (int): The case.
+        user_id (int): The requesting user.
+        status (str): pending, accepted or rejected (None for all).
+    Returns:
+        list[CaseSuggestion]
+    Raises:
+        ValueError: For an unknown status.
+        NotFound/Forbidden: As get_case_by_id.
+    """
+    if status is not None and status not in CaseSuggestion.STATUSES:
+        raise ValueError(f"Unknown suggestion status: {status}")
+    get_case_by_id(case_id, user_id, profile=PROFILE_DISCOVERY)  # Ownership check
+    return _drop_locked(case_id, suggestion_query(case_id, status).all())
+
+
+def group_by_document(suggestions):
+    """
+    Shapes suggestion rows as {'doc_<id>': {field: value}}, the layout the
+    case page used when suggestions lived in case_details.
+    """
+    grouped = {}
+    for suggestion in suggestions:
+        doc_key = f"doc_{suggestion.document_id}" if suggestion.document_id is not None else 'doc_unknown'
+        grouped.setdefault(doc_key, {})[suggestion.field] = suggestion.value
+    return grouped
+
+
+def store_document_suggestions(case_id, document_id, suggestion_data, commit=True):
+    """
+    Replaces the suggestions from one document's analysis. Unchanged values keep
+    their status (a rejected value isn't suggested again); new or changed values
+    are pending; pending fields the new analysis no longer has are removed.
+    Ownership must be checked by the caller.
+    Returns:
+        int: Number of suggestions now pending for the document.
+    """
+    try:
+        existing = {s.field: s for s in CaseSuggestion.query.filter_by(case_id=case_id, document_id=document_id)}
+        now = datetime.utcnow()
+        pending = 0
+
+        for field, value in suggestion_data.items():
+            if _is_empty(value) or len(field) > CaseSuggestion.field.type.length:
+                continue
+            suggestion = existing.pop(field, None)
+            if suggestion is None:
+                db.session.add(CaseSuggestion(case_id=case_id, document_id=document_id, field=field, value=value))
+            elif suggestion.value != value:
+                suggestion.value = value
+                suggestion.status = CaseSuggestion.STATUS_PENDING
+                suggestion.updated_at = now
+            elif suggestion.status != CaseSuggestion.STATUS_PENDING:
+                continue
+            pending += 1
+
+        stale_ids = [s.id for s in existing.values() if s.status == CaseSuggestion.STATUS_PENDING]
+        if stale_ids:
+            CaseSuggestion.query.filter(CaseSuggestion.id.in_(stale_ids)).delete(synchronize_session=False)
+
+        if commit:
+            db.session.commit()
+        logger.debug("Stored %s pending suggestions for case %s from doc %s (removed %s stale)", pending, case_id, document_id, len(stale_ids))
+        return pending
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error storing suggestions for case %s, doc %s: %s", case_id, document_id, e)
+        raise SuggestionServiceError(f"Failed to store suggestions for document {document_id}") from e
+
+
+def _resolve(item, by_id, by_field):
+    """Finds the pending suggestion an apply/reject item refers to."""
+    if isinstance(item, int):
+        return by_id.get(item)
+    if not isinstance(item, dict):
+        return None
+    if item.get('id') is not None:
+        return by_id.get(item['id'])
+    return by_field.get((item.get('document_id'), item.get('field')))
+
+
+def apply_suggestions(case_id, user_id, accept=(), reject=(), reject_remaining=False):
+    """
+    Applies and rejects pending suggestions in bulk, ensuring ownership.
+
+    Args:
+        case_id (int): The case.
+        user_id (int): The user applying the suggestions.
+        accept (list): Suggestion ids, or dicts with 'id' or 'document_id' and
+            'field', plus optional 'value' (an edited value to apply instead)
+            and 'lock' (add the field to locked_fields).
+        reject (list): Suggestion ids, or dicts as for accept.
+        reject_remaining (bool): Reject every other pending suggestion too.
+    Returns:
+        dict: {'accepted': [...], 'rejected': count, 'skipped': [...]}
+    Raises:
+        NotFound/Forbidden: As get_case_by_id.
+        SuggestionServiceError: For database errors.
+    """
+    get_case_by_id(case_id, user_id, profile=PROFILE_DISCOVERY)  # Ownership check
+
+    # Only pending, unlocked suggestions can be applied
+    pending = _drop_locked(case_id, suggestion_query(case_id).all())
+    by_id = {s.id: s for s in pending}
+    by_field = {(s.document_id, s.field): s for s in pending}
+
+    case_columns = {col.key for col in inspect(Case).columns if col.key not in PROTECTED_CASE_FIELDS}
+    column_updates = {}
+    detail_updates = {}
+    lock_fields = []
+    accepted_ids = []
+    skipped = []
+
+    for item in accept or ():
+        suggestion = _resolve(item, by_id, by_field)
+        if suggestion is None:
+            skipped.append(item)
+            continue
+        value = item.get('value', suggestion.value) if isinstance(item, dict) else suggestion.value
+        if suggestion.field in case_columns:
+            column_updates[suggestion.field] = value
+        else:
+            detail_updates[suggestion.field] = value
+        if isinstance(item, dict) and item.get('lock') and suggestion.field not in lock_fields:
+            lock_fields.append(suggestion.field)
+        accepted_ids.append(suggestion.id)
+
+    rejected_ids = []
+    for item in reject or ():
+        suggestion = _resolve(item, by_id, by_field)
+        if suggestion is None:
+            skipped.append(item)
+        elif suggestion.id not in accepted_ids:
+            rejected_ids.append(suggestion.id)
+
+    try:
+        now = datetime.utcnow()
+        if accepted_ids:
+            (CaseSuggestion.query.filter(CaseSuggestion.id.in_(accepted_ids))
+             .update({'status': CaseSuggestion.STATUS_ACCEPTED, 'updated_at': now}, synchronize_session=False))
+        rejected = 0
+        if rejected_ids:
+            rejected += (CaseSuggestion.query.filter(CaseSuggestion.id.in_(rejected_ids))
+                         .update({'status': CaseSuggestion.STATUS_REJECTED, 'updated_at': now},
+                                 synchronize_session=False))
+        if reject_remaining:
+            # Includes suggestions hidden because their field is locked
+            rejected += (CaseSuggestion.query
+                         .filter(CaseSuggestion.case_id == case_id,
+                                 CaseSuggestion.status == CaseSuggestion.STATUS_PENDING,
+                                 CaseSuggestion.id.notin_(accepted_ids))
+                         .update({'status': CaseSuggestion.STATUS_REJECTED, 'updated_at': now},
+                                 synchronize_session=False))
+
+        if column_updates or detail_updates:
+            if detail_updates:
+                column_updates['case_details'] = detail_updates
+            update_case(case_id, column_updates, user_id)
+        # update_case only commits when a value changed; the status changes always need it
+        db.session.commit()
+
+        if lock_fields:
+            locked_fields = list(get_case_detail(case_id, 'locked_fields', default=[]) or [])
+            new_locks = [field for field in lock_fields if field not in locked_fields]
+            if new_locks:
+                update_case_details(case_id, {'locked_fields': locked_fields + new_locks})
+    except CaseServiceError as e:
+        db.session.rollback()
+        raise SuggestionServiceError(f"Failed to apply suggestions for case {case_id}: {e}") from e
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error applying suggestions for case %s: %s", case_id, e)
+        raise SuggestionServiceError(f"Failed to apply suggestions for case {case_id}") from e
+
+    logger.debug("Case %s: accepted %s, rejected %s, locked %s, skipped %s", case_id, len(accepted_ids), rejected, lock_fields, len(skipped))
+    return {'accepted': accepted_ids, 'rejected': rejected, 'locked': lock_fields, 'skipped': skipped}
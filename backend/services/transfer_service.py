@@ -0,0 +1,503 @@
+# --- backend/services/transfer_service.py ---
+"""
+Bulk export and import of cases with their documents, for moving a user's or
+a firm's cases between environments.
+
+Export writes two artifacts, both streamed with constant memory:
+  - NDJSON, one record per line, in this order:
+        {"type": "header", "format": 1, "scope": {...}, "exported_at": ...}
+        {"type": "user", "data": {id, username, email, firm}}      (case owners)
+        {"type": "case", "data": {id, display_name, ..., "owner_id": ...}}
+        {"type": "document", "data": {id, case_id, file_name, ..., "blob": name or null}}
+        {"type": "footer", "counts": {...}}
+    Rows are read through server-side cursors (yield_per), ordered by id.
+  - Optionally a tar archive of the documents' files, members named
+    documents/<exported id> in document id order. Files are copied as stored,
+    i.e. still encrypted. Each document line carries its wrapped data key
+    (file_key), so the target needs the same file key-encryption keys (and
+    the legacy file key for files from before envelope encryption).
+
+Import reads the NDJSON line by line and inserts cases and documents in
+batches (one INSERT ... RETURNING per table per batch), remapping ids. Each
+batch commits together with its ImportCheckpoint, so an interrupted import
+started again with the same key carries on after the last committed batch.
+Cases whose display name (per owner), case number or official name already
+exist are skipped with their documents, which also makes re-running a
+finished import harmless.
+"""
+import json
+import os
+import tarfile
+import time
+from datetime import datetime, date
+
+from flask import current_app
+from sqlalchemy import select, insert, or_, and_
+
+from backend.extensions import db
+from backend.models import Case, Document, User, ImportCheckpoint
+from backend.services.search_service import index_document
+from backend.utils.db_types import ENCRYPTED_TYPES, decrypt_rows, raw_ciphertext
+from backend.utils.file_security import generate_secure_filename, get_secure_file_path
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = 1
+DEFAULT_BATCH_SIZE = 200
+BLOB_CHUNK_SIZE = 64 * 1024
+BLOB_PREFIX = 'documents/'
+
+# Columns that don't travel: ids are remapped, versions restart, file paths and
+# blind indexes (keyed per installation) are rebuilt on import
+CASE_EXCLUDED_COLUMNS = {'user_id', 'version', 'case_number_bidx'}
+DOCUMENT_EXCLUDED_COLUMNS = {'file_path', 'version'}
+
+
+# --- Custom Exceptions ---
+class TransferServiceError(Exception):
+    """Base exception for errors in the Transfer service."""
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _line(record):
+    return json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def _owner_ids(user_id=None, username=None, firm=None):
+    """Subquery of the users whose cases are exported."""
+    query = select(User.id)
+    if user_id is not None:
+        return query.where(User.id == user_id)
+    if username:
+        return query.where(User.username == username)
+    if firm:
+        return query.where(User.firm == firm)
+    raise ValueError("An export needs a user id, a username or a firm")
+
+
+def _blob_name(document_id):
+    return f"{BLOB_PREFIX}{document_id}"
+
+
+# --- Export ---
+
+def export_ndjson(user_id=None, username=None, firm=None, include_blobs=False, yield_per=500):
+    """
+    Yields the NDJSON export of the selected users' cases and documents, one
+    line at a time. include_blobs sets each document's "blob" name (the tar
+    archive from export_blob_archive() carries the files).
+    """
+    owners = _owner_ids(user_id, username, firm)
+    case_table, document_table = Case.__table__, Document.__table__
+    case_columns = [c for c in case_table.columns if c.key not in CASE_EXCLUDED_COLUMNS]
+    document_columns = [c for c in document_table.columns if c.key not in DOCUMENT_EXCLUDED_COLUMNS]
+    counts = {'users': 0, 'cases': 0, 'documents': 0, 'blobs': 0}
+
+    yield _line({
+        'type': 'header', 'format': EXPORT_FORMAT, 'exported_at': datetime.utcnow(),
+        'scope': {'user_id': user_id, 'username': username, 'firm': firm},
+        'include_blobs': include_blobs,
+    })
+
+    for row in db.session.execute(select(User.id, User.username, User.email, User.firm)
+                                  .where(User.id.in_(owners)).order_by(User.id)):
+        counts['users'] += 1
+        yield _line({'type': 'user', 'data': dict(row._mapping)})
+
+    # Encrypted columns come back as stored and are decrypted a batch at a time
+    encrypted = {c.key: c.type for c in case_columns if isinstance(c.type, ENCRYPTED_TYPES)}
+    case_rows = db.session.execute(
+        select(*(raw_ciphertext(c) if c.key in encrypted else c for c in case_columns),
+               case_table.c.user_id.label('owner_id'))
+        .where(case_table.c.user_id.in_(owners))
+        .order_by(case_table.c.id)
+        .execution_options(yield_per=yield_per)
+    )
+    for batch in case_rows.partitions():
+        for data in decrypt_rows(batch, encrypted):
+            counts['cases'] += 1
+            yield _line({'type': 'case', 'data': data})
+
+    document_rows = db.session.execute(
+        select(*document_columns, document_table.c.file_path)
+        .join(case_table, case_table.c.id == document_table.c.case_id)
+        .where(case_table.c.user_id.in_(owners))
+        .order_by(document_table.c.id)
+        .execution_options(yield_per=yield_per)
+    )
+    for row in document_rows:
+        data = dict(row._mapping)
+        file_path = data.pop('file_path')
+        has_blob = include_blobs and bool(file_path) and os.path.isfile(file_path)
+        data['blob'] = _blob_name(data['id']) if has_blob else None
+        counts['documents'] += 1
+        counts['blobs'] += int(has_blob)
+        yield _line({'type': 'document', 'data': data})
+
+    yield _line({'type': 'footer', 'counts': counts})
+    logger.debug("Exported %s (user_id=%s, username=%s, firm=%s)", counts, user_id, username, firm)
+
+
+def export_blob_archive(user_id=None, username=None, firm=None, yield_per=500):
+    """
+    Yields a tar archive of the selected documents' stored files, written
+    by hand (header, file chunks, padding) so no file is ever held in memory.
+    Documents whose file is missing on disk are left out.
+    """
+    owners = _owner_ids(user_id, username, firm)
+    rows = db.session.execute(
+        select(Document.id, Document.file_path)
+        .join(Case, Case.id == Document.case_id)
+        .where(Case.user_id.in_(owners))
+        .order_by(Document.id)
+        .execution_options(yield_per=yield_per)
+    )
+    for document_id, file_path in rows:
+        if not file_path or not os.path.isfile(file_path):
+            continue
+        info = tarfile.TarInfo(_blob_name(document_id))
+        info.size = os.path.getsize(file_path)
+        info.mtime = int(os.path.getmtime(file_path))
+        info.mode = 0o640
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        padding = (-info.size) % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def write_export(directory, user_id=None, username=None, firm=None, include_blobs=False):
+    """Writes cases.ndjson (and blobs.tar) into directory; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {'ndjson': os.path.join(directory, 'cases.ndjson')}
+    with open(paths['ndjson'], 'w', encoding='utf-8') as f:
+        for line in export_ndjson(user_id, username, firm, include_blobs=include_blobs):
+            f.write(line)
+    if include_blobs:
+        paths['blobs'] = os.path.join(directory, 'blobs.tar')
+        with open(paths['blobs'], 'wb') as f:
+            for chunk in export_blob_archive(user_id, username, firm):
+                f.write(chunk)
+    return paths
+
+
+# --- Import ---
+
+class _BlobReader:
+    """
+    Reads a blob archive in one forward pass (tar stream mode), in step with
+    the NDJSON documents, which come in the same id order.
+    """
+
+    def __init__(self, fileobj):
+        self._tar = tarfile.open(fileobj=fileobj, mode='r|*') if fileobj is not None else None
+        self._member = None
+        self._done = self._tar is None
+
+    def _id(self, member):
+        name = member.name
+        return int(name[len(BLOB_PREFIX):]) if name.startswith(BLOB_PREFIX) and name[len(BLOB_PREFIX):].isdigit() else -1
+
+    def copy_to(self, exported_id, path):
+        """Copies the blob for exported_id to path; False if the archive doesn't have it."""
+        while not self._done:
+            if self._member is None:
+                self._member = self._tar.next()
+                if self._member is None:
+                    self._done = True
+                    break
+            member_id = self._id(self._member)
+            if member_id < exported_id:
+                self._member = None  # Skip it (already imported, or not wanted)
+                continue
+            if member_id > exported_id:
+                return False
+            source = self._tar.extractfile(self._member)
+            self._member = None
+            with open(path, 'wb') as target:
+                while True:
+                    chunk = source.read(BLOB_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            return True
+        return False
+
+
+def _parse_value(column, value):
+    if value is None:
+        return None
+    python_type = None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        pass
+    if python_type is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if python_type is date and isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _row_for(table, data, excluded):
+    """Column values for an INSERT from an exported record (ids dropped)."""
+    return {column.key: _parse_value(column, data.get(column.key))
+            for column in table.columns
+            if column.key not in excluded and column.key != 'id' and column.key in data}
+
+
+class _Importer:
+    """State of one import run; see import_ndjson()."""
+
+    def __init__(self, checkpoint, owner=None, blob_reader=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.checkpoint = checkpoint
+        self.owner = owner
+        self.blobs = blob_reader
+        self.batch_size = batch_size
+        self.case_map = {int(k): v for k, v in (checkpoint.case_id_map or {}).items()}
+        self.stats = dict(checkpoint.stats or {})
+        for key in ('cases', 'documents', 'blobs', 'skipped_cases', 'skipped_documents', 'missing_blobs'):
+            self.stats.setdefault(key, 0)
+        self.stats.setdefault('skipped', [])
+        self.user_map = {}
+        self.pending_cases = []
+        self.pending_documents = []
+        self.written_files = []
+
+    # --- Users ---
+    def add_user(self, data):
+        if self.owner is not None:
+            self.user_map[data['id']] = self.owner.id
+            return
+        user = (User.query.filter_by(email=data.get('email')).first()
+                or User.query.filter_by(username=data.get('username')).first())
+        self.user_map[data['id']] = user.id if user else None
+
+    def _skip(self, kind, exported_id, reason):
+        self.stats[f'skipped_{kind}s'] += 1
+        if len(self.stats['skipped']) < 100:  # Keep the checkpoint small
+            self.stats['skipped'].append({'type': kind, 'id': exported_id, 'reason': reason})
+
+    # --- Batches ---
+    def add(self, record_type, data):
+        if record_type == 'case':
+            self.pending_cases.append(data)
+        else:
+            self.pending_documents.append(data)
+        return len(self.pending_cases) + len(self.pending_documents) >= self.batch_size
+
+    def _conflicts(self, rows):
+        """Returns the indexes of rows that collide with existing cases' unique columns."""
+        conditions = []
+        for row in rows:
+            conditions.append(and_(Case.user_id == row['user_id'], Case.display_name == row['display_name']))
+        numbers = [row['case_number'] for row in rows if row.get('case_number')]
+        names = [row['official_case_name'] for row in rows if row.get('official_case_name')]
+        if numbers:
+            conditions.append(Case.case_number.in_(numbers))
+        if names:
+            conditions.append(Case.official_case_name.in_(names))
+        existing = db.session.execute(
+            select(Case.user_id, Case.display_name, Case.case_number, Case.official_case_name).where(or_(*conditions))
+        ).all()
+        taken_names = {(r.user_id, r.display_name) for r in existing}
+        taken_numbers = {r.case_number for r in existing if r.case_number}
+        taken_official = {r.official_case_name for r in existing if r.official_case_name}
+
+        conflicts = {}
+        for index, row in enumerate(rows):
+            key = (row['user_id'], row['display_name'])
+            if key in taken_names:
+                conflicts[index] = 'display name exists'
+            elif row.get('case_number') and row['case_number'] in taken_numbers:
+                conflicts[index] = 'case number exists'
+            elif row.get('official_case_name') and row['official_case_name'] in taken_official:
+                conflicts[index] = 'official case name exists'
+            else:
+                # Later rows in the same batch must not collide with this one
+                taken_names.add(key)
+                if row.get('case_number'):
+                    taken_numbers.add(row['case_number'])
+                if row.get('official_case_name'):
+                    taken_official.add(row['official_case_name'])
+        return conflicts
+
+    def _flush_cases(self):
+        rows, exported_ids = [], []
+        for data in self.pending_cases:
+            owner_id = self.user_map.get(data.get('owner_id'))
+            if owner_id is None:
+                self.case_map[data['id']] = None
+                self._skip('case', data['id'], 'owner not found')
+                continue
+            row = _row_for(Case.__table__, data, CASE_EXCLUDED_COLUMNS)
+            row['user_id'] = owner_id
+            rows.append(row)
+            exported_ids.append(data['id'])
+        self.pending_cases = []
+        if not rows:
+            return
+
+        conflicts = self._conflicts(rows)
+        for index in conflicts:
+            self.case_map[exported_ids[index]] = None
+            self._skip('case', exported_ids[index], conflicts[index])
+        keep = [i for i in range(len(rows)) if i not in conflicts]
+        if not keep:
+            return
+        new_ids = db.session.execute(
+            insert(Case.__table__).returning(Case.__table__.c.id, sort_by_parameter_order=True),
+            [rows[i] for i in keep],
+        ).scalars().all()
+        for index, new_id in zip(keep, new_ids):
+            self.case_map[exported_ids[index]] = new_id
+        self.stats['cases'] += len(new_ids)
+
+    def _flush_documents(self):
+        rows, texts = [], []
+        for data in self.pending_documents:
+            case_id = self.case_map.get(data.get('case_id'))
+            if case_id is None:
+                self._skip('document', data['id'], 'case not imported')
+                continue
+            row = _row_for(Document.__table__, data, DOCUMENT_EXCLUDED_COLUMNS)
+            row['case_id'] = case_id
+            row['file_path'] = ''
+            if data.get('blob') and self.blobs is not None:
+                secure_name, _ = generate_secure_filename(data.get('file_name') or 'document', case_id)
+                path = get_secure_file_path(secure_name, case_id)
+                if self.blobs.copy_to(data['id'], path):
+                    self.written_files.append(path)
+                    row['file_path'] = path
+                    self.stats['blobs'] += 1
+                else:
+                    self.stats['missing_blobs'] += 1
+            rows.append(row)
+            texts.append((case_id, row.get('extracted_text')))
+        self.pending_documents = []
+        if not rows:
+            return
+
+        new_ids = db.session.execute(
+            insert(Document.__table__).returning(Document.__table__.c.id, sort_by_parameter_order=True),
+            rows,
+        ).scalars().all()
+        for new_id, (case_id, extracted_text) in zip(new_ids, texts):
+            if extracted_text:
+                index_document(new_id, case_id, extracted_text, commit=False)
+        self.stats['documents'] += len(new_ids)
+
+    def flush(self, line_number):
+        """Inserts the pending batch and commits it with the checkpoint."""
+        try:
+            self._flush_cases()
+            self._flush_documents()
+            self.checkpoint.line_number = line_number
+            self.checkpoint.case_id_map = {str(k): v for k, v in self.case_map.items()}
+            self.checkpoint.stats = dict(self.stats)
+            db.session.commit()
+            self.written_files = []
+        except Exception:
+            db.session.rollback()
+            for path in self.written_files:  # Files of the batch that didn't commit
+                if os.path.exists(path):
+                    os.remove(path)
+            self.written_files = []
+            raise
+
+
+def _get_checkpoint(import_key):
+    checkpoint = ImportCheckpoint.query.filter_by(import_key=import_key).first()
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(import_key=import_key, line_number=0, case_id_map={}, stats={})
+        db.session.add(checkpoint)
+        db.session.commit()
+    return checkpoint
+
+
+def import_ndjson(lines, import_key, owner_username=None, blob_file=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Imports an NDJSON export.
+
+    Args:
+        lines (iterable): The export's lines (str or bytes), e.g. an open file.
+        import_key (str): Names the checkpoint; run again with the same key
+            to resume an interrupted import.
+        owner_username (str): Give every imported case to this user instead
+            of matching the exported owners by email/username.
+        blob_file (file): The blob archive (optional), read in one pass.
+        batch_size (int): Records per INSERT batch and commit.
+    Returns:
+        dict: Counts of imported and skipped records, and the checkpoint state.
+    Raises:
+        TransferServiceError: For unknown owners, bad input and database errors.
+    """
+    owner = None
+    if owner_username:
+        owner = User.query.filter_by(username=owner_username).first()
+        if owner is None:
+            raise TransferServiceError(f"User '{owner_username}' not found")
+
+    checkpoint = _get_checkpoint(import_key)
+    if checkpoint.status == ImportCheckpoint.STATUS_COMPLETE:
+        return {'import_key': import_key, 'status': checkpoint.status, 'resumed_from_line': checkpoint.line_number,
+                **(checkpoint.stats or {})}
+
+    resume_from = checkpoint.line_number
+    importer = _Importer(checkpoint, owner=owner, blob_reader=_BlobReader(blob_file) if blob_file else None,
+                         batch_size=max(int(batch_size), 1))
+    started = time.monotonic()
+    line_number = 0
+    saw_header = False
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record_type = record.get('type')
+
+            if record_type == 'header':
+                if record.get('format') != EXPORT_FORMAT:
+                    raise TransferServiceError(f"Unsupported export format: {record.get('format')}")
+                saw_header = True
+            elif record_type == 'user':
+                importer.add_user(record['data'])  # Always re-read: cheap, and needed after a resume
+            elif record_type in ('case', 'document'):
+                if not saw_header:
+                    raise TransferServiceError("Export header missing")
+                if line_number <= resume_from:
+                    continue
+                if importer.add(record_type, record['data']):
+                    importer.flush(line_number)
+            elif record_type != 'footer':
+                raise TransferServiceError(f"Unknown record type on line {line_number}: {record_type}")
+
+        importer.flush(line_number)
+        checkpoint.status = ImportCheckpoint.STATUS_COMPLETE
+        db.session.commit()
+    except TransferServiceError:
+        raise
+    except (ValueError, KeyError) as e:
+        raise TransferServiceError(f"Invalid export data near line {line_number}: {e}") from e
+    except Exception as e:
+        logger.error("Error importing cases (key %s) near line %s: %s", import_key, line_number, e)
+        raise TransferServiceError(f"Import failed near line {line_number}; run it again to resume") from e
+
+    logger.debug("Import %s finished in %.1fs: %s", import_key, time.monotonic() - started, importer.stats)
+    return {'import_key': import_key, 'status': checkpoint.status, 'resumed_from_line': resume_from,
+            **importer.stats}
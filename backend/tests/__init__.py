@@ -0,0 +1,122 @@
+# Tests for the backend API and services
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from backend import create_app
+from backend.config import Config
+from backend.extensions import db
+from backend.models import User
+
+PASSWORD = 'Passw0rd!'
+
+
+class TestConfig(Config):
+    """In-memory SQLite app for endpoint tests."""
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    SHRED_WORKER_ENABLED = False  # Tests drain the shred queue themselves
+    LOG_FILE_DIR = None
+    METRICS_DIR = None  # This process's histograms only
+
+
+def isolated_config(test, config=TestConfig):
+    """
+    ``config`` with its own temporary key directories and upload folder,
+    removed after ``test``; without them the app would create and read the
+    real keys under instance/. Paths ``config`` already sets are kept.
+    """
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+    paths = {
+        'ENCRYPTION_KEY_DIR': os.path.join(directory, 'encryption_keys'),
+        'FILE_KEY_DIR': os.path.join(directory, 'file_keys'),
+        'FILE_ENCRYPTION_KEY_PATH': os.path.join(directory, 'file_encryption.key'),
+        'UPLOAD_FOLDER': os.path.join(directory, 'uploads'),
+    }
+    paths = {name: path for name, path in paths.items()
+             if getattr(config, name, None) in (None, getattr(Config, name, None))}
+    return type(config.__name__, (config,), paths)
+
+
+OTHER_PROCESS_SCRIPT = """
+import json, sys
+from backend import create_app
+from backend.tests import TestConfig
+config = type('OtherProcessConfig', (TestConfig,), json.loads(sys.argv[1]))
+result = create_app(config).test_cli_runner().invoke(args=sys.argv[2:])
+sys.stdout.write(result.output)
+sys.exit(result.exit_code)
+"""
+SHARED_SETTINGS = ('SQLALCHEMY_DATABASE_URI', 'ENCRYPTION_KEY_DIR', 'FILE_KEY_DIR', 'FILE_ENCRYPTION_KEY_PATH',
+                   'UPLOAD_FOLDER', 'ENCRYPT_CASE_FIELDS')
+
+
+def run_command_in_other_process(app, *args):
+    """
+    Runs a flask CLI command (e.g. 'rotate-keys') in a separate process on
+    ``app``'s database file and key directories, as an operator would while
+    the app keeps running. Returns the command's output.
+    """
+    settings = {name: app.config.get(name) for name in SHARED_SETTINGS}
+    repo = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, '-c', OTHER_PROCESS_SCRIPT, json.dumps(settings), *args],
+                            cwd=repo, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise AssertionError(f"{' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+    return result.stdout
+
+
+def make_user(username, **fields):
+    """Adds an approved user with PASSWORD to the session (inside an app context); commit to keep it."""
+    fields = dict({'email': f'{username}@example.com', 'firm': 'Adamson Ahdoot LLC',
+                   'pending_approval': False, 'failed_login_attempts': 0}, **fields)
+    user = User(username=username, **fields)
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    return user
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    A fresh app on ``config`` with its tables created, and a test client.
+    Subclasses add their users with make_user and sign in with login();
+    set ``self.config`` before calling setUp for a config built per test.
+
+    Tests whose requests run background jobs set ``file_database``: the
+    in-memory database is one connection, which the job's thread and the
+    test's requests can't use at the same time.
+    """
+
+    config = TestConfig
+    file_database = False
+
+    def setUp(self):
+        config = isolated_config(self, self.config)
+        if self.file_database:
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+            config = type(config.__name__, (config,), {
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'test.db')}"})
+        self.app = create_app(config)
+        with self.app.app_context():
+            db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+
+    def login(self, username, client=None):
+        """Signs ``username`` in on ``client`` (the test client by default)."""
+        response = (client or self.client).post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
@@ -0,0 +1,52 @@
+"""
+Query budget helper for endpoint tests.
+
+Usage:
+    with assert_max_queries(self, 4):
+        self.client.get('/api/cases')
+
+Fails the test, listing the statements, if more SQL statements are executed
+inside the block than the budget allows.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from backend.extensions import db
+
+
+class QueryCounter:
+    """Records every SQL statement executed on the app's engine while active."""
+
+    def __init__(self, engine=None):
+        self.engine = engine or db.engine
+        self.queries = []  # (statement, parameters)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return False
+
+    @property
+    def statements(self):
+        return [statement for statement, _ in self.queries]
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+@contextmanager
+def assert_max_queries(testcase, budget, engine=None):
+    """Fails ``testcase`` if the block runs more than ``budget`` SQL statements."""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        listing = "\n".join(f"  {i + 1}. {' '.join(s.split())}" for i, s in enumerate(counter.statements))
+        testcase.fail(f"Query budget exceeded: {counter.count} queries, budget {budget}\n{listing}")
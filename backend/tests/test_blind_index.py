@@ -0,0 +1,137 @@
+"""
+Tests for blind-index lookups and uniqueness on encrypted case numbers.
+"""
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import insert, select, type_coerce, Text
+from sqlalchemy.exc import IntegrityError
+
+from backend import create_app
+from backend.extensions import db
+from backend.models import Case
+from backend.services.key_rotation_service import rotation_status
+from backend.utils.db_types import EncryptedJSON
+from backend.utils.encryption import field_encryptor
+from . import AppTestCase, TestConfig, isolated_config, make_user
+from .query_budget import QueryCounter
+
+
+class TestCaseNumberBlindIndex(AppTestCase):
+    """Case numbers are found and kept unique through case_number_bidx, encrypted or not."""
+
+    encrypt = True
+
+    def setUp(self):
+        self.key_dir = tempfile.mkdtemp()
+
+        class BlindIndexConfig(TestConfig):
+            ENCRYPTION_KEY_DIR = self.key_dir
+            ENCRYPT_CASE_FIELDS = self.encrypt
+
+        self.config = BlindIndexConfig
+        super().setUp()
+        with self.app.app_context():
+            self.engine = db.engine
+            user = make_user('bidx')
+            db.session.add_all([Case(display_name=f'Case {n}', case_number=f'BC{n}', owner=user) for n in range(3)])
+            db.session.commit()
+            self.user_id = user.id
+        self.login('bidx')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.key_dir)
+
+    def stored(self):
+        return db.session.execute(
+            select(type_coerce(Case.case_number, Text), Case.case_number_bidx).order_by(Case.id)).all()
+
+    def test_stored_value_is_ciphertext_with_index(self):
+        with self.app.app_context():
+            for stored, bidx in self.stored():
+                self.assertTrue(field_encryptor.is_encrypted(stored))
+                self.assertEqual(len(bidx), 64)
+            self.assertEqual([case.case_number for case in Case.query.order_by(Case.id)], ['BC0', 'BC1', 'BC2'])
+
+    def test_search_is_an_index_lookup(self):
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get('/api/cases?case_number=BC1')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([case['case_number'] for case in response.get_json()], ['BC1'])
+        self.assertNotIn('case_number_bidx', response.get_json()[0])
+
+        statement, parameters = next((s, p) for s, p in counter.queries if 'case_number_bidx =' in s)
+        with self.engine.connect() as conn:
+            plan = ' | '.join(row[3] for row in
+                              conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+        self.assertIn('INDEX ix_case_case_number_bidx', plan)
+        self.assertEqual(self.client.get('/api/cases?case_number=BC9').get_json(), [])
+
+    def test_duplicates_are_refused(self):
+        with self.app.app_context():
+            db.session.add(Case(display_name='Another', case_number='BC1', user_id=self.user_id))
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_core_inserts_and_in_lookups(self):
+        with self.app.app_context():
+            db.session.execute(insert(Case.__table__), [
+                {'display_name': 'Imported', 'case_number': 'BC7', 'user_id': self.user_id}])
+            found = db.session.execute(select(Case.display_name).where(Case.case_number.in_(['BC7', 'BC2']))
+                                       .order_by(Case.display_name)).scalars().all()
+            self.assertEqual(found, ['Case 2', 'Imported'])
+
+    def test_orm_update_moves_the_index(self):
+        with self.app.app_context():
+            case = Case.query.filter_by(case_number='BC0').one()
+            case.case_number = 'BC0-A'
+            db.session.commit()
+            self.assertIsNone(Case.query.filter_by(case_number='BC0').first())
+            self.assertEqual(Case.query.filter(Case.case_number == 'BC0-A').one().id, case.id)
+            case.case_number = None
+            db.session.commit()
+            self.assertEqual(Case.query.filter(Case.case_number == None).count(), 1)  # noqa: E711
+
+
+class TestCaseNumberSwitchedOff(TestCaseNumberBlindIndex):
+    """With ENCRYPT_CASE_FIELDS off values are plaintext, still indexed the same way."""
+
+    encrypt = False
+
+    def test_stored_value_is_ciphertext_with_index(self):
+        with self.app.app_context():
+            self.assertEqual([stored for stored, _ in self.stored()], ['BC0', 'BC1', 'BC2'])
+
+    def test_switching_on_and_rotating_encrypts_old_rows(self):
+        with self.app.app_context():
+            tables = [Case.__table__]
+            before = [bidx for _, bidx in self.stored()]
+            self.assertEqual(rotation_status(tables)['stale_rows'], 0)
+
+            self.app.config['ENCRYPT_CASE_FIELDS'] = True
+            self.assertEqual(rotation_status(tables)['stale_rows'], 3)
+            self.assertTrue(field_encryptor.rotate_keys(tables=tables))
+            self.assertEqual(rotation_status(tables)['stale_rows'], 0)
+            self.assertTrue(all(field_encryptor.is_encrypted(stored) for stored, _ in self.stored()))
+            self.assertEqual([bidx for _, bidx in self.stored()], before)
+            self.assertEqual(Case.query.filter_by(case_number='BC2').one().display_name, 'Case 2')
+
+
+class TestJSONBlindIndex(unittest.TestCase):
+    """JSON values are indexed in canonical form."""
+
+    def test_key_order_does_not_matter(self):
+        app = create_app(isolated_config(self))
+        with app.app_context():
+            column_type = EncryptedJSON(blind_index='details_bidx')
+            self.assertEqual(column_type.blind_index_of({'a': 1, 'b': [2]}),
+                             column_type.blind_index_of({'b': [2], 'a': 1}))
+            self.assertNotEqual(column_type.blind_index_of({'a': 1}),
+                                EncryptedJSON(blind_index='other_bidx').blind_index_of({'a': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for in-place case_details updates.
+"""
+import unittest
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from backend.extensions import db
+from backend.models import Case
+from backend.services.case_service import (
+    update_case_details, get_case_detail, get_cases_with_detail_key, update_case,
+    case_details_update_expression
+)
+from . import AppTestCase, make_user
+from .query_budget import QueryCounter
+
+
+class TestCaseDetailsUpdates(AppTestCase):
+    """Single keys are written in SQL without rewriting the rest of case_details."""
+
+    def setUp(self):
+        super().setUp()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        user = make_user('details')
+        db.session.flush()
+        self.user_id = user.id
+        case = Case(display_name='Details', user_id=user.id, case_details={
+            'locked_fields': ['judge'],
+            'pending_suggestions': {'doc_1': {'judge': 'A'}},
+        })
+        db.session.add_all([case, Case(display_name='Empty', user_id=user.id)])
+        db.session.commit()
+        self.case_id = case.id
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+        super().tearDown()
+
+    def details(self):
+        db.session.expire_all()
+        return db.session.get(Case, self.case_id).case_details
+
+    def test_set_nested_and_top_level_keys(self):
+        with QueryCounter() as counter:
+            update_case_details(self.case_id, {
+                ('pending_suggestions', 'doc_2'): {'county': 'Los Angeles', 'note': None},
+                'last_analyzed_doc_id': 2,
+            })
+        writes = [s for s in counter.statements if s.lstrip().upper().startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('json_set', writes[0])
+        self.assertEqual(self.details(), {
+            'locked_fields': ['judge'],
+            'pending_suggestions': {'doc_1': {'judge': 'A'}, 'doc_2': {'county': 'Los Angeles', 'note': None}},
+            'last_analyzed_doc_id': 2,
+        })
+
+    def test_remove_and_missing_details(self):
+        update_case_details(self.case_id, remove=[('pending_suggestions', 'doc_1'), 'locked_fields'])
+        self.assertEqual(self.details(), {'pending_suggestions': {}})
+
+        empty = Case.query.filter_by(display_name='Empty').first()
+        update_case_details(empty.id, {('pending_suggestions', 'doc_3'): {'x': 1}})
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, empty.id).case_details, {'pending_suggestions': {'doc_3': {'x': 1}}})
+
+    def test_update_case_writes_only_changed_keys(self):
+        update_case(self.case_id, {'case_details': {'locked_fields': ['judge'], 'notes': 'x'}}, self.user_id)
+        self.assertEqual(self.details()['notes'], 'x')
+        self.assertEqual(self.details()['pending_suggestions'], {'doc_1': {'judge': 'A'}})
+
+    def test_read_and_query_by_key(self):
+        self.assertEqual(get_case_detail(self.case_id, 'locked_fields'), ['judge'])
+        self.assertEqual(get_case_detail(self.case_id, 'missing', default=[]), [])
+        cases = get_cases_with_detail_key(self.user_id, 'pending_suggestions')
+        self.assertEqual([c.display_name for c in cases], ['Details'])
+
+    def test_postgres_expression(self):
+        """On Postgres the same update is a jsonb merge plus jsonb_set for nested keys."""
+        expression = case_details_update_expression(
+            'postgresql', {'a': 1, ('pending_suggestions', 'doc_2'): {'x': 1}}, remove=['old'])
+        sql = str(update(Case).values(case_details=expression).compile(dialect=postgresql.dialect()))
+        self.assertIn('jsonb_set', sql)
+        self.assertIn('||', sql)
+        self.assertIn('#-', sql)
+
+    def test_rejects_deep_or_unsafe_paths(self):
+        with self.assertRaises(ValueError):
+            case_details_update_expression('sqlite', {('a', 'b', 'c'): 1})
+        with self.assertRaises(ValueError):
+            case_details_update_expression('sqlite', {'a"b': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests for ETag / Last-Modified revalidation of the case endpoints.
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+from backend.extensions import db
+from backend.models import Case, Document
+from backend.services.case_service import update_case_details
+from . import AppTestCase, make_user
+
+
+class TestConditionalGet(AppTestCase):
+    """Validators change whenever the response would, and only then."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            user = make_user('etag')
+            case = Case(display_name='ETag', owner=user)
+            case.documents.append(Document(file_name='a.pdf', file_path='/tmp/a.pdf'))
+            case.documents.append(Document(file_name='b.pdf', file_path='/tmp/b.pdf'))
+            db.session.add(case)
+            db.session.commit()
+            self.case_id = case.id
+            self.document_id = case.documents[0].id
+
+        self.login('etag')
+        self.urls = ('/api/cases', f'/api/cases/{self.case_id}', f'/api/cases/{self.case_id}/documents')
+
+    def etags(self):
+        responses = [self.client.get(url) for url in self.urls]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        return [response.headers['ETag'] for response in responses]
+
+    def test_unchanged_data_keeps_etags(self):
+        self.assertEqual(self.etags(), self.etags())
+
+    def test_case_update_changes_case_etags_only(self):
+        before = self.etags()
+        with self.app.app_context():
+            update_case_details(self.case_id, {'note': 'changed'})  # Bulk UPDATE, not the ORM
+        after = self.etags()
+        self.assertNotEqual(before[:2], after[:2])
+        self.assertEqual(before[2], after[2])
+
+    def test_document_delete_changes_every_etag(self):
+        before = self.etags()
+        response = self.client.delete(f'/api/documents/{self.document_id}')
+        self.assertEqual(response.status_code, 200, response.data)
+        after = self.etags()
+        self.assertTrue(all(b != a for b, a in zip(before, after)))
+
+    def test_if_modified_since(self):
+        url = f'/api/cases/{self.case_id}'
+        last_modified = self.client.get(url).headers['Last-Modified']
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': last_modified}).status_code, 304)
+        earlier = http_date(datetime.utcnow() - timedelta(days=1))
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': earlier}).status_code, 200)
+
+    def test_other_users_case_is_not_revalidated(self):
+        with self.app.app_context():
+            db.session.add(Case(display_name='Theirs', owner=make_user('other')))
+            db.session.commit()
+            their_id = Case.query.filter_by(display_name='Theirs').one().id
+        response = self.client.get(f'/api/cases/{their_id}', headers={'If-None-Match': '"anything"'})
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for the database engine profiles and the pool statistics endpoint.
+"""
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from backend import create_app
+from backend.extensions import db
+from backend.utils.db_engine import engine_options, TimedQueuePool
+from . import AppTestCase, TestConfig, isolated_config, make_user
+
+
+class TestEngineProfiles(unittest.TestCase):
+    """Each backend gets its pool and connection settings."""
+
+    def test_postgres_profile(self):
+        options = engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@db/app',
+                                  'DB_POOL_SIZE': 8, 'DB_STATEMENT_TIMEOUT_MS': 15000})
+        self.assertIs(options['poolclass'], TimedQueuePool)
+        self.assertEqual(options['pool_size'], 8)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(options['connect_args'], {'options': '-c statement_timeout=15000'})
+
+    def test_explicit_engine_options_win(self):
+        options = engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@db/app',
+                                  'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2}})
+        self.assertEqual(options['pool_size'], 2)
+
+    def test_sqlite_file_pragmas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            class FileConfig(TestConfig):
+                SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'wal.db')}"
+                SQLITE_BUSY_TIMEOUT_MS = 7000
+
+            app = create_app(isolated_config(self, FileConfig))
+            with app.app_context():
+                self.assertIsInstance(db.engine.pool, TimedQueuePool)
+                with db.engine.connect() as connection:
+                    pragma = lambda name: connection.execute(text(f"PRAGMA {name}")).scalar()
+                    self.assertEqual(pragma('journal_mode'), 'wal')
+                    self.assertEqual(pragma('busy_timeout'), 7000)
+                    self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+                db.engine.dispose()
+
+
+class TestPoolStatsEndpoint(AppTestCase):
+    """Pool statistics are admin only."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            for name in ('admin', 'clerk'):
+                make_user(name)
+            db.session.commit()
+
+    def test_admin_gets_stats(self):
+        self.login('admin')
+        stats = self.client.get('/api/admin/db-pool').get_json()
+        self.assertEqual(stats['dialect'], 'sqlite')
+        self.assertGreater(stats['checkouts'], 0)
+        self.assertIn('DB_POOL_SIZE', stats['config'])
+
+    def test_other_users_are_refused(self):
+        self.login('clerk')
+        self.assertEqual(self.client.get('/api/admin/db-pool').status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
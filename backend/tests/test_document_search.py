@@ -0,0 +1,81 @@
+"""
+Tests for full-text search over documents' extracted text (SQLite FTS5).
+"""
+import unittest
+
+from backend.extensions import db
+from backend.models import Case, Document, DocumentSearchPage
+from backend.services.case_service import delete_case
+from backend.services.search_service import index_document, search_documents, remove_document_from_index
+from backend.utils.document_parser import PAGE_BREAK
+from . import AppTestCase, make_user
+
+
+class TestDocumentSearch(AppTestCase):
+    """Pages are indexed on ingest, searched per user, and removed on delete."""
+
+    def setUp(self):
+        super().setUp()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        users = [make_user(name) for name in ('searcher', 'other')]
+        db.session.flush()
+        self.user_id, self.other_id = users[0].id, users[1].id
+
+        case = Case(display_name='Search', user_id=self.user_id)
+        other_case = Case(display_name='Other', user_id=self.other_id)
+        db.session.add_all([case, other_case])
+        db.session.flush()
+        self.case_id = case.id
+
+        records = Document(case_id=case.id, file_name='records.pdf', file_path='/tmp/records.pdf')
+        letter = Document(case_id=case.id, file_name='letter.docx', file_path='/tmp/letter.docx')
+        private = Document(case_id=other_case.id, file_name='private.pdf', file_path='/tmp/private.pdf')
+        db.session.add_all([records, letter, private])
+        db.session.commit()
+        self.records_id, self.letter_id = records.id, letter.id
+
+        index_document(records.id, case.id, PAGE_BREAK.join([
+            "Intake form.\n",
+            "Seen by Dr. Maria Lopez at Valley Orthopedics on 03/14/2023.\n",
+            "Follow-up with Dr. Lopez; Valley Orthopedics billing attached.\n",
+        ]))
+        index_document(letter.id, case.id, "Letter mentioning Valley Orthopedics once.")
+        index_document(private.id, other_case.id, "Valley Orthopedics records for someone else.")
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+        super().tearDown()
+
+    def test_results_are_scoped_ranked_and_have_pages_and_snippets(self):
+        found = search_documents(self.user_id, 'valley orthopedics')
+        self.assertEqual(found['total'], 3)
+        pages = [(r['document_id'], r['page_number']) for r in found['results']]
+        self.assertCountEqual(pages, [(self.records_id, 2), (self.records_id, 3), (self.letter_id, None)])
+        self.assertEqual(found['results'], sorted(found['results'], key=lambda r: -r['score']))
+        self.assertIn('<mark>Valley</mark>', found['results'][0]['snippet'])
+
+    def test_phrase_and_syntax_characters(self):
+        found = search_documents(self.user_id, '"Maria Lopez" 03/14/2023')
+        self.assertEqual([(r['document_id'], r['page_number']) for r in found['results']], [(self.records_id, 2)])
+        self.assertEqual(search_documents(self.user_id, 'lopez -OR* :')['total'], 0)
+
+    def test_pagination(self):
+        first = search_documents(self.user_id, 'orthopedics', per_page=2)
+        second = search_documents(self.user_id, 'orthopedics', page=2, per_page=2)
+        self.assertEqual((len(first['results']), len(second['results']), second['total']), (2, 1, 3))
+
+    def test_index_follows_reindex_and_delete(self):
+        index_document(self.letter_id, self.case_id, "Rewritten letter.")
+        self.assertEqual(search_documents(self.user_id, 'orthopedics')['total'], 2)
+        remove_document_from_index(self.records_id)
+        db.session.commit()
+        self.assertEqual(search_documents(self.user_id, 'orthopedics')['total'], 0)
+        delete_case(self.case_id, self.user_id)
+        self.assertEqual(DocumentSearchPage.query.filter_by(case_id=self.case_id).count(), 0)
+        self.assertEqual(search_documents(self.user_id, 'rewritten')['total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
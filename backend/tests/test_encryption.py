@@ -0,0 +1,243 @@
+"""
+Tests for key-id tagged field encryption, bulk decryption and key rotation.
+"""
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import Column, Integer, MetaData, Table, Text, select, type_coerce
+
+from backend import create_app
+from backend.extensions import db
+from backend.models import Case
+from backend.utils.db_types import EncryptedJSON, EncryptedText, raw_ciphertext, decrypt_rows
+from backend.utils.encryption import KeyRing, field_encryptor, benchmark_decrypt
+from backend.services import key_rotation_service
+from backend.services.key_rotation_service import rotation_status
+from . import AppTestCase, TestConfig, isolated_config, make_user, run_command_in_other_process
+
+
+class TestKeyRing(unittest.TestCase):
+    """Tagged values go to their key; untagged (legacy) values still decrypt."""
+
+    def setUp(self):
+        self.keys = {'key_old': Fernet.generate_key(), 'key_new': Fernet.generate_key()}
+        self.ring = KeyRing(self.keys, 'key_new')
+
+    def test_tagged_round_trip(self):
+        token = self.ring.encrypt(b'secret')
+        self.assertTrue(token.startswith(b'$key_new$'))
+        self.assertEqual(self.ring.key_id_of(token), 'key_new')
+        self.assertEqual(self.ring.decrypt(token), b'secret')
+        self.assertEqual(self.ring.decrypt(token.decode('utf-8')), b'secret')
+
+    def test_untagged_values_from_any_key(self):
+        legacy = Fernet(self.keys['key_old']).encrypt(b'legacy')
+        self.assertIsNone(self.ring.key_id_of(legacy))
+        self.assertEqual(self.ring.decrypt(legacy), b'legacy')
+
+    def test_tag_routes_to_one_key(self):
+        old = KeyRing(self.keys, 'key_old').encrypt(b'x')
+        # Mislabel the token: the named key must be used, not a search over all keys
+        mislabeled = b'$key_new$' + KeyRing.split(old)[1]
+        with self.assertRaises(InvalidToken):
+            self.ring.decrypt(mislabeled)
+        with self.assertRaises(InvalidToken):
+            self.ring.decrypt(b'$key_gone$' + KeyRing.split(old)[1])
+
+    def test_decrypt_many_keeps_order_and_nones(self):
+        old_ring = KeyRing(self.keys, 'key_old')
+        tokens = [self.ring.encrypt(b'a'), None, old_ring.encrypt(b'b'),
+                  Fernet(self.keys['key_new']).encrypt(b'c'), self.ring.encrypt(b'd')]
+        self.assertEqual(self.ring.decrypt_many(tokens), [b'a', None, b'b', b'c', b'd'])
+
+    def test_fallback_order_puts_the_active_key_first(self):
+        ring = KeyRing({'key_a': self.keys['key_old'], 'key_b': Fernet.generate_key(),
+                        'key_c': self.keys['key_new']}, 'key_c')
+        self.assertEqual(ring.fallback_order, ['key_c', 'key_a', 'key_b'])
+
+    def test_benchmark_reports_each_key_count(self):
+        rows = benchmark_decrypt((1, 3), values=20)
+        self.assertEqual([row['keys'] for row in rows], [1, 3])
+        self.assertTrue(all(row['tagged'] > 0 and row['untagged'] > 0 for row in rows))
+
+
+class TestBulkDecrypt(unittest.TestCase):
+    """Rows selected as raw ciphertext decrypt in one call per column."""
+
+    def setUp(self):
+        self.app = create_app(isolated_config(self))
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.table = Table('secrets', MetaData(), Column('id', Integer, primary_key=True),
+                           Column('note', EncryptedText()), Column('data', EncryptedJSON()))
+        self.table.create(db.engine)
+
+    def tearDown(self):
+        self.table.drop(db.engine)
+        self.ctx.pop()
+
+    def test_decrypt_rows_matches_per_value_decryption(self):
+        with db.engine.begin() as connection:
+            connection.execute(self.table.insert(), [
+                {'note': f'note {i}', 'data': {'n': i}} if i != 2 else {'note': None, 'data': None}
+                for i in range(5)])
+            stored = connection.execute(select(raw_ciphertext(self.table.c.note))).scalars().all()
+            per_value = connection.execute(select(self.table.c.id, self.table.c.note, self.table.c.data)
+                                           .order_by(self.table.c.id)).all()
+            raw_rows = connection.execute(select(self.table.c.id, raw_ciphertext(self.table.c.note),
+                                                 raw_ciphertext(self.table.c.data))
+                                          .order_by(self.table.c.id)).all()
+
+        self.assertTrue(stored[0].startswith('$'))
+        self.assertEqual(field_encryptor.key_id_of(stored[0]), field_encryptor._active_key_id)
+        bulk = decrypt_rows(raw_rows, {'note': self.table.c.note.type, 'data': self.table.c.data.type})
+        self.assertEqual([dict(row._mapping) for row in per_value], bulk)
+        self.assertEqual(bulk[2], {'id': 3, 'note': None, 'data': None})
+
+
+class TestKeyRotation(unittest.TestCase):
+    """Rotation re-encrypts in committed batches and resumes from its checkpoint."""
+
+    def setUp(self):
+        self.key_dir = tempfile.mkdtemp()
+
+        class KeyDirConfig(TestConfig):
+            ENCRYPTION_KEY_DIR = self.key_dir
+
+        self.app = create_app(isolated_config(self, KeyDirConfig))
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.table = Table('rotated', MetaData(), Column('id', Integer, primary_key=True),
+                           Column('note', EncryptedText()), Column('data', EncryptedJSON()))
+        self.table.create(db.engine)
+        rows = [{'note': f'note {i}', 'data': {'n': i}} for i in range(7)]
+        rows[3] = {'note': None, 'data': None}
+        db.session.execute(self.table.insert(), rows)
+        db.session.commit()
+        self.expected = self.read()
+
+    def tearDown(self):
+        self.table.drop(db.engine)
+        self.ctx.pop()
+        shutil.rmtree(self.key_dir)
+
+    def read(self):
+        return [tuple(row) for row in db.session.execute(select(self.table).order_by(self.table.c.id))]
+
+    def status(self):
+        return rotation_status(tables=[self.table])
+
+    def test_status_and_full_rotation(self):
+        self.assertEqual(self.status()['stale_rows'], 0)
+        self.assertTrue(field_encryptor.rotate_keys(batch_size=2, workers=2, tables=[self.table]))
+        self.assertEqual(field_encryptor.rotation['status'], 'complete')
+        self.assertEqual(field_encryptor.rotation['tables']['rotated'], {'last_id': 7, 'rows': 6})
+        self.assertEqual(self.status()['stale_rows'], 0)
+        self.assertEqual(self.read(), self.expected)
+
+    def test_interrupted_rotation_resumes(self):
+        reencrypt = key_rotation_service._reencrypt_rows
+        calls = []
+
+        def failing(rows, reencryptors, pool):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise RuntimeError('worker crashed')
+            return reencrypt(rows, reencryptors, pool)
+
+        with mock.patch.object(key_rotation_service, '_reencrypt_rows', failing):
+            self.assertFalse(field_encryptor.rotate_keys(batch_size=2, workers=2, tables=[self.table]))
+        new_key_id = field_encryptor.active_key_id
+        self.assertEqual(field_encryptor.rotation['status'], 'running')
+        self.assertEqual(field_encryptor.rotation['tables']['rotated']['last_id'], 4)
+        self.assertEqual(self.status()['stale_rows'], 3)  # Rows 5-7
+        self.assertEqual(self.read(), self.expected)  # Old and new keys both decrypt
+
+        # A new process picks the checkpoint up from the key metadata
+        field_encryptor.init_app(self.app)
+        self.assertTrue(field_encryptor.rotate_keys(batch_size=2, tables=[self.table]))
+        self.assertEqual(field_encryptor.active_key_id, new_key_id)
+        self.assertEqual(field_encryptor.rotation['tables']['rotated']['rows'], 6)
+        self.assertEqual(self.status()['stale_rows'], 0)
+        self.assertEqual(self.read(), self.expected)
+
+
+    def test_edit_between_read_and_write_is_kept(self):
+        reencrypt = key_rotation_service._reencrypt_rows
+        calls = []
+
+        def edited_meanwhile(rows, reencryptors, pool):
+            calls.append(len(rows))
+            changed = reencrypt(rows, reencryptors, pool)
+            if len(calls) == 1:
+                # A user saves row 1 after the batch was read, before it is written
+                db.session.execute(self.table.update().where(self.table.c.id == 1).values(note='edited by a user'))
+            return changed
+
+        with mock.patch.object(key_rotation_service, '_reencrypt_rows', edited_meanwhile):
+            self.assertTrue(field_encryptor.rotate_keys(batch_size=3, tables=[self.table]))
+        self.assertEqual(self.read()[0], (1, 'edited by a user', {'n': 0}))
+        self.assertEqual(self.read()[1:], self.expected[1:])
+        self.assertEqual(self.status()['stale_rows'], 0)
+        self.assertEqual(field_encryptor.rotation['tables']['rotated']['rows'], 6)
+
+
+class TestRotationByAnotherProcess(AppTestCase):
+    """Keys rotated by flask rotate-keys in another process are used without a restart."""
+
+    file_database = True  # Shared with the other process
+
+    class config(TestConfig):
+        ENCRYPT_CASE_FIELDS = True
+        KEY_RELOAD_CHECK_SECONDS = 3600  # Only an unknown key id reloads, unless a test says otherwise
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            user = make_user('rotation')
+            db.session.add_all([Case(display_name=f'Case {n}', case_number=f'BC{n}', owner=user) for n in range(3)])
+            db.session.commit()
+            self.old_key_id = field_encryptor.active_key_id
+
+    def stored_key_ids(self):
+        stored = db.session.execute(select(type_coerce(Case.case_number, Text)).order_by(Case.id)).scalars()
+        return [field_encryptor.key_id_of(value) for value in stored]
+
+    def rotate(self):
+        output = run_command_in_other_process(self.app, 'rotate-keys', '--batch-size', '2')
+        self.assertIn('Key rotation completed successfully.', output)
+
+    def test_reads_values_rotated_by_another_process(self):
+        self.rotate()
+        with self.app.app_context():
+            new_key_ids = set(self.stored_key_ids())
+            self.assertEqual(len(new_key_ids), 1)
+            self.assertNotIn(self.old_key_id, new_key_ids)
+
+            # Tagged with a key this process never loaded: it is read on demand
+            self.assertEqual([case.case_number for case in Case.query.order_by(Case.id)], ['BC0', 'BC1', 'BC2'])
+            self.assertEqual({field_encryptor.active_key_id}, new_key_ids)
+            self.assertEqual(field_encryptor.rotation['status'], 'complete')
+
+    def test_is_encrypted_knows_keys_from_another_process(self):
+        self.rotate()
+        with self.app.app_context():
+            stored = db.session.execute(select(type_coerce(Case.case_number, Text))).scalars().first()
+            self.assertTrue(field_encryptor.is_encrypted(stored))
+
+    def test_writes_follow_a_rotation_by_another_process(self):
+        field_encryptor._watcher.interval = 0  # Check the key metadata on every use
+        self.rotate()
+        with self.app.app_context():
+            db.session.add(Case(display_name='Case 3', case_number='BC3', owner=make_user('writer')))
+            db.session.commit()
+            key_ids = self.stored_key_ids()
+            self.assertNotEqual(key_ids[-1], self.old_key_id)
+            self.assertEqual(key_ids[-1], key_ids[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
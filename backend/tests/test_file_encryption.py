@@ -0,0 +1,157 @@
+"""
+Tests for envelope encryption of uploaded files and file key rotation.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+from sqlalchemy import update
+
+from backend.extensions import db
+from backend.models import Case, Document, ShredJob
+from backend.services.key_rotation_service import rewrap_file_keys, file_key_status
+from backend.services.shred_service import drain_queue
+from backend.utils.file_encryption import file_encryptor
+from . import AppTestCase, TestConfig, make_user, run_command_in_other_process
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class TestFileEnvelopeEncryption(AppTestCase):
+    """Per-file data keys: rotation rewraps keys only, deletion erases the key."""
+
+    file_database = True  # Shared with rotate-file-keys run in another process
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        class FileKeyConfig(TestConfig):
+            FILE_KEY_DIR = os.path.join(self.tmp, 'file_keys')
+            KEY_RELOAD_CHECK_SECONDS = 3600  # Only an unknown key id reloads, unless a test says otherwise
+
+        self.config = FileKeyConfig
+        super().setUp()
+        with self.app.app_context():
+            case = Case(display_name='Files', owner=make_user('files'))
+            db.session.add(case)
+            db.session.flush()
+            self.paths = {}
+            for name in ('one', 'two', 'legacy'):
+                path = os.path.join(self.tmp, f'{name}.txt')
+                with open(path, 'wb') as f:
+                    f.write(f'contents of {name}'.encode('utf-8'))
+                if name == 'legacy':
+                    # Written before envelope encryption: the single legacy key, no data key
+                    with open(path, 'rb') as f:
+                        data = file_encryptor.cipher.encrypt(f.read())
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    file_key = None
+                else:
+                    file_key = file_encryptor.encrypt_file(path)
+                document = Document(case_id=case.id, file_name=f'{name}.txt', file_path=path, file_key=file_key)
+                db.session.add(document)
+                db.session.flush()
+                self.paths[name] = (document.id, path)
+            db.session.commit()
+
+        self.login('files')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp)
+
+    def download(self, name):
+        response = self.client.get(f'/api/documents/{self.paths[name][0]}/download')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_each_file_has_its_own_data_key(self):
+        with self.app.app_context():
+            keys = [db.session.get(Document, self.paths[name][0]).file_key for name in ('one', 'two')]
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertTrue(all(file_encryptor.kek_id_of(key) == file_encryptor.active_kek_id for key in keys))
+        self.assertEqual(self.download('one'), b'contents of one')
+        self.assertEqual(self.download('legacy'), b'contents of legacy')
+        self.assertNotIn('file_key', self.client.get('/api/cases/1/documents').get_data(as_text=True))
+
+    def test_rotation_rewraps_keys_without_touching_files(self):
+        before = {name: digest(path) for name, (_, path) in self.paths.items()}
+        with self.app.app_context():
+            old_kek = file_encryptor.active_kek_id
+            file_encryptor.rotate_kek()
+            self.assertEqual(file_key_status()['stale_keys'], 2)
+            self.assertEqual(rewrap_file_keys(batch_size=1), 2)
+            status = file_key_status()
+            self.assertEqual((status['stale_keys'], status['legacy_files']), (0, 1))
+            self.assertNotEqual(status['active_kek_id'], old_kek)
+            self.assertEqual(rewrap_file_keys(), 0)  # Nothing left: reruns are free
+        self.assertEqual({name: digest(path) for name, (_, path) in self.paths.items()}, before)
+        self.assertEqual(self.download('two'), b'contents of two')
+
+    def test_rewrap_keeps_a_key_erased_meanwhile(self):
+        rewrap_key = file_encryptor.rewrap_key
+        one_id = self.paths['one'][0]
+
+        def deleted_meanwhile(wrapped_key):
+            # 'one' is deleted (its data key erased) after the batch was read
+            db.session.execute(update(Document).where(Document.id == one_id).values(file_key=None))
+            return rewrap_key(wrapped_key)
+
+        with self.app.app_context():
+            file_encryptor.rotate_kek()
+            with mock.patch.object(file_encryptor, 'rewrap_key', deleted_meanwhile):
+                self.assertEqual(rewrap_file_keys(), 1)
+            self.assertIsNone(db.session.get(Document, one_id).file_key)
+            self.assertEqual(file_key_status()['stale_keys'], 0)
+        self.assertEqual(self.download('two'), b'contents of two')
+
+    def test_rotation_by_another_process(self):
+        with self.app.app_context():
+            old_kek = file_encryptor.active_kek_id
+        output = run_command_in_other_process(self.app, 'rotate-file-keys')
+        new_kek = output.split('New key-encryption key: ')[1].split()[0]
+        self.assertIn('Rewrapped 2 data keys.', output)
+        self.assertNotEqual(new_kek, old_kek)
+
+        # Rewrapped under a key this process never loaded: it is read on demand
+        self.assertEqual(self.download('one'), b'contents of one')
+        self.assertEqual(file_encryptor.active_kek_id, new_kek)
+
+    def test_uploads_follow_a_rotation_by_another_process(self):
+        file_encryptor._watcher.interval = 0  # Check the key metadata on every use
+        output = run_command_in_other_process(self.app, 'rotate-file-keys')
+        new_kek = output.split('New key-encryption key: ')[1].split()[0]
+        path = os.path.join(self.tmp, 'new.txt')
+        with open(path, 'wb') as f:
+            f.write(b'uploaded after the rotation')
+        with self.app.app_context():
+            self.assertEqual(file_encryptor.kek_id_of(file_encryptor.encrypt_file(path)), new_kek)
+
+    def test_delete_erases_data_key(self):
+        document_id, path = self.paths['one']
+        with self.app.app_context():
+            wrapped_key = db.session.get(Document, document_id).file_key
+        with open(path, 'rb') as f:
+            stored = f.read()
+        response = self.client.delete(f'/api/documents/{document_id}')
+        self.assertEqual(response.status_code, 200, response.data)
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(Document, document_id))
+            job = ShredJob.query.filter_by(document_id=document_id).one()
+            self.assertEqual(job.mode, ShredJob.MODE_UNLINK)  # No overwrite passes needed
+            drain_queue()
+        self.assertFalse(os.path.exists(path))
+        # A copy of the bytes (a backup, say) was only readable with the now deleted wrapped key
+        self.assertEqual(Fernet(file_encryptor._kek_ring.decrypt(wrapped_key)).decrypt(stored), b'contents of one')
+
+
+if __name__ == '__main__':
+    unittest.main()
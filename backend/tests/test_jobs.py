@@ -0,0 +1,104 @@
+"""
+Tests for background jobs shared between workers through the database.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from backend import create_app
+from backend.extensions import db
+from backend.models import BackgroundJob
+from backend.services import job_service
+from . import TestConfig, isolated_config, make_user
+
+
+class TestSharedJobs(unittest.TestCase):
+    """A job started by one worker is polled and downloaded through another."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        class WorkerConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.tmp, 'jobs.db')}"
+
+        # Two apps on one database file stand in for two gunicorn workers
+        WorkerConfig = isolated_config(self, WorkerConfig)
+        self.worker_a = create_app(WorkerConfig)
+        self.worker_b = create_app(WorkerConfig)
+        with self.worker_a.app_context():
+            db.create_all()
+            user = make_user('paralegal')
+            db.session.commit()
+            self.user_id = user.id
+
+    def tearDown(self):
+        for app in (self.worker_a, self.worker_b):
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+        shutil.rmtree(self.tmp)
+
+    def wait_for(self, app, job_id):
+        for _ in range(100):
+            with app.app_context():
+                job = job_service.get_job(job_id, self.user_id, 'test')
+                if job.status != BackgroundJob.STATUS_RUNNING:
+                    return job_service.job_status(job), job_service.job_document(job)
+            time.sleep(0.05)
+        self.fail('Job did not finish')
+
+    def test_job_polled_from_another_worker(self):
+        release = threading.Event()
+
+        def work(report):
+            report(step=1)
+            release.wait(5)
+            return {'providers': 4}, b'PK\x03\x04 document'
+
+        with self.worker_a.app_context():
+            job_id = job_service.start_job('test', self.user_id, work, ttl=60, progress={'step': 0})['id']
+        time.sleep(0.1)
+        with self.worker_b.app_context():
+            status = job_service.job_status(job_service.get_job(job_id, self.user_id, 'test'))
+            self.assertEqual((status['status'], status['step'], status['result']), ('running', 1, None))
+            self.assertIsNone(job_service.get_job(job_id, self.user_id + 1, 'test'))
+            self.assertIsNone(job_service.get_job(job_id, self.user_id, 'other'))
+        release.set()
+
+        status, document = self.wait_for(self.worker_b, job_id)
+        self.assertEqual((status['status'], status['result']), ('done', {'providers': 4}))
+        self.assertEqual(document, b'PK\x03\x04 document')
+        with self.worker_b.app_context():
+            stored = db.session.execute(db.text("SELECT result, document FROM background_job")).one()
+            self.assertNotIn('providers', stored.result)  # Encrypted at rest
+
+    def test_failed_stale_and_expired_jobs(self):
+        def work(report):
+            raise ValueError('unreadable upload')
+
+        with self.worker_a.app_context():
+            failed_id = job_service.start_job('test', self.user_id, work, ttl=60)['id']
+        status, _ = self.wait_for(self.worker_b, failed_id)
+        self.assertEqual((status['status'], status['error']), ('failed', 'unreadable upload'))
+
+        with self.worker_b.app_context():
+            long_ago = datetime.utcnow() - timedelta(hours=2)
+            db.session.add(BackgroundJob(id='stale', kind='test', user_id=self.user_id, progress={},
+                                         ttl_seconds=60, updated_at=long_ago))
+            db.session.add(BackgroundJob(id='expired', kind='test', user_id=self.user_id, progress={},
+                                         status=BackgroundJob.STATUS_DONE, ttl_seconds=60, expires_at=long_ago))
+            db.session.commit()
+
+            stale = job_service.get_job('stale', self.user_id, 'test')
+            self.assertEqual((stale.status, stale.error), ('failed', job_service.STOPPED_ERROR))
+            # Reads prune expired jobs, not only starts
+            self.assertIsNone(job_service.get_job('expired', self.user_id, 'test'))
+            self.assertEqual(sorted(job.id for job in BackgroundJob.query), sorted([failed_id, 'stale']))
+
+
+if __name__ == '__main__':
+    unittest.main()
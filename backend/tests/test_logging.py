@@ -0,0 +1,55 @@
+"""
+Tests for the queue-backed logging setup and request ids.
+"""
+import json
+import logging
+import unittest
+
+from flask import g
+
+from backend import create_app
+from backend.utils.logging_config import JsonFormatter, RequestIdFilter, lazy_json, parse_levels
+from . import isolated_config
+
+
+class TestLoggingConfig(unittest.TestCase):
+    """Records carry the request id; disabled levels build nothing."""
+
+    def setUp(self):
+        self.app = create_app(isolated_config(self))
+
+    def test_json_records_carry_the_request_id(self):
+        record = logging.LogRecord('backend.services.case_service', logging.INFO, __file__, 1,
+                                   'Updated case %s', (7,), None)
+        record.case_id = 7
+        with self.app.test_request_context():
+            g.request_id = 'abc123'
+            RequestIdFilter().filter(record)
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['message'], entry['request_id'], entry['case_id'], entry['level']),
+                         ('Updated case 7', 'abc123', 7, 'INFO'))
+
+    def test_request_id_header(self):
+        client = self.app.test_client()
+        response = client.get('/api/auth/status', headers={'X-Request-ID': 'proxy-id.42'})
+        self.assertEqual(response.headers['X-Request-ID'], 'proxy-id.42')
+        generated = client.get('/api/auth/status', headers={'X-Request-ID': 'bad id; drop'}).headers['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+
+    def test_disabled_debug_does_not_serialize(self):
+        class Payload:
+            def __str__(self):
+                raise AssertionError('serialized a payload for a disabled level')
+
+        logger = logging.getLogger('backend.tests.quiet')
+        logger.setLevel(logging.INFO)
+        logger.debug('Case details: %s', lazy_json({'details': Payload()}))
+        logger.debug('Payload: %s', Payload())
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels('backend.services=debug, rate_limit=WARNING,,bad'),
+                         {'backend.services': 'DEBUG', 'rate_limit': 'WARNING'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Tests for the local provider table reader behind medical record summaries.
+"""
+import io
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import docx
+import fitz
+
+from backend.extensions import db
+from backend.services.medical_summary_service import (
+    extract_pdf_rows, extract_docx_rows, resolve_rows, format_summary, summarize_records
+)
+from . import AppTestCase, make_user
+from .test_subpoena_prepass import draw_table
+
+HEADER = ["Provider", "Provider Specialty", "First Service Date", "Last Service Date", "Total Billed"]
+ROWS = [["Cedars Sinai Medical Center", "Emergency Medicine", "01/05/2021 10:30", "01/05/2021", "$12,450.00"],
+        ["Kerlan Jobe Orthopaedic", "Orthopedic Surgery", "02/01/2021", "06/30/2021", "3,200.50"],
+        ["Smith Chiropractic", "Chiropractic", "03/10/2021", "", "N/A"]]
+X = [40, 200, 330, 410, 490]
+
+
+def ledger_pdf():
+    """A text-only ledger: wrapped header, a wrapped provider name, a total line and a footer."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((40, 50), "Provider Billing Summary", fontsize=11)
+    for x, name in zip(X, ["Provider", "Provider Specialty", "First Service", "Last Service", "Total Billed"]):
+        page.insert_text((x, 80), name, fontsize=8)
+    for x in X[2:4]:
+        page.insert_text((x, 90), "Date", fontsize=8)
+    y = 110
+    for row in ROWS:
+        name, *rest = row
+        # The first provider's name wraps onto a second line
+        cells = ["Cedars Sinai Medical"] + rest if name.startswith("Cedars") else row
+        for x, text in zip(X, cells):
+            if text:
+                page.insert_text((x, y), text, fontsize=8)
+        y += 10
+        if name.startswith("Cedars"):
+            page.insert_text((40, y), "Center", fontsize=8)
+            y += 10
+    page.insert_text((40, y + 4), "Total", fontsize=8)
+    page.insert_text((490, y + 4), "$15,650.50", fontsize=8)
+    page.insert_text((250, 780), "Page 1 of 1", fontsize=8)
+    return doc
+
+
+def long_ledger_pdf():
+    """Five pages, the header only on the first; Cedars Sinai comes back on the last page, spelled differently."""
+    doc = fitz.open()
+    visits = [("Cedars Sinai Medical Center", "Emergency Medicine", "01/05/2021", "01/05/2021", "$1,000.00"),
+              ("Kerlan Jobe Orthopaedic", "Orthopedic Surgery", "02/01/2021", "06/30/2021", "500.00"),
+              ("Smith Chiropractic", "Chiropractic", "03/10/2021", "04/10/2021", "250.00"),
+              ("Valley Imaging", "Radiology", "05/02/2021", "05/02/2021", "125.25"),
+              ("CEDARS-SINAI MEDICAL CENTER, INC.", "Inpatient", "07/01/2021", "07/04/2021", "2,000.00")]
+    for number, visit in enumerate(visits):
+        page = doc.new_page()
+        if number == 0:
+            for x, name in zip(X, HEADER):
+                page.insert_text((x, 80), name.replace("Service ", ""), fontsize=8)
+        for x, text in zip(X, visit):
+            page.insert_text((x, 110), text, fontsize=8)
+    return doc
+
+
+class TestProviderTables(unittest.TestCase):
+    """Ledger rows are read from word positions or drawn tables, then validated."""
+
+    def test_layout_ledger(self):
+        doc = ledger_pdf()
+        rows = extract_pdf_rows(doc)
+        doc.close()
+        self.assertEqual([[row[field] for field in ('provider', 'specialty', 'first_date', 'last_date', 'total_billed')]
+                          for row in rows], ROWS)
+        self.assertEqual({row['source'] for row in rows}, {'layout'})
+
+    def test_drawn_table_and_docx(self):
+        doc = fitz.open()
+        draw_table(doc.new_page(width=842, height=595), [HEADER] + ROWS[:2])  # Landscape: five columns
+        self.assertEqual([row['provider'] for row in extract_pdf_rows(doc)], [ROWS[0][0], ROWS[1][0]])
+        doc.close()
+
+        word = docx.Document()
+        table = word.add_table(rows=0, cols=len(HEADER))
+        for values in [HEADER] + ROWS + [["Grand Total", "", "", "", "$15,650.50"]]:
+            for cell, value in zip(table.add_row().cells, values):
+                cell.text = value
+        output = io.BytesIO()
+        word.save(output)
+        self.assertEqual([row['total_billed'] for row in extract_docx_rows(output.getvalue())],
+                         [row[4] for row in ROWS])
+
+    def test_only_failing_rows_reach_the_model(self):
+        doc = ledger_pdf()
+        rows = extract_pdf_rows(doc)
+        doc.close()
+        reply = {"rows": [{"index": 0, "provider": "Smith Chiropractic", "specialty": "Chiropractic",
+                           "first_service_date": "03/10/2021", "last_service_date": None, "total_billed": "875.00"}]}
+        with mock.patch('backend.services.medical_summary_service.call_gemini_json', return_value=reply) as model:
+            parsed, stats = resolve_rows(rows, api_key='test')
+        prompt = model.call_args[0][0]
+        self.assertIn("Smith Chiropractic", prompt)
+        self.assertNotIn("Kerlan", prompt)
+        self.assertEqual(stats, {'rows': 3, 'repaired': 1, 'unresolved': 0})
+        self.assertEqual([row['total_billed'] for row in parsed],
+                         [Decimal('12450.00'), Decimal('3200.50'), Decimal('875.00')])
+
+        lines = format_summary(parsed)
+        self.assertEqual(lines[:4], ["(a) Cedars Sinai Medical Center", "(b) Emergency Medicine",
+                                     "(c) 01/05/2021", "(d) $12,450.00"])
+        self.assertIn("(c) 02/01/2021 - 06/30/2021 (may need to check for additional service dates)", lines)
+
+
+class TestMapReduce(unittest.TestCase):
+    """Page-range chunks are read concurrently, then merged by provider."""
+
+    def summary_lines(self, output):
+        return [p.text for p in docx.Document(output).paragraphs]
+
+    def test_chunks_merge_by_provider(self):
+        doc = long_ledger_pdf()
+        data = doc.tobytes()
+        doc.close()
+        progress = []
+        with mock.patch('backend.services.medical_summary_service.call_gemini_json') as model:
+            output, info = summarize_records(data, '.pdf', api_key='test', chunk_pages=2, max_workers=3,
+                                             progress=lambda *args: progress.append(args))
+        model.assert_not_called()  # Later chunks carry the first page's columns
+        self.assertEqual((info['chunks'], info['providers'], info['rows']), (3, 4, 5))
+        self.assertEqual(progress[0], (0, 3, 0))
+        self.assertEqual(progress[-1][:2], (3, 3))
+
+        lines = self.summary_lines(output)
+        self.assertEqual(lines[:4], ["(a) Cedars Sinai Medical Center", "(b) Emergency Medicine; Inpatient",
+                                     "(c) 01/05/2021 - 07/04/2021 (may need to check for additional service dates)",
+                                     "(d) $3,000.00"])
+        self.assertEqual([line for line in lines if line.startswith("(a)")][1:],
+                         ["(a) Kerlan Jobe Orthopaedic", "(a) Smith Chiropractic", "(a) Valley Imaging"])
+
+    def test_text_chunks_go_to_the_model(self):
+        doc = fitz.open()
+        for day in (3, 9):
+            doc.new_page().insert_text((50, 60), f"Seen at Valley Imaging on 05/0{day}/2021, billed $100.00.")
+        data = doc.tobytes()
+        doc.close()
+
+        def reply(prompt, api_key=None):
+            date = "05/03/2021" if "05/03" in prompt else "05/09/2021"
+            return {"rows": [{"provider": "Valley Imaging", "specialty": "Radiology", "first_service_date": date,
+                              "last_service_date": None, "total_billed": "100"}]}
+
+        with mock.patch('backend.services.medical_summary_service.call_gemini_json', side_effect=reply) as model:
+            output, info = summarize_records(data, '.pdf', api_key='test', chunk_pages=1)
+        self.assertEqual(model.call_count, 2)
+        self.assertEqual(self.summary_lines(output)[2:],
+                         ["(c) 05/03/2021 - 05/09/2021 (may need to check for additional service dates)",
+                          "(d) $200.00"])
+
+
+class TestSummarizeRecordsEndpoint(AppTestCase):
+    """A ledger with valid rows is summarized without any model call."""
+
+    file_database = True  # test_async_job polls a background job
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            make_user('paralegal')
+            db.session.commit()
+        self.login('paralegal')
+
+    def test_word_summary_without_model(self):
+        doc = fitz.open()
+        draw_table(doc.new_page(width=842, height=595), [HEADER] + ROWS[:2])  # Landscape: five columns
+        data = {'file': (io.BytesIO(doc.tobytes()), 'records.pdf')}
+        doc.close()
+        with mock.patch('backend.services.medical_summary_service.call_gemini_json') as model:
+            response = self.client.post('/api/medical/summarize-records', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200, response.data)
+        model.assert_not_called()
+        paragraphs = [p.text for p in docx.Document(io.BytesIO(response.data)).paragraphs]
+        self.assertEqual(paragraphs[:4], ["(a) Cedars Sinai Medical Center", "(b) Emergency Medicine",
+                                          "(c) 01/05/2021", "(d) $12,450.00"])
+
+    def test_async_job(self):
+        doc = long_ledger_pdf()
+        data = {'file': (io.BytesIO(doc.tobytes()), 'records.pdf')}
+        doc.close()
+        response = self.client.post('/api/medical/summarize-records?async=1', data=data,
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 202, response.data)
+        status_url = response.get_json()['status_url']
+
+        for _ in range(100):
+            status = self.client.get(status_url).get_json()
+            if status['status'] != 'running':
+                break
+            time.sleep(0.05)
+        self.assertEqual((status['status'], status['chunks_done'], status['providers']), ('done', 1, 4))
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("(d) $3,000.00", [p.text for p in docx.Document(io.BytesIO(response.data)).paragraphs])
+        self.assertEqual(self.client.get('/api/medical/summarize-records/jobs/unknown').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
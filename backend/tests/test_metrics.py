@@ -0,0 +1,107 @@
+"""
+Tests for the request metrics and GET /api/admin/metrics.
+"""
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from backend.extensions import db
+from backend.utils.metrics import EXITED_FILE, RequestMetrics, render
+from . import AppTestCase, make_user
+
+WORKER_SCRIPT = """
+import sys
+from backend.utils.metrics import RequestMetrics
+metrics = RequestMetrics(sys.argv[1])
+for seconds in (0.02, 0.3):
+    metrics.observe('http_request_duration_seconds', {'endpoint': 'api.handle_cases', 'method': 'GET', 'status': '200'}, seconds)
+"""  # Flushed at exit
+
+
+class TestMetricsEndpoint(AppTestCase):
+    """Requests are observed per endpoint, with the queries they ran."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            for name in ('admin', 'associate'):
+                make_user(name)
+            db.session.commit()
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/admin/metrics').status_code, 401)
+        self.login('associate')
+        self.assertEqual(self.client.get('/api/admin/metrics').status_code, 403)
+
+    def test_scrape_token(self):
+        self.app.config['METRICS_TOKEN'] = 's3cret-scrape-token'
+        response = self.client.get('/api/admin/metrics', headers={'Authorization': 'Bearer s3cret-scrape-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', response.get_data(as_text=True))
+        for header in ('Bearer wrong-token', 'Basic s3cret-scrape-token', 'Bearer '):
+            response = self.client.get('/api/admin/metrics', headers={'Authorization': header})
+            self.assertEqual(response.status_code, 401, header)
+        # A logged-in non-admin gets no further with a wrong token
+        self.login('associate')
+        response = self.client.get('/api/admin/metrics', headers={'Authorization': 'Bearer wrong-token'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_no_token_configured(self):
+        # Without METRICS_TOKEN an empty bearer token must not match
+        response = self.client.get('/api/admin/metrics', headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 401)
+
+    def test_request_histograms(self):
+        self.login('admin')
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/cases').status_code, 200)
+        self.client.get('/api/no-such-route')
+
+        response = self.client.get('/api/admin/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn('http_request_duration_seconds_count{endpoint="api.handle_cases",method="GET",status="200"} 2',
+                      lines)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="api.handle_cases",method="GET",status="200",'
+                      'le="+Inf"} 2', lines)
+        self.assertIn('http_request_duration_seconds_count{endpoint="<unmatched>",method="GET",status="404"} 1',
+                      lines)
+        self.assertIn('http_response_size_bytes_count{endpoint="api.handle_cases",method="GET"} 2', lines)
+        # The login read the user, so its requests ran at least one statement
+        self.assertIn('db_queries_per_request_bucket{endpoint="api.login",le="0.0"} 0', lines)
+        self.assertIn('db_queries_per_request_count{endpoint="api.login"} 1', lines)
+
+
+class TestMultiprocessMetrics(unittest.TestCase):
+    """A scrape adds up every process's file; exited processes are folded into one."""
+
+    def test_exited_worker_is_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', WORKER_SCRIPT, directory], check=True,
+                               capture_output=True, cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+            metrics = RequestMetrics(directory)
+            self.addCleanup(atexit.unregister, metrics.flush)
+            metrics.observe('http_request_duration_seconds',
+                            {'endpoint': 'api.handle_cases', 'method': 'GET', 'status': '200'}, 4.0)
+
+            lines = render(metrics.collect()).splitlines()
+            labels = 'endpoint="api.handle_cases",method="GET",status="200"'
+            self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 5', lines)
+            self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 2', lines)
+            self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.5"}} 4', lines)
+            self.assertIn(f'http_request_duration_seconds_sum{{{labels}}} 4.64', lines)
+            files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+            self.assertEqual(files, sorted([EXITED_FILE, os.path.basename(metrics._path)]))
+
+            # Scraping again doesn't count the exited workers twice
+            self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 5', render(metrics.collect()).splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the cached Flask-Login principal and the login bookkeeping transaction.
+"""
+import unittest
+
+from sqlalchemy import event
+
+from backend.extensions import db
+from backend.models import User
+from .query_budget import QueryCounter
+from . import PASSWORD, AppTestCase, make_user
+
+
+class TestPrincipalCache(AppTestCase):
+    """Authenticated requests don't read users; user changes drop the cached entry."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            user = make_user('cached')
+            db.session.commit()
+            self.user_id = user.id
+            self.engine = db.engine
+
+    def users_queries(self, url='/api/cases'):
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [s for s in counter.statements if 'FROM users' in s or 'UPDATE users' in s]
+
+    def test_requests_after_login_skip_users_table(self):
+        self.login('cached')
+        self.assertEqual(self.users_queries(), [])
+        self.assertEqual(self.users_queries('/api/auth/status'), [])
+        self.assertEqual(self.client.get('/api/auth/status').get_json()['user']['username'], 'cached')
+
+    def test_login_bookkeeping_is_one_commit(self):
+        commits = []
+        listener = lambda conn: commits.append(conn)
+        event.listen(self.engine, 'commit', listener)
+        try:
+            response = self.client.post('/api/auth/login', json={'username': 'cached', 'password': 'wrong'})
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(len(commits), 1)
+            self.login('cached')
+            self.assertEqual(len(commits), 2)
+        finally:
+            event.remove(self.engine, 'commit', listener)
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            self.assertEqual((user.failed_login_attempts, user.locked_until), (0, None))
+            self.assertIsNotNone(user.last_login_ip)
+
+    def test_user_update_invalidates_entry(self):
+        self.login('cached')
+        self.users_queries()
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            user.firm = 'New Firm LLP'
+            db.session.commit()
+        self.assertEqual(len(self.users_queries('/api/auth/status')), 1)  # Reloaded once...
+        self.assertEqual(self.client.get('/api/auth/status').get_json()['user']['firm'], 'New Firm LLP')
+        self.assertEqual(self.users_queries('/api/auth/status'), [])  # ...then cached again
+
+    def test_suspended_user_is_refused_at_once(self):
+        self.login('cached')
+        self.users_queries()
+        with self.app.app_context():
+            user = db.session.get(User, self.user_id)
+            user.pending_approval = True
+            db.session.commit()
+        self.assertEqual(self.client.get('/api/cases').status_code, 401)
+
+    def test_password_change_logs_out_other_sessions(self):
+        other = self.app.test_client()
+        self.login('cached')
+        self.login('cached', other)
+        response = self.client.post('/api/auth/change-password', json={
+            'current_password': PASSWORD, 'new_password': 'N3wPassw0rd!'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.client.get('/api/cases').status_code, 200)
+        self.assertEqual(other.get('/api/cases').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Query budgets for the case endpoints: each loading profile should issue a fixed
+number of queries however many cases and documents there are.
+"""
+import unittest
+from unittest import mock
+
+from backend.extensions import db
+from backend.models import Case, Document
+from backend.services.case_service import get_judge_doc
+from . import AppTestCase, make_user
+from .query_budget import assert_max_queries, QueryCounter
+
+
+class TestQueryBudgets(AppTestCase):
+    """Endpoint query counts stay within budget and don't grow with the data."""
+
+    def setUp(self):
+        # Requests must run outside this context so each gets its own session and g
+        super().setUp()
+        with self.app.app_context():
+            self.engine = db.engine
+            user = make_user('budget')
+            db.session.commit()
+            self.user_id = user.id
+        self.login('budget')
+
+    def add_cases(self, count, documents_per_case=3):
+        """Adds cases with documents; returns the id of the last one."""
+        with self.app.app_context():
+            for i in range(count):
+                case = Case(display_name=f'Case {Case.query.count() + 1}', user_id=self.user_id)
+                for j in range(documents_per_case):
+                    analysis = {'judge_doc': f'Judge {i}'} if j == 1 else {'summary': 'x'}
+                    case.documents.append(Document(file_name=f'doc{j}.pdf', file_path=f'/tmp/doc{j}.pdf',
+                                                   extracted_text='text ' * 100, analysis_json=analysis))
+                db.session.add(case)
+            db.session.commit()
+            return case.id
+
+    def count_queries(self, url):
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return counter.count
+
+    def test_case_list_budget(self):
+        """GET /api/cases: versions, cases, documents, and no more as cases are added."""
+        self.add_cases(2)
+        small = self.count_queries('/api/cases')
+        self.add_cases(8)
+        with assert_max_queries(self, 3, self.engine):
+            response = self.client.get('/api/cases')
+        self.assertEqual(len(response.get_json()), 10)
+        self.assertNotIn('extracted_text', response.get_json()[0]['documents'][0])
+        self.assertEqual(self.count_queries('/api/cases'), small)
+
+    def test_case_detail_budget(self):
+        """GET /api/cases/<id>: versions, case, documents; the owner comes from the cached principal."""
+        case_id = self.add_cases(1, documents_per_case=10)
+        with assert_max_queries(self, 3, self.engine):
+            response = self.client.get(f'/api/cases/{case_id}')
+        self.assertEqual(len(response.get_json()['documents']), 10)
+
+    def test_revalidation_budget(self):
+        """A matching If-None-Match costs one aggregate query, and no serialization."""
+        case_id = self.add_cases(3)
+        for url in ('/api/cases', f'/api/cases/{case_id}', f'/api/cases/{case_id}/documents'):
+            etag = self.client.get(url).headers['ETag']
+            with mock.patch('backend.api.cases.case_list_schema') as list_schema, \
+                 mock.patch('backend.api.cases.case_schema') as detail_schema, \
+                 mock.patch('backend.api.documents.documents_schema') as documents_schema, \
+                 assert_max_queries(self, 1, self.engine):
+                response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.data, b'')
+            for schema in (list_schema, detail_schema, documents_schema):
+                schema.dump.assert_not_called()
+
+    def test_judge_doc_single_query(self):
+        """judge_doc is read with one query, without loading the documents."""
+        case_id = self.add_cases(1, documents_per_case=5)
+        with self.app.app_context(), assert_max_queries(self, 1):
+            self.assertEqual(get_judge_doc(case_id), 'Judge 0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Query-plan regression tests: the statements the main endpoints actually run
+must use the ownership-scoped indexes on SQLite.
+"""
+import unittest
+
+from backend.extensions import db
+from backend.models import Case, Document, User
+from . import AppTestCase, make_user
+from .query_budget import QueryCounter
+
+
+class TestQueryPlans(AppTestCase):
+    """EXPLAIN QUERY PLAN for the statements each endpoint issues."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            self.engine = db.engine
+            admin = make_user('admin')
+            pending = make_user('pending', pending_approval=True)
+            self.approval_token = pending.generate_approval_token()
+            db.session.flush()
+            case = Case(display_name='Plan Case', user_id=admin.id)
+            case.documents.append(Document(file_name='a.pdf', file_path='/tmp/a.pdf'))
+            db.session.add(case)
+            db.session.commit()
+            self.case_id = case.id
+
+        self.login('admin')
+
+    def plans_for(self, method, url, marker, **kwargs):
+        """Runs a request and returns the query plans of the SELECTs it issued containing ``marker``."""
+        with QueryCounter(self.engine) as counter:
+            response = self.client.open(url, method=method, **kwargs)
+        self.assertLess(response.status_code, 500, response.data)
+
+        plans = []
+        with self.engine.connect() as conn:
+            for statement, parameters in counter.queries:
+                if not statement.lstrip().upper().startswith('SELECT') or marker not in statement:
+                    continue
+                rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                plans.append(' | '.join(row[3] for row in rows))
+        self.assertTrue(plans, f'{url} issued no queries containing {marker}')
+        return plans
+
+    def assertUsesIndex(self, plans, index_name):
+        for plan in plans:
+            self.assertIn(f'INDEX {index_name}', plan)
+
+    def test_case_list_uses_user_display_name_index(self):
+        plans = self.plans_for('GET', '/api/cases', 'WHERE "case".user_id')
+        self.assertUsesIndex(plans, 'ix_case_user_id_display_name')
+
+    def test_duplicate_check_uses_user_display_name_index(self):
+        plans = self.plans_for('POST', '/api/cases', 'WHERE "case".display_name', json={'display_name': 'Plan Case'})
+        self.assertUsesIndex(plans, 'ix_case_user_id_display_name')
+
+    def test_document_list_uses_case_upload_date_index(self):
+        plans = self.plans_for('GET', f'/api/cases/{self.case_id}/documents', 'WHERE document.case_id')
+        self.assertUsesIndex(plans, 'ix_document_case_id_upload_date')
+
+    def test_pending_users_uses_partial_index(self):
+        plans = self.plans_for('GET', '/api/auth/admin/pending-users', 'users.pending_approval =')
+        self.assertUsesIndex(plans, 'ix_users_pending_created_at')
+
+    def test_approval_token_lookup_is_indexed(self):
+        plans = self.plans_for('GET', f'/api/auth/approve/{self.approval_token}', 'WHERE users.approval_token')
+        for plan in plans:
+            self.assertRegex(plan, r'SEARCH users USING (COVERING )?INDEX')
+
+    def test_display_name_unique_per_user(self):
+        """Two users may both have a case with the same display name."""
+        with self.app.app_context():
+            other = User.query.filter_by(username='pending').first()
+            db.session.add(Case(display_name='Plan Case', user_id=other.id))
+            db.session.commit()
+            self.assertEqual(Case.query.filter_by(display_name='Plan Case').count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
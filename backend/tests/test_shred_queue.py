@@ -0,0 +1,124 @@
+"""
+Tests for the background secure-deletion queue.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from backend.extensions import db
+from backend.models import Case, Document, ShredJob
+from backend.services.shred_service import enqueue_file_deletion, process_due_jobs, drain_queue, queue_status
+from backend.utils.file_encryption import file_encryptor
+from backend.utils.secure_deletion import Shredder
+from . import AppTestCase, TestConfig, make_user
+
+
+class TestShredder(unittest.TestCase):
+    """Batches of files are overwritten pass by pass with the same buffers, then removed."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_overwrites_then_removes(self):
+        original = b'privileged' * 10
+        paths = [self.write('a', original), self.write('b', b''), os.path.join(self.tmp, 'missing')]
+        shredder = Shredder(chunk_size=16)
+        with mock.patch('backend.utils.secure_deletion.os.remove'), \
+                mock.patch('backend.utils.secure_deletion.os.fdatasync', wraps=os.fdatasync) as fdatasync:
+            results = shredder.shred(paths, passes=3)
+        with open(paths[0], 'rb') as f:
+            overwritten = f.read()
+        self.assertEqual(len(overwritten), len(original))
+        self.assertEqual(overwritten, (bytes(shredder._random) * 7)[:len(original)])  # Last pass: random
+        self.assertEqual(fdatasync.call_count, 6)  # One per pass per open file
+        self.assertIsNone(results[paths[0]])
+        self.assertIsInstance(results[paths[2]], FileNotFoundError)
+
+        self.assertIsNone(shredder.shred(paths[:1])[paths[0]])
+        self.assertFalse(os.path.exists(paths[0]))
+
+
+class TestShredQueue(AppTestCase):
+    """Deletes queue their files; the worker erases them, retries and records the outcome."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        class ShredConfig(TestConfig):
+            FILE_KEY_DIR = os.path.join(self.tmp, 'file_keys')
+            SHRED_MAX_ATTEMPTS = 2
+            SHRED_RETRY_BASE_SECONDS = 60
+
+        self.config = ShredConfig
+        super().setUp()
+        with self.app.app_context():
+            case = Case(display_name='Shred', owner=make_user('shred'))
+            for name in ('legacy', 'envelope'):
+                path = os.path.join(self.tmp, f'{name}.pdf')
+                with open(path, 'wb') as f:
+                    f.write(b'%PDF ' + name.encode('ascii'))
+                file_key = file_encryptor.encrypt_file(path) if name == 'envelope' else None
+                case.documents.append(Document(file_name=f'{name}.pdf', file_path=path, file_key=file_key))
+            db.session.add(case)
+            db.session.commit()
+            self.case_id = case.id
+            self.paths = [document.file_path for document in case.documents]
+
+        self.login('shred')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp)
+
+    def test_case_delete_returns_before_erasure(self):
+        response = self.client.delete(f'/api/cases/{self.case_id}')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.get_json()['files_queued'], 2)
+        self.assertTrue(all(os.path.exists(path) for path in self.paths))
+
+        with self.app.app_context():
+            self.assertEqual(queue_status()['jobs']['pending'], 2)
+            self.assertEqual(sorted(job.mode for job in ShredJob.query),
+                             [ShredJob.MODE_OVERWRITE, ShredJob.MODE_UNLINK])
+            self.assertEqual(drain_queue(), {'done': 2, 'retried': 0, 'failed': 0})
+            self.assertTrue(all(job.status == ShredJob.STATUS_DONE and job.finished_at for job in ShredJob.query))
+        self.assertFalse(any(os.path.exists(path) for path in self.paths))
+
+    def test_failures_back_off_then_fail(self):
+        with self.app.app_context():
+            job = enqueue_file_deletion(self.tmp)  # A directory: can't be opened for overwriting
+            db.session.commit()
+            self.assertEqual(process_due_jobs()['retried'], 1)
+            job = db.session.get(ShredJob, job.id)
+            self.assertEqual((job.status, job.attempts), (ShredJob.STATUS_PENDING, 1))
+            self.assertGreater(job.next_attempt_at, datetime.utcnow() + timedelta(seconds=50))
+            self.assertIn('directory', job.last_error)
+
+            self.assertEqual(process_due_jobs()['retried'], 0)  # Not due yet
+            self.assertEqual(process_due_jobs(now=datetime.utcnow() + timedelta(minutes=2))['failed'], 1)
+            job = db.session.get(ShredJob, job.id)
+            self.assertEqual((job.status, job.attempts), (ShredJob.STATUS_FAILED, 2))
+
+    def test_stale_running_job_is_reclaimed(self):
+        with self.app.app_context():
+            job = enqueue_file_deletion(self.paths[0])
+            job.status, job.started_at = ShredJob.STATUS_RUNNING, datetime.utcnow() - timedelta(hours=2)
+            db.session.commit()
+            self.assertEqual(process_due_jobs()['done'], 1)
+        self.assertFalse(os.path.exists(self.paths[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
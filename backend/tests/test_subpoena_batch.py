@@ -0,0 +1,166 @@
+"""
+Tests for batch subpoena processing and the merged provider index.
+"""
+import io
+import json
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from backend.extensions import db
+from backend.services.subpoena_service import (
+    SubpoenaServiceError, collect_batch_files, merge_record_types, normalize_address, normalize_provider_name
+)
+from . import AppTestCase, TestConfig, make_user
+from .test_subpoena_prepass import subpoena_packet
+
+
+def model_reply(prompt):
+    """What the model would answer: one Medical entry per packet, spelled differently each time."""
+    spelling = 'The Cedars-Sinai Medical Center, Inc.' if 'page 24' in prompt else 'CEDARS SINAI MEDICAL CENTER'
+    return mock.Mock(text=json.dumps({"record_types": {"Medical": [{
+        "location": spelling, "address": "8700 Beverly Boulevard, Los Angeles, CA 90048-1804",
+        "body_parts": ["HEAD"], "reference_number": "66302-01"}]}}))
+
+
+class TestMergeRecordTypes(unittest.TestCase):
+    """Entries for the same provider and address merge, keeping every source."""
+
+    def test_normalization(self):
+        self.assertEqual(normalize_provider_name('The Cedars-Sinai Medical Center, Inc.'), 'cedars sinai medical center')
+        self.assertEqual(normalize_address('8700 Beverly Boulevard, Suite 100, CA 90048-1804'),
+                         normalize_address('8700 beverly blvd ste 100 CA 90048'))
+
+    def test_merge_keeps_sources_and_combines_details(self):
+        first = {"location": "Kerlan Jobe", "address": "6801 Park Terrace", "body_parts": ["NECK"],
+                 "reference_number": "1", "pages": [3]}
+        second = dict(first, location="KERLAN-JOBE", body_parts=["NECK", "BACK"], reference_number="2", pages=[5])
+        other_address = dict(first, address="1 Other Street", pages=[9])
+        merged = merge_record_types([
+            {"file": "a.pdf", "result": {"record_types": {"Medical": [first], "Billing": [first]}}},
+            {"file": "b.pdf", "result": {"record_types": {"Medical": [second, other_address]}}},
+            {"file": "c.pdf", "result": {"error": "model failed"}},
+        ])
+        medical = merged["record_types"]["Medical"]
+        self.assertEqual(len(medical), 2)
+        self.assertEqual(medical[0]["sources"], [{"file": "a.pdf", "pages": [3]}, {"file": "b.pdf", "pages": [5]}])
+        self.assertEqual(medical[0]["body_parts"], ["NECK", "BACK"])
+        self.assertEqual(medical[0]["reference_numbers"], ["1", "2"])
+        self.assertEqual(len(merged["record_types"]["Billing"]), 1)
+
+
+class TestCollectBatchFiles(unittest.TestCase):
+    """ZIPs expand to their PDFs, within the batch limits."""
+
+    def zip_of(self, names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in names:
+                archive.writestr(name, b'%PDF-1.4')
+        return buffer.getvalue()
+
+    def test_zip_members_and_pdfs(self):
+        files = collect_batch_files([
+            ('batch.zip', self.zip_of(['one.pdf', 'notes.txt', '__MACOSX/._one.pdf', 'sub/two.PDF'])),
+            ('three.pdf', b'%PDF-1.4'),
+        ])
+        self.assertEqual([name for name, _ in files], ['batch.zip/one.pdf', 'batch.zip/sub/two.PDF', 'three.pdf'])
+
+    def test_limits(self):
+        with self.assertRaises(SubpoenaServiceError):
+            collect_batch_files([('batch.zip', self.zip_of([f'{i}.pdf' for i in range(4)]))], max_files=3)
+        with self.assertRaises(SubpoenaServiceError):
+            collect_batch_files([('batch.zip', b'not a zip')])
+        with self.assertRaises(SubpoenaServiceError):
+            collect_batch_files([('letter.docx', b'')])
+
+
+class SubpoenaConfig(TestConfig):
+    AI_API_KEY = 'test-key'
+
+
+class TestSubpoenaBatchEndpoint(AppTestCase):
+    """POST /api/subpoenas/batch merges the packets into one index with file and page references."""
+
+    config = SubpoenaConfig
+    file_database = True  # Large batches run as background jobs
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            make_user('clerk')
+            db.session.commit()
+        self.login('clerk')
+
+    def packet_bytes(self, boilerplate_pages):
+        doc = subpoena_packet(boilerplate_pages)
+        try:
+            return doc.tobytes()
+        finally:
+            doc.close()
+
+    def test_batch_of_zip_and_pdf(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('packet-a.pdf', self.packet_bytes(20))
+        data = {'files': [(io.BytesIO(buffer.getvalue()), 'batch.zip'),
+                          (io.BytesIO(self.packet_bytes(2)), 'packet-b.pdf')]}
+        with mock.patch('backend.services.subpoena_service.genai') as genai:
+            genai.GenerativeModel.return_value.generate_content.side_effect = model_reply
+            response = self.client.post('/api/subpoenas/batch', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200, response.data)
+        result = response.get_json()
+
+        medical, = result["record_types"]["Medical"]
+        # The model gave no pages: they come from the notification table rows
+        self.assertEqual(medical["sources"], [{"file": "batch.zip/packet-a.pdf", "pages": [2]},
+                                              {"file": "packet-b.pdf", "pages": [2]}])
+        self.assertEqual([item["status"] for item in result["files"]], ["ok", "ok"])
+        self.assertIn("Sources: batch.zip/packet-a.pdf (p. 2); packet-b.pdf (p. 2)", result["summary"])
+
+    def test_rejects_other_files(self):
+        data = {'files': [(io.BytesIO(b'x'), 'letter.docx')]}
+        response = self.client.post('/api/subpoenas/batch', data=data, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_large_batch_runs_as_a_job(self):
+        packet = self.packet_bytes(2)
+        data = {'files': [(io.BytesIO(packet), f'packet-{n}.pdf') for n in range(4)]}  # Over the sync limit
+        with mock.patch('backend.services.subpoena_service.genai') as genai:
+            genai.GenerativeModel.return_value.generate_content.side_effect = model_reply
+            response = self.client.post('/api/subpoenas/batch', data=data, content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 202, response.data)
+            status_url = response.get_json()['status_url']
+            for _ in range(100):
+                status = self.client.get(status_url).get_json()
+                if status['status'] != 'running':
+                    break
+                time.sleep(0.05)
+        self.assertEqual((status['status'], status['files_done'], status['files_total']), ('done', 4, 4))
+        medical, = status['result']['record_types']['Medical']
+        self.assertEqual(len(medical['sources']), 4)
+        self.assertEqual(self.client.get('/api/subpoenas/batch/jobs/unknown').status_code, 404)
+
+
+class LimitedConfig(SubpoenaConfig):
+    RATELIMIT_ENABLED = True
+
+
+class TestSubpoenaBatchRateLimit(AppTestCase):
+    """Batch uploads are rate limited like the other upload endpoints."""
+
+    config = LimitedConfig
+
+    def test_limit(self):
+        with self.app.app_context():
+            make_user('clerk')
+            db.session.commit()
+        self.login('clerk')
+        codes = [self.client.post('/api/subpoenas/batch', data={'files': [(io.BytesIO(b'x'), 'letter.docx')]},
+                                  content_type='multipart/form-data').status_code for _ in range(6)]
+        self.assertEqual(codes, [400] * 5 + [429])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for the local subpoena pre-pass: section search and table rows.
+"""
+import json
+import unittest
+from unittest import mock
+
+import fitz
+
+from backend.services.subpoena_service import SubpoenaService, subpoena_prepass
+
+COLUMNS = ["Location", "Department", "City/State/Zip", "Records"]
+ROWS = [["Cedars Sinai Medical Center", "Custodian of Records", "Los Angeles, CA 90048", "Medical"],
+        ["Cedars Sinai Medical Center", "Billing Dept", "Los Angeles, CA 90048", "Billing"],
+        ["Kerlan Jobe Orthopaedic", "Radiology", "Los Angeles, CA 90045", "Radiology Films"]]
+
+
+def draw_table(page, rows, top=100):
+    width, height = 125, 20
+    for r, row in enumerate(rows):
+        for c, cell in enumerate(row):
+            rect = fitz.Rect(50 + c * width, top + r * height, 50 + (c + 1) * width, top + (r + 1) * height)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+            page.insert_textbox(rect + (2, 3, -2, 0), cell, fontsize=7)
+
+
+def subpoena_packet(boilerplate_pages=20):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 60), "DEPOSITION SUBPOENA For Production of Business Records", fontsize=12)
+    page.insert_text((50, 90), "Case Name: SMITH v. JONES   Case No.: 23STCV01234", fontsize=10)
+    page = doc.new_page()
+    page.insert_text((50, 60), "Notification of Subpoenaed Records", fontsize=12)
+    page.insert_text((50, 80), "Records requested from January 1, 2018 through Present", fontsize=9)
+    draw_table(page, [COLUMNS] + ROWS[:2])
+    # The table runs on to the next page, without a heading
+    draw_table(doc.new_page(), [COLUMNS] + ROWS[2:], top=60)
+    for i in range(boilerplate_pages):
+        doc.new_page().insert_text((50, 60), f"Proof of service, page {i}. " + "Declaration text " * 20, fontsize=8)
+    page = doc.new_page()
+    page.insert_text((50, 60), "ATTACHMENT 3 - Specified Records Requested", fontsize=12)
+    page.insert_text((50, 90), "SCOPE/ BODY PART LIMITATIONS: HEAD, NECK, SHOULDERS", fontsize=10)
+    return doc
+
+
+class TestSubpoenaPrepass(unittest.TestCase):
+    """Only the notification tables, attachments and caption reach the model."""
+
+    def setUp(self):
+        self.doc = subpoena_packet()
+        with mock.patch('backend.services.subpoena_service.genai'):
+            self.service = SubpoenaService(api_key='test')
+
+    def tearDown(self):
+        self.doc.close()
+
+    def test_tables_become_rows_across_pages(self):
+        prepass = subpoena_prepass(self.doc)
+        rows = [[row[name] for name in COLUMNS] for table in prepass["tables"] for row in table["rows"]]
+        self.assertEqual(rows, ROWS)
+        self.assertEqual([table["page"] for table in prepass["tables"]], [2, 3])
+        sections = {span["section"]: span for span in prepass["spans"]}
+        self.assertIn("through Present", sections["notification"]["text"])
+        self.assertNotIn("Cedars", sections["notification"]["text"])  # Table cells are not repeated
+        self.assertIn("HEAD, NECK, SHOULDERS", sections["attachment_3"]["text"])
+        self.assertIn("23STCV01234", sections["caption"]["text"])
+        self.assertEqual(prepass["pages_used"], [1, 2, 3, 24])
+
+    def test_model_gets_compact_input(self):
+        response = mock.Mock(text=json.dumps({"record_types": {"Medical": [{"location": "Cedars Sinai Medical Center"}]}}))
+        self.service.model = mock.Mock()
+        self.service.model.generate_content.return_value = response
+
+        result = self.service.process_subpoena(self.doc)
+        prompt = self.service.model.generate_content.call_args[0][0]
+        self.assertIn('"rows":[["Cedars Sinai Medical Center"', prompt)
+        self.assertNotIn("Proof of service", prompt)
+        extraction = result["extraction"]
+        self.assertEqual(extraction["mode"], "structured")
+        self.assertLess(extraction["input_chars"] * 3, extraction["full_text_chars"])
+        self.assertIn("Medical Records", self.service.format_result_summary(result))
+
+    def test_falls_back_to_full_text_without_sections(self):
+        doc = fitz.open()
+        doc.new_page().insert_text((50, 60), "A letter about records, with no subpoena headings.")
+        text, info = self.service.prepare_input(doc)
+        self.assertEqual(info["mode"], "full_text")
+        self.assertEqual(text.count("[END OF PAGE 1]"), 1)  # Each page once, no repeated summary
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests for per-field case suggestions.
+"""
+import unittest
+
+from backend.extensions import db
+from backend.models import Case, CaseSuggestion, Document
+from backend.services.suggestion_service import (
+    store_document_suggestions, list_suggestions, apply_suggestions, group_by_document
+)
+from . import AppTestCase, make_user
+
+
+class TestCaseSuggestions(AppTestCase):
+    """Analysis results become suggestion rows that are listed and applied in bulk."""
+
+    def setUp(self):
+        super().setUp()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        user = make_user('suggest')
+        db.session.flush()
+        self.user_id = user.id
+        case = Case(display_name='Suggest', user_id=user.id, case_details={'locked_fields': ['judge']})
+        db.session.add(case)
+        db.session.flush()
+        self.case_id = case.id
+        doc = Document(case_id=case.id, file_name='complaint.pdf', file_path='/tmp/complaint.pdf')
+        db.session.add(doc)
+        db.session.commit()
+        self.doc_id = doc.id
+        store_document_suggestions(self.case_id, self.doc_id, {
+            'judge': 'Hon. A', 'county': 'Los Angeles', 'venue_notes': 'Dept 5', 'plaintiff': '', 'parties': [],
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+        super().tearDown()
+
+    def test_store_skips_empty_values_and_list_filters_locked_fields(self):
+        self.assertEqual(CaseSuggestion.query.count(), 3)
+        fields = [s.field for s in list_suggestions(self.case_id, self.user_id)]
+        self.assertEqual(sorted(fields), ['county', 'venue_notes'])
+
+    def test_reanalysis_keeps_rejected_values_and_drops_stale_pending(self):
+        apply_suggestions(self.case_id, self.user_id, reject=[{'document_id': self.doc_id, 'field': 'county'}])
+        store_document_suggestions(self.case_id, self.doc_id, {'county': 'Los Angeles', 'case_type': 'Auto'})
+        pending = {s.field: s.value for s in list_suggestions(self.case_id, self.user_id)}
+        self.assertEqual(pending, {'case_type': 'Auto'})
+
+    def test_apply_writes_columns_and_details_and_locks(self):
+        result = apply_suggestions(self.case_id, self.user_id, accept=[
+            {'document_id': self.doc_id, 'field': 'county', 'value': 'Orange', 'lock': True},
+            {'document_id': self.doc_id, 'field': 'venue_notes'},
+            {'document_id': self.doc_id, 'field': 'judge'},  # Locked: not applicable
+        ], reject_remaining=True)
+
+        self.assertEqual(len(result['accepted']), 2)
+        self.assertEqual(len(result['skipped']), 1)
+        db.session.expire_all()
+        case = db.session.get(Case, self.case_id)
+        self.assertEqual(case.county, 'Orange')
+        self.assertEqual(case.judge, None)
+        self.assertEqual(case.case_details['venue_notes'], 'Dept 5')
+        self.assertEqual(case.case_details['locked_fields'], ['judge', 'county'])
+        self.assertNotIn('pending_suggestions', case.case_details)
+        statuses = {s.field: s.status for s in CaseSuggestion.query}
+        self.assertEqual(statuses, {'judge': 'rejected', 'county': 'accepted', 'venue_notes': 'accepted'})
+
+    def test_accepting_the_current_value_still_records_the_status(self):
+        case = db.session.get(Case, self.case_id)
+        case.county = 'Los Angeles'
+        db.session.commit()
+        county = CaseSuggestion.query.filter_by(field='county').one()
+        result = apply_suggestions(self.case_id, self.user_id, accept=[county.id])
+        self.assertEqual(result['accepted'], [county.id])
+
+        db.session.remove()  # A fresh session only sees what was committed
+        self.assertEqual(db.session.get(CaseSuggestion, county.id).status, CaseSuggestion.STATUS_ACCEPTED)
+
+    def test_group_by_document_matches_old_layout(self):
+        grouped = group_by_document(list_suggestions(self.case_id, self.user_id))
+        self.assertEqual(grouped, {f'doc_{self.doc_id}': {'county': 'Los Angeles', 'venue_notes': 'Dept 5'}})
+
+    def test_endpoint_lists_pending_suggestions(self):
+        client = self.app.test_client()
+        self.ctx.pop()
+        try:
+            self.login('suggest', client)
+            response = client.get(f'/api/cases/{self.case_id}/suggestions')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['suggestions']), 2)
+            self.assertEqual(client.get(f'/api/cases/{self.case_id}/suggestions?status=bogus').status_code, 400)
+        finally:
+            self.ctx.push()
+
+
+if __name__ == '__main__':
+    unittest.main()
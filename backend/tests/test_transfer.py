@@ -0,0 +1,165 @@
+"""
+Tests for the NDJSON case export and the resumable import.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import select
+
+from backend import create_app
+from backend.extensions import db
+from backend.models import Case, Document, ImportCheckpoint, User
+from backend.services import transfer_service
+from backend.services.search_service import search_documents
+from backend.services.transfer_service import write_export, import_ndjson, TransferServiceError
+from backend.utils.db_types import raw_ciphertext
+from backend.utils.encryption import field_encryptor
+from . import PASSWORD, isolated_config, make_user
+
+
+class TestTransfer(unittest.TestCase):
+    """Export, import into another database with new ids, and resume."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        keys = isolated_config(self)  # Both apps share the process's encryptors
+
+        class SourceConfig(keys):
+            UPLOAD_FOLDER = os.path.join(self.tmp, 'source')
+
+        class TargetConfig(keys):
+            UPLOAD_FOLDER = os.path.join(self.tmp, 'target')
+
+        self.source = create_app(SourceConfig)
+        self.target = create_app(TargetConfig)
+        with self.source.app_context():
+            db.create_all()
+            make_user('admin')
+            owner = make_user('lawyer')
+            db.session.flush()
+            for n in range(3):
+                case = Case(display_name=f'Case {n}', case_number=f'24STCV0{n}', user_id=owner.id,
+                            case_details={'note': n})
+                db.session.add(case)
+                db.session.flush()
+                path = os.path.join(self.tmp, f'file{n}.bin')
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(1000 + n))  # Stored files are opaque (encrypted) bytes
+                db.session.add(Document(case_id=case.id, file_name=f'doc{n}.pdf', file_path=path,
+                                        extracted_text=f'Deposition of witness number{n}'))
+            db.session.commit()
+            self.paths = write_export(os.path.join(self.tmp, 'export'), username='lawyer', include_blobs=True)
+        with self.target.app_context():
+            db.create_all()
+            for name in ('admin', 'someone', 'lawyer'):  # Different ids than the source
+                make_user(name)
+            db.session.add(Case(display_name='Existing', user_id=1))
+            db.session.commit()
+
+    def tearDown(self):
+        for app in (self.source, self.target):
+            with app.app_context():
+                db.drop_all()
+        shutil.rmtree(self.tmp)
+
+    def run_import(self, key='export-1', **kwargs):
+        with open(self.paths['ndjson'], encoding='utf-8') as lines, open(self.paths['blobs'], 'rb') as blobs:
+            return import_ndjson(lines, key, blob_file=blobs, **kwargs)
+
+    def test_export_lines(self):
+        with open(self.paths['ndjson'], encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['type'] for r in records],
+                         ['header', 'user'] + ['case'] * 3 + ['document'] * 3 + ['footer'])
+        self.assertNotIn('password_hash', records[1]['data'])
+        self.assertNotIn('file_path', records[-2]['data'])
+        self.assertEqual(records[-1]['counts'], {'users': 1, 'cases': 3, 'documents': 3, 'blobs': 3})
+
+    def test_export_decrypts_case_numbers_in_bulk(self):
+        with self.source.app_context():
+            with mock.patch.dict(field_encryptor._config, {'ENCRYPT_CASE_FIELDS': True}):
+                owner = User.query.filter_by(username='lawyer').one()
+                db.session.add(Case(display_name='Encrypted', case_number='24STCV09', user_id=owner.id))
+                db.session.commit()
+            stored = db.session.execute(select(raw_ciphertext(Case.case_number))
+                                        .where(Case.display_name == 'Encrypted')).scalar()
+            self.assertTrue(field_encryptor.is_encrypted(stored))
+
+            with mock.patch.object(field_encryptor, 'decrypt', side_effect=AssertionError('per-value decrypt')), \
+                    mock.patch.object(field_encryptor, 'decrypt_many', wraps=field_encryptor.decrypt_many) as bulk:
+                lines = list(transfer_service.export_ndjson(username='lawyer', yield_per=2))
+        numbers = [json.loads(line)['data']['case_number'] for line in lines if '"type": "case"' in line]
+        self.assertEqual(numbers, ['24STCV00', '24STCV01', '24STCV02', '24STCV09'])
+        self.assertEqual(bulk.call_count, 2)  # One call per yield_per batch
+
+    def test_admin_export_endpoints_stream(self):
+        client = self.source.test_client()
+        client.post('/api/auth/login', json={'username': 'admin', 'password': PASSWORD})
+        response = client.get('/api/admin/export/cases.ndjson?username=lawyer&blobs=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        with open(self.paths['ndjson'], encoding='utf-8') as f:
+            expected = [json.loads(line) for line in f]
+        received = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(received[1:], expected[1:])  # The header has the export time
+        with open(self.paths['blobs'], 'rb') as f:
+            self.assertEqual(client.get('/api/admin/export/blobs.tar?username=lawyer').data, f.read())
+        self.assertEqual(client.get('/api/admin/export/cases.ndjson').status_code, 400)
+
+    def test_round_trip_remaps_ids_and_copies_blobs(self):
+        with self.target.app_context():
+            result = self.run_import()
+            self.assertEqual((result['cases'], result['documents'], result['blobs']), (3, 3, 3))
+            owner = User.query.filter_by(username='lawyer').one()
+            cases = Case.query.filter_by(user_id=owner.id).order_by(Case.id).all()
+            self.assertEqual([c.display_name for c in cases], ['Case 0', 'Case 1', 'Case 2'])
+            self.assertEqual(cases[2].case_details, {'note': 2})
+            document, = cases[2].documents
+            with open(document.file_path, 'rb') as f:
+                copied = f.read()
+            with open(os.path.join(self.tmp, 'file2.bin'), 'rb') as f:
+                self.assertEqual(copied, f.read())
+            self.assertTrue(document.file_path.startswith(os.path.join(self.tmp, 'target', str(cases[2].id))))
+            self.assertEqual(search_documents(owner.id, 'number2')['total'], 1)
+
+            # Running it again does nothing, under a new key too: the cases exist
+            self.assertEqual(self.run_import()['status'], ImportCheckpoint.STATUS_COMPLETE)
+            again = self.run_import(key='export-2')
+            self.assertEqual((again['cases'], again['skipped_cases'], again['skipped_documents']), (0, 3, 3))
+            self.assertEqual(Document.query.count(), 3)
+
+    def test_interrupted_import_resumes(self):
+        flush = transfer_service._Importer.flush
+        calls = []
+
+        def failing_flush(importer, line_number):
+            calls.append(line_number)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return flush(importer, line_number)
+
+        with self.target.app_context():
+            with mock.patch.object(transfer_service._Importer, 'flush', failing_flush):
+                with self.assertRaises(TransferServiceError):
+                    self.run_import(batch_size=2)
+            checkpoint = ImportCheckpoint.query.filter_by(import_key='export-1').one()
+            self.assertEqual(checkpoint.status, ImportCheckpoint.STATUS_RUNNING)
+            self.assertEqual((checkpoint.stats['cases'], checkpoint.stats['documents']), (3, 1))
+
+            result = self.run_import(batch_size=2)
+            self.assertEqual(result['status'], ImportCheckpoint.STATUS_COMPLETE)
+            self.assertEqual((result['cases'], result['documents'], result['blobs']), (3, 3, 3))
+            self.assertEqual(Case.query.count(), 4)
+            self.assertEqual(Document.query.count(), 3)
+            # Documents imported after the resume still find their remapped cases
+            for document in Document.query.all():
+                self.assertEqual(document.case.display_name, f"Case {document.file_name[3]}")
+
+
+if __name__ == '__main__':
+    unittest.main()
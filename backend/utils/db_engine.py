@@ -0,0 +1,170 @@
+# backend/utils/db_engine.py
+"""
+Per-backend database engine profiles and connection pool statistics.
+
+engine_options(config) picks SQLALCHEMY_ENGINE_OPTIONS for the configured
+database; configure_engine(engine) adds what can only be done per connection
+or per pool (SQLite pragmas, pool event counters). Pool statistics are per
+process: each gunicorn worker has its own pool.
+
+  - SQLite (file): WAL journal, busy_timeout and synchronous=NORMAL on every
+    connection, so concurrent workers wait for the write lock instead of
+    failing with "database is locked".
+  - Postgres: bounded pool with overflow, pre-ping, recycle and a server-side
+    statement timeout.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_timeout()
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+
+class PoolStats:
+    """Thread-safe counters fed by pool events (see configure_engine)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def _increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_checkout(self):
+        self._increment('checkouts')
+
+    def record_checkin(self):
+        self._increment('checkins')
+
+    def record_connect(self):
+        self._increment('connects')
+
+    def record_invalidation(self):
+        self._increment('invalidations')
+
+    def record_timeout(self):
+        self._increment('timeouts')
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, engine=None):
+        """Counters since the worker started, plus the pool's current state."""
+        with self._lock:
+            stats = {
+                'pid': os.getpid(),
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_count': self.wait_count,
+                'wait_avg_ms': round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+        if engine is not None:
+            pool = engine.pool
+            stats['dialect'] = engine.dialect.name
+            stats['pool_class'] = type(pool).__name__
+            stats['pool_status'] = pool.status()
+            if isinstance(pool, QueuePool):
+                stats.update({
+                    'size': pool.size(),
+                    'checked_out': pool.checkedout(),
+                    'checked_in': pool.checkedin(),
+                    'overflow': pool.overflow(),
+                    'max_overflow': pool._max_overflow,
+                })
+        return stats
+
+
+pool_stats = PoolStats()
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for config['SQLALCHEMY_DATABASE_URI'].
+    Options already set in config['SQLALCHEMY_ENGINE_OPTIONS'] win.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    options = {}
+
+    if backend == 'sqlite':
+        if not _is_memory_sqlite(url):
+            # Python's sqlite3 busy handler, in seconds; the PRAGMA below sets the same
+            options['connect_args'] = {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}
+            options['poolclass'] = TimedQueuePool
+    elif backend == 'postgresql':
+        connect_args = {}
+        statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+        if statement_timeout:
+            connect_args['options'] = f"-c statement_timeout={int(statement_timeout)}"
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+            'connect_args': connect_args,
+        })
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def configure_engine(engine, config):
+    """Registers connection pragmas (SQLite) and the pool statistics events."""
+    if engine.dialect.name == 'sqlite' and not _is_memory_sqlite(engine.url):
+        busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            finally:
+                cursor.close()
+
+    event.listen(engine, 'connect', lambda *args: pool_stats.record_connect())
+    event.listen(engine, 'checkout', lambda *args: pool_stats.record_checkout())
+    event.listen(engine, 'checkin', lambda *args: pool_stats.record_checkin())
+    event.listen(engine, 'invalidate', lambda *args: pool_stats.record_invalidation())
@@ -1,25 +1,113 @@
 # backend/utils/db_types.py
-from sqlalchemy import TypeDecorator, String, Text
+from sqlalchemy import TypeDecorator, String, Text, JSON, Column, type_coerce, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapper
+from sqlalchemy.sql import operators, ClauseElement
 import json
 from backend.utils.encryption import field_encryptor
 
-class EncryptedString(TypeDecorator):
+# Hex HMAC-SHA256 (see FieldEncryptor.blind_index)
+BLIND_INDEX_LENGTH = 64
+
+
+def _is_sql(value):
+    return isinstance(value, ClauseElement) or hasattr(value, '__clause_element__')
+
+
+class BlindIndexed:
+    """
+    Blind-index support for the encrypted types. Fernet ciphertext is
+    randomized, so an encrypted column can't be compared in SQL; given
+    ``blind_index='<column name>'`` the type keeps an HMAC of the plaintext in
+    that companion column of the same table (see blind_index_column), and
+    equality tests on the encrypted column compare the companion instead:
+
+        Case.query.filter_by(case_number='BC123456')
+        # ... WHERE "case".case_number_bidx = '<hmac of BC123456>'
+
+    ``==``, ``!=`` and ``in_()`` against plain values are rewritten; unique
+    constraints and indexes go on the companion column.
+
+    ``switch`` names a config flag (e.g. ENCRYPT_CASE_FIELDS): while it is off,
+    values are written as plaintext; reads accept both, so the flag can be
+    turned on for a live table and rotate-keys encrypts the older rows.
+    """
+
+    def __init__(self, *args, blind_index=None, switch=None, **kwargs):
+        self.blind_index = blind_index
+        self.switch = switch
+        super().__init__(*args, **kwargs)
+
+    class comparator_factory(TypeDecorator.Comparator):
+        def _blind_index_column(self):
+            name = self.type.blind_index
+            table = getattr(self.expr, 'table', None)
+            if name is None or table is None:
+                return None
+            return table.c.get(name)
+
+        def operate(self, op, *other, **kwargs):
+            column = self._blind_index_column()
+            if column is not None and other:
+                value = other[0]
+                if op in (operators.eq, operators.ne) and not _is_sql(value):
+                    return op(column, self.type.blind_index_of(value))
+                if op in (operators.in_op, operators.not_in_op) and isinstance(value, (list, tuple, set)) \
+                        and not any(_is_sql(item) for item in value):
+                    return op(column, [self.type.blind_index_of(item) for item in value])
+            return super().operate(op, *other, **kwargs)
+
+    def _serialize(self, value):
+        return value
+
+    def _deserialize(self, value):
+        return value
+
+    def blind_index_of(self, value):
+        """The companion column's value for a plaintext value (None stays None)."""
+        if value is None:
+            return None
+        return field_encryptor.blind_index(self._canonical(value), self.blind_index)
+
+    def _canonical(self, value):
+        return self._serialize(value)
+
+    def process_bind_param(self, value, dialect):
+        """Encrypt the value before storing in the database."""
+        if value is None:
+            return None
+        value = self._serialize(value)
+        if not field_encryptor.enabled(self.switch):
+            return value
+        return field_encryptor.encrypt(value).decode('utf-8')
+
+    def process_result_value(self, value, dialect):
+        """Decrypt the value when retrieved from the database."""
+        if value is None:
+            return None
+        if self.switch is None or field_encryptor.is_encrypted(value):
+            value = field_encryptor.decrypt(value.encode('utf-8'))
+        return self._deserialize(value)
+
+    def process_result_values(self, values):
+        """Decrypt a whole column of raw values at once (see decrypt_rows)."""
+        values = list(values)
+        if self.switch is None:
+            decrypted = field_encryptor.decrypt_many(values)
+        else:
+            # Plaintext written while the switch was off is returned as is
+            positions = [i for i, value in enumerate(values) if field_encryptor.is_encrypted(value)]
+            decrypted = list(values)
+            for i, value in zip(positions, field_encryptor.decrypt_many([values[i] for i in positions])):
+                decrypted[i] = value
+        return [self._deserialize(value) if value is not None else None for value in decrypted]
+
+
+class EncryptedString(BlindIndexed, TypeDecorator):
     """Platform-independent encrypted string type."""
     
     impl = String
     cache_ok = True
-    
-    def process_bind_param(self, value, dialect):
-        """Encrypt the string before storing in the database."""
-        if value is not None:
-            return field_encryptor.encrypt(value).decode('utf-8')
-        return None
-        
-    def process_result_value(self, value, dialect):
-        """Decrypt the string when retrieved from the database."""
-        if value is not None:
-            return field_encryptor.decrypt(value.encode('utf-8'))
-        return None
         
 class EncryptedText(TypeDecorator):
     """Platform-independent encrypted text type for longer content."""
@@ -38,23 +126,105 @@ class EncryptedText(TypeDecorator):
         if value is not None:
             return field_encryptor.decrypt(value.encode('utf-8'))
         return None
+
+    def process_result_values(self, values):
+        """Decrypt a whole column of raw values at once (see decrypt_rows)."""
+        return field_encryptor.decrypt_many(values)
         
-class EncryptedJSON(TypeDecorator):
+class EncryptedJSON(BlindIndexed, TypeDecorator):
     """Platform-independent encrypted JSON type."""
     
     impl = Text
     cache_ok = True
-    
-    def process_bind_param(self, value, dialect):
-        """Encrypt the JSON before storing in the database."""
-        if value is not None:
-            json_str = json.dumps(value)
-            return field_encryptor.encrypt(json_str).decode('utf-8')
-        return None
-        
-    def process_result_value(self, value, dialect):
-        """Decrypt the JSON when retrieved from the database."""
-        if value is not None:
-            decrypted = field_encryptor.decrypt(value.encode('utf-8'))
-            return json.loads(decrypted)
-        return None
\ No newline at end of file
+
+    def _serialize(self, value):
+        return json.dumps(value)
+
+    def _deserialize(self, value):
+        return json.loads(value)
+
+    def _canonical(self, value):
+        # Equal documents must give equal tokens whatever their key order
+        return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+ENCRYPTED_TYPES = (EncryptedString, EncryptedText, EncryptedJSON)
+
+
+def blind_index_column(source, **kwargs):
+    """
+    The companion column holding the blind index of the encrypted column
+    ``source`` (whose type names this column in ``blind_index=``). Core
+    inserts fill it from the source value through the column default; ORM
+    writes set it whenever the source attribute is set (see
+    _maintain_blind_indexes). Bulk UPDATEs of the source must set it too:
+
+        update(Case).values(case_number=n, case_number_bidx=Case.case_number.type.blind_index_of(n))
+    """
+    def default(context):
+        column = context.current_column.table.c[source]
+        return column.type.blind_index_of(context.get_current_parameters().get(source))
+
+    return Column(String(BLIND_INDEX_LENGTH), default=default, **kwargs)
+
+
+def blind_index_columns(table):
+    """Maps each blind-indexed encrypted column of ``table`` to its companion column."""
+    return {column: table.c[column.type.blind_index] for column in table.columns
+            if isinstance(column.type, BlindIndexed) and column.type.blind_index}
+
+
+@event.listens_for(Mapper, 'mapper_configured')
+def _maintain_blind_indexes(mapper, class_):
+    """Keeps each blind index in step with its source attribute on ORM writes."""
+    for table in mapper.tables:
+        for column, index_column in blind_index_columns(table).items():
+            source = mapper.get_property_by_column(column).key
+            target = mapper.get_property_by_column(index_column).key
+
+            def set_index(instance, value, oldvalue, initiator, column_type=column.type, target=target):
+                setattr(instance, target, column_type.blind_index_of(value))
+
+            event.listen(getattr(class_, source), 'set', set_index)
+
+
+def raw_ciphertext(column):
+    """
+    Selects an encrypted column's stored value without decrypting it, for
+    queries whose rows are then decrypted in bulk by decrypt_rows():
+
+        rows = db.session.execute(select(Model.id, raw_ciphertext(Model.secret))).all()
+        rows = decrypt_rows(rows, {'secret': Model.secret.type})
+    """
+    return type_coerce(column, Text).label(column.key)
+
+
+def decrypt_rows(rows, encrypted_columns):
+    """
+    Decrypts result rows column by column with one bulk call per column,
+    instead of one decrypt per value during result processing.
+
+    Args:
+        rows (list): Result rows (Row or mapping) with raw_ciphertext() columns.
+        encrypted_columns (dict): Column label -> its Encrypted* type instance.
+    Returns:
+        list[dict]: One dict per row, the encrypted columns decrypted.
+    """
+    records = [dict(row._mapping) if hasattr(row, '_mapping') else dict(row) for row in rows]
+    for label, column_type in encrypted_columns.items():
+        values = column_type.process_result_values([record[label] for record in records])
+        for record, value in zip(records, values):
+            record[label] = value
+    return records
+
+class PortableJSONB(TypeDecorator):
+    """JSON column stored as JSONB on Postgres and as JSON text everywhere else."""
+
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        """Use JSONB on Postgres so the column can be GIN indexed and updated in place."""
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(JSON())
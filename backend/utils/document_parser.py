@@ -1,50 +1,164 @@
 import fitz  # PyMuPDF
 from docx import Document as DocxDocument # Rename to avoid clash with our DB model
+from docx.document import Document as DocxDocumentType
+import io
 import os
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Separates pages in text extracted from PDFs, so page numbers can be recovered
+# later (see split_pages). Word documents have no pages and no breaks.
+PAGE_BREAK = "\f"
+
+# Anything a document can be opened from: a path, the raw bytes, a binary
+# file-like object (e.g. a werkzeug FileStorage stream) or an open document.
+DocumentSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, fitz.Document]
+
+# PyMuPDF isn't thread-safe: code reading PDFs from worker threads holds this
+# while it touches fitz, and leaves the slow parts (model calls) outside it
+pdf_lock = threading.Lock()
+
+
+def _read_bytes(source) -> bytes:
+    """Returns the bytes of an in-memory source, or None if it's a path."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return source.read()
+    return None
+
+
+@contextmanager
+def open_pdf(source: DocumentSource) -> Iterator[fitz.Document]:
+    """
+    Opens a PDF from a path, bytes, a file-like object or an already open
+    fitz.Document, without writing anything to disk.
+
+    Documents opened here are closed on exit; a document passed in is left
+    open for its owner.
+    """
+    if isinstance(source, fitz.Document):
+        yield source
+        return
+
+    data = _read_bytes(source)
+    if data is not None:
+        doc = fitz.open(stream=data, filetype="pdf")
+    else:
+        doc = fitz.open(os.fspath(source))
+    try:
+        yield doc
+    finally:
+        doc.close()
+
+
+def open_docx(source: DocumentSource) -> DocxDocumentType:
+    """
+    Opens a Word document from a path, bytes, a file-like object or an
+    already open python-docx Document.
+    """
+    if isinstance(source, DocxDocumentType):
+        return source
+    data = _read_bytes(source)
+    if data is not None:
+        return DocxDocument(io.BytesIO(data))
+    return DocxDocument(os.fspath(source))
+
+
+def _is_missing_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike)) and not os.path.exists(source)
+
 
 def extract_text_from_pdf(pdf_path):
     """
     Extracts text content from a PDF file.
 
     Args:
-        pdf_path (str): The full path to the PDF file on the server.
+        pdf_path (DocumentSource): Path to the PDF file on the server, or its bytes / stream / open document.
 
     Returns:
         str: The extracted text, or None if an error occurs.
     """
-    if not os.path.exists(pdf_path):
-        print(f"Error: PDF file not found at {pdf_path}")
+    if _is_missing_path(pdf_path):
+        logger.error("Error: PDF file not found at %s", pdf_path)
         return None
     try:
         text = ""
-        # Use fitz.open() to handle the PDF file
-        with fitz.open(pdf_path) as doc:
+        with open_pdf(pdf_path) as doc:
             for page_num in range(len(doc)):
+                if page_num:
+                    text += PAGE_BREAK # Mark the page boundary for split_pages()
                 page = doc.load_page(page_num)
                 text += page.get_text("text") # Extract plain text from the page
                 text += "\n" # Add a newline between pages for readability
         return text
     except Exception as e:
         # Log the error for debugging
-        print(f"Error extracting text from PDF '{pdf_path}': {e}")
+        logger.error("Error extracting text from PDF: %s", e)
         return None # Return None to indicate failure
 
+def _clean_cell(value):
+    return " ".join(value.split()) if value else ""
+
+
+def extract_page_tables(page):
+    """
+    Finds the tables on a PDF page (PyMuPDF table detection) and returns them
+    as structured rows, header cells becoming the keys.
+
+    Args:
+        page (fitz.Page): The page to search.
+
+    Returns:
+        list[dict]: One dict per table: header (list of column names), rows
+        (list of dicts keyed by column name, blank rows dropped) and bbox.
+    """
+    tables = []
+    for table in page.find_tables().tables:
+        cells = [[_clean_cell(cell) for cell in row] for row in table.extract()]
+        header = [_clean_cell(name) for name in table.header.names]
+        if not table.header.external and cells:
+            cells = cells[1:]  # The header is the table's first row
+        header = [name or f"column_{i + 1}" for i, name in enumerate(header)]
+        rows = [dict(zip(header, row)) for row in cells if any(row)]
+        if rows:
+            tables.append({"header": header, "rows": rows, "bbox": tuple(table.bbox)})
+    return tables
+
+def split_pages(text):
+    """
+    Splits extracted text into (page_number, page_text) pairs. Text without
+    page breaks (Word documents, PDFs extracted before PAGE_BREAK was added)
+    comes back as a single part with page_number None. Blank pages are skipped.
+    """
+    if not text:
+        return []
+    if PAGE_BREAK not in text:
+        return [(None, text)] if text.strip() else []
+    return [(number, page) for number, page in enumerate(text.split(PAGE_BREAK), start=1) if page.strip()]
+
 def extract_text_from_docx(docx_path):
     """
     Extracts text content from a DOCX file.
 
     Args:
-        docx_path (str): The full path to the DOCX file on the server.
+        docx_path (DocumentSource): Path to the DOCX file on the server, or its bytes / stream.
 
     Returns:
         str: The extracted text, or None if an error occurs.
     """
-    if not os.path.exists(docx_path):
-        print(f"Error: DOCX file not found at {docx_path}")
+    if _is_missing_path(docx_path):
+        logger.error("Error: DOCX file not found at %s", docx_path)
         return None
     try:
         # Use python-docx to open the document
-        document = DocxDocument(docx_path)
+        document = open_docx(docx_path)
         full_text = []
         # Iterate through each paragraph in the document
         for para in document.paragraphs:
@@ -53,7 +167,7 @@ def extract_text_from_docx(docx_path):
         return '\n'.join(full_text)
     except Exception as e:
         # Log the error
-        print(f"Error extracting text from DOCX '{docx_path}': {e}")
+        logger.error("Error extracting text from DOCX: %s", e)
         return None # Return None on failure
 
 # You could add functions for other file types here if needed (.txt, .rtf, etc.)
\ No newline at end of file
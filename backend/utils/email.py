@@ -3,20 +3,23 @@ from flask import current_app, render_template
 from flask_mail import Message
 from backend.extensions import mail
 import threading
+import logging
+
+logger = logging.getLogger(__name__)
 
 def send_async_email(app, msg):
     """Send email asynchronously with error handling"""
     with app.app_context():
         try:
             mail.send(msg)
-            print(f"Email sent successfully to {msg.recipients}")
+            logger.info("Email sent successfully to %s", msg.recipients)
         except Exception as e:
             # Log the error but don't crash
-            print(f"Email sending failed: {e}")
-            print(f"Would have sent email with subject: {msg.subject}")
-            print(f"To: {msg.recipients}")
+            logger.error("Email sending failed: %s", e)
+            logger.info("Would have sent email with subject: %s", msg.subject)
+            logger.info("To: %s", msg.recipients)
             # Print email content for testing purposes
-            print(f"Content (HTML): {msg.html[:200]}...")
+            logger.info("Content (HTML): %s...", msg.html[:200])
 
 def send_email(subject, recipients, html_body, text_body=None):
     """Send an email"""
@@ -1,20 +1,32 @@
 from cryptography.fernet import Fernet
 import os
+import json
 import logging
+import threading
 from datetime import datetime
 from flask import current_app
+from backend.utils.encryption import KeyMetadataWatcher, KeyRing, ReloadableKeys
 
-# Initialize logger
+# Audit log: also written to LOG_FILE_DIR/file_encryption.log (see utils/logging_config.py)
 file_encryption_logger = logging.getLogger('file_encryption')
-file_encryption_logger.setLevel(logging.INFO)
-if not file_encryption_logger.handlers:
-    handler = logging.FileHandler('file_encryption.log')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    file_encryption_logger.addHandler(handler)
-
-class FileEncryptor:
-    """Handles encryption and decryption of files"""
+
+class FileEncryptor(ReloadableKeys):
+    """
+    Handles encryption and decryption of files with envelope encryption.
+
+    Each file is encrypted with its own random data key (a Fernet key). The
+    data key is wrapped (encrypted) by the active key-encryption key, a
+    versioned key kept in FILE_KEY_DIR, and the wrapped key is stored with
+    the document (Document.file_key), tagged with the id of the wrapping key.
+    Rotating key-encryption keys only rewraps the small data keys; deleting
+    the wrapped key makes the file unreadable (crypto-erasure).
+
+    Files encrypted before envelope encryption have no data key: they are
+    read with the single legacy key, file_encryption.key (FILE_ENCRYPTION_KEY_PATH).
+
+    Key-encryption keys rotated by another process (flask rotate-file-keys)
+    are picked up without a restart (see ReloadableKeys).
+    """
     
     _instance = None
     _initialized = False
@@ -29,11 +41,17 @@ class FileEncryptor:
             return
         self._key = None
         self.cipher = None
+        self._kek_dir = None
+        self._keks = {}
+        self._active_kek_id = None
+        self._kek_ring = None
+        self._watcher = None
+        self._reload_lock = threading.Lock()
     
     def init_app(self, app):
         """Initialize with Flask app instance"""
         # Get or generate key from app config
-        key_path = os.path.join(app.instance_path, 'file_encryption.key')
+        key_path = app.config.get('FILE_ENCRYPTION_KEY_PATH') or os.path.join(app.instance_path, 'file_encryption.key')
         
         if os.path.exists(key_path):
             with open(key_path, 'rb') as key_file:
@@ -42,8 +60,8 @@ class FileEncryptor:
             # Generate a new key
             self._key = Fernet.generate_key()
             
-            # Ensure instance path exists
-            os.makedirs(app.instance_path, exist_ok=True)
+            # Ensure the key's directory exists
+            os.makedirs(os.path.dirname(key_path), exist_ok=True)
             
             # Save key to file with restricted permissions
             with open(key_path, 'wb') as key_file:
@@ -53,17 +71,102 @@ class FileEncryptor:
             try:
                 os.chmod(key_path, 0o600)
             except Exception as e:
-                file_encryption_logger.warning(f"Could not set file permissions for encryption key: {e}")
+                file_encryption_logger.warning("Could not set file permissions for encryption key: %s", e)
             
-        # Create cipher
+        # Create cipher (legacy files only)
         self.cipher = Fernet(self._key)
+
+        # Key-encryption keys for the per-file data keys
+        self._kek_dir = app.config.get('FILE_KEY_DIR') or os.path.join(app.instance_path, 'file_keys')
+        os.makedirs(self._kek_dir, exist_ok=True)
+        self._watcher = KeyMetadataWatcher(self._kek_metadata_path(), app.config.get('KEY_RELOAD_CHECK_SECONDS', 1))
+        self._load_keks()
         FileEncryptor._initialized = True
         file_encryption_logger.info("File encryption initialized")
+
+    # --- Key-encryption keys ---
+
+    def _kek_metadata_path(self):
+        return os.path.join(self._kek_dir, 'kek_metadata.json')
+
+    def _load_keks(self):
+        """Load every key-encryption key; create the first one if there are none"""
+        metadata_path = self._kek_metadata_path()
+        if not os.path.exists(metadata_path):
+            self._create_kek()
+        self._watcher.mark()
+        with open(metadata_path, 'r') as f:
+            active_kek_id = json.load(f).get('active_kek_id')
+
+        keks = {}
+        for filename in os.listdir(self._kek_dir):
+            if filename.endswith('.key'):
+                with open(os.path.join(self._kek_dir, filename), 'rb') as key_file:
+                    keks[filename[:-len('.key')]] = key_file.read()
+        self._kek_ring = KeyRing(keks, active_kek_id)
+        self._keks, self._active_kek_id = keks, active_kek_id
+
+    def reload_keys(self):
+        """Reload the key-encryption keys, e.g. after another process rotated them"""
+        with self._reload_lock:
+            previous = self._active_kek_id
+            self._load_keks()
+        if self._active_kek_id != previous:
+            file_encryption_logger.info("File key-encryption keys reloaded; active key: %s", self._active_kek_id)
+
+    def _loaded_key_ring(self):
+        return self._kek_ring
+
+    def _create_kek(self):
+        """Write a new key-encryption key and make it the active one"""
+        kek_id = f"kek_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+        key_path = os.path.join(self._kek_dir, f"{kek_id}.key")
+        with open(key_path, 'wb') as key_file:
+            key_file.write(Fernet.generate_key())
+        try:
+            os.chmod(key_path, 0o600)
+        except Exception as e:
+            file_encryption_logger.warning("Could not set file permissions for key-encryption key: %s", e)
+
+        metadata_path = self._kek_metadata_path()
+        with open(metadata_path + '.tmp', 'w') as f:
+            json.dump({'active_kek_id': kek_id, 'last_updated': datetime.utcnow().isoformat()}, f)
+        os.replace(metadata_path + '.tmp', metadata_path)
+        return kek_id
+
+    @property
+    def active_kek_id(self):
+        self._current_key_ring()
+        return self._active_kek_id
+
+    def rotate_kek(self):
+        """Create a new active key-encryption key; rewrap_key() moves data keys onto it"""
+        self._create_kek()
+        self._load_keks()
+        file_encryption_logger.info("File key-encryption key rotated; active key: %s", self._active_kek_id)
+        return self._active_kek_id
+
+    def kek_id_of(self, wrapped_key):
+        """Id of the key-encryption key that wrapped a data key"""
+        return self._kek_ring.key_id_of(wrapped_key)
+
+    def rewrap_key(self, wrapped_key):
+        """Rewrap a data key with the active key-encryption key (unchanged if already on it)"""
+        if wrapped_key is None or self.kek_id_of(wrapped_key) == self.active_kek_id:
+            return wrapped_key
+        data_key = self._with_key_ring(lambda ring: ring.decrypt(wrapped_key))
+        return self._kek_ring.encrypt(data_key).decode('ascii')
+
+    def _data_cipher(self, wrapped_key):
+        if wrapped_key is None:
+            return self.cipher
+        return Fernet(self._with_key_ring(lambda ring: ring.decrypt(wrapped_key)))
         
     def encrypt_file(self, input_path, output_path=None):
         """
-        Encrypt a file at input_path and save to output_path.
+        Encrypt a file at input_path with a new data key and save to output_path.
         If output_path is None, encrypt in place.
+        Returns the wrapped data key (str), to be stored as Document.file_key.
         """
         if not self._initialized:
             raise RuntimeError("FileEncryptor not initialized. Call init_app first.")
@@ -76,24 +179,27 @@ class FileEncryptor:
             with open(input_path, 'rb') as f:
                 data = f.read()
                 
-            # Encrypt the data
-            encrypted_data = self.cipher.encrypt(data)
+            # Encrypt the data with its own key, and wrap that key
+            data_key = Fernet.generate_key()
+            encrypted_data = Fernet(data_key).encrypt(data)
+            wrapped_key = self._current_key_ring().encrypt(data_key).decode('ascii')
             
             # Write the encrypted data
             with open(output_path, 'wb') as f:
                 f.write(encrypted_data)
                 
-            file_encryption_logger.info(f"File encrypted: {input_path}")
-            return True
+            file_encryption_logger.info("File encrypted: %s", input_path)
+            return wrapped_key
             
         except Exception as e:
-            file_encryption_logger.error(f"Error encrypting file {input_path}: {e}")
+            file_encryption_logger.error("Error encrypting file %s: %s", input_path, e)
             raise
     
-    def decrypt_file(self, input_path, output_path=None):
+    def decrypt_file(self, input_path, output_path=None, wrapped_key=None):
         """
         Decrypt a file at input_path and save to output_path.
         If output_path is None, return the decrypted data as bytes.
+        wrapped_key is the file's Document.file_key (None for legacy files).
         """
         if not self._initialized:
             raise RuntimeError("FileEncryptor not initialized. Call init_app first.")
@@ -104,21 +210,21 @@ class FileEncryptor:
                 encrypted_data = f.read()
                 
             # Decrypt the data
-            decrypted_data = self.cipher.decrypt(encrypted_data)
+            decrypted_data = self._data_cipher(wrapped_key).decrypt(encrypted_data)
             
             if output_path:
                 # Write the decrypted data to a file
                 with open(output_path, 'wb') as f:
                     f.write(decrypted_data)
-                file_encryption_logger.info(f"File decrypted to: {output_path}")
+                file_encryption_logger.info("File decrypted to: %s", output_path)
                 return True
             else:
                 # Return the decrypted data
-                file_encryption_logger.info(f"File decrypted: {input_path}")
+                file_encryption_logger.info("File decrypted: %s", input_path)
                 return decrypted_data
                 
         except Exception as e:
-            file_encryption_logger.error(f"Error decrypting file {input_path}: {e}")
+            file_encryption_logger.error("Error decrypting file %s: %s", input_path, e)
             raise
 
 # Create a singleton instance
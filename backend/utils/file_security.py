@@ -7,14 +7,8 @@ import logging
 from werkzeug.utils import secure_filename
 from flask import current_app
 
-# Initialize logger for file security events
+# Audit log: also written to LOG_FILE_DIR/file_security.log (see utils/logging_config.py)
 file_security_logger = logging.getLogger('file_security')
-file_security_logger.setLevel(logging.INFO)
-if not file_security_logger.handlers:
-    handler = logging.FileHandler('file_security.log')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    file_security_logger.addHandler(handler)
 
 # Configuration
 # Allowed MIME types with their extensions
@@ -64,7 +58,7 @@ def check_file_size(file_storage):
         max_mb = MAX_FILE_SIZE_BYTES / (1024 * 1024)
         file_mb = file_size / (1024 * 1024)
         error_msg = f"File size ({file_mb:.2f}MB) exceeds maximum allowed size ({max_mb:.2f}MB)"
-        file_security_logger.warning(f"File size validation failed: {error_msg}")
+        file_security_logger.warning("File size validation failed: %s", error_msg)
         raise FileSizeExceededError(error_msg)
     
     return True
@@ -85,7 +79,7 @@ def validate_file_type(file_storage):
     # First check by filename extension
     if not file_storage.filename:
         error_msg = "Missing filename"
-        file_security_logger.warning(f"File type validation failed: {error_msg}")
+        file_security_logger.warning("File type validation failed: %s", error_msg)
         raise FileTypeNotAllowedError(error_msg)
     
     ext = os.path.splitext(file_storage.filename)[1].lower().lstrip('.')
@@ -101,13 +95,13 @@ def validate_file_type(file_storage):
     # If mime type not detected or not allowed, reject
     if not mime_type or mime_type not in ALLOWED_MIME_TYPES:
         error_msg = f"File type '{mime_type or 'unknown'}' not allowed"
-        file_security_logger.warning(f"File type validation failed: {error_msg} for file {file_storage.filename}")
+        file_security_logger.warning("File type validation failed: %s for file %s", error_msg, file_storage.filename)
         raise FileTypeNotAllowedError(error_msg)
     
     # Double-check extension matches mime type
     if ext not in ALLOWED_MIME_TYPES.get(mime_type, []):
         error_msg = f"File extension '.{ext}' does not match detected type '{mime_type}'"
-        file_security_logger.warning(f"File extension validation failed: {error_msg}")
+        file_security_logger.warning("File extension validation failed: %s", error_msg)
         raise FileTypeNotAllowedError(error_msg)
     
     return mime_type
@@ -142,7 +136,7 @@ def generate_secure_filename(original_filename, case_id):
     secure_name = f"{case_id}-{unique_id}-{filename_hash}{ext}"
     
     # Log the mapping for audit purposes
-    file_security_logger.info(f"Secure filename generated: {original_filename} -> {secure_name}")
+    file_security_logger.info("Secure filename generated: %s -> %s", original_filename, secure_name)
     
     return secure_name, clean_filename
 
@@ -189,7 +183,7 @@ def process_and_validate_file(file_storage, case_id):
         raise ValueError("Invalid file storage object provided")
     
     # Log file upload attempt
-    file_security_logger.info(f"Processing upload: {file_storage.filename} for case {case_id}")
+    file_security_logger.info("Processing upload: %s for case %s", file_storage.filename, case_id)
     
     # Check file size
     check_file_size(file_storage)
@@ -0,0 +1,54 @@
+# backend/utils/http_cache.py
+"""
+Conditional GET support for API reads.
+
+An endpoint computes its validators (a strong ETag and a Last-Modified time)
+from a cheap aggregate query, asks not_modified() whether the client's copy
+is current and only loads and serializes rows when it isn't:
+
+    etag = make_etag('cases', current_user.id, versions['cases'])
+    cached = not_modified(etag, versions['last_modified'])
+    if cached:
+        return cached
+    ...
+    return add_validators(jsonify(result), etag, versions['last_modified'])
+"""
+import hashlib
+
+from flask import request, current_app
+from werkzeug.http import is_resource_modified
+
+# Bump to invalidate every ETag when a response format changes
+ETAG_FORMAT_VERSION = 1
+
+# Browsers keep the response but revalidate it on every use; shared caches don't store it
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts):
+    """Strong ETag (unquoted) for the given validator parts."""
+    digest = hashlib.sha256(repr((ETAG_FORMAT_VERSION,) + parts).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def add_validators(response, etag, last_modified=None):
+    """Sets ETag, Last-Modified and Cache-Control on a response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Returns an empty 304 response if the request's If-None-Match (or, without
+    it, If-Modified-Since) matches, else None. If-None-Match takes precedence,
+    as RFC 9110 requires.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+        return add_validators(response, etag, last_modified)
+    return None
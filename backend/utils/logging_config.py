@@ -0,0 +1,195 @@
+# --- backend/utils/logging_config.py ---
+"""
+The app's logging setup (configure_logging, called by create_app).
+
+- Loggers only hand records to a queue; a listener thread does the
+  formatting I/O (stderr, and the audit log files), so a request never
+  waits on a write.
+- LOG_LEVEL is the root level; LOG_LEVELS sets levels per logger, e.g.
+  "backend.services.case_service=DEBUG,rate_limit=WARNING".
+- LOG_FORMAT=json writes one JSON object per line: time, level, logger,
+  message, request_id and any ``extra`` fields. 'text' is for a console.
+- Records logged while handling a request carry its id: the X-Request-ID
+  header when a proxy sent one, else a new one. It's returned as a
+  response header too.
+- The audit loggers (security, rate_limit, ...) also go to their own
+  files in LOG_FILE_DIR, when set.
+
+Log with %-style arguments (logger.debug("Case %s: %s", case_id, details)):
+the message is only built for records that pass the level checks, and
+lazy_json() defers serializing a payload the same way.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+AUDIT_LOGGERS = ('security', 'rate_limit', 'file_encryption', 'file_security', 'secure_deletion')
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+_queue_handler = None
+
+
+class lazy_json:
+    """Serializes ``value`` as JSON only if a log message using it is built."""
+
+    def __init__(self, value, **kwargs):
+        self.value = value
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return json.dumps(self.value, default=str, **self.kwargs)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Builds the message in the thread that logs (its args may change once the
+    call returns); formatting is left to the listener's handlers.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds request_id to records, in the thread that logs them."""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=warning' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _handlers(config):
+    formatter = JsonFormatter() if config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter()
+    stream = logging.StreamHandler()
+    stream.setFormatter(formatter)
+    handlers = [stream]
+
+    log_dir = config.get('LOG_FILE_DIR')
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        for name in AUDIT_LOGGERS:
+            handler = logging.FileHandler(os.path.join(log_dir, f'{name}.log'), delay=True)
+            handler.setFormatter(formatter)
+            handler.addFilter(logging.Filter(name))
+            handlers.append(handler)
+    return handlers
+
+
+def shutdown_logging():
+    """Stops the listener thread once the queued records are written."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def configure_logging(config):
+    """
+    Routes all logging through one queue to the configured handlers.
+    Calling it again (another app in the same process) replaces the setup.
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    records = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(records)
+    _queue_handler.addFilter(RequestIdFilter())
+    _listener = logging.handlers.QueueListener(records, *_handlers(config), respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO').upper())
+
+    for name in AUDIT_LOGGERS:
+        logging.getLogger(name).setLevel(logging.INFO)
+    for name, level in parse_levels(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+
+atexit.register(shutdown_logging)
+
+
+def init_request_ids(app):
+    """Gives every request an id (see RequestIdFilter) and returns it as X-Request-ID."""
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def add_request_id_header(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
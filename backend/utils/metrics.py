@@ -0,0 +1,319 @@
+# backend/utils/metrics.py
+"""
+Request metrics in the Prometheus text format (GET /api/admin/metrics).
+
+init_app(app) times every request and observes, per endpoint (the Flask
+endpoint name, e.g. 'api.handle_cases'; '<unmatched>' for unknown URLs):
+
+  - http_request_duration_seconds{endpoint, method, status}, up to the
+    response being returned (a streamed body is not included)
+  - http_response_size_bytes{endpoint, method}, for responses with a length
+  - db_queries_per_request{endpoint} and db_query_duration_seconds{endpoint}:
+    how many SQL statements the request ran and their total time, from the
+    engines' cursor events
+
+Each process keeps its histograms in memory. With METRICS_DIR set, each
+process also writes them to its own file there (at most every
+METRICS_FLUSH_SECONDS, and at exit) and a scrape adds up all the files, so
+whichever gunicorn worker answers it reports them all; the other workers'
+numbers may be that many seconds old. Files of processes that have exited are
+folded into one, so counts survive worker restarts. The directory must be on
+the workers' host (processes are found by pid); empty it when deploying.
+
+Prometheus can't log in, so with METRICS_TOKEN set the endpoint also accepts
+'Authorization: Bearer <METRICS_TOKEN>' instead of an admin session.
+"""
+import atexit
+import bisect
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: exited processes' files are left as they are
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (help, bucket upper bounds)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Request latency by endpoint, method and status.", LATENCY_BUCKETS),
+    'http_response_size_bytes': ("Response body size by endpoint and method.", SIZE_BUCKETS),
+    'db_queries_per_request': ("SQL statements run per request, by endpoint.", QUERY_COUNT_BUCKETS),
+    'db_query_duration_seconds': ("Total SQL statement time per request, by endpoint.", LATENCY_BUCKETS),
+}
+UNMATCHED_ENDPOINT = '<unmatched>'
+EXITED_FILE = 'exited.json'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histograms:
+    """
+    Thread-safe histogram series. A series is keyed by (name, sorted label
+    pairs) and holds a count per bucket, then +Inf's, then the sum.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.changed = False
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(buckets, value)  # The first bound >= value
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+            self.changed = True
+
+    def series(self):
+        with self._lock:
+            self.changed = False
+            return {key: list(values) for key, values in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.changed = False
+
+
+def merge_series(into, series):
+    """Adds ``series`` to ``into``; series whose buckets differ (older code) are skipped."""
+    for key, values in series.items():
+        current = into.get(key)
+        if current is None:
+            into[key] = list(values)
+        elif len(current) == len(values):
+            into[key] = [a + b for a, b in zip(current, values)]
+
+
+def _write_series(path, series):
+    rows = [[name, [list(pair) for pair in labels], values] for (name, labels), values in series.items()]
+    temporary = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(rows, f)
+    os.replace(temporary, path)  # Readers see the old file or the new one, never half of it
+
+
+def _read_series(path):
+    try:
+        with open(path) as f:
+            rows = json.load(f)
+    except (OSError, ValueError):
+        return {}  # Folded away meanwhile, or not a metrics file
+    return {(name, tuple(tuple(pair) for pair in labels)): values for name, labels, values in rows}
+
+
+def _process_exited(file_name):
+    pid = file_name.split('-', 1)[0]
+    if not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # Alive, under another user
+    return False
+
+
+class RequestMetrics:
+    """This process's histograms, and their file in METRICS_DIR (one per app, app.extensions['metrics'])."""
+
+    def __init__(self, directory=None, flush_seconds=5):
+        self.directory = directory or None
+        self.flush_seconds = flush_seconds
+        self.histograms = Histograms()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._pid = None
+        self._path = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def observe(self, name, labels, value):
+        self.histograms.observe(name, labels, value)
+
+    def _own_path(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            if self._pid is not None:
+                # Forked after flushing: the parent's numbers are already in its file
+                self.histograms.reset()
+            self._pid = pid
+            self._path = os.path.join(self.directory, f'{pid}-{uuid.uuid4().hex[:8]}.json')
+        return self._path
+
+    def flush(self, blocking=True):
+        """Writes this process's histograms to its file, if there are any."""
+        if not self.directory or not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            path = self._own_path()
+            series = self.histograms.series()
+            self._flushed_at = time.monotonic()
+            if series:
+                _write_series(path, series)
+        except OSError as e:
+            logger.warning("Could not write request metrics to %s: %s", self.directory, e)
+        finally:
+            self._flush_lock.release()
+
+    def maybe_flush(self):
+        """After a request: flush if there is something new and the interval has passed."""
+        if self.directory and self.histograms.changed and time.monotonic() - self._flushed_at >= self.flush_seconds:
+            self.flush(blocking=False)  # Another thread is already writing
+
+    def _fold_exited(self):
+        """Merges exited processes' files into EXITED_FILE, one process at a time."""
+        if fcntl is None:
+            return
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = [name for name in os.listdir(self.directory)
+                      if name.endswith('.json') and name != EXITED_FILE and _process_exited(name)]
+            if not exited:
+                return
+            exited_path = os.path.join(self.directory, EXITED_FILE)
+            series = _read_series(exited_path)
+            for name in exited:
+                merge_series(series, _read_series(os.path.join(self.directory, name)))
+            _write_series(exited_path, series)
+            for name in exited:
+                os.remove(os.path.join(self.directory, name))
+
+    def collect(self):
+        """Every process's series: this one's as of now, the others' as last flushed."""
+        if not self.directory:
+            return self.histograms.series()
+        self.flush()
+        self._fold_exited()
+        series = {}
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.json'):
+                merge_series(series, _read_series(os.path.join(self.directory, name)))
+        return series
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render(series):
+    """The Prometheus text exposition of ``series`` (see Histograms)."""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), values in sorted(series.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels, le=le)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def scrape_token_valid():
+    """Whether the request carries the configured METRICS_TOKEN as its bearer token."""
+    token = current_app.config.get('METRICS_TOKEN')
+    scheme, _, presented = request.headers.get('Authorization', '').partition(' ')
+    if not token or scheme.lower() != 'bearer' or not presented:
+        return False
+    return hmac.compare_digest(presented.strip().encode(), token.encode())
+
+
+def render_metrics():
+    """The current app's metrics, from all workers, as Prometheus text."""
+    return render(current_app.extensions['metrics'].collect())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _record_query(context):
+    start = getattr(context, '_metrics_start', None)
+    if start is None or not has_request_context():
+        return
+    totals = g.get('_metrics_db')
+    if totals is not None:  # Only requests that init_app's hooks are timing
+        totals[0] += 1
+        totals[1] += time.perf_counter() - start
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context)
+
+
+def _handle_error(exception_context):
+    if exception_context.execution_context is not None:
+        _record_query(exception_context.execution_context)
+
+
+def init_app(app):
+    """Register before the app's other request hooks, so the timing covers them."""
+    metrics = RequestMetrics(app.config.get('METRICS_DIR'), app.config.get('METRICS_FLUSH_SECONDS', 5))
+    app.extensions['metrics'] = metrics
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    for event_name, listener in (('before_cursor_execute', _before_cursor_execute),
+                                 ('after_cursor_execute', _after_cursor_execute),
+                                 ('handle_error', _handle_error)):
+        if not event.contains(Engine, event_name, listener):
+            event.listen(Engine, event_name, listener)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_db = [0, 0.0]
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        method = request.method
+        metrics.observe('http_request_duration_seconds',
+                        {'endpoint': endpoint, 'method': method, 'status': str(response.status_code)},
+                        time.perf_counter() - start)
+        if response.content_length is not None:
+            metrics.observe('http_response_size_bytes', {'endpoint': endpoint, 'method': method},
+                            response.content_length)
+        queries, query_seconds = g.pop('_metrics_db', (0, 0.0))
+        metrics.observe('db_queries_per_request', {'endpoint': endpoint}, queries)
+        metrics.observe('db_query_duration_seconds', {'endpoint': endpoint}, query_seconds)
+        metrics.maybe_flush()
+        return response
@@ -0,0 +1,166 @@
+# backend/utils/principal_cache.py
+"""
+Per-worker cache of the Flask-Login principal, so an authenticated request
+doesn't have to read the users table.
+
+load_principal() (the user_loader) returns a SessionPrincipal, a read-only
+snapshot of the user's public columns, from a TTL cache keyed by the user id
+and the session's auth stamp (the user's password_changed_at, stored in the
+session at login). A cache miss reads the user once; a session whose stamp
+no longer matches the user's (the password changed) is logged out.
+
+Any ORM update or delete of a User (lockout, approval, login bookkeeping,
+password change) drops that user's entry in this worker at once. Other
+workers pick the change up when their entry expires (SESSION_PRINCIPAL_TTL
+seconds), so keep the TTL short.
+
+Code that needs to write the user, or to check the password, loads the row:
+
+    user = db.session.get(User, current_user.id)
+"""
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, session, has_app_context
+from flask_login import UserMixin
+
+from backend.extensions import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+SESSION_STAMP_KEY = '_auth_stamp'
+
+# Columns copied onto the principal; never the password hash or tokens
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'email', 'firm', 'pending_approval', 'created_at', 'approved_at',
+    'failed_login_attempts', 'locked_until', 'password_changed_at', 'last_login_at', 'last_login_ip',
+)
+
+
+class SessionPrincipal(UserMixin):
+    """Read-only snapshot of a User, served as current_user."""
+
+    def __init__(self, user):
+        for field in PRINCIPAL_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    @property
+    def is_active(self):
+        return not self.pending_approval
+
+    def is_account_locked(self):
+        return bool(self.locked_until and self.locked_until > datetime.utcnow())
+
+    def __repr__(self):
+        return f'<SessionPrincipal {self.username}>'
+
+
+def auth_stamp(user):
+    """The value a session must carry for the user's current credentials."""
+    changed_at = user.password_changed_at
+    return changed_at.isoformat() if changed_at else 'initial'
+
+
+class PrincipalCache:
+    """Thread-safe TTL cache of SessionPrincipals, one per app (app.extensions)."""
+
+    def __init__(self, ttl=30, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # user_id -> (stamp, principal, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, stamp):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == stamp and entry[2] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, principal, stamp):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries and principal.id not in self._entries:
+                expired = [key for key, entry in self._entries.items() if entry[2] <= now]
+                for key in expired or [next(iter(self._entries))]:  # Else drop the oldest entry
+                    del self._entries[key]
+            self._entries[principal.id] = (stamp, principal, now + self.ttl)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_app(app):
+    from backend.models import User
+    for event_name in ('after_update', 'after_delete'):
+        if not db.event.contains(User, event_name, _invalidate_user):
+            db.event.listen(User, event_name, _invalidate_user)
+    app.extensions['principal_cache'] = PrincipalCache(
+        ttl=app.config.get('SESSION_PRINCIPAL_TTL', 30),
+        max_entries=app.config.get('SESSION_PRINCIPAL_CACHE_SIZE', 1000),
+    )
+
+
+def get_principal_cache():
+    return current_app.extensions['principal_cache']
+
+
+def load_principal(user_id):
+    """Flask-Login user_loader: the cached principal, or one read of the user."""
+    from backend.models import User
+    user_id = int(user_id)
+    cache = get_principal_cache()
+    stamp = session.get(SESSION_STAMP_KEY)
+    if stamp is not None:
+        principal = cache.get(user_id, stamp)
+        if principal is not None:
+            return principal
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    current = auth_stamp(user)
+    if stamp is None:
+        # Sessions from before stamps, and logins restored from the remember cookie
+        session[SESSION_STAMP_KEY] = current
+    elif stamp != current:
+        logger.debug("Session for user %s predates a password change; logging it out", user_id)
+        return None
+    principal = SessionPrincipal(user)
+    cache.put(principal, current)
+    return principal
+
+
+def remember_principal(principal):
+    """
+    After login_user() or a password change: stamp the session and cache the
+    principal. Take the snapshot before the commit (which expires the user)
+    and call this after it (whose flush drops the user's old entry).
+    """
+    stamp = auth_stamp(principal)
+    session[SESSION_STAMP_KEY] = stamp
+    get_principal_cache().put(principal, stamp)
+
+
+def forget_session():
+    session.pop(SESSION_STAMP_KEY, None)
+
+
+def _invalidate_user(mapper, connection, target):
+    """Drops a user's cached principal whenever the ORM updates or deletes the row."""
+    if has_app_context() and 'principal_cache' in current_app.extensions:
+        current_app.extensions['principal_cache'].invalidate(target.id)
@@ -2,14 +2,8 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import logging
 
-# Configure logging for rate limiter
+# Audit log: also written to LOG_FILE_DIR/rate_limit.log (see utils/logging_config.py)
 rate_limit_logger = logging.getLogger('rate_limit')
-rate_limit_logger.setLevel(logging.INFO)
-if not rate_limit_logger.handlers:
-    handler = logging.FileHandler('rate_limit.log')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    rate_limit_logger.addHandler(handler)
 
 # Custom error handler function
 def on_rate_limit_exceeded(request_limit):
@@ -24,8 +18,8 @@ def on_rate_limit_exceeded(request_limit):
         
     endpoint = request_limit.route if hasattr(request_limit, 'route') else "unknown_endpoint"
     rate_limit_logger.warning(
-        f"Rate limit exceeded: {request_limit} by IP {get_remote_address()} - "
-        f"User ID: {user_id}, Endpoint: {endpoint}"
+        "Rate limit exceeded: %s by IP %s - User ID: %s, Endpoint: %s",
+        request_limit, get_remote_address(), user_id, endpoint
     )
     return "Rate limit exceeded. Please try again later.", 429
 
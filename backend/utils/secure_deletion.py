@@ -1,21 +1,98 @@
 import os
-import random
 import logging
 from contextlib import contextmanager
 
-# Setup logging
+# Audit log: also written to LOG_FILE_DIR/secure_deletion.log (see utils/logging_config.py)
 secure_deletion_logger = logging.getLogger('secure_deletion')
-secure_deletion_logger.setLevel(logging.INFO)
-if not secure_deletion_logger.handlers:
-    handler = logging.FileHandler('secure_deletion.log')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    secure_deletion_logger.addHandler(handler)
+
+CHUNK_SIZE = 1024 * 1024  # Overwrite buffers are 1MB
+
+
+class Shredder:
+    """
+    Overwrites and removes files in batches. The pattern buffers (zeros,
+    ones, random bytes) are allocated once and reused for every file and
+    pass; each pass is written to every file of the batch and then synced,
+    so the batch waits on one round of fdatasync per pass rather than
+    interleaving writes and syncs file by file.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._zeros = bytes(chunk_size)
+        self._ones = b'\xFF' * chunk_size
+        self._random = bytearray(chunk_size)
+
+    def _pattern(self, pass_index):
+        if pass_index == 0:
+            return memoryview(self._zeros)
+        if pass_index == 1:
+            return memoryview(self._ones)
+        return memoryview(self._random)
+
+    def _overwrite(self, f, size, pattern):
+        f.seek(0)
+        remaining = size
+        while remaining > 0:
+            write_size = min(self.chunk_size, remaining)
+            f.write(pattern[:write_size])
+            remaining -= write_size
+        f.flush()
+
+    def shred(self, file_paths, passes=3):
+        """
+        Overwrites each file ``passes`` times, then removes it.
+
+        Returns:
+            dict: path -> None if shredded, else the exception that stopped it.
+                FileNotFoundError means there was nothing left to erase.
+        """
+        results = {}
+        handles = {}
+        try:
+            for path in file_paths:
+                try:
+                    f = open(path, 'rb+')
+                    handles[path] = (f, os.fstat(f.fileno()).st_size)
+                except OSError as e:
+                    results[path] = e
+
+            self._random[:] = os.urandom(self.chunk_size)
+            for i in range(passes):
+                pattern = self._pattern(i)
+                for path, (f, size) in list(handles.items()):
+                    try:
+                        self._overwrite(f, size, pattern)
+                    except OSError as e:
+                        results[path] = e
+                        handles.pop(path)[0].close()
+                # One sync round per pass: every file's pass is on disk before the next
+                for path, (f, _) in list(handles.items()):
+                    try:
+                        os.fdatasync(f.fileno())
+                    except OSError as e:
+                        results[path] = e
+                        handles.pop(path)[0].close()
+                secure_deletion_logger.info("Pass %s/%s completed for %s file(s)", i+1, passes, len(handles))
+        finally:
+            for f, _ in handles.values():
+                f.close()
+
+        for path in handles:
+            try:
+                os.remove(path)
+                results[path] = None
+                secure_deletion_logger.info("File securely deleted: %s", path)
+            except OSError as e:
+                results[path] = e
+        return results
+
 
 def secure_delete_file(file_path, passes=3):
     """
     Securely delete a file by overwriting its contents multiple times 
-    before deletion.
+    before deletion. Deletions requested by the API go through the shred
+    queue instead (services/shred_service.py).
     
     Args:
         file_path (str): Path to the file to delete
@@ -25,64 +102,19 @@ def secure_delete_file(file_path, passes=3):
         bool: True if deletion was successful, False otherwise
     """
     if not os.path.exists(file_path):
-        secure_deletion_logger.warning(f"File not found for secure deletion: {file_path}")
+        secure_deletion_logger.warning("File not found for secure deletion: %s", file_path)
         return False
-        
+
+    error = Shredder().shred([file_path], passes=passes)[file_path]
+    if error is None:
+        return True
+
+    secure_deletion_logger.error("Error during secure deletion of %s: %s", file_path, error)
+    # Try standard deletion as fallback
     try:
-        # Get file size
-        file_size = os.path.getsize(file_path)
-        
-        if file_size == 0:
-            # Empty file, just remove it
-            os.remove(file_path)
-            secure_deletion_logger.info(f"Empty file removed: {file_path}")
-            return True
-            
-        # Open the file for binary writing
-        for i in range(passes):
-            pattern = None
-            with open(file_path, 'rb+') as f:
-                # Determine which pattern to write based on the pass
-                if i == 0:
-                    # First pass: all zeros
-                    pattern = b'\x00'
-                elif i == 1:
-                    # Second pass: all ones
-                    pattern = b'\xFF'
-                else:
-                    # Other passes: random data
-                    pattern = bytes([random.randint(0, 255)])
-                
-                # Go to the beginning of the file
-                f.seek(0)
-                
-                # Write the pattern over the entire file
-                chunk_size = 1024 * 1024  # 1MB chunks to avoid memory issues
-                remaining = file_size
-                
-                while remaining > 0:
-                    write_size = min(chunk_size, remaining)
-                    f.write(pattern * write_size)
-                    remaining -= write_size
-                
-                # Flush changes to disk
-                f.flush()
-                os.fsync(f.fileno())
-                
-            secure_deletion_logger.info(f"Pass {i+1}/{passes} completed for {file_path}")
-            
-        # Finally remove the file
         os.remove(file_path)
-        secure_deletion_logger.info(f"File securely deleted: {file_path}")
+        secure_deletion_logger.warning("Fallback to standard deletion for %s", file_path)
         return True
-        
-    except Exception as e:
-        secure_deletion_logger.error(f"Error during secure deletion of {file_path}: {e}")
-        # Try standard deletion as fallback
-        try:
-            os.remove(file_path)
-            secure_deletion_logger.warning(f"Fallback to standard deletion for {file_path}")
-            return True
-        except Exception as e2:
-            secure_deletion_logger.error(f"Even standard deletion failed for {file_path}: {e2}")
-            return False
\ No newline at end of file
+    except Exception as e2:
+        secure_deletion_logger.error("Even standard deletion failed for %s: %s", file_path, e2)
+        return False
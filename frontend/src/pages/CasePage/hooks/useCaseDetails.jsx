@@ -18,7 +18,16 @@ export function useCaseDetails(caseId) {
     setError(null);
     
     try {
-      const response = await api.getCase(caseId);
+      // Suggestions live in their own table; fetch them alongside the case and
+      // expose them as case_details.pending_suggestions for the suggestions tab
+      const [response, suggestionsResponse] = await Promise.all([
+        api.getCase(caseId),
+        api.getCaseSuggestions(caseId)
+      ]);
+      response.data.case_details = {
+        ...(response.data.case_details || {}),
+        pending_suggestions: suggestionsResponse.data?.by_document || {}
+      };
       setCaseDetails(response.data);
       
       // Calculate data completeness
@@ -196,11 +196,7 @@ export function useSuggestions(caseDetails, refreshCase) {
     setError(null);
     
     try {
-      const updatePayload = {};
-      const currentCaseDetailsData = caseDetails?.case_details ?? {};
-      const updatedDetails = JSON.parse(JSON.stringify(currentCaseDetailsData));
-      const processedDocKeys = new Set();
-      let caseDetailsChanged = false;
+      const acceptList = [];
       
       // Helper function to truncate string values
       const truncateValue = (value, maxLength = 200) => {
@@ -213,7 +209,7 @@ export function useSuggestions(caseDetails, refreshCase) {
 
       // Process each accepted suggestion
       for (const [docKey, suggestions] of Object.entries(acceptedSuggestions)) {
-        processedDocKeys.add(docKey);
+        const documentId = parseInt(docKey.replace('doc_', ''), 10);
         
         for (const [field, suggestionData] of Object.entries(suggestions)) {
           // Skip if field is locked
@@ -222,72 +218,41 @@ export function useSuggestions(caseDetails, refreshCase) {
             continue;
           }
           
-          // Determine if this is a dedicated field or case_details field
-          console.log(`Looking up field configuration for: ${field}`);
+          // Only fields the case page knows how to show can be applied
           const fieldConfig = caseFieldConfig.find(f => f.name === field);
-          console.log('Found field config:', fieldConfig);
           if (!fieldConfig) {
             console.warn(`No field configuration found for ${field}, skipping...`);
             continue;
           }
           
-          const processedValue = truncateValue(suggestionData.value);
-          
-          if (fieldConfig.isDedicated) {
-            updatePayload[field] = processedValue;
-          } else {
-            if (updatedDetails[field] !== processedValue) {
-              updatedDetails[field] = processedValue;
-              caseDetailsChanged = true;
-            }
-          }
-
-          // If this suggestion should also lock the field
-          if (suggestionData.applyAndLock) {
-            if (!updatedDetails.locked_fields) {
-              updatedDetails.locked_fields = [];
-            }
-            if (!updatedDetails.locked_fields.includes(field)) {
-              updatedDetails.locked_fields.push(field);
-              caseDetailsChanged = true;
-            }
-          }
+          acceptList.push({
+            document_id: Number.isNaN(documentId) ? null : documentId,
+            field,
+            value: truncateValue(suggestionData.value),
+            lock: !!suggestionData.applyAndLock
+          });
         }
       }
       
-      // Clear processed suggestions from case_details
-      if (updatedDetails.pending_suggestions) {
-        // Clear all suggestions after applying selected ones
-        updatedDetails.pending_suggestions = {};
-        caseDetailsChanged = true;
-      }
-      
-      if (caseDetailsChanged) {
-        updatePayload.case_details = updatedDetails;
-      }
-      
       // If no changes to apply, just exit
-      if (Object.keys(updatePayload).length === 0) {
+      if (acceptList.length === 0) {
         setAcceptedSuggestions({});
         setIsApplying(false);
         return;
       }
       
-      console.log("Sending update payload:", updatePayload);
+      // Apply the selected suggestions; the rest are cleared (rejected)
+      const payload = { accept: acceptList, reject_remaining: true };
+      console.log("Sending apply payload:", payload);
       
       // Make the API call
-      const response = await api.updateCase(caseDetails.id, updatePayload);
-      console.log("Update response:", response);
+      const response = await api.applyCaseSuggestions(caseDetails.id, payload);
+      console.log("Apply response:", response);
       
-      // Update local state with the response data
-      if (response?.data) {
-        // Update case details with the response data
-        if (response.data.case_details) {
-          // Update locked fields from response
-          if (response.data.case_details.locked_fields) {
-            setLockedFields(response.data.case_details.locked_fields);
-          }
-        }
+      // Update locked fields from the returned case
+      const updatedCaseDetails = response?.data?.case?.case_details;
+      if (updatedCaseDetails?.locked_fields) {
+        setLockedFields(updatedCaseDetails.locked_fields);
       }
       
       setApplySuccess(true);
@@ -320,16 +285,8 @@ export function useSuggestions(caseDetails, refreshCase) {
     
     setIsClearing(true);
     
-    const currentDetails = caseDetails.case_details || {};
-    const payload = {
-      case_details: {
-        ...currentDetails,
-        pending_suggestions: {}
-      }
-    };
-    
     try {
-      await api.updateCase(caseDetails.id, payload);
+      await api.applyCaseSuggestions(caseDetails.id, { reject_remaining: true });
       message.success("Pending suggestions cleared successfully!");
       if (refreshCase) {
         refreshCase();
@@ -40,10 +40,14 @@ export const getCase = (caseId) => apiClient.get(`/cases/${caseId}`);
 export const createCase = (caseData) => apiClient.post('/cases', caseData);
 export const updateCase = (caseId, caseData) => apiClient.put(`/cases/${caseId}`, caseData);
 export const deleteCase = (caseId) => apiClient.delete(`/cases/${caseId}`);
+export const getCaseSuggestions = (caseId, status = 'pending') => apiClient.get(`/cases/${caseId}/suggestions`, { params: { status } });
+export const applyCaseSuggestions = (caseId, payload) => apiClient.post(`/cases/${caseId}/suggestions/apply`, payload);
 export const getDocumentTypes = () => apiClient.get('/generation/document-types');
 
 // --- Document Management ---
 export const getDocumentsForCase = (caseId) => apiClient.get(`/cases/${caseId}/documents`);
+export const searchDocuments = (query, { caseId, page = 1, perPage = 20 } = {}) =>
+  apiClient.get('/documents/search', { params: { q: query, case_id: caseId, page, per_page: perPage } });
 
 // Upload requires multipart/form-data, handled separately
 export const uploadDocument = async (caseId, file, options = {}) => {
@@ -400,7 +404,10 @@ const api = {
   createCase,
   updateCase,
   deleteCase,
+  getCaseSuggestions,
+  applyCaseSuggestions,
   getDocumentsForCase,
+  searchDocuments,
   uploadDocument,
   deleteDocument,
   analyzeDocument,
@@ -41,8 +41,8 @@ if not sqlalchemy_url:
                 try:
                     engine = current_app.extensions['migrate'].db.engine
                 except (AttributeError, RuntimeError) as e:
-                     logger.error(f"Could not get engine from current_app: {e}. "
-                                  "Ensure FLASK_APP is set correctly and points to your app.")
+                     logger.error("Could not get engine from current_app: %s. "
+                                  "Ensure FLASK_APP is set correctly and points to your app.", e)
                      raise
             if engine is None:
                 raise RuntimeError("Failed to get engine from Flask app.")
@@ -53,13 +53,13 @@ if not sqlalchemy_url:
                 # Use render_as_string for full URL representation
                 return get_engine().url.render_as_string(hide_password=False).replace('%', '%%')
             except Exception as e:
-                 logger.error(f"Error rendering engine URL: {e}")
+                 logger.error("Error rendering engine URL: %s", e)
                  raise
 
         sqlalchemy_url = get_engine_url()
 
     except Exception as e:
-        logger.error(f"Failed to determine database URL for Alembic: {e}")
+        logger.error("Failed to determine database URL for Alembic: %s", e)
         # You might want to raise an error or default to a known safe value if appropriate
         # Raising error is often safer to prevent migrations on wrong DB.
         raise ValueError("Could not determine database URL for Alembic migrations. "
@@ -67,7 +67,7 @@ if not sqlalchemy_url:
 
 
 # Set the URL for Alembic to use
-logger.info(f"Alembic using database URL: {sqlalchemy_url.split('@')[0]}@********") # Log URL without password
+logger.info("Alembic using database URL: %s@********", sqlalchemy_url.split('@')[0]) # Log URL without password
 config.set_main_option('sqlalchemy.url', sqlalchemy_url)
 
 # --- End Modified Section ---
@@ -79,8 +79,8 @@ config.set_main_option('sqlalchemy.url', sqlalchemy_url)
 try:
     target_db = current_app.extensions['migrate'].db
 except Exception as e:
-    logger.error(f"Could not get target_db from current_app: {e}. "
-                 "Ensure FLASK_APP=backend is set correctly before running flask db commands.")
+    logger.error("Could not get target_db from current_app: %s. "
+                 "Ensure FLASK_APP=backend is set correctly before running flask db commands.", e)
     raise
 
 def get_metadata():
@@ -98,6 +98,19 @@ target_metadata = get_metadata()
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Keeps autogenerate away from the SQLite FTS5 search index and its shadow
+    tables, and from indexes created only on another dialect (Index.ddl_if).
+    """
+    if type_ == 'table' and reflected and name.startswith('document_search_fts'):
+        return False
+    ddl_if = getattr(object, '_ddl_if', None)
+    if type_ == 'index' and ddl_if is not None and ddl_if.dialect:
+        return context.get_context().dialect.name == ddl_if.dialect
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
     """
@@ -108,7 +121,8 @@ def run_migrations_offline():
         target_metadata=target_metadata, # Use metadata determined above
         literal_binds=True,
         dialect_opts={"paramstyle": "named"}, # Recommended for SQLite offline mode
-        render_as_batch=True # Keep batch mode enabled for SQLite compatibility
+        render_as_batch=True, # Keep batch mode enabled for SQLite compatibility
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -124,6 +138,7 @@ def run_migrations_online():
          conf_args = current_app.extensions['migrate'].configure_args
          # Ensure render_as_batch=True is set for online mode too if needed (helps with SQLite)
          conf_args.setdefault('render_as_batch', True)
+    conf_args.setdefault('include_object', include_object)
 
     # Create engine using the explicitly determined URL
     connectable = sa.create_engine(config.get_main_option("sqlalchemy.url"))
@@ -0,0 +1,39 @@
+"""add import_checkpoint table
+
+Progress of bulk NDJSON case imports: the last imported line and the map of
+exported to new case ids, committed with each batch so an interrupted
+import resumes where it stopped.
+
+Revision ID: a8d3f5b1c9e2
+Revises: f4c9d1a7b3e8
+Create Date: 2026-10-19 19:26:41.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f5b1c9e2'
+down_revision = 'f4c9d1a7b3e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_checkpoint',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('import_key', sa.String(length=200), nullable=False),
+    sa.Column('line_number', sa.Integer(), nullable=False),
+    sa.Column('case_id_map', sa.JSON(), nullable=False),
+    sa.Column('stats', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('import_key')
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoint')
@@ -0,0 +1,65 @@
+"""add ownership-scoped composite and partial indexes
+
+Makes case display names unique per user instead of globally, and indexes
+the hot lookups: a user's cases by display name, a case's documents by
+upload date, and pending users.
+
+Revision ID: b5e1c7d2a9f4
+Revises: f90f33a6c4b3
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1c7d2a9f4'
+down_revision = 'f90f33a6c4b3'
+branch_labels = None
+depends_on = None
+
+# The initial schema created the display_name constraint without a name. Postgres
+# named it itself; SQLite keeps it anonymous, so batch mode needs a naming
+# convention to find it when the table is recreated.
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _display_name_unique_constraint(bind):
+    for constraint in sa.inspect(bind).get_unique_constraints('case'):
+        if constraint['column_names'] == ['display_name']:
+            return constraint['name'] or 'uq_case_display_name'
+    return None
+
+
+def upgrade():
+    bind = op.get_bind()
+    constraint_name = _display_name_unique_constraint(bind)
+    with op.batch_alter_table('case', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        if constraint_name:
+            batch_op.drop_constraint(constraint_name, type_='unique')
+        # Unique per user; user_id leads so the case list (filter by user,
+        # order by display name) is an index range scan
+        batch_op.create_index('ix_case_user_id_display_name', ['user_id', 'display_name'], unique=True)
+
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.create_index('ix_document_case_id_upload_date', ['case_id', 'upload_date'], unique=False)
+
+    # approval_token already has a unique constraint, which is indexed on both
+    # databases; pending users only need a partial index
+    op.create_index(
+        'ix_users_pending_created_at', 'users', ['created_at'], unique=False,
+        sqlite_where=sa.text('pending_approval = 1'),
+        postgresql_where=sa.text('pending_approval'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_users_pending_created_at', table_name='users')
+
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_index('ix_document_case_id_upload_date')
+
+    with op.batch_alter_table('case', schema=None) as batch_op:
+        batch_op.drop_index('ix_case_user_id_display_name')
+        batch_op.create_unique_constraint('uq_case_display_name', ['display_name'])
@@ -0,0 +1,30 @@
+"""add document file_key for envelope encryption
+
+Each uploaded file gets its own data key, stored here wrapped by a file
+key-encryption key. Existing rows stay NULL: their files were encrypted with
+the legacy single key and are still read with it.
+
+Revision ID: b6e2a9d4f1c7
+Revises: a8d3f5b1c9e2
+Create Date: 2026-10-19 20:41:09.318552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2a9d4f1c7'
+down_revision = 'a8d3f5b1c9e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_key', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_column('file_key')
@@ -0,0 +1,46 @@
+"""store case_details as JSONB on Postgres with a GIN index
+
+On Postgres case_details changes from json to jsonb so single keys can be
+updated in place (jsonb_set / ||) and cases can be found by detail keys
+through a GIN index. SQLite keeps its JSON text column; nothing to do there.
+
+Revision ID: c3f8a1e6d2b7
+Revises: b5e1c7d2a9f4
+Create Date: 2026-10-19 11:40:07.218954
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a1e6d2b7'
+down_revision = 'b5e1c7d2a9f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.alter_column('case', 'case_details',
+                    existing_type=postgresql.JSON(astext_type=sa.Text()),
+                    type_=postgresql.JSONB(astext_type=sa.Text()),
+                    existing_nullable=True,
+                    postgresql_using='case_details::jsonb')
+    op.create_index('ix_case_case_details_gin', 'case', ['case_details'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_case_case_details_gin', table_name='case', postgresql_using='gin')
+    op.alter_column('case', 'case_details',
+                    existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                    type_=postgresql.JSON(astext_type=sa.Text()),
+                    existing_nullable=True,
+                    postgresql_using='case_details::json')
@@ -0,0 +1,88 @@
+"""add case_number blind index
+
+case_number may now be stored encrypted (ENCRYPT_CASE_FIELDS), and its
+randomized ciphertext can't be compared or kept unique in SQL. Lookups and the
+unique constraint move to case_number_bidx, an HMAC of the plaintext keyed from
+the field encryption key directory; existing rows are backfilled here, which
+needs the app's keys (run through `flask db upgrade`). case_number is widened
+to fit ciphertext.
+
+Downgrading decrypts any encrypted case numbers back to plaintext first.
+
+Revision ID: c9f1e3a7b2d4
+Revises: b6e2a9d4f1c7
+Create Date: 2026-10-19 21:27:44.602318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f1e3a7b2d4'
+down_revision = 'b6e2a9d4f1c7'
+branch_labels = None
+depends_on = None
+
+case_table = sa.table('case', sa.column('id', sa.Integer), sa.column('case_number', sa.Text),
+                      sa.column('case_number_bidx', sa.String))
+
+
+def _stored_case_numbers(connection):
+    """(id, plaintext, stored value) of every case with a case number."""
+    from backend.utils.encryption import field_encryptor
+
+    rows = connection.execute(
+        sa.select(case_table.c.id, case_table.c.case_number).where(case_table.c.case_number.isnot(None))
+    ).all()
+    for case_id, stored in rows:
+        plaintext = field_encryptor.decrypt(stored.encode('utf-8')) if field_encryptor.is_encrypted(stored) else stored
+        yield case_id, plaintext, stored
+
+
+# SQLite reflects the unique constraint without its name; this gives it back
+naming_convention = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def upgrade():
+    with op.batch_alter_table('case', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.add_column(sa.Column('case_number_bidx', sa.String(length=64), nullable=True))
+        batch_op.alter_column('case_number', existing_type=sa.String(length=100),
+                              type_=sa.String(length=512), existing_nullable=True)
+        batch_op.drop_constraint('uq_case_case_number', type_='unique')
+
+    if not op.get_context().as_sql:
+        from backend.utils.encryption import field_encryptor
+
+        connection = op.get_bind()
+        params = [{'_id': case_id, '_bidx': field_encryptor.blind_index(plaintext, 'case_number_bidx')}
+                  for case_id, plaintext, _ in _stored_case_numbers(connection)]
+        if params:
+            connection.execute(
+                case_table.update().where(case_table.c.id == sa.bindparam('_id'))
+                .values(case_number_bidx=sa.bindparam('_bidx')),
+                params,
+            )
+
+    with op.batch_alter_table('case', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_case_case_number_bidx'), ['case_number_bidx'], unique=True)
+
+
+def downgrade():
+    if not op.get_context().as_sql:
+        connection = op.get_bind()
+        params = [{'_id': case_id, '_number': plaintext}
+                  for case_id, plaintext, stored in _stored_case_numbers(connection) if plaintext != stored]
+        if params:
+            connection.execute(
+                case_table.update().where(case_table.c.id == sa.bindparam('_id'))
+                .values(case_number=sa.bindparam('_number')),
+                params,
+            )
+
+    with op.batch_alter_table('case', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_case_case_number_bidx'))
+        batch_op.create_unique_constraint(batch_op.f('uq_case_case_number'), ['case_number'])
+        batch_op.alter_column('case_number', existing_type=sa.String(length=512),
+                              type_=sa.String(length=100), existing_nullable=True)
+        batch_op.drop_column('case_number_bidx')
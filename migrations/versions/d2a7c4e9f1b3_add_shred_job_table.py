@@ -0,0 +1,47 @@
+"""add shred_job table
+
+Durable queue of deleted documents' files awaiting secure erasure. Deletes
+queue a row in their own transaction; the background shred worker claims due
+rows, retries failures with backoff, and leaves every row as an audit record.
+
+Revision ID: d2a7c4e9f1b3
+Revises: c9f1e3a7b2d4
+Create Date: 2026-10-19 22:04:51.836207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c4e9f1b3'
+down_revision = 'c9f1e3a7b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('shred_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=1000), nullable=False),
+    sa.Column('mode', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('document_id', sa.Integer(), nullable=True),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shred_job', schema=None) as batch_op:
+        batch_op.create_index('ix_shred_job_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shred_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_shred_job_status_next_attempt_at')
+
+    op.drop_table('shred_job')
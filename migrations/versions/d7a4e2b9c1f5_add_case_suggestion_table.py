@@ -0,0 +1,119 @@
+"""move pending suggestions out of case_details into case_suggestion
+
+Each case_details['pending_suggestions']['doc_<id>'] dict becomes one pending
+case_suggestion row per non-empty field (document_id is left null when the
+document no longer exists), and the pending_suggestions key is removed.
+Downgrade folds the pending rows back into case_details.
+
+Revision ID: d7a4e2b9c1f5
+Revises: c3f8a1e6d2b7
+Create Date: 2026-10-19 14:05:31.402117
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a4e2b9c1f5'
+down_revision = 'c3f8a1e6d2b7'
+branch_labels = None
+depends_on = None
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _load(details):
+    if isinstance(details, str):
+        try:
+            return json.loads(details)
+        except ValueError:
+            return None
+    return details
+
+
+def upgrade():
+    suggestion_table = op.create_table('case_suggestion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('case_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=True),
+        sa.Column('field', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['case_id'], ['case.id'], ),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('case_id', 'document_id', 'field', name='uq_case_suggestion_case_document_field')
+    )
+    op.create_index('ix_case_suggestion_case_id_status', 'case_suggestion', ['case_id', 'status'], unique=False)
+
+    if op.get_context().as_sql:
+        # Offline (--sql) mode can't read existing rows; run online to move the data
+        return
+
+    bind = op.get_bind()
+    case_table = sa.table('case', sa.column('id', sa.Integer), sa.column('case_details', sa.JSON))
+    document_ids = {row[0] for row in bind.execute(sa.text('SELECT id FROM document'))}
+    now = datetime.utcnow()
+
+    for case_id, raw_details in bind.execute(sa.select(case_table.c.id, case_table.c.case_details)).all():
+        details = _load(raw_details)
+        if not isinstance(details, dict) or 'pending_suggestions' not in details:
+            continue
+
+        rows = {}
+        pending = details.pop('pending_suggestions') or {}
+        for doc_key, fields in (pending.items() if isinstance(pending, dict) else []):
+            if not isinstance(fields, dict):
+                continue
+            doc_id = doc_key[len('doc_'):] if doc_key.startswith('doc_') else None
+            document_id = int(doc_id) if doc_id and doc_id.isdigit() and int(doc_id) in document_ids else None
+            for field, value in fields.items():
+                if _is_empty(value) or len(field) > 100:
+                    continue
+                rows[(document_id, field)] = {
+                    'case_id': case_id, 'document_id': document_id, 'field': field, 'value': value,
+                    'status': 'pending', 'created_at': now, 'updated_at': now,
+                }
+        if rows:
+            op.bulk_insert(suggestion_table, list(rows.values()))
+        bind.execute(case_table.update().where(case_table.c.id == case_id).values(case_details=details))
+
+
+def downgrade():
+    if not op.get_context().as_sql:
+        bind = op.get_bind()
+        case_table = sa.table('case', sa.column('id', sa.Integer), sa.column('case_details', sa.JSON))
+        pending = {}
+        suggestion_table = sa.table('case_suggestion',
+            sa.column('case_id', sa.Integer), sa.column('document_id', sa.Integer),
+            sa.column('field', sa.String), sa.column('value', sa.JSON), sa.column('status', sa.String))
+        result = bind.execute(sa.select(
+            suggestion_table.c.case_id, suggestion_table.c.document_id,
+            suggestion_table.c.field, suggestion_table.c.value,
+        ).where(suggestion_table.c.status == 'pending'))
+        for case_id, document_id, field, value in result:
+            doc_key = f'doc_{document_id}' if document_id is not None else 'doc_unknown'
+            pending.setdefault(case_id, {}).setdefault(doc_key, {})[field] = value
+
+        for case_id, suggestions in pending.items():
+            details = bind.execute(
+                sa.select(case_table.c.case_details).where(case_table.c.id == case_id)).scalar() or {}
+            details['pending_suggestions'] = suggestions
+            bind.execute(case_table.update().where(case_table.c.id == case_id).values(case_details=details))
+
+    op.drop_index('ix_case_suggestion_case_id_status', table_name='case_suggestion')
+    op.drop_table('case_suggestion')
@@ -0,0 +1,102 @@
+"""add full-text search index over documents' extracted text
+
+Adds document_search_page (a document's text, one row per page) and
+indexes it: on Postgres a GIN index on to_tsvector('english', content), on
+SQLite an external-content FTS5 table kept in sync by triggers. Existing
+documents are indexed as part of the upgrade.
+
+Revision ID: e2b8f4c6a1d3
+Revises: d7a4e2b9c1f5
+Create Date: 2026-10-19 16:22:48.730561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b8f4c6a1d3'
+down_revision = 'd7a4e2b9c1f5'
+branch_labels = None
+depends_on = None
+
+PAGE_BREAK = '\f'
+BATCH_SIZE = 100
+
+# Same statements as models.DOCUMENT_SEARCH_FTS_DDL
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE document_search_fts USING fts5("
+    "content, content='document_search_page', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER document_search_page_ai AFTER INSERT ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER document_search_page_ad AFTER DELETE ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER document_search_page_au AFTER UPDATE ON document_search_page BEGIN "
+    "INSERT INTO document_search_fts(document_search_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO document_search_fts(rowid, content) VALUES (new.id, new.content); END",
+)
+
+
+def _pages(text):
+    if PAGE_BREAK not in text:
+        return [(None, text)] if text.strip() else []
+    return [(number, page) for number, page in enumerate(text.split(PAGE_BREAK), start=1) if page.strip()]
+
+
+def upgrade():
+    dialect_name = op.get_context().dialect.name
+
+    page_table = op.create_table('document_search_page',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('case_id', sa.Integer(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['case_id'], ['case.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_document_search_page_case_id', 'document_search_page', ['case_id'], unique=False)
+    op.create_index('ix_document_search_page_document_id', 'document_search_page', ['document_id'], unique=False)
+
+    if dialect_name == 'postgresql':
+        op.create_index('ix_document_search_page_tsv', 'document_search_page',
+                        [sa.text("to_tsvector('english', content)")], unique=False, postgresql_using='gin')
+    elif dialect_name == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+    if op.get_context().as_sql:
+        # Offline (--sql) mode can't read documents; run `flask reindex-documents` afterwards
+        return
+
+    bind = op.get_bind()
+    document_table = sa.table('document', sa.column('id', sa.Integer), sa.column('case_id', sa.Integer),
+                              sa.column('extracted_text', sa.Text))
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(document_table.c.id, document_table.c.case_id, document_table.c.extracted_text)
+            .where(document_table.c.id > last_id, document_table.c.extracted_text.isnot(None))
+            .order_by(document_table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        rows = [{'document_id': document_id, 'case_id': case_id, 'page_number': number, 'content': content}
+                for document_id, case_id, extracted_text in batch
+                for number, content in _pages(extracted_text)]
+        if rows:
+            op.bulk_insert(page_table, rows)
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    dialect_name = op.get_context().dialect.name
+    if dialect_name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS document_search_fts")
+    elif dialect_name == 'postgresql':
+        op.drop_index('ix_document_search_page_tsv', table_name='document_search_page', postgresql_using='gin')
+    op.drop_index('ix_document_search_page_document_id', table_name='document_search_page')
+    op.drop_index('ix_document_search_page_case_id', table_name='document_search_page')
+    op.drop_table('document_search_page')
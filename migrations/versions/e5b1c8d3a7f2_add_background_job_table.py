@@ -0,0 +1,48 @@
+"""add background_job table
+
+Status, progress and encrypted results of upload jobs run in a background
+thread (medical summaries, subpoena batches), so that any worker can answer
+the status polls and downloads.
+
+Revision ID: e5b1c8d3a7f2
+Revises: d2a7c4e9f1b3
+Create Date: 2026-10-20 10:12:37.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c8d3a7f2'
+down_revision = 'd2a7c4e9f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('background_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('progress', sa.JSON(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('document', sa.Text(), nullable=True),
+    sa.Column('ttl_seconds', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('background_job', schema=None) as batch_op:
+        batch_op.create_index('ix_background_job_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('background_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_background_job_expires_at')
+
+    op.drop_table('background_job')
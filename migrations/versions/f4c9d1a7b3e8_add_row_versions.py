@@ -0,0 +1,36 @@
+"""add row version counters to case and document
+
+Every UPDATE of a case or document row increments its version (see the
+onupdate on the model columns); the case endpoints build their ETags from
+these and updated_at with one aggregate query.
+
+Revision ID: f4c9d1a7b3e8
+Revises: e2b8f4c6a1d3
+Create Date: 2026-10-19 18:03:12.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c9d1a7b3e8'
+down_revision = 'e2b8f4c6a1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('case', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('case', schema=None) as batch_op:
+        batch_op.drop_column('version')